@@ -0,0 +1,190 @@
+//! Compares the size and parse time of the JSON and binary encodings of each object type.
+//!
+//! Run with `cargo bench --bench object_encoding`.
+
+use std::collections::HashMap;
+use std::time::{Duration, Instant};
+
+use anoncreds::{
+    data_types::{
+        binary,
+        cred_def::{CredentialDefinitionId, CredentialDefinitionPrivate},
+        rev_reg::RevocationRegistryId,
+        schema::SchemaId,
+    },
+    issuer, prover,
+    tails::{TailsFileReader, TailsFileWriter},
+    types::{
+        CredentialDefinitionConfig, CredentialRevocationConfig, MakeCredentialValues,
+        PresentCredentials, PresentationRequest, RegistryType, SignatureType,
+    },
+    verifier,
+};
+use serde::{de::DeserializeOwned, Serialize};
+use serde_json::json;
+
+const SCHEMA_ID: &str = "mock:uri";
+const CRED_DEF_ID: &str = "mock:uri";
+const ISSUER_ID: &str = "mock:issuer_id/path&q=bar";
+const REV_REG_DEF_ID: &str = "mock:uri:revregid";
+const REV_IDX: u32 = 1;
+const MAX_CRED_NUM: u32 = 100;
+const ITERATIONS: u32 = 200;
+
+fn time_per_call(mut f: impl FnMut()) -> Duration {
+    let start = Instant::now();
+    for _ in 0..ITERATIONS {
+        f();
+    }
+    start.elapsed() / ITERATIONS
+}
+
+fn compare<T: Serialize + DeserializeOwned>(name: &str, obj: &T) {
+    let json = serde_json::to_vec(obj).expect("Error serializing object");
+    let bytes = binary::to_bytes(obj).expect("Error encoding object");
+    assert_eq!(
+        serde_json::to_value(binary::from_bytes::<T>(&bytes).expect("Error decoding object"))
+            .unwrap(),
+        serde_json::to_value(obj).unwrap()
+    );
+
+    let json_parse = time_per_call(|| {
+        serde_json::from_slice::<T>(&json).expect("Error parsing object");
+    });
+    let binary_parse = time_per_call(|| {
+        binary::from_bytes::<T>(&bytes).expect("Error decoding object");
+    });
+
+    println!(
+        "{name:<36} json: {:>7} B {json_parse:>12?}  binary: {:>7} B {binary_parse:>12?}  size: {:>5.1}%",
+        json.len(),
+        bytes.len(),
+        bytes.len() as f64 * 100.0 / json.len() as f64
+    );
+}
+
+fn main() {
+    let master_secret = prover::create_master_secret().expect("Error creating master secret");
+    let schema = issuer::create_schema("gvt", "1.0", ISSUER_ID, ["name", "age"][..].into())
+        .expect("Error creating schema");
+    let (cred_def, cred_def_priv, key_proof) = issuer::create_credential_definition(
+        SCHEMA_ID,
+        &schema,
+        ISSUER_ID,
+        "tag",
+        SignatureType::CL,
+        CredentialDefinitionConfig {
+            support_revocation: true,
+        },
+    )
+    .expect("Error creating credential definition");
+
+    let tails_dir = std::env::temp_dir().to_string_lossy().into_owned();
+    let mut tails_writer = TailsFileWriter::new(Some(tails_dir));
+    let (rev_reg_def, rev_reg_def_priv) = issuer::create_revocation_registry_def(
+        &cred_def,
+        CRED_DEF_ID,
+        ISSUER_ID,
+        "tag",
+        RegistryType::CL_ACCUM,
+        MAX_CRED_NUM,
+        &mut tails_writer,
+    )
+    .expect("Error creating revocation registry definition");
+    let rev_status_list =
+        issuer::create_revocation_status_list(REV_REG_DEF_ID, &rev_reg_def, Some(10), true)
+            .expect("Error creating revocation status list");
+
+    let cred_offer = issuer::create_credential_offer(SCHEMA_ID, CRED_DEF_ID, &key_proof)
+        .expect("Error creating credential offer");
+    let (cred_request, cred_request_metadata) =
+        prover::create_credential_request(None, &cred_def, &master_secret, "default", &cred_offer)
+            .expect("Error creating credential request");
+    let mut cred_values = MakeCredentialValues::default();
+    cred_values
+        .add_raw("name", "Alex")
+        .expect("Error encoding attribute");
+    cred_values
+        .add_raw("age", "28")
+        .expect("Error encoding attribute");
+    let mut credential = issuer::create_credential(
+        &cred_def,
+        &cred_def_priv,
+        &cred_offer,
+        &cred_request,
+        cred_values.into(),
+        Some(RevocationRegistryId::new_unchecked(REV_REG_DEF_ID)),
+        Some(&rev_status_list),
+        Some(CredentialRevocationConfig {
+            reg_def: &rev_reg_def,
+            reg_def_private: &rev_reg_def_priv,
+            registry_idx: REV_IDX,
+            tails_reader: TailsFileReader::new_tails_reader(&rev_reg_def.value.tails_location),
+        }),
+    )
+    .expect("Error creating credential");
+    prover::process_credential(
+        &mut credential,
+        &cred_request_metadata,
+        &master_secret,
+        &cred_def,
+        Some(&rev_reg_def),
+    )
+    .expect("Error processing credential");
+    let rev_state = prover::create_or_update_revocation_state(
+        &rev_reg_def.value.tails_location,
+        &rev_reg_def,
+        &rev_status_list,
+        REV_IDX,
+        None,
+        None,
+    )
+    .expect("Error creating revocation state");
+
+    let pres_request: PresentationRequest = serde_json::from_value(json!({
+        "nonce": verifier::generate_nonce().expect("Error generating nonce"),
+        "name": "pres_req_1",
+        "version": "0.1",
+        "requested_attributes": {
+            "attr1_referent": { "name": "name" },
+        },
+        "requested_predicates": {
+            "predicate1_referent": { "name": "age", "p_type": ">=", "p_value": 18 },
+        },
+        "non_revoked": { "from": 10, "to": 10 },
+    }))
+    .expect("Error creating presentation request");
+    let mut present = PresentCredentials::default();
+    {
+        let mut entry = present.add_credential(&credential, Some(10), Some(&rev_state));
+        entry.add_requested_attribute("attr1_referent", true);
+        entry.add_requested_predicate("predicate1_referent");
+    }
+    let schema_id = SchemaId::new_unchecked(SCHEMA_ID);
+    let cred_def_id = CredentialDefinitionId::new_unchecked(CRED_DEF_ID);
+    let presentation = prover::create_presentation(
+        &pres_request,
+        present,
+        None,
+        &master_secret,
+        &HashMap::from([(&schema_id, &schema)]),
+        &HashMap::from([(&cred_def_id, &cred_def)]),
+    )
+    .expect("Error creating presentation");
+
+    compare("Schema", &schema);
+    compare("CredentialDefinition", &cred_def);
+    compare::<CredentialDefinitionPrivate>("CredentialDefinitionPrivate", &cred_def_priv);
+    compare("KeyCorrectnessProof", &key_proof);
+    compare("MasterSecret", &master_secret);
+    compare("CredentialOffer", &cred_offer);
+    compare("CredentialRequest", &cred_request);
+    compare("CredentialRequestMetadata", &cred_request_metadata);
+    compare("Credential", &credential);
+    compare("RevocationRegistryDefinition", &rev_reg_def);
+    compare("RevocationRegistryDefinitionPrivate", &rev_reg_def_priv);
+    compare("RevocationStatusList", &rev_status_list);
+    compare("CredentialRevocationState", &rev_state);
+    compare("PresentationRequest", &pres_request);
+    compare("Presentation", &presentation);
+}
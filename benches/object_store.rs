@@ -0,0 +1,110 @@
+//! Measures the throughput of the FFI object store as more threads share it, along
+//! with how often its locks were contended.
+//!
+//! Run with `cargo bench --bench object_store`.
+
+use std::os::raw::c_char;
+use std::thread;
+use std::time::{Duration, Instant};
+
+// link the library, whose FFI functions are called directly
+use anoncreds as _;
+
+// the layout of `ffi_support::ByteBuffer`, borrowing the input instead of owning it
+#[repr(C)]
+struct ByteBuffer {
+    len: i64,
+    data: *const u8,
+}
+
+extern "C" {
+    fn anoncreds_schema_from_json(json: ByteBuffer, result_p: *mut usize) -> usize;
+    fn anoncreds_object_get_type_name(handle: usize, result_p: *mut *const c_char) -> usize;
+    fn anoncreds_object_free(handle: usize);
+    fn anoncreds_string_free(string: *mut c_char);
+    fn anoncreds_object_store_stats(
+        live_objects_p: *mut i64,
+        lock_acquisitions_p: *mut i64,
+        lock_contentions_p: *mut i64,
+    ) -> usize;
+}
+
+const SCHEMA_JSON: &str =
+    r#"{"name":"gvt","version":"1.0","attrNames":["name","age"],"issuerId":"mock:uri"}"#;
+const THREADS: [usize; 5] = [1, 2, 4, 8, 16];
+const OBJECTS_PER_THREAD: usize = 64;
+const LOADS_PER_THREAD: usize = 200_000;
+const CREATES_PER_THREAD: usize = 5_000;
+
+fn create_schema() -> usize {
+    let json = ByteBuffer {
+        len: SCHEMA_JSON.len() as i64,
+        data: SCHEMA_JSON.as_ptr(),
+    };
+    let mut handle = 0;
+    let code = unsafe { anoncreds_schema_from_json(json, &mut handle) };
+    assert_eq!(code, 0, "Error creating schema");
+    handle
+}
+
+fn load(handle: usize) {
+    let mut name = std::ptr::null();
+    let code = unsafe { anoncreds_object_get_type_name(handle, &mut name) };
+    assert_eq!(code, 0, "Error loading object");
+    unsafe { anoncreds_string_free(name as *mut c_char) };
+}
+
+fn contentions() -> (i64, i64) {
+    let (mut live, mut acquisitions, mut contentions) = (0, 0, 0);
+    let code =
+        unsafe { anoncreds_object_store_stats(&mut live, &mut acquisitions, &mut contentions) };
+    assert_eq!(code, 0, "Error reading object store stats");
+    (acquisitions, contentions)
+}
+
+/// Run `work` on `threads` threads at once, returning the elapsed time and the
+/// share of lock acquisitions which were contended.
+fn run(threads: usize, work: impl Fn() + Sync) -> (Duration, f64) {
+    let (acquisitions, contended) = contentions();
+    let start = Instant::now();
+    thread::scope(|scope| {
+        for _ in 0..threads {
+            scope.spawn(&work);
+        }
+    });
+    let elapsed = start.elapsed();
+    let (after_acquisitions, after_contended) = contentions();
+    let contention = (after_contended - contended) as f64 * 100.0
+        / (after_acquisitions - acquisitions).max(1) as f64;
+    (elapsed, contention)
+}
+
+fn main() {
+    for threads in THREADS {
+        let handles: Vec<usize> = (0..threads * OBJECTS_PER_THREAD)
+            .map(|_| create_schema())
+            .collect();
+        let (load_time, load_contention) = run(threads, || {
+            for idx in 0..LOADS_PER_THREAD {
+                load(handles[idx % handles.len()]);
+            }
+        });
+        for handle in handles {
+            unsafe { anoncreds_object_free(handle) };
+        }
+
+        let (create_time, create_contention) = run(threads, || {
+            for _ in 0..CREATES_PER_THREAD {
+                unsafe { anoncreds_object_free(create_schema()) };
+            }
+        });
+
+        let loads = (threads * LOADS_PER_THREAD) as f64;
+        let creates = (threads * CREATES_PER_THREAD) as f64;
+        println!(
+            "{threads:>2} threads  load: {:>6.2} M/s ({load_contention:>5.2}% contended)  create+free: {:>6.3} M/s ({create_contention:>5.2}% contended)",
+            loads / load_time.as_secs_f64() / 1e6,
+            creates / create_time.as_secs_f64() / 1e6,
+        );
+    }
+}
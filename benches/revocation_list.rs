@@ -0,0 +1,65 @@
+//! Compares the size, serialization and parse time of the revocation list encodings.
+//!
+//! Run with `cargo bench --bench revocation_list`.
+
+use std::time::{Duration, Instant};
+
+use anoncreds::data_types::rev_reg::{RevocationListEncoding, RevocationStatusList};
+use bitvec::vec::BitVec;
+
+const SIZES: [usize; 3] = [10_000, 100_000, 1_000_000];
+// Every `REVOKED_SPACING` indices on average is revoked
+const REVOKED_SPACING: u64 = 100;
+const ITERATIONS: u32 = 20;
+
+fn time_per_call(mut f: impl FnMut()) -> Duration {
+    let start = Instant::now();
+    for _ in 0..ITERATIONS {
+        f();
+    }
+    start.elapsed() / ITERATIONS
+}
+
+fn status_list(size: usize) -> RevocationStatusList {
+    // a fixed xorshift sequence, so that runs are comparable
+    let mut seed = 0x2545_f491_4f6c_dd1d_u64;
+    let mut revocation_list = BitVec::repeat(false, size);
+    for idx in 0..size {
+        seed ^= seed << 13;
+        seed ^= seed >> 7;
+        seed ^= seed << 17;
+        if seed % REVOKED_SPACING == 0 {
+            revocation_list.set(idx, true);
+        }
+    }
+    RevocationStatusList::new(Some("mock:uri"), revocation_list, None, Some(10))
+        .expect("Error creating revocation status list")
+}
+
+fn main() {
+    for size in SIZES {
+        let list = status_list(size);
+        for encoding in [
+            RevocationListEncoding::Array,
+            RevocationListEncoding::Bitstring,
+            RevocationListEncoding::RunLength,
+        ] {
+            let json = list
+                .to_json_with_encoding(encoding)
+                .expect("Error serializing status list");
+            let serialize = time_per_call(|| {
+                list.to_json_with_encoding(encoding)
+                    .expect("Error serializing status list");
+            });
+            let parse = time_per_call(|| {
+                serde_json::from_slice::<RevocationStatusList>(&json)
+                    .expect("Error parsing status list");
+            });
+            println!(
+                "{size:>9} entries {:<10} size: {:>9} B  serialize: {serialize:>12?}  parse: {parse:>12?}",
+                format!("{encoding:?}"),
+                json.len(),
+            );
+        }
+    }
+}
@@ -0,0 +1,62 @@
+//! Compares the time to create a revocation registry, writing its tails file on one
+//! thread and on every available core.
+//!
+//! Run with `cargo bench --bench tails_generation`.
+
+use std::time::Instant;
+
+use anoncreds::{
+    issuer,
+    tails::TailsFileWriter,
+    types::{CredentialDefinitionConfig, RegistryType, SignatureType},
+};
+
+const CRED_DEF_ID: &str = "mock:uri";
+const ISSUER_ID: &str = "mock:issuer_id/path&q=bar";
+const MAX_CRED_NUMS: [u32; 2] = [10_000, 100_000];
+
+fn main() {
+    let schema = issuer::create_schema("gvt", "1.0", ISSUER_ID, ["name", "age"][..].into())
+        .expect("Error creating schema");
+    let (cred_def, _cred_def_priv, _key_proof) = issuer::create_credential_definition(
+        "mock:uri",
+        &schema,
+        ISSUER_ID,
+        "tag",
+        SignatureType::CL,
+        CredentialDefinitionConfig {
+            support_revocation: true,
+        },
+    )
+    .expect("Error creating credential definition");
+
+    for max_cred_num in MAX_CRED_NUMS {
+        for threads in [1, 0] {
+            let tails_dir = tempfile::tempdir().expect("Error creating tails directory");
+            let mut tails_writer =
+                TailsFileWriter::new(Some(tails_dir.path().to_string_lossy().into_owned()))
+                    .with_threads(threads);
+            let start = Instant::now();
+            let (rev_reg_def, _rev_reg_def_priv) = issuer::create_revocation_registry_def(
+                &cred_def,
+                CRED_DEF_ID,
+                ISSUER_ID,
+                "tag",
+                RegistryType::CL_ACCUM,
+                max_cred_num,
+                &mut tails_writer,
+            )
+            .expect("Error creating revocation registry definition");
+            println!(
+                "{max_cred_num:>7} credentials  threads: {:<4} {:>10.2?}  tails hash: {}",
+                if threads == 0 {
+                    "all".to_owned()
+                } else {
+                    threads.to_string()
+                },
+                start.elapsed(),
+                rev_reg_def.value.tails_hash,
+            );
+        }
+    }
+}
@@ -0,0 +1,190 @@
+//! Compares presentation verification with and without a prepared `VerifierContext`.
+//!
+//! Run with `cargo bench --bench verifier_context`.
+
+use std::collections::HashMap;
+use std::time::{Duration, Instant};
+
+use anoncreds::{
+    data_types::{
+        cred_def::{CredentialDefinition, CredentialDefinitionId},
+        presentation::Presentation,
+        schema::{Schema, SchemaId},
+    },
+    issuer, prover,
+    types::{
+        CredentialDefinitionConfig, MakeCredentialValues, PresentCredentials, PresentationRequest,
+        SignatureType,
+    },
+    verifier,
+};
+use serde_json::json;
+
+const SCHEMA_ID: &str = "mock:uri";
+const CRED_DEF_ID: &str = "mock:uri";
+const ISSUER_ID: &str = "mock:issuer_id/path&q=bar";
+const ITERATIONS: u32 = 20;
+
+struct Fixture {
+    schema: Schema,
+    cred_def: CredentialDefinition,
+    pres_request: PresentationRequest,
+    presentation: Presentation,
+}
+
+fn fixture(sub_proofs: usize) -> Fixture {
+    let master_secret = prover::create_master_secret().expect("Error creating master secret");
+
+    let schema = issuer::create_schema("gvt", "1.0", ISSUER_ID, ["name", "age"][..].into())
+        .expect("Error creating schema");
+    let (cred_def, cred_def_priv, key_proof) = issuer::create_credential_definition(
+        SCHEMA_ID,
+        &schema,
+        ISSUER_ID,
+        "tag",
+        SignatureType::CL,
+        CredentialDefinitionConfig {
+            support_revocation: false,
+        },
+    )
+    .expect("Error creating credential definition");
+
+    let mut credentials = Vec::with_capacity(sub_proofs);
+    for idx in 0..sub_proofs {
+        let cred_offer = issuer::create_credential_offer(SCHEMA_ID, CRED_DEF_ID, &key_proof)
+            .expect("Error creating credential offer");
+        let (cred_request, cred_request_metadata) = prover::create_credential_request(
+            None,
+            &cred_def,
+            &master_secret,
+            "default",
+            &cred_offer,
+        )
+        .expect("Error creating credential request");
+        let mut cred_values = MakeCredentialValues::default();
+        cred_values
+            .add_raw("name", format!("name-{idx}"))
+            .expect("Error encoding attribute");
+        cred_values
+            .add_raw("age", "28")
+            .expect("Error encoding attribute");
+        let mut credential = issuer::create_credential(
+            &cred_def,
+            &cred_def_priv,
+            &cred_offer,
+            &cred_request,
+            cred_values.into(),
+            None,
+            None,
+            None,
+        )
+        .expect("Error creating credential");
+        prover::process_credential(
+            &mut credential,
+            &cred_request_metadata,
+            &master_secret,
+            &cred_def,
+            None,
+        )
+        .expect("Error processing credential");
+        credentials.push(credential);
+    }
+
+    // One referent per credential, so that every credential becomes a sub-proof
+    let requested_attributes: serde_json::Map<String, serde_json::Value> = (0..sub_proofs)
+        .map(|idx| (format!("attr{idx}_referent"), json!({ "name": "name" })))
+        .collect();
+    let pres_request: PresentationRequest = serde_json::from_value(json!({
+        "nonce": verifier::generate_nonce().expect("Error generating nonce"),
+        "name": "pres_req_1",
+        "version": "0.1",
+        "requested_attributes": requested_attributes,
+        "requested_predicates": {},
+    }))
+    .expect("Error creating presentation request");
+
+    let mut present = PresentCredentials::default();
+    for (idx, credential) in credentials.iter().enumerate() {
+        present
+            .add_credential(credential, None, None)
+            .add_requested_attribute(format!("attr{idx}_referent"), true);
+    }
+
+    let schema_id = SchemaId::new_unchecked(SCHEMA_ID);
+    let cred_def_id = CredentialDefinitionId::new_unchecked(CRED_DEF_ID);
+    let presentation = prover::create_presentation(
+        &pres_request,
+        present,
+        None,
+        &master_secret,
+        &HashMap::from([(&schema_id, &schema)]),
+        &HashMap::from([(&cred_def_id, &cred_def)]),
+    )
+    .expect("Error creating presentation");
+
+    Fixture {
+        schema,
+        cred_def,
+        pres_request,
+        presentation,
+    }
+}
+
+fn time_per_call(mut f: impl FnMut()) -> Duration {
+    let start = Instant::now();
+    for _ in 0..ITERATIONS {
+        f();
+    }
+    start.elapsed() / ITERATIONS
+}
+
+fn main() {
+    for sub_proofs in [1, 5, 20] {
+        let fixture = fixture(sub_proofs);
+        let schema_id = SchemaId::new_unchecked(SCHEMA_ID);
+        let cred_def_id = CredentialDefinitionId::new_unchecked(CRED_DEF_ID);
+        let schemas = HashMap::from([(&schema_id, &fixture.schema)]);
+        let cred_defs = HashMap::from([(&cred_def_id, &fixture.cred_def)]);
+
+        let uncached = time_per_call(|| {
+            let valid = verifier::verify_presentation(
+                &fixture.presentation,
+                &fixture.pres_request,
+                &schemas,
+                &cred_defs,
+                None,
+                None,
+            )
+            .expect("Error verifying presentation");
+            assert!(valid);
+        });
+
+        let context = verifier::VerifierContext::new(
+            HashMap::from([(schema_id.clone(), fixture.schema.clone())]),
+            HashMap::from([(
+                cred_def_id.clone(),
+                fixture
+                    .cred_def
+                    .try_clone()
+                    .expect("Error copying credential definition"),
+            )]),
+            HashMap::new(),
+        )
+        .expect("Error creating verifier context");
+        let cached = time_per_call(|| {
+            let valid = verifier::verify_presentation_with_context(
+                &fixture.presentation,
+                &fixture.pres_request,
+                &context,
+                None,
+            )
+            .expect("Error verifying presentation");
+            assert!(valid);
+        });
+
+        println!(
+            "sub-proofs: {sub_proofs:>2}  verify: {uncached:>12?}  with context: {cached:>12?}  saved: {:>12?}",
+            uncached.saturating_sub(cached)
+        );
+    }
+}
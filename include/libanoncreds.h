@@ -164,6 +164,11 @@ typedef struct ByteBuffer {
  */
 typedef const char *FfiStr;
 
+typedef struct FfiList_ByteBuffer {
+  size_t count;
+  const struct ByteBuffer *data;
+} FfiList_ByteBuffer;
+
 typedef struct FfiList_FfiStr {
   size_t count;
   const FfiStr *data;
@@ -211,12 +216,47 @@ typedef struct FfiList_i32 {
   const int32_t *data;
 } FfiList_i32;
 
+typedef struct FfiList_i64 {
+  size_t count;
+  const int64_t *data;
+} FfiList_i64;
+
+/**
+ * Fill `buf` with `size` bytes of the tails starting at `offset`, returning zero on
+ * success. `context` is the value given when registering the reader.
+ */
+typedef int8_t (*TailsReadCallback)(int64_t context, int64_t offset, int64_t size, uint8_t *buf);
+
+/**
+ * Called once the library no longer uses a tails reader, after which its read
+ * callback is not called again. `context` is the value given when registering it.
+ */
+typedef void (*TailsReleaseCallback)(int64_t context);
+
+/**
+ * Receive the next `size` bytes of the tails, returning zero on success. `context`
+ * is the value given when creating the registry definition.
+ */
+typedef int8_t (*TailsChunkCallback)(int64_t context, const uint8_t *data, int64_t size);
+
 #ifdef __cplusplus
 extern "C" {
 #endif // __cplusplus
 
 void anoncreds_buffer_free(struct ByteBuffer buffer);
 
+/**
+ * Update a revocation state created or last updated with `old_rev_status_list` to the
+ * latest of the newer `rev_status_lists`, with a single witness update.
+ */
+ErrorCode anoncreds_catch_up_revocation_state(ObjectHandle rev_reg_def,
+                                              int64_t rev_reg_index,
+                                              FfiStr tails_path,
+                                              ObjectHandle rev_state,
+                                              ObjectHandle old_rev_status_list,
+                                              struct FfiList_ObjectHandle rev_status_lists,
+                                              ObjectHandle *rev_state_p);
+
 ErrorCode anoncreds_create_credential(ObjectHandle cred_def,
                                       ObjectHandle cred_def_private,
                                       ObjectHandle cred_offer,
@@ -252,6 +292,56 @@ ErrorCode anoncreds_create_credential_request(FfiStr prover_did,
                                               ObjectHandle *cred_req_p,
                                               ObjectHandle *cred_req_meta_p);
 
+/**
+ * Create a credential at `rev_reg_index` in the registry of `session`.
+ */
+ErrorCode anoncreds_create_credential_with_session(ObjectHandle cred_def,
+                                                   ObjectHandle cred_def_private,
+                                                   ObjectHandle cred_offer,
+                                                   ObjectHandle cred_request,
+                                                   FfiStrList attr_names,
+                                                   FfiStrList attr_raw_values,
+                                                   FfiStrList attr_enc_values,
+                                                   FfiStr rev_reg_id,
+                                                   ObjectHandle session,
+                                                   int64_t rev_reg_index,
+                                                   ObjectHandle *cred_p);
+
+/**
+ * Create one credential per offer and request. The attribute values of all the
+ * credentials are concatenated in `attr_raw_values`, with one value per attribute
+ * name for each credential, and likewise in `attr_enc_values` when it is not empty.
+ *
+ * `creds_p` must point to an array with room for one handle per credential. For
+ * revocable credentials `rev_reg_idxs` holds the registry index of each credential,
+ * and `rev_status_list_p` receives the status list with all of them issued.
+ */
+ErrorCode anoncreds_create_credentials(ObjectHandle cred_def,
+                                       ObjectHandle cred_def_private,
+                                       struct FfiList_ObjectHandle cred_offers,
+                                       struct FfiList_ObjectHandle cred_requests,
+                                       FfiStrList attr_names,
+                                       FfiStrList attr_raw_values,
+                                       FfiStrList attr_enc_values,
+                                       FfiStr rev_reg_id,
+                                       ObjectHandle rev_status_list,
+                                       ObjectHandle rev_reg_def,
+                                       ObjectHandle rev_reg_def_private,
+                                       FfiStr tails_path,
+                                       struct FfiList_i64 rev_reg_idxs,
+                                       ObjectHandle *creds_p,
+                                       ObjectHandle *rev_status_list_p);
+
+/**
+ * Create a session issuing credentials for one revocation registry, bound to its
+ * definition, private key and tails file.
+ */
+ErrorCode anoncreds_create_issuer_registry_session(ObjectHandle rev_reg_def,
+                                                   ObjectHandle rev_reg_def_private,
+                                                   ObjectHandle rev_status_list,
+                                                   FfiStr tails_path,
+                                                   ObjectHandle *session_p);
+
 ErrorCode anoncreds_create_master_secret(ObjectHandle *master_secret_p);
 
 ErrorCode anoncreds_create_or_update_revocation_state(ObjectHandle rev_reg_def,
@@ -274,6 +364,14 @@ ErrorCode anoncreds_create_presentation(ObjectHandle pres_req,
                                         FfiStrList cred_def_ids,
                                         ObjectHandle *presentation_p);
 
+ErrorCode anoncreds_create_revocation_index(struct FfiList_ObjectHandle rev_status_lists,
+                                           ObjectHandle *rev_index_p);
+
+ErrorCode anoncreds_create_revocation_index_allocator(ObjectHandle rev_status_list,
+                                                     int8_t issuance_by_default,
+                                                     int64_t first_unused,
+                                                     ObjectHandle *allocator_p);
+
 ErrorCode anoncreds_create_revocation_registry_def(ObjectHandle cred_def,
                                                    FfiStr cred_def_id,
                                                    FfiStr issuer_id,
@@ -284,6 +382,49 @@ ErrorCode anoncreds_create_revocation_registry_def(ObjectHandle cred_def,
                                                    ObjectHandle *reg_def_p,
                                                    ObjectHandle *reg_def_private_p);
 
+/**
+ * Create a revocation registry definition, returning the tails in `tails_p` instead
+ * of writing a tails file. When `sink` is given the tails are passed to it in
+ * chunks as they are generated, and `tails_p` is left empty.
+ *
+ * The tails location of the definition is `tails_location`, or the tails hash when
+ * it is not given.
+ */
+ErrorCode anoncreds_create_revocation_registry_def_in_memory(ObjectHandle cred_def,
+                                                             FfiStr cred_def_id,
+                                                             FfiStr issuer_id,
+                                                             FfiStr tag,
+                                                             FfiStr rev_reg_type,
+                                                             int64_t max_cred_num,
+                                                             FfiStr tails_location,
+                                                             int64_t threads,
+                                                             TailsChunkCallback sink,
+                                                             int64_t sink_context,
+                                                             ObjectHandle *reg_def_p,
+                                                             ObjectHandle *reg_def_private_p,
+                                                             struct ByteBuffer *tails_p);
+
+ErrorCode anoncreds_create_revocation_registry_def_with_threads(ObjectHandle cred_def,
+                                                                FfiStr cred_def_id,
+                                                                FfiStr issuer_id,
+                                                                FfiStr tag,
+                                                                FfiStr rev_reg_type,
+                                                                int64_t max_cred_num,
+                                                                FfiStr tails_dir_path,
+                                                                int64_t threads,
+                                                                ObjectHandle *reg_def_p,
+                                                                ObjectHandle *reg_def_private_p);
+
+/**
+ * Create the revocation states of many credentials for the same status list, reading the
+ * tails once. `rev_states_p` must have room for one handle per index.
+ */
+ErrorCode anoncreds_create_revocation_states(ObjectHandle rev_reg_def,
+                                            ObjectHandle rev_status_list,
+                                            struct FfiList_i64 rev_reg_idxs,
+                                            FfiStr tails_path,
+                                            ObjectHandle *rev_states_p);
+
 ErrorCode anoncreds_create_revocation_status_list(FfiStr rev_reg_def_id,
                                                   ObjectHandle rev_reg_def,
                                                   int64_t timestamp,
@@ -296,6 +437,14 @@ ErrorCode anoncreds_create_schema(FfiStr schema_name,
                                   FfiStrList attr_names,
                                   ObjectHandle *result_p);
 
+ErrorCode anoncreds_create_verifier_context(struct FfiList_ObjectHandle schemas,
+                                            FfiStrList schema_ids,
+                                            struct FfiList_ObjectHandle cred_defs,
+                                            FfiStrList cred_def_ids,
+                                            struct FfiList_ObjectHandle rev_reg_defs,
+                                            FfiStrList rev_reg_def_ids,
+                                            ObjectHandle *context_p);
+
 ErrorCode anoncreds_credential_get_attribute(ObjectHandle handle,
                                              FfiStr name,
                                              const char **result_p);
@@ -306,12 +455,55 @@ ErrorCode anoncreds_generate_nonce(const char **nonce_p);
 
 ErrorCode anoncreds_get_current_error(const char **error_json_p);
 
+ErrorCode anoncreds_issuer_registry_session_get_status_list(ObjectHandle session,
+                                                            ObjectHandle *rev_status_list_p);
+
+/**
+ * Register a further handle for an object. The object is kept alive until every
+ * handle to it has been freed.
+ */
+ErrorCode anoncreds_object_copy(ObjectHandle handle, ObjectHandle *result_p);
+
 void anoncreds_object_free(ObjectHandle handle);
 
+/**
+ * Free a list of handles at once. Handles which are not registered are skipped,
+ * as with `anoncreds_object_free`.
+ */
+void anoncreds_object_free_many(struct FfiList_ObjectHandle handles);
+
+/**
+ * Serialize an object in the compact binary encoding, which is accepted by the
+ * `*_from_bytes` constructor of its type.
+ */
+ErrorCode anoncreds_object_get_bytes(ObjectHandle handle, struct ByteBuffer *result_p);
+
 ErrorCode anoncreds_object_get_json(ObjectHandle handle, struct ByteBuffer *result_p);
 
 ErrorCode anoncreds_object_get_type_name(ObjectHandle handle, const char **result_p);
 
+/**
+ * Report the live objects as JSON: their number and approximate size in total and
+ * per type name, the most objects live at once since the peak was last reset,
+ * and the `largest` biggest objects. Sizes are estimated when reporting, mostly
+ * from the length of the JSON encoding of each object. Secrets are not encoded
+ * to be measured.
+ */
+ErrorCode anoncreds_object_store_report(int64_t largest, const char **result_p);
+
+/**
+ * Start tracking the peak number of live objects again from the current number.
+ */
+ErrorCode anoncreds_object_store_reset_peak(void);
+
+/**
+ * Report the number of live objects, the number of times the object store has
+ * been locked, and how many of those had to wait for another thread.
+ */
+ErrorCode anoncreds_object_store_stats(int64_t *live_objects_p,
+                                       int64_t *lock_acquisitions_p,
+                                       int64_t *lock_contentions_p);
+
 ErrorCode anoncreds_process_credential(ObjectHandle cred,
                                        ObjectHandle cred_req_metadata,
                                        ObjectHandle master_secret,
@@ -319,12 +511,103 @@ ErrorCode anoncreds_process_credential(ObjectHandle cred,
                                        ObjectHandle rev_reg_def,
                                        ObjectHandle *cred_p);
 
+ErrorCode anoncreds_revocation_index_allocator_free_count(ObjectHandle allocator,
+                                                          int64_t *count_p);
+
+/**
+ * Restore an allocator from the JSON snapshot returned by `anoncreds_object_get_json`
+ */
+ErrorCode anoncreds_revocation_index_allocator_from_json(struct ByteBuffer json,
+                                                         ObjectHandle *allocator_p);
+
+/**
+ * Allocate `count` free indices into `indices_p`, or none of them if there are not
+ * enough.
+ */
+ErrorCode anoncreds_revocation_index_allocator_next(ObjectHandle allocator,
+                                                    int64_t count,
+                                                    int64_t *indices_p);
+
+ErrorCode anoncreds_revocation_index_allocator_release(ObjectHandle allocator, int64_t idx);
+
+ErrorCode anoncreds_revocation_index_allocator_reserve(ObjectHandle allocator, int64_t idx);
+
+/**
+ * Find the timestamp of the latest revocation status list for a registry within a
+ * non-revocation interval. A negative `from` or `to` leaves that end of the interval
+ * open, and `-1` is returned in `timestamp_p` when no list matches.
+ */
+ErrorCode anoncreds_revocation_index_find_timestamp(ObjectHandle rev_index,
+                                                    FfiStr rev_reg_def_id,
+                                                    int64_t from,
+                                                    int64_t to,
+                                                    int64_t *timestamp_p);
+
 ErrorCode anoncreds_revocation_registry_definition_get_attribute(ObjectHandle handle,
                                                                  FfiStr name,
                                                                  const char **result_p);
 
+/**
+ * Access the revocation list of a status list without copying it. Index `i` is revoked
+ * when bit `i % 8` (counting from the least significant bit) of byte `i / 8` is set;
+ * the bits following the last index are undefined. The bytes remain valid until the
+ * handle returned in `pin_p` is freed with `anoncreds_object_free`.
+ */
+ErrorCode anoncreds_revocation_status_list_get_bits(ObjectHandle rev_status_list,
+                                                    const uint8_t **bits_p,
+                                                    size_t *bits_len_p,
+                                                    size_t *list_len_p,
+                                                    ObjectHandle *pin_p);
+
+/**
+ * Serialize a revocation status list to JSON with the given revocation list encoding:
+ * `array` (the default when no encoding is given), `bits` or `rle`. The `bits`
+ * encoding packs the list as `anoncreds_revocation_status_list_get_bits` does.
+ */
+ErrorCode anoncreds_revocation_status_list_to_json(ObjectHandle rev_status_list,
+                                                   FfiStr encoding,
+                                                   struct ByteBuffer *json_p);
+
 ErrorCode anoncreds_set_default_logger(void);
 
+ErrorCode anoncreds_tails_cache_clear(void);
+
+ErrorCode anoncreds_tails_cache_evict(FfiStr tails_hash, int8_t *evicted_p);
+
+ErrorCode anoncreds_tails_cache_preload(FfiStr tails_path, FfiStr tails_hash, int8_t pin);
+
+/**
+ * Register tails held in memory for `tails_hash`, which are used instead of the
+ * tails file by every operation reading those tails.
+ */
+ErrorCode anoncreds_tails_cache_register_bytes(FfiStr tails_hash,
+                                               struct ByteBuffer data,
+                                               int8_t pin);
+
+/**
+ * Register a reader of `tails_size` bytes of tails for `tails_hash`, used instead
+ * of the tails file. The reader is called for blocks of `block_tails` tails, from
+ * any thread, until it is evicted from the tails cache and no open tails reader
+ * uses it. `release` is then called, if given, including when the registration
+ * fails after checking the arguments.
+ */
+ErrorCode anoncreds_tails_cache_register_reader(FfiStr tails_hash,
+                                                int64_t tails_size,
+                                                int64_t block_tails,
+                                                TailsReadCallback read,
+                                                TailsReleaseCallback release,
+                                                int64_t context);
+
+ErrorCode anoncreds_tails_cache_set_capacity(int64_t capacity);
+
+ErrorCode anoncreds_update_revocation_states(ObjectHandle rev_reg_def,
+                                            ObjectHandle old_rev_status_list,
+                                            ObjectHandle rev_status_list,
+                                            struct FfiList_ByteBuffer rev_states,
+                                            struct FfiList_i64 rev_reg_idxs,
+                                            FfiStr tails_path,
+                                            struct ByteBuffer *rev_states_p);
+
 ErrorCode anoncreds_update_revocation_status_list(int64_t timestamp,
                                                   struct FfiList_i32 issued,
                                                   struct FfiList_i32 revoked,
@@ -332,6 +615,13 @@ ErrorCode anoncreds_update_revocation_status_list(int64_t timestamp,
                                                   ObjectHandle rev_current_list,
                                                   ObjectHandle *new_rev_status_list_p);
 
+ErrorCode anoncreds_update_revocation_status_list_bits(int64_t timestamp,
+                                                       struct ByteBuffer issued,
+                                                       struct ByteBuffer revoked,
+                                                       ObjectHandle rev_reg_def,
+                                                       ObjectHandle rev_current_list,
+                                                       ObjectHandle *new_rev_status_list_p);
+
 ErrorCode anoncreds_update_revocation_status_list_timestamp_only(int64_t timestamp,
                                                                  ObjectHandle rev_current_list,
                                                                  ObjectHandle *rev_status_list_p);
@@ -347,6 +637,34 @@ ErrorCode anoncreds_verify_presentation(ObjectHandle presentation,
                                         struct FfiList_ObjectHandle rev_status_list,
                                         int8_t *result_p);
 
+ErrorCode anoncreds_verify_presentation_with_context(ObjectHandle presentation,
+                                                     ObjectHandle pres_req,
+                                                     ObjectHandle context,
+                                                     ObjectHandle rev_index,
+                                                     int8_t *result_p);
+
+ErrorCode anoncreds_verify_presentation_with_revocation_index(ObjectHandle presentation,
+                                                              ObjectHandle pres_req,
+                                                              struct FfiList_ObjectHandle schemas,
+                                                              FfiStrList schema_ids,
+                                                              struct FfiList_ObjectHandle cred_defs,
+                                                              FfiStrList cred_def_ids,
+                                                              struct FfiList_ObjectHandle rev_reg_defs,
+                                                              FfiStrList rev_reg_def_ids,
+                                                              ObjectHandle rev_index,
+                                                              int8_t *result_p);
+
+ErrorCode anoncreds_verify_presentations(struct FfiList_ObjectHandle presentations,
+                                         struct FfiList_ObjectHandle pres_reqs,
+                                         struct FfiList_ObjectHandle schemas,
+                                         FfiStrList schema_ids,
+                                         struct FfiList_ObjectHandle cred_defs,
+                                         FfiStrList cred_def_ids,
+                                         struct FfiList_ObjectHandle rev_reg_defs,
+                                         FfiStrList rev_reg_def_ids,
+                                         struct FfiList_ObjectHandle rev_status_list,
+                                         const char **results_json_p);
+
 char *anoncreds_version(void);
 
 #ifdef __cplusplus
@@ -0,0 +1,381 @@
+//! A compact, versioned binary encoding of the JSON representation of the data types.
+//!
+//! Encoded objects start with `BINARY_MAGIC` and the format version, followed by a
+//! tagged encoding of the JSON value. Most of the size of the JSON forms comes from
+//! large unsigned integers written as decimal strings, which are stored here as
+//! big-endian bytes and restored to the same decimal strings on decoding.
+
+use serde::{de::DeserializeOwned, Serialize};
+use serde_json::{Map, Number, Value};
+
+use crate::error::Result;
+
+/// The leading bytes of a binary encoded object
+pub const BINARY_MAGIC: [u8; 3] = *b"ACB";
+
+/// The current version of the binary encoding
+pub const BINARY_VERSION: u8 = 1;
+
+// Shorter decimal strings are kept as strings
+const MIN_DECIMAL_DIGITS: usize = 20;
+
+// Guards the decoder against deeply nested input
+const MAX_DEPTH: usize = 128;
+
+const TAG_NULL: u8 = 0;
+const TAG_FALSE: u8 = 1;
+const TAG_TRUE: u8 = 2;
+const TAG_UINT: u8 = 3;
+const TAG_NEG_INT: u8 = 4;
+const TAG_FLOAT: u8 = 5;
+const TAG_STRING: u8 = 6;
+const TAG_DECIMAL: u8 = 7;
+const TAG_ARRAY: u8 = 8;
+const TAG_OBJECT: u8 = 9;
+
+/// Encode an object in the binary format
+pub fn to_bytes<T: Serialize + ?Sized>(value: &T) -> Result<Vec<u8>> {
+    let value = serde_json::to_value(value).map_err(err_map!("Error serializing object"))?;
+    Ok(encode_value(&value))
+}
+
+/// Decode an object from the binary format
+pub fn from_bytes<T: DeserializeOwned>(bytes: &[u8]) -> Result<T> {
+    Ok(serde_json::from_value(decode_value(bytes)?)?)
+}
+
+/// Encode a JSON value in the binary format
+pub fn encode_value(value: &Value) -> Vec<u8> {
+    let mut out = Vec::with_capacity(256);
+    out.extend_from_slice(&BINARY_MAGIC);
+    out.push(BINARY_VERSION);
+    write_value(&mut out, value);
+    out
+}
+
+/// Decode a JSON value from the binary format
+pub fn decode_value(bytes: &[u8]) -> Result<Value> {
+    let body = bytes
+        .strip_prefix(&BINARY_MAGIC[..])
+        .ok_or_else(|| err_msg!(Input, "Invalid binary encoding"))?;
+    let (version, body) = body
+        .split_first()
+        .ok_or_else(|| err_msg!(Input, "Invalid binary encoding"))?;
+    if *version != BINARY_VERSION {
+        return Err(err_msg!(
+            Input,
+            "Unsupported binary encoding version: {}",
+            version
+        ));
+    }
+    let mut reader = Reader(body);
+    let value = reader.read_value(0)?;
+    if !reader.0.is_empty() {
+        return Err(err_msg!(Input, "Trailing data after binary encoded value"));
+    }
+    Ok(value)
+}
+
+fn write_value(out: &mut Vec<u8>, value: &Value) {
+    match value {
+        Value::Null => out.push(TAG_NULL),
+        Value::Bool(false) => out.push(TAG_FALSE),
+        Value::Bool(true) => out.push(TAG_TRUE),
+        Value::Number(num) => {
+            if let Some(val) = num.as_u64() {
+                out.push(TAG_UINT);
+                write_varint(out, val);
+            } else if let Some(val) = num.as_i64() {
+                out.push(TAG_NEG_INT);
+                write_varint(out, !(val as u64));
+            } else {
+                out.push(TAG_FLOAT);
+                out.extend_from_slice(&num.as_f64().unwrap_or_default().to_le_bytes());
+            }
+        }
+        Value::String(val) => {
+            if is_canonical_decimal(val) {
+                out.push(TAG_DECIMAL);
+                write_bytes(out, &decimal_to_bytes(val));
+            } else {
+                out.push(TAG_STRING);
+                write_bytes(out, val.as_bytes());
+            }
+        }
+        Value::Array(items) => {
+            out.push(TAG_ARRAY);
+            write_varint(out, items.len() as u64);
+            for item in items {
+                write_value(out, item);
+            }
+        }
+        Value::Object(map) => {
+            out.push(TAG_OBJECT);
+            write_varint(out, map.len() as u64);
+            for (key, item) in map {
+                write_bytes(out, key.as_bytes());
+                write_value(out, item);
+            }
+        }
+    }
+}
+
+fn write_varint(out: &mut Vec<u8>, mut val: u64) {
+    while val >= 0x80 {
+        out.push((val as u8) | 0x80);
+        val >>= 7;
+    }
+    out.push(val as u8);
+}
+
+fn write_bytes(out: &mut Vec<u8>, bytes: &[u8]) {
+    write_varint(out, bytes.len() as u64);
+    out.extend_from_slice(bytes);
+}
+
+struct Reader<'a>(&'a [u8]);
+
+impl<'a> Reader<'a> {
+    fn read_u8(&mut self) -> Result<u8> {
+        let (first, rest) = self
+            .0
+            .split_first()
+            .ok_or_else(|| err_msg!(Input, "Unexpected end of binary encoded value"))?;
+        self.0 = rest;
+        Ok(*first)
+    }
+
+    fn read_varint(&mut self) -> Result<u64> {
+        let mut val = 0u64;
+        for shift in (0..64).step_by(7) {
+            let byte = self.read_u8()?;
+            val |= u64::from(byte & 0x7f) << shift;
+            if byte & 0x80 == 0 {
+                return Ok(val);
+            }
+        }
+        Err(err_msg!(Input, "Invalid length in binary encoded value"))
+    }
+
+    fn read_len(&mut self) -> Result<usize> {
+        // every item takes at least one byte, so longer lengths are invalid
+        match usize::try_from(self.read_varint()?) {
+            Ok(len) if len <= self.0.len() => Ok(len),
+            _ => Err(err_msg!(Input, "Unexpected end of binary encoded value")),
+        }
+    }
+
+    fn read_bytes(&mut self) -> Result<&'a [u8]> {
+        let len = self.read_len()?;
+        let (bytes, rest) = self.0.split_at(len);
+        self.0 = rest;
+        Ok(bytes)
+    }
+
+    fn read_string(&mut self) -> Result<String> {
+        let bytes = self.read_bytes()?;
+        Ok(std::str::from_utf8(bytes)
+            .map_err(err_map!(Input, "Invalid string in binary encoded value"))?
+            .to_owned())
+    }
+
+    fn read_value(&mut self, depth: usize) -> Result<Value> {
+        if depth > MAX_DEPTH {
+            return Err(err_msg!(Input, "Binary encoded value is nested too deeply"));
+        }
+        Ok(match self.read_u8()? {
+            TAG_NULL => Value::Null,
+            TAG_FALSE => Value::Bool(false),
+            TAG_TRUE => Value::Bool(true),
+            TAG_UINT => Value::Number(self.read_varint()?.into()),
+            TAG_NEG_INT => Value::Number((!self.read_varint()? as i64).into()),
+            TAG_FLOAT => {
+                let mut bytes = [0u8; 8];
+                for byte in bytes.iter_mut() {
+                    *byte = self.read_u8()?;
+                }
+                Value::Number(
+                    Number::from_f64(f64::from_le_bytes(bytes))
+                        .ok_or_else(|| err_msg!(Input, "Invalid number in binary encoded value"))?,
+                )
+            }
+            TAG_STRING => Value::String(self.read_string()?),
+            TAG_DECIMAL => Value::String(bytes_to_decimal(self.read_bytes()?)),
+            TAG_ARRAY => {
+                let len = self.read_len()?;
+                let mut items = Vec::with_capacity(len);
+                for _ in 0..len {
+                    items.push(self.read_value(depth + 1)?);
+                }
+                Value::Array(items)
+            }
+            TAG_OBJECT => {
+                let len = self.read_len()?;
+                let mut map = Map::new();
+                for _ in 0..len {
+                    let key = self.read_string()?;
+                    map.insert(key, self.read_value(depth + 1)?);
+                }
+                Value::Object(map)
+            }
+            tag => {
+                return Err(err_msg!(
+                    Input,
+                    "Unknown tag in binary encoded value: {}",
+                    tag
+                ))
+            }
+        })
+    }
+}
+
+// Only decimal strings without leading zeros are restored exactly from their bytes
+fn is_canonical_decimal(val: &str) -> bool {
+    val.len() >= MIN_DECIMAL_DIGITS
+        && !val.starts_with('0')
+        && val.bytes().all(|byte| byte.is_ascii_digit())
+}
+
+const DECIMAL_CHUNK: u64 = 1_000_000_000;
+const DECIMAL_CHUNK_DIGITS: usize = 9;
+
+fn decimal_to_bytes(val: &str) -> Vec<u8> {
+    // little-endian 32 bit limbs
+    let mut limbs: Vec<u32> = Vec::with_capacity(val.len() / 9 + 1);
+    let digits = val.as_bytes();
+    let first_len = match digits.len() % DECIMAL_CHUNK_DIGITS {
+        0 => DECIMAL_CHUNK_DIGITS,
+        len => len,
+    };
+    let mut start = 0;
+    let mut end = first_len;
+    while start < digits.len() {
+        let chunk = &digits[start..end];
+        let mut carry = chunk
+            .iter()
+            .fold(0u64, |acc, digit| acc * 10 + u64::from(digit - b'0'));
+        let multiplier = 10u64.pow(chunk.len() as u32);
+        for limb in limbs.iter_mut() {
+            let val = u64::from(*limb) * multiplier + carry;
+            *limb = val as u32;
+            carry = val >> 32;
+        }
+        if carry > 0 {
+            limbs.push(carry as u32);
+        }
+        start = end;
+        end += DECIMAL_CHUNK_DIGITS;
+    }
+    let mut bytes: Vec<u8> = limbs
+        .iter()
+        .rev()
+        .flat_map(|limb| limb.to_be_bytes())
+        .skip_while(|byte| *byte == 0)
+        .collect();
+    bytes.shrink_to_fit();
+    bytes
+}
+
+fn bytes_to_decimal(bytes: &[u8]) -> String {
+    // little-endian 32 bit limbs
+    let mut limbs: Vec<u32> = bytes
+        .rchunks(4)
+        .map(|chunk| {
+            chunk
+                .iter()
+                .fold(0u32, |acc, byte| (acc << 8) | u32::from(*byte))
+        })
+        .collect();
+    while limbs.last() == Some(&0) {
+        limbs.pop();
+    }
+    let mut chunks = Vec::with_capacity(bytes.len() * 3 / 9 + 1);
+    while !limbs.is_empty() {
+        let mut rem = 0u64;
+        for limb in limbs.iter_mut().rev() {
+            let val = (rem << 32) | u64::from(*limb);
+            *limb = (val / DECIMAL_CHUNK) as u32;
+            rem = val % DECIMAL_CHUNK;
+        }
+        chunks.push(rem);
+        while limbs.last() == Some(&0) {
+            limbs.pop();
+        }
+    }
+    let mut result = match chunks.pop() {
+        Some(first) => first.to_string(),
+        None => return "0".to_owned(),
+    };
+    for chunk in chunks.iter().rev() {
+        result.push_str(&format!("{:09}", chunk));
+    }
+    result
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn value_round_trip() {
+        let value = json!({
+            "big": "1234567890123456789012345678901234567890123456789",
+            "big_chunk": "100000000000000000000000000000000000",
+            "short": "12345",
+            "padded": "00012345678901234567890",
+            "text": "some text",
+            "uint": 42,
+            "max": u64::MAX,
+            "neg": -7,
+            "min": i64::MIN,
+            "float": 1.5,
+            "list": [null, true, false, [], {}],
+        });
+        let encoded = encode_value(&value);
+        assert_eq!(encoded[..3], BINARY_MAGIC);
+        assert_eq!(decode_value(&encoded).unwrap(), value);
+    }
+
+    #[test]
+    fn decimal_conversion() {
+        for val in [
+            "18446744073709551616",
+            "4294967296000000000000",
+            "99999999999999999999999999999",
+            "1000000000000000000000000000000000000000000000000000000000000000000000001",
+        ] {
+            let bytes = decimal_to_bytes(val);
+            assert_ne!(bytes[0], 0);
+            assert_eq!(bytes_to_decimal(&bytes), val);
+        }
+        assert_eq!(
+            decimal_to_bytes("18446744073709551616"),
+            [1, 0, 0, 0, 0, 0, 0, 0, 0]
+        );
+    }
+
+    #[test]
+    fn decimals_are_compact() {
+        let value = json!(["9".repeat(600)]);
+        let encoded = encode_value(&value);
+        assert!(encoded.len() < 260);
+        assert_eq!(decode_value(&encoded).unwrap(), value);
+    }
+
+    #[test]
+    fn invalid_input_is_rejected() {
+        let encoded = encode_value(&json!({"key": ["value", 1]}));
+        assert!(decode_value(&encoded[..encoded.len() - 1]).is_err());
+        assert!(decode_value(&[encoded.as_slice(), &[0]].concat()).is_err());
+        assert!(decode_value(b"ACB\x02\x00").is_err());
+        assert!(decode_value(b"{}").is_err());
+        assert!(decode_value(b"ACB\x01\x08\xff\xff\xff\xff\x0f").is_err());
+        let nested = [
+            &b"ACB\x01"[..],
+            &[TAG_ARRAY, 1].repeat(MAX_DEPTH + 2),
+            &[TAG_NULL],
+        ]
+        .concat();
+        assert!(decode_value(&nested).is_err());
+    }
+}
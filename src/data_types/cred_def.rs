@@ -51,6 +51,19 @@ impl CredentialDefinition {
         .map_err(|e| e.to_string())?;
         Ok(key)
     }
+
+    pub fn try_clone(&self) -> Result<Self, ConversionError> {
+        Ok(Self {
+            schema_id: self.schema_id.clone(),
+            signature_type: self.signature_type,
+            tag: self.tag.clone(),
+            value: CredentialDefinitionData {
+                primary: self.value.primary.try_clone().map_err(|e| e.to_string())?,
+                revocation: self.value.revocation.clone(),
+            },
+            issuer_id: self.issuer_id.clone(),
+        })
+    }
 }
 
 impl Validatable for CredentialDefinition {
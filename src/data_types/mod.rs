@@ -1,3 +1,6 @@
+/// Compact binary encoding
+pub mod binary;
+
 /// Credential definitions
 pub mod cred_def;
 
@@ -2,10 +2,12 @@ use bitvec::vec::BitVec;
 use serde::{
     de::{Deserializer, Error as DeError, SeqAccess, Visitor},
     ser::{SerializeSeq, Serializer},
+    Serialize,
 };
 use std::collections::{BTreeSet, HashSet};
+use std::str::FromStr;
 
-use crate::{error, impl_anoncreds_object_identifier};
+use crate::{error, error::ConversionError, impl_anoncreds_object_identifier};
 
 use super::rev_reg_def::RevocationRegistryDefinitionId;
 
@@ -35,19 +37,58 @@ pub struct RevocationRegistryDelta {
 
 impl Validatable for RevocationRegistryDelta {}
 
-#[derive(Clone, Debug, Serialize, Deserialize)]
+/// The representation of the revocation list in a serialized `RevocationStatusList`.
+///
+/// Every encoding is accepted when loading a status list.
+#[derive(Copy, Clone, Debug, Default, PartialEq, Eq)]
+pub enum RevocationListEncoding {
+    /// An array with one `0` or `1` value per index, i.e. `[1, 0, 1]`
+    #[default]
+    Array,
+    /// The base64 encoded bitstring, with index `i` in bit `i % 8` of byte `i / 8`
+    /// counting from the least significant bit, i.e. `"bits:3:BQ=="`. This is the
+    /// layout of the packed bits of `anoncreds_revocation_status_list_get_bits`.
+    Bitstring,
+    /// The base64 encoded lengths of the alternating runs of unrevoked and revoked
+    /// indices as LEB128 varints, i.e. `"rle:3:AAEBAQ=="`
+    RunLength,
+}
+
+impl FromStr for RevocationListEncoding {
+    type Err = ConversionError;
+
+    fn from_str(s: &str) -> Result<Self, Self::Err> {
+        match s {
+            "array" => Ok(Self::Array),
+            serde_revocation_list::BITSTRING_PREFIX => Ok(Self::Bitstring),
+            serde_revocation_list::RUN_LENGTH_PREFIX => Ok(Self::RunLength),
+            _ => Err(ConversionError::from_msg(
+                "Invalid revocation list encoding",
+            )),
+        }
+    }
+}
+
+#[derive(Clone, Debug, Deserialize)]
 #[serde(rename_all = "camelCase")]
 pub struct RevocationStatusList {
-    #[serde(skip_serializing_if = "Option::is_none")]
     rev_reg_def_id: Option<RevocationRegistryDefinitionId>,
-    #[serde(with = "serde_revocation_list")]
+    #[serde(deserialize_with = "serde_revocation_list::deserialize")]
     revocation_list: bitvec::vec::BitVec,
-    #[serde(flatten, skip_serializing_if = "Option::is_none")]
+    #[serde(flatten)]
     registry: Option<ursa::cl::RevocationRegistry>,
-    #[serde(skip_serializing_if = "Option::is_none")]
     timestamp: Option<u64>,
 }
 
+impl Serialize for RevocationStatusList {
+    fn serialize<S>(&self, serializer: S) -> Result<S::Ok, S::Error>
+    where
+        S: Serializer,
+    {
+        self.serialize_with_encoding(RevocationListEncoding::default(), serializer)
+    }
+}
+
 impl From<&RevocationStatusList> for Option<ursa::cl::RevocationRegistry> {
     fn from(rev_status_list: &RevocationStatusList) -> Option<ursa::cl::RevocationRegistry> {
         rev_status_list.registry.clone()
@@ -72,6 +113,8 @@ impl RevocationStatusList {
         self.timestamp
     }
 
+    /// The revocation list, with the first index in the least significant bit of the
+    /// first storage word
     pub(crate) fn state(&self) -> &bitvec::vec::BitVec {
         &self.revocation_list
     }
@@ -132,12 +175,55 @@ impl RevocationStatusList {
         Ok(())
     }
 
+    /// Serialize the status list, writing the revocation list with the given encoding
+    pub fn serialize_with_encoding<S>(
+        &self,
+        encoding: RevocationListEncoding,
+        serializer: S,
+    ) -> Result<S::Ok, S::Error>
+    where
+        S: Serializer,
+    {
+        #[derive(Serialize)]
+        #[serde(rename_all = "camelCase")]
+        struct EncodedStatusList<'a> {
+            #[serde(skip_serializing_if = "Option::is_none")]
+            rev_reg_def_id: Option<&'a RevocationRegistryDefinitionId>,
+            revocation_list: serde_revocation_list::Encoded<'a>,
+            #[serde(flatten, skip_serializing_if = "Option::is_none")]
+            registry: Option<&'a ursa::cl::RevocationRegistry>,
+            #[serde(skip_serializing_if = "Option::is_none")]
+            timestamp: Option<u64>,
+        }
+
+        EncodedStatusList {
+            rev_reg_def_id: self.rev_reg_def_id.as_ref(),
+            revocation_list: serde_revocation_list::Encoded(&self.revocation_list, encoding),
+            registry: self.registry.as_ref(),
+            timestamp: self.timestamp,
+        }
+        .serialize(serializer)
+    }
+
+    /// Serialize the status list to JSON, writing the revocation list with the given
+    /// encoding
+    pub fn to_json_with_encoding(
+        &self,
+        encoding: RevocationListEncoding,
+    ) -> Result<Vec<u8>, error::Error> {
+        let mut json = Vec::new();
+        self.serialize_with_encoding(encoding, &mut serde_json::Serializer::new(&mut json))?;
+        Ok(json)
+    }
+
     pub fn new(
         rev_reg_def_id: Option<&str>,
         revocation_list: bitvec::vec::BitVec,
         registry: Option<ursa::cl::RevocationRegistry>,
         timestamp: Option<u64>,
     ) -> Result<Self, error::Error> {
+        let mut revocation_list = revocation_list;
+        revocation_list.force_align();
         Ok(RevocationStatusList {
             rev_reg_def_id: rev_reg_def_id
                 .map(RevocationRegistryDefinitionId::new)
@@ -151,16 +237,68 @@ impl RevocationStatusList {
 
 pub mod serde_revocation_list {
     use super::*;
+    use base64::{engine::general_purpose::STANDARD, Engine};
+    use bitvec::field::BitField;
+
+    pub(super) const BITSTRING_PREFIX: &str = "bits";
+    pub(super) const RUN_LENGTH_PREFIX: &str = "rle";
+
+    // The largest registry accepted in a compact encoding, far beyond any practical
+    // tails file, so that a short string cannot force a large allocation
+    const MAX_LIST_LEN: u64 = 1 << 24;
+
+    const WORD_BITS: usize = usize::BITS as usize;
+    const WORD_BYTES: usize = WORD_BITS / 8;
+
+    /// A revocation list paired with the encoding to serialize it with
+    pub struct Encoded<'a>(pub &'a BitVec, pub RevocationListEncoding);
+
+    impl Serialize for Encoded<'_> {
+        fn serialize<S>(&self, s: S) -> Result<S::Ok, S::Error>
+        where
+            S: Serializer,
+        {
+            serialize_with_encoding(self.0, self.1, s)
+        }
+    }
+
     pub fn serialize<S>(state: &bitvec::vec::BitVec, s: S) -> Result<S::Ok, S::Error>
     where
         S: Serializer,
     {
-        let mut seq = s.serialize_seq(Some(state.len()))?;
-        for element in state {
-            let e = *element as i32;
-            seq.serialize_element(&e)?;
+        serialize_with_encoding(state, RevocationListEncoding::Array, s)
+    }
+
+    pub fn serialize_with_encoding<S>(
+        state: &bitvec::vec::BitVec,
+        encoding: RevocationListEncoding,
+        s: S,
+    ) -> Result<S::Ok, S::Error>
+    where
+        S: Serializer,
+    {
+        match encoding {
+            RevocationListEncoding::Array => {
+                let mut seq = s.serialize_seq(Some(state.len()))?;
+                for element in state {
+                    let e = *element as i32;
+                    seq.serialize_element(&e)?;
+                }
+                seq.end()
+            }
+            RevocationListEncoding::Bitstring => s.serialize_str(&format!(
+                "{}:{}:{}",
+                BITSTRING_PREFIX,
+                state.len(),
+                STANDARD.encode(pack_bits(state))
+            )),
+            RevocationListEncoding::RunLength => s.serialize_str(&format!(
+                "{}:{}:{}",
+                RUN_LENGTH_PREFIX,
+                state.len(),
+                STANDARD.encode(run_lengths(state))
+            )),
         }
-        seq.end()
     }
 
     pub fn deserialize<'de, D>(deserializer: D) -> Result<bitvec::vec::BitVec, D::Error>
@@ -175,7 +313,7 @@ pub mod serde_revocation_list {
             fn expecting(&self, formatter: &mut std::fmt::Formatter) -> std::fmt::Result {
                 write!(
                     formatter,
-                    "a seq containing revoation state, i.e. [1, 0, 1]"
+                    "a seq containing revoation state, i.e. [1, 0, 1], or an encoded revocation list"
                 )
             }
 
@@ -183,21 +321,203 @@ pub mod serde_revocation_list {
             where
                 S: SeqAccess<'de>,
             {
-                // TODO: do we have a min size for this?
-                let mut bv = BitVec::with_capacity(v.size_hint().unwrap_or_default());
-                while let Some(ele) = v.next_element()? {
+                // collect whole words rather than pushing each bit onto the vector
+                let mut words =
+                    Vec::with_capacity(v.size_hint().unwrap_or_default() / WORD_BITS + 1);
+                let mut word = 0usize;
+                let mut len = 0usize;
+                while let Some(ele) = v.next_element::<u8>()? {
                     match ele {
-                        0 => bv.push(false),
-                        1 => bv.push(true),
+                        0 => (),
+                        1 => word |= 1 << (len % WORD_BITS),
                         _ => {
                             return Err(S::Error::custom("invalid revocation state"));
                         }
                     }
+                    len += 1;
+                    if len % WORD_BITS == 0 {
+                        words.push(word);
+                        word = 0;
+                    }
+                }
+                if len % WORD_BITS != 0 {
+                    words.push(word);
                 }
+                let mut bv = BitVec::from_vec(words);
+                bv.truncate(len);
                 Ok(bv)
             }
+
+            fn visit_str<E>(self, v: &str) -> Result<Self::Value, E>
+            where
+                E: DeError,
+            {
+                let mut parts = v.splitn(3, ':');
+                let (encoding, len, data) = match (parts.next(), parts.next(), parts.next()) {
+                    (Some(encoding), Some(len), Some(data)) => (encoding, len, data),
+                    _ => return Err(E::custom("invalid encoded revocation list")),
+                };
+                let len = len
+                    .parse::<u64>()
+                    .ok()
+                    .filter(|len| *len <= MAX_LIST_LEN)
+                    .ok_or_else(|| E::custom("invalid revocation list length"))?
+                    as usize;
+                let data = STANDARD
+                    .decode(data)
+                    .map_err(|_| E::custom("invalid base64 in revocation list"))?;
+                match encoding {
+                    BITSTRING_PREFIX => unpack_bits(&data, len),
+                    RUN_LENGTH_PREFIX => decode_run_lengths(&data, len),
+                    _ => Err("unknown revocation list encoding"),
+                }
+                .map_err(E::custom)
+            }
+        }
+        deserializer.deserialize_any(JsonBitStringVisitor)
+    }
+
+    /// Pack the bits in index order, least significant bit first as they are stored,
+    /// loading a word of the list at a time.
+    fn pack_bits(state: &BitVec) -> Vec<u8> {
+        let mut bytes = Vec::with_capacity(state.len() / 8 + 8);
+        for chunk in state.chunks(64) {
+            let word = chunk.load_le::<u64>();
+            bytes.extend(word.to_le_bytes());
+        }
+        bytes.truncate((state.len() + 7) / 8);
+        bytes
+    }
+
+    fn unpack_bits(bytes: &[u8], len: usize) -> Result<BitVec, &'static str> {
+        if bytes.len() != (len + 7) / 8 {
+            return Err("revocation list length does not match its bitstring");
+        }
+        let words = bytes
+            .chunks(WORD_BYTES)
+            .map(|chunk| {
+                let mut word = [0u8; WORD_BYTES];
+                word[..chunk.len()].copy_from_slice(chunk);
+                usize::from_le_bytes(word)
+            })
+            .collect();
+        let mut bv = BitVec::from_vec(words);
+        bv.truncate(len);
+        Ok(bv)
+    }
+
+    /// Encode the lengths of the alternating runs of unset and set bits, starting with
+    /// the unset bits, finding the end of each run a word at a time.
+    fn run_lengths(state: &BitVec) -> Vec<u8> {
+        let mut out = Vec::new();
+        let mut value = false;
+        let mut run_start = 0;
+        for (idx, chunk) in state.chunks(64).enumerate() {
+            let word = chunk.load_le::<u64>();
+            let mut offset = 0;
+            while offset < chunk.len() {
+                let pending = if value { !word } else { word } >> offset;
+                let skip = pending.trailing_zeros() as usize;
+                if offset + skip >= chunk.len() {
+                    break;
+                }
+                offset += skip;
+                write_varint(&mut out, (idx * 64 + offset - run_start) as u64);
+                run_start = idx * 64 + offset;
+                value = !value;
+            }
+        }
+        if state.len() > run_start {
+            write_varint(&mut out, (state.len() - run_start) as u64);
+        }
+        out
+    }
+
+    /// Read the ends of the runs in order, checking that they stay within `len`.
+    fn run_ends(
+        mut data: &[u8],
+        len: usize,
+    ) -> impl Iterator<Item = Result<usize, &'static str>> + '_ {
+        let mut pos = 0usize;
+        std::iter::from_fn(move || {
+            if data.is_empty() {
+                return None;
+            }
+            let end = read_varint(&mut data).and_then(|run| {
+                usize::try_from(run)
+                    .ok()
+                    .and_then(|run| pos.checked_add(run))
+                    .filter(|end| *end <= len)
+                    .ok_or(RUN_LENGTH_ERROR)
+            });
+            if let Ok(end) = end {
+                pos = end;
+            }
+            Some(end)
+        })
+    }
+
+    const RUN_LENGTH_ERROR: &str = "revocation list length does not match its run lengths";
+
+    fn decode_run_lengths(data: &[u8], len: usize) -> Result<BitVec, &'static str> {
+        // Check that the runs cover the list before allocating it
+        let mut total = 0;
+        for end in run_ends(data, len) {
+            total = end?;
+        }
+        if total != len {
+            return Err(RUN_LENGTH_ERROR);
+        }
+        let mut words = vec![0usize; (len + WORD_BITS - 1) / WORD_BITS];
+        let mut pos = 0usize;
+        let mut value = false;
+        for end in run_ends(data, len) {
+            let end = end?;
+            if value {
+                set_range(&mut words, pos, end);
+            }
+            pos = end;
+            value = !value;
+        }
+        let mut bv = BitVec::from_vec(words);
+        bv.truncate(len);
+        Ok(bv)
+    }
+
+    fn set_range(words: &mut [usize], start: usize, end: usize) {
+        let mut pos = start;
+        while pos < end {
+            let offset = pos % WORD_BITS;
+            let count = (WORD_BITS - offset).min(end - pos);
+            let mask = if count == WORD_BITS {
+                usize::MAX
+            } else {
+                ((1 << count) - 1) << offset
+            };
+            words[pos / WORD_BITS] |= mask;
+            pos += count;
+        }
+    }
+
+    fn write_varint(out: &mut Vec<u8>, mut val: u64) {
+        while val >= 0x80 {
+            out.push(val as u8 | 0x80);
+            val >>= 7;
+        }
+        out.push(val as u8);
+    }
+
+    fn read_varint(data: &mut &[u8]) -> Result<u64, &'static str> {
+        let mut val = 0u64;
+        for shift in (0..64).step_by(7) {
+            let (byte, rest) = data.split_first().ok_or("truncated revocation list")?;
+            *data = rest;
+            val |= u64::from(byte & 0x7f) << shift;
+            if byte & 0x80 == 0 {
+                return Ok(val);
+            }
         }
-        deserializer.deserialize_seq(JsonBitStringVisitor)
+        Err("invalid run length in revocation list")
     }
 }
 
@@ -242,4 +562,51 @@ mod tests {
         assert_eq!(list.get(0usize).unwrap(), false);
         assert_eq!(list.timestamp().unwrap(), 1245);
     }
+
+    #[test]
+    fn compact_rev_list_encodings_roundtrip() {
+        let mut list = serde_json::from_str::<RevocationStatusList>(REVOCATION_LIST).unwrap();
+        let mut state = bitvec![0; 1000];
+        for idx in (0..1000).step_by(7).chain(130..300) {
+            state.set(idx, true);
+        }
+        list.revocation_list = state.clone();
+
+        for encoding in [
+            RevocationListEncoding::Array,
+            RevocationListEncoding::Bitstring,
+            RevocationListEncoding::RunLength,
+        ] {
+            let json = list.to_json_with_encoding(encoding).unwrap();
+            let des = serde_json::from_slice::<RevocationStatusList>(&json).unwrap();
+            assert_eq!(des.state(), &state);
+            assert_eq!(des.timestamp(), Some(1234));
+        }
+    }
+
+    #[test]
+    fn compact_rev_list_can_be_deserialized() {
+        for encoded in ["bits:3:BQ==", "rle:3:AAEBAQ=="] {
+            let json = REVOCATION_LIST.replace("[1, 1, 1, 1]", &format!("\"{encoded}\""));
+            let des = serde_json::from_str::<RevocationStatusList>(&json).unwrap();
+            assert_eq!(des.state(), &bitvec![1, 0, 1]);
+        }
+    }
+
+    #[test]
+    fn invalid_compact_rev_list_is_rejected() {
+        for encoded in [
+            "bits:9:BQ==",
+            "bits:3:o",
+            "rle:4:AAEBAQ==",
+            "rle:3:gA==",
+            "rle:4294967295:",
+            "rle:16777216:AQ==",
+            "bits:16777217:",
+            "xyz:3:oA==",
+        ] {
+            let json = REVOCATION_LIST.replace("[1, 1, 1, 1]", &format!("\"{encoded}\""));
+            assert!(serde_json::from_str::<RevocationStatusList>(&json).is_err());
+        }
+    }
 }
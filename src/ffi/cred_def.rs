@@ -70,14 +70,35 @@ impl_anoncreds_object_from_json!(
     anoncreds_credential_definition_from_json
 );
 
-impl_anoncreds_object!(CredentialDefinitionPrivate, "CredentialDefinitionPrivate");
+impl_anoncreds_object_from_bytes!(
+    CredentialDefinition,
+    anoncreds_credential_definition_from_bytes
+);
+
+// The private key is not encoded to be measured: with two 1024-bit primes and the
+// revocation keys, its encoding is about 800 bytes
+impl_anoncreds_object!(
+    CredentialDefinitionPrivate,
+    "CredentialDefinitionPrivate",
+    |_| 800
+);
 impl_anoncreds_object_from_json!(
     CredentialDefinitionPrivate,
     anoncreds_credential_definition_private_from_json
 );
 
+impl_anoncreds_object_from_bytes!(
+    CredentialDefinitionPrivate,
+    anoncreds_credential_definition_private_from_bytes
+);
+
 impl_anoncreds_object!(KeyCorrectnessProof, "KeyCorrectnessProof");
 impl_anoncreds_object_from_json!(
     KeyCorrectnessProof,
     anoncreds_key_correctness_proof_from_json
 );
+
+impl_anoncreds_object_from_bytes!(
+    KeyCorrectnessProof,
+    anoncreds_key_correctness_proof_from_bytes
+);
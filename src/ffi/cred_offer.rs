@@ -29,3 +29,5 @@ pub extern "C" fn anoncreds_create_credential_offer(
 
 impl_anoncreds_object!(CredentialOffer, "CredentialOffer");
 impl_anoncreds_object_from_json!(CredentialOffer, anoncreds_credential_offer_from_json);
+
+impl_anoncreds_object_from_bytes!(CredentialOffer, anoncreds_credential_offer_from_bytes);
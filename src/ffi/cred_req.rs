@@ -50,8 +50,21 @@ pub extern "C" fn anoncreds_create_credential_request(
 impl_anoncreds_object!(CredentialRequest, "CredentialRequest");
 impl_anoncreds_object_from_json!(CredentialRequest, anoncreds_credential_request_from_json);
 
-impl_anoncreds_object!(CredentialRequestMetadata, "CredentialRequestMetadata");
+impl_anoncreds_object_from_bytes!(CredentialRequest, anoncreds_credential_request_from_bytes);
+
+// The blinding factors are secret and not encoded to be measured: with the nonce,
+// their encoding is about 800 bytes
+impl_anoncreds_object!(
+    CredentialRequestMetadata,
+    "CredentialRequestMetadata",
+    |meta: &CredentialRequestMetadata| 800 + meta.master_secret_name.len()
+);
 impl_anoncreds_object_from_json!(
     CredentialRequestMetadata,
     anoncreds_credential_request_metadata_from_json
 );
+
+impl_anoncreds_object_from_bytes!(
+    CredentialRequestMetadata,
+    anoncreds_credential_request_metadata_from_bytes
+);
@@ -1,18 +1,28 @@
 use std::os::raw::c_char;
 use std::ptr;
+use std::sync::{Mutex, MutexGuard};
 
 use ffi_support::{rust_string_to_c, FfiStr};
 
 use super::error::{catch_error, ErrorCode};
-use super::object::{AnonCredsObject, ObjectHandle};
-use super::util::FfiStrList;
-use crate::data_types::rev_reg::RevocationRegistryId;
+use super::object::{AnonCredsObject, AnonCredsObjectList, ObjectHandle, ToJson};
+use super::util::{FfiList, FfiStrList};
+use crate::data_types::{
+    rev_reg::RevocationRegistryId,
+    rev_reg_def::{RevocationRegistryDefinition, RevocationRegistryDefinitionPrivate},
+};
 use crate::error::Result;
 use crate::services::{
-    issuer::create_credential,
+    issuer::{
+        create_credential, create_credential_with_session, create_credentials,
+        IssuerRegistrySession,
+    },
     prover::process_credential,
-    tails::TailsFileReader,
-    types::{Credential, CredentialRevocationConfig, MakeCredentialValues},
+    tails::TailsMmapReader,
+    types::{
+        Credential, CredentialIssuance, CredentialOffer, CredentialRequest,
+        CredentialRevocationConfig, CredentialsRevocationConfig, MakeCredentialValues,
+    },
     utils::encode_credential_attribute,
 };
 
@@ -34,15 +44,79 @@ struct RevocationConfig {
 
 impl RevocationConfig {
     pub fn as_ref_config(&self) -> Result<CredentialRevocationConfig> {
+        let reg_def: &RevocationRegistryDefinition = self.reg_def.cast_ref()?;
         Ok(CredentialRevocationConfig {
-            reg_def: self.reg_def.cast_ref()?,
+            reg_def,
             reg_def_private: self.reg_def_private.cast_ref()?,
             registry_idx: self.reg_idx,
-            tails_reader: TailsFileReader::new_tails_reader(self.tails_path.as_str()),
+            tails_reader: TailsMmapReader::new_tails_reader(
+                self.tails_path.as_str(),
+                &reg_def.value.tails_hash,
+            )?,
         })
     }
 }
 
+impl RevocationConfig {
+    fn load(revocation: *const FfiCredRevInfo) -> Result<Option<Self>> {
+        if revocation.is_null() {
+            return Ok(None);
+        }
+        let revocation = unsafe { &*revocation };
+        let tails_path = revocation
+            .tails_path
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails file path"))?
+            .to_string();
+        Ok(Some(RevocationConfig {
+            reg_def: revocation.reg_def.load()?,
+            reg_def_private: revocation.reg_def_private.load()?,
+            reg_idx: revocation
+                .reg_idx
+                .try_into()
+                .map_err(|_| err_msg!("Invalid revocation index"))?,
+            tails_path,
+        }))
+    }
+}
+
+fn _make_credential_values(
+    attr_names: &[FfiStr],
+    attr_raw_values: &[FfiStr],
+    enc_values: &[FfiStr],
+) -> Result<MakeCredentialValues> {
+    if attr_names.is_empty() {
+        return Err(err_msg!("Cannot create credential with no attribute"));
+    }
+    if attr_names.len() != attr_raw_values.len() {
+        return Err(err_msg!(
+            "Mismatch between length of attribute names and raw values"
+        ));
+    }
+    let mut cred_values = MakeCredentialValues::default();
+    for (attr_idx, (name, raw)) in attr_names.iter().zip(attr_raw_values).enumerate() {
+        let name = name
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing attribute name"))?
+            .to_string();
+        let raw = raw
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing attribute raw value"))?
+            .to_string();
+        let encoded = if attr_idx < enc_values.len() {
+            enc_values[attr_idx].as_opt_str().map(str::to_string)
+        } else {
+            None
+        };
+        if let Some(encoded) = encoded {
+            cred_values.add_encoded(name, raw, encoded);
+        } else {
+            cred_values.add_raw(name, raw)?;
+        }
+    }
+    Ok(cred_values)
+}
+
 #[no_mangle]
 pub extern "C" fn anoncreds_create_credential(
     cred_def: ObjectHandle,
@@ -59,64 +133,16 @@ pub extern "C" fn anoncreds_create_credential(
 ) -> ErrorCode {
     catch_error(|| {
         check_useful_c_ptr!(cred_p);
-        if attr_names.is_empty() {
-            return Err(err_msg!("Cannot create credential with no attribute"));
-        }
-        if attr_names.len() != attr_raw_values.len() {
-            return Err(err_msg!(
-                "Mismatch between length of attribute names and raw values"
-            ));
-        }
+        let cred_values = _make_credential_values(
+            attr_names.as_slice(),
+            attr_raw_values.as_slice(),
+            attr_enc_values.as_slice(),
+        )?;
         let rev_reg_id = rev_reg_id
             .as_opt_str()
             .map(RevocationRegistryId::new)
             .transpose()?;
-        let enc_values = attr_enc_values.as_slice();
-        let mut cred_values = MakeCredentialValues::default();
-        for (attr_idx, (name, raw)) in attr_names
-            .as_slice()
-            .iter()
-            .zip(attr_raw_values.as_slice())
-            .enumerate()
-        {
-            let name = name
-                .as_opt_str()
-                .ok_or_else(|| err_msg!("Missing attribute name"))?
-                .to_string();
-            let raw = raw
-                .as_opt_str()
-                .ok_or_else(|| err_msg!("Missing attribute raw value"))?
-                .to_string();
-            let encoded = if attr_idx < enc_values.len() {
-                enc_values[attr_idx].as_opt_str().map(str::to_string)
-            } else {
-                None
-            };
-            if let Some(encoded) = encoded {
-                cred_values.add_encoded(name, raw, encoded);
-            } else {
-                cred_values.add_raw(name, raw)?;
-            }
-        }
-        let revocation_config = if !revocation.is_null() {
-            let revocation = unsafe { &*revocation };
-            let tails_path = revocation
-                .tails_path
-                .as_opt_str()
-                .ok_or_else(|| err_msg!("Missing tails file path"))?
-                .to_string();
-            Some(RevocationConfig {
-                reg_def: revocation.reg_def.load()?,
-                reg_def_private: revocation.reg_def_private.load()?,
-                reg_idx: revocation
-                    .reg_idx
-                    .try_into()
-                    .map_err(|_| err_msg!("Invalid revocation index"))?,
-                tails_path,
-            })
-        } else {
-            None
-        };
+        let revocation_config = RevocationConfig::load(revocation)?;
 
         let cred = create_credential(
             cred_def.load()?.cast_ref()?,
@@ -139,6 +165,265 @@ pub extern "C" fn anoncreds_create_credential(
     })
 }
 
+/// Create one credential per offer and request. The attribute values of all the
+/// credentials are concatenated in `attr_raw_values`, with one value per attribute
+/// name for each credential, and likewise in `attr_enc_values` when it is not empty.
+///
+/// `creds_p` must point to an array with room for one handle per credential. For
+/// revocable credentials `rev_reg_idxs` holds the registry index of each credential,
+/// and `rev_status_list_p` receives the status list with all of them issued.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_credentials(
+    cred_def: ObjectHandle,
+    cred_def_private: ObjectHandle,
+    cred_offers: FfiList<ObjectHandle>,
+    cred_requests: FfiList<ObjectHandle>,
+    attr_names: FfiStrList,
+    attr_raw_values: FfiStrList,
+    attr_enc_values: FfiStrList,
+    rev_reg_id: FfiStr,
+    rev_status_list: ObjectHandle,
+    rev_reg_def: ObjectHandle,
+    rev_reg_def_private: ObjectHandle,
+    tails_path: FfiStr,
+    rev_reg_idxs: FfiList<i64>,
+    creds_p: *mut ObjectHandle,
+    rev_status_list_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(creds_p);
+        check_useful_c_ptr!(rev_status_list_p);
+        let count = cred_offers.len();
+        if cred_requests.len() != count {
+            return Err(err_msg!(
+                "Mismatch between length of credential offers and requests"
+            ));
+        }
+        let attr_count = attr_names.len();
+        if attr_raw_values.len() != attr_count * count {
+            return Err(err_msg!(
+                "Mismatch between number of attribute raw values and credentials"
+            ));
+        }
+        if !attr_enc_values.is_empty() && attr_enc_values.len() != attr_count * count {
+            return Err(err_msg!(
+                "Mismatch between number of attribute encoded values and credentials"
+            ));
+        }
+        if !rev_reg_idxs.is_empty() && rev_reg_idxs.len() != count {
+            return Err(err_msg!(
+                "Mismatch between number of revocation indices and credentials"
+            ));
+        }
+        let rev_reg_id = rev_reg_id
+            .as_opt_str()
+            .map(RevocationRegistryId::new)
+            .transpose()?;
+
+        let cred_offers = AnonCredsObjectList::load(cred_offers.as_slice())?;
+        let cred_offers = cred_offers.refs::<CredentialOffer>()?;
+        let cred_requests = AnonCredsObjectList::load(cred_requests.as_slice())?;
+        let cred_requests = cred_requests.refs::<CredentialRequest>()?;
+
+        let mut issuances = Vec::with_capacity(count);
+        for (idx, (cred_offer, cred_request)) in
+            cred_offers.into_iter().zip(cred_requests).enumerate()
+        {
+            let values = idx * attr_count..(idx + 1) * attr_count;
+            let cred_values = _make_credential_values(
+                attr_names.as_slice(),
+                &attr_raw_values.as_slice()[values.clone()],
+                attr_enc_values.as_slice().get(values).unwrap_or_default(),
+            )?;
+            let registry_idx = rev_reg_idxs
+                .as_slice()
+                .get(idx)
+                .map(|registry_idx| {
+                    u32::try_from(*registry_idx).map_err(|_| err_msg!("Invalid revocation index"))
+                })
+                .transpose()?;
+            issuances.push(CredentialIssuance {
+                cred_offer,
+                cred_request,
+                cred_values: cred_values.into(),
+                registry_idx,
+            });
+        }
+
+        let rev_status_list = rev_status_list.opt_load()?;
+        let rev_reg_def = rev_reg_def.opt_load()?;
+        let rev_reg_def_private = rev_reg_def_private.opt_load()?;
+        let revocation_config = match (rev_reg_def.as_ref(), rev_reg_def_private.as_ref()) {
+            (Some(reg_def), Some(reg_def_private)) => Some(CredentialsRevocationConfig {
+                reg_def: reg_def.cast_ref()?,
+                reg_def_private: reg_def_private.cast_ref()?,
+                tails_path: tails_path
+                    .as_opt_str()
+                    .ok_or_else(|| err_msg!("Missing tails file path"))?,
+            }),
+            _ => None,
+        };
+
+        let (creds, rev_status_list) = create_credentials(
+            cred_def.load()?.cast_ref()?,
+            cred_def_private.load()?.cast_ref()?,
+            issuances,
+            rev_reg_id,
+            rev_status_list
+                .as_ref()
+                .map(AnonCredsObject::cast_ref)
+                .transpose()?,
+            revocation_config,
+        )?;
+
+        let creds = creds
+            .into_iter()
+            .map(ObjectHandle::create)
+            .collect::<Result<Vec<_>>>()?;
+        let rev_status_list = rev_status_list
+            .map(ObjectHandle::create)
+            .transpose()?
+            .unwrap_or_default();
+        unsafe {
+            std::slice::from_raw_parts_mut(creds_p, count).copy_from_slice(&creds);
+            *rev_status_list_p = rev_status_list;
+        };
+        Ok(())
+    })
+}
+
+/// An `IssuerRegistrySession` shared through an object handle, together with the
+/// private key of its registry
+#[derive(Debug)]
+pub struct IssuerRegistrySessionObject {
+    session: Mutex<IssuerRegistrySession>,
+    reg_def_private: AnonCredsObject,
+}
+
+impl_anoncreds_object!(
+    IssuerRegistrySessionObject,
+    "IssuerRegistrySession",
+    |obj: &IssuerRegistrySessionObject| obj
+        .lock()
+        .map(|session| session.size_estimate())
+        .unwrap_or(0)
+);
+
+impl ToJson for IssuerRegistrySessionObject {
+    fn to_json(&self) -> Result<Vec<u8>> {
+        Err(err_msg!("IssuerRegistrySession cannot be serialized"))
+    }
+}
+
+impl IssuerRegistrySessionObject {
+    fn lock(&self) -> Result<MutexGuard<'_, IssuerRegistrySession>> {
+        self.session
+            .lock()
+            .map_err(|_| err_msg!("Error locking issuer registry session"))
+    }
+}
+
+/// Create a session issuing credentials for one revocation registry, bound to its
+/// definition, private key and tails file.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_issuer_registry_session(
+    rev_reg_def: ObjectHandle,
+    rev_reg_def_private: ObjectHandle,
+    rev_status_list: ObjectHandle,
+    tails_path: FfiStr,
+    session_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(session_p);
+        let tails_path = tails_path
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails file path"))?;
+        let rev_reg_def = rev_reg_def.load()?;
+        let rev_reg_def: &RevocationRegistryDefinition = rev_reg_def.cast_ref()?;
+        let reg_def_private = rev_reg_def_private.load()?;
+        reg_def_private.cast_ref::<RevocationRegistryDefinitionPrivate>()?;
+        let session = IssuerRegistrySession::new(
+            rev_reg_def,
+            rev_status_list.load()?.cast_ref()?,
+            TailsMmapReader::new_tails_reader(tails_path, &rev_reg_def.value.tails_hash)?,
+        )?;
+        let session = ObjectHandle::create(IssuerRegistrySessionObject {
+            session: Mutex::new(session),
+            reg_def_private,
+        })?;
+        unsafe { *session_p = session };
+        Ok(())
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_issuer_registry_session_get_status_list(
+    session: ObjectHandle,
+    rev_status_list_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(rev_status_list_p);
+        let rev_status_list = session
+            .load()?
+            .cast_ref::<IssuerRegistrySessionObject>()?
+            .lock()?
+            .rev_status_list()
+            .clone();
+        let rev_status_list = ObjectHandle::create(rev_status_list)?;
+        unsafe { *rev_status_list_p = rev_status_list };
+        Ok(())
+    })
+}
+
+/// Create a credential at `rev_reg_index` in the registry of `session`.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_credential_with_session(
+    cred_def: ObjectHandle,
+    cred_def_private: ObjectHandle,
+    cred_offer: ObjectHandle,
+    cred_request: ObjectHandle,
+    attr_names: FfiStrList,
+    attr_raw_values: FfiStrList,
+    attr_enc_values: FfiStrList,
+    rev_reg_id: FfiStr,
+    session: ObjectHandle,
+    rev_reg_index: i64,
+    cred_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(cred_p);
+        let cred_values = _make_credential_values(
+            attr_names.as_slice(),
+            attr_raw_values.as_slice(),
+            attr_enc_values.as_slice(),
+        )?;
+        let rev_reg_id = rev_reg_id
+            .as_opt_str()
+            .map(RevocationRegistryId::new)
+            .transpose()?;
+        let rev_reg_index: u32 = rev_reg_index
+            .try_into()
+            .map_err(|_| err_msg!("Invalid revocation index"))?;
+        let session = session.load()?;
+        let session = session.cast_ref::<IssuerRegistrySessionObject>()?;
+
+        let cred = create_credential_with_session(
+            cred_def.load()?.cast_ref()?,
+            cred_def_private.load()?.cast_ref()?,
+            cred_offer.load()?.cast_ref()?,
+            cred_request.load()?.cast_ref()?,
+            cred_values.into(),
+            rev_reg_id,
+            session.reg_def_private.cast_ref()?,
+            rev_reg_index,
+            &mut *session.lock()?,
+        )?;
+        let cred = ObjectHandle::create(cred)?;
+        unsafe { *cred_p = cred };
+        Ok(())
+    })
+}
+
 #[no_mangle]
 pub extern "C" fn anoncreds_encode_credential_attributes(
     attr_raw_values: FfiStrList,
@@ -198,6 +483,8 @@ pub extern "C" fn anoncreds_process_credential(
 impl_anoncreds_object!(Credential, "Credential");
 impl_anoncreds_object_from_json!(Credential, anoncreds_credential_from_json);
 
+impl_anoncreds_object_from_bytes!(Credential, anoncreds_credential_from_bytes);
+
 #[no_mangle]
 pub extern "C" fn anoncreds_credential_get_attribute(
     handle: ObjectHandle,
@@ -1,14 +1,16 @@
 use crate::error::{Error, ErrorKind, Result};
 
+use std::cell::RefCell;
 use std::os::raw::c_char;
 use std::panic::{catch_unwind, UnwindSafe};
-use std::sync::RwLock;
 
 use ffi_support::rust_string_to_c;
 
-use once_cell::sync::Lazy;
-
-static LAST_ERROR: Lazy<RwLock<Option<Error>>> = Lazy::new(|| RwLock::new(None));
+thread_local! {
+    // Errors are reported on the thread which made the failing call, so that callers
+    // on different threads cannot observe each other's errors
+    static LAST_ERROR: RefCell<Option<Error>> = RefCell::new(None);
+}
 
 #[derive(Debug, PartialEq, Eq, Copy, Clone, Serialize)]
 #[repr(usize)]
@@ -77,7 +79,7 @@ where
 }
 
 pub fn get_current_error_json() -> String {
-    if let Some(err) = Option::take(&mut *LAST_ERROR.write().unwrap()) {
+    if let Some(err) = LAST_ERROR.with(|error| error.borrow_mut().take()) {
         let message = err.to_string();
         let code = ErrorCode::from(err.kind()) as usize;
         serde_json::json!({"code": code, "message": message}).to_string()
@@ -92,6 +94,42 @@ pub fn set_last_error(error: Option<Error>) -> ErrorCode {
         Some(err) => err.kind().into(),
         None => ErrorCode::Success,
     };
-    *LAST_ERROR.write().unwrap() = error;
+    LAST_ERROR.with(|last| *last.borrow_mut() = error);
     code
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    use std::thread;
+
+    #[test]
+    fn errors_are_reported_per_thread() {
+        let threads: Vec<_> = (0..32)
+            .map(|thread_idx| {
+                thread::spawn(move || {
+                    for call_idx in 0..200 {
+                        let message = format!("thread {} call {}", thread_idx, call_idx);
+                        if (thread_idx + call_idx) % 2 == 0 {
+                            let error = message.clone();
+                            let code =
+                                catch_error(move || Err(err_msg!(InvalidState, "{}", error)));
+                            assert_eq!(code, ErrorCode::InvalidState);
+                            let error: serde_json::Value =
+                                serde_json::from_str(&get_current_error_json()).unwrap();
+                            assert_eq!(error["code"], ErrorCode::InvalidState as usize);
+                            assert!(error["message"].as_str().unwrap().contains(&message));
+                        } else {
+                            assert_eq!(catch_error(|| Ok(())), ErrorCode::Success);
+                        }
+                        assert_eq!(get_current_error_json(), r#"{"code":0,"message":null}"#);
+                    }
+                })
+            })
+            .collect();
+        for thread in threads {
+            thread.join().unwrap();
+        }
+    }
+}
@@ -12,5 +12,8 @@ pub extern "C" fn anoncreds_create_master_secret(master_secret_p: *mut ObjectHan
     })
 }
 
-impl_anoncreds_object!(MasterSecret, "MasterSecret");
+// The secret is not encoded to be measured: its encoding is about 100 bytes
+impl_anoncreds_object!(MasterSecret, "MasterSecret", |_| 100);
 impl_anoncreds_object_from_json!(MasterSecret, anoncreds_master_secret_from_json);
+
+impl_anoncreds_object_from_bytes!(MasterSecret, anoncreds_master_secret_from_bytes);
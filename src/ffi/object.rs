@@ -1,66 +1,305 @@
 use std::any::TypeId;
 use std::cmp::Eq;
-use std::collections::{BTreeMap, HashMap};
+use std::collections::{BTreeMap, HashMap, HashSet};
 use std::fmt::Debug;
 use std::hash::{Hash, Hasher};
 use std::ops::{Deref, DerefMut};
 use std::os::raw::c_char;
-use std::sync::{Arc, Mutex};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex, MutexGuard, TryLockError};
 
 use ffi_support::{rust_string_to_c, ByteBuffer};
 use once_cell::sync::Lazy;
 use serde::Serialize;
 
 use super::error::{catch_error, ErrorCode};
+use super::util::FfiList;
+use crate::data_types::binary;
 use crate::error::Result;
 use crate::new_handle_type;
 
-pub(crate) static FFI_OBJECTS: Lazy<Mutex<BTreeMap<ObjectHandle, AnonCredsObject>>> =
-    Lazy::new(|| Mutex::new(BTreeMap::new()));
+pub(crate) static FFI_OBJECTS: Lazy<ObjectStore> = Lazy::new(ObjectStore::new);
+
+// Handles are allocated sequentially, so consecutive handles fall in different shards
+const OBJECT_STORE_SHARDS: usize = 64;
+
+type ObjectShard = HashMap<ObjectHandle, AnonCredsObject>;
+
+/// One shard of the object store with its own counters, aligned to a cache line
+/// so that threads updating different shards do not share one.
+#[repr(align(64))]
+struct Shard {
+    objects: Mutex<ObjectShard>,
+    live_objects: AtomicUsize,
+    peak_objects: AtomicUsize,
+    lock_acquisitions: AtomicUsize,
+    lock_contentions: AtomicUsize,
+}
+
+impl Shard {
+    fn new() -> Self {
+        Self {
+            objects: Mutex::new(HashMap::new()),
+            live_objects: AtomicUsize::new(0),
+            peak_objects: AtomicUsize::new(0),
+            lock_acquisitions: AtomicUsize::new(0),
+            lock_contentions: AtomicUsize::new(0),
+        }
+    }
+
+    fn added(&self, count: usize) {
+        let live = self.live_objects.fetch_add(count, Ordering::Relaxed) + count;
+        self.peak_objects.fetch_max(live, Ordering::Relaxed);
+    }
+
+    fn removed(&self, count: usize) {
+        self.live_objects.fetch_sub(count, Ordering::Relaxed);
+    }
+}
+
+/// The objects behind the FFI handles, split by handle into separately locked
+/// shards so that threads working on different objects rarely wait for each other.
+pub(crate) struct ObjectStore {
+    shards: Box<[Shard]>,
+}
+
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub(crate) struct ObjectStoreStats {
+    pub live_objects: usize,
+    pub lock_acquisitions: usize,
+    /// The lock acquisitions which had to wait for another thread
+    pub lock_contentions: usize,
+}
+
+/// The live objects, with their approximate sizes as estimated by each type. An
+/// object registered under several handles is only measured once.
+#[derive(Debug, Default, Serialize)]
+pub(crate) struct ObjectStoreReport {
+    pub live_objects: usize,
+    pub live_bytes: usize,
+    /// The most objects live at once since the peak was last reset, as the sum of
+    /// the peaks of the shards. This can exceed the true peak when the shards did
+    /// not peak at the same time.
+    pub peak_objects: usize,
+    pub types: BTreeMap<&'static str, TypeUsage>,
+    pub largest: Vec<ObjectUsage>,
+}
+
+#[derive(Debug, Default, Serialize)]
+pub(crate) struct TypeUsage {
+    pub count: usize,
+    pub bytes: usize,
+}
+
+#[derive(Debug, Serialize)]
+pub(crate) struct ObjectUsage {
+    pub handle: usize,
+    pub type_name: &'static str,
+    pub bytes: usize,
+}
+
+impl ObjectStore {
+    fn new() -> Self {
+        Self {
+            shards: (0..OBJECT_STORE_SHARDS).map(|_| Shard::new()).collect(),
+        }
+    }
+
+    #[inline]
+    fn shard_index(handle: ObjectHandle) -> usize {
+        handle.0 % OBJECT_STORE_SHARDS
+    }
+
+    fn lock_shard(&self, index: usize) -> Result<MutexGuard<'_, ObjectShard>> {
+        let shard = &self.shards[index];
+        shard.lock_acquisitions.fetch_add(1, Ordering::Relaxed);
+        match shard.objects.try_lock() {
+            Ok(guard) => Ok(guard),
+            Err(TryLockError::WouldBlock) => {
+                shard.lock_contentions.fetch_add(1, Ordering::Relaxed);
+                shard
+                    .objects
+                    .lock()
+                    .map_err(|_| err_msg!("Error locking object store"))
+            }
+            Err(TryLockError::Poisoned(_)) => Err(err_msg!("Error locking object store")),
+        }
+    }
+
+    fn insert(&self, handle: ObjectHandle, object: AnonCredsObject) -> Result<()> {
+        let index = Self::shard_index(handle);
+        self.lock_shard(index)?.insert(handle, object);
+        self.shards[index].added(1);
+        Ok(())
+    }
+
+    fn get(&self, handle: ObjectHandle) -> Result<AnonCredsObject> {
+        self.lock_shard(Self::shard_index(handle))?
+            .get(&handle)
+            .cloned()
+            .ok_or_else(|| err_msg!("Invalid object handle"))
+    }
+
+    /// Group the positions of a list of handles by the shard each handle falls in.
+    fn by_shard(handles: &[ObjectHandle]) -> Vec<(usize, Vec<usize>)> {
+        let mut positions = handles
+            .iter()
+            .enumerate()
+            .map(|(pos, handle)| (Self::shard_index(*handle), pos))
+            .collect::<Vec<_>>();
+        positions.sort_unstable();
+        let mut groups: Vec<(usize, Vec<usize>)> = Vec::new();
+        for (index, pos) in positions {
+            match groups.last_mut() {
+                Some((last, group)) if *last == index => group.push(pos),
+                _ => groups.push((index, vec![pos])),
+            }
+        }
+        groups
+    }
+
+    /// Resolve a list of handles, locking each shard they fall in only once.
+    fn get_many(&self, handles: &[ObjectHandle]) -> Result<Vec<AnonCredsObject>> {
+        let mut found = vec![None; handles.len()];
+        for (index, positions) in Self::by_shard(handles) {
+            let shard = self.lock_shard(index)?;
+            for pos in positions {
+                found[pos] = Some(
+                    shard
+                        .get(&handles[pos])
+                        .cloned()
+                        .ok_or_else(|| err_msg!("Invalid object handle"))?,
+                );
+            }
+        }
+        // every position has been filled in
+        Ok(found.into_iter().flatten().collect())
+    }
+
+    fn remove(&self, handle: ObjectHandle) -> Result<AnonCredsObject> {
+        let index = Self::shard_index(handle);
+        let object = self
+            .lock_shard(index)?
+            .remove(&handle)
+            .ok_or_else(|| err_msg!("Invalid object handle"))?;
+        self.shards[index].removed(1);
+        Ok(object)
+    }
+
+    /// Remove a list of handles, locking each shard they fall in only once and
+    /// skipping handles which are not registered.
+    fn remove_many(&self, handles: &[ObjectHandle]) -> Result<Vec<AnonCredsObject>> {
+        let mut removed = Vec::with_capacity(handles.len());
+        for (index, positions) in Self::by_shard(handles) {
+            let mut shard = self.lock_shard(index)?;
+            let count = removed.len();
+            removed.extend(
+                positions
+                    .into_iter()
+                    .filter_map(|pos| shard.remove(&handles[pos])),
+            );
+            drop(shard);
+            self.shards[index].removed(removed.len() - count);
+        }
+        Ok(removed)
+    }
+
+    fn sum(&self, counter: impl Fn(&Shard) -> &AtomicUsize) -> usize {
+        self.shards
+            .iter()
+            .map(|shard| counter(shard).load(Ordering::Relaxed))
+            .sum()
+    }
+
+    pub fn stats(&self) -> ObjectStoreStats {
+        ObjectStoreStats {
+            live_objects: self.sum(|shard| &shard.live_objects),
+            lock_acquisitions: self.sum(|shard| &shard.lock_acquisitions),
+            lock_contentions: self.sum(|shard| &shard.lock_contentions),
+        }
+    }
+
+    /// Measure the live objects, listing the `largest` biggest ones. Each shard is
+    /// locked only to collect its objects, which are measured afterwards.
+    pub fn report(&self, largest: usize) -> Result<ObjectStoreReport> {
+        let mut report = ObjectStoreReport {
+            peak_objects: self.sum(|shard| &shard.peak_objects),
+            ..Default::default()
+        };
+        let mut measured = HashSet::new();
+        let mut objects = Vec::new();
+        for index in 0..self.shards.len() {
+            let live = self
+                .lock_shard(index)?
+                .iter()
+                .map(|(handle, object)| (*handle, object.clone()))
+                .collect::<Vec<_>>();
+            for (handle, object) in live {
+                let usage = report.types.entry(object.type_name()).or_default();
+                usage.count += 1;
+                report.live_objects += 1;
+                // count the object under the first of its handles only
+                if measured.insert(Arc::as_ptr(&object.0) as *const () as usize) {
+                    let bytes = object.size_estimate();
+                    usage.bytes += bytes;
+                    report.live_bytes += bytes;
+                    objects.push(ObjectUsage {
+                        handle: handle.0,
+                        type_name: object.type_name(),
+                        bytes,
+                    });
+                }
+            }
+        }
+        objects.sort_unstable_by(|a, b| b.bytes.cmp(&a.bytes));
+        objects.truncate(largest);
+        report.largest = objects;
+        Ok(report)
+    }
+
+    pub fn reset_peak(&self) {
+        for shard in self.shards.iter() {
+            shard.peak_objects.store(
+                shard.live_objects.load(Ordering::Relaxed),
+                Ordering::Relaxed,
+            );
+        }
+    }
+}
 
 new_handle_type!(ObjectHandle, FFI_OBJECT_COUNTER);
 
 impl ObjectHandle {
     pub(crate) fn create<O: AnyAnonCredsObject + 'static>(value: O) -> Result<Self> {
+        Self::insert(AnonCredsObject::new(value))
+    }
+
+    /// Register a further handle for a loaded object, which keeps the object alive
+    /// until that handle is freed.
+    pub(crate) fn insert(object: AnonCredsObject) -> Result<Self> {
         let handle = Self::next();
-        FFI_OBJECTS
-            .lock()
-            .map_err(|_| err_msg!("Error locking object store"))?
-            .insert(handle, AnonCredsObject::new(value));
+        FFI_OBJECTS.insert(handle, object)?;
         Ok(handle)
     }
 
     pub(crate) fn load(&self) -> Result<AnonCredsObject> {
-        FFI_OBJECTS
-            .lock()
-            .map_err(|_| err_msg!("Error locking object store"))?
-            .get(self)
-            .cloned()
-            .ok_or_else(|| err_msg!("Invalid object handle"))
+        FFI_OBJECTS.get(*self)
     }
 
     pub(crate) fn opt_load(&self) -> Result<Option<AnonCredsObject>> {
         if self.0 != 0 {
-            Some(
-                FFI_OBJECTS
-                    .lock()
-                    .map_err(|_| err_msg!("Error locking object store"))?
-                    .get(self)
-                    .cloned()
-                    .ok_or_else(|| err_msg!("Invalid object handle")),
-            )
-            .transpose()
+            FFI_OBJECTS.get(*self).map(Some)
         } else {
             Ok(None)
         }
     }
 
     pub(crate) fn remove(&self) -> Result<AnonCredsObject> {
-        FFI_OBJECTS
-            .lock()
-            .map_err(|_| err_msg!("Error locking object store"))?
-            .remove(self)
-            .ok_or_else(|| err_msg!("Invalid object handle"))
+        FFI_OBJECTS.remove(*self)
+    }
+
+    pub(crate) fn remove_many(handles: &[Self]) -> Result<Vec<AnonCredsObject>> {
+        FFI_OBJECTS.remove_many(handles)
     }
 }
 
@@ -89,6 +328,10 @@ impl AnonCredsObject {
     pub fn type_name(&self) -> &'static str {
         self.0.type_name()
     }
+
+    pub fn size_estimate(&self) -> usize {
+        self.0.size_estimate()
+    }
 }
 
 impl Hash for AnonCredsObject {
@@ -99,6 +342,10 @@ impl Hash for AnonCredsObject {
 
 pub(crate) trait ToJson {
     fn to_json(&self) -> Result<Vec<u8>>;
+
+    fn to_json_value(&self) -> Result<serde_json::Value> {
+        Ok(serde_json::from_slice(&self.to_json()?)?)
+    }
 }
 
 impl ToJson for AnonCredsObject {
@@ -106,6 +353,11 @@ impl ToJson for AnonCredsObject {
     fn to_json(&self) -> Result<Vec<u8>> {
         self.0.to_json()
     }
+
+    #[inline]
+    fn to_json_value(&self) -> Result<serde_json::Value> {
+        self.0.to_json_value()
+    }
 }
 
 impl<T> ToJson for T
@@ -115,11 +367,19 @@ where
     fn to_json(&self) -> Result<Vec<u8>> {
         serde_json::to_vec(self).map_err(err_map!("Error serializing object"))
     }
+
+    fn to_json_value(&self) -> Result<serde_json::Value> {
+        serde_json::to_value(self).map_err(err_map!("Error serializing object"))
+    }
 }
 
 pub(crate) trait AnyAnonCredsObject: Debug + ToJson + Send + Sync {
     fn type_name(&self) -> &'static str;
 
+    /// The approximate size of the object in bytes, for reporting. Unless the type
+    /// gives its own estimate, this is the length of its JSON encoding.
+    fn size_estimate(&self) -> usize;
+
     #[doc(hidden)]
     fn type_id(&self) -> TypeId
     where
@@ -131,10 +391,21 @@ pub(crate) trait AnyAnonCredsObject: Debug + ToJson + Send + Sync {
 
 macro_rules! impl_anoncreds_object {
     ($ident:path, $name:expr) => {
+        impl_anoncreds_object!($ident, $name, |obj: &$ident| {
+            $crate::ffi::object::ToJson::to_json(obj)
+                .map(|json| json.len())
+                .unwrap_or(0)
+        });
+    };
+    ($ident:path, $name:expr, $size_estimate:expr) => {
         impl $crate::ffi::object::AnyAnonCredsObject for $ident {
             fn type_name(&self) -> &'static str {
                 $name
             }
+
+            fn size_estimate(&self) -> usize {
+                ($size_estimate)(self)
+            }
         }
     };
 }
@@ -171,6 +442,40 @@ pub extern "C" fn anoncreds_object_get_json(
     })
 }
 
+macro_rules! impl_anoncreds_object_from_bytes {
+    ($ident:path, $method:ident) => {
+        #[no_mangle]
+        pub extern "C" fn $method(
+            bytes: ffi_support::ByteBuffer,
+            result_p: *mut $crate::ffi::object::ObjectHandle,
+        ) -> $crate::ffi::error::ErrorCode {
+            $crate::ffi::error::catch_error(|| {
+                check_useful_c_ptr!(result_p);
+                let obj = $crate::data_types::binary::from_bytes::<$ident>(bytes.as_slice())?;
+                let handle = $crate::ffi::object::ObjectHandle::create(obj)?;
+                unsafe { *result_p = handle };
+                Ok(())
+            })
+        }
+    };
+}
+
+/// Serialize an object in the compact binary encoding, which is accepted by the
+/// `*_from_bytes` constructor of its type.
+#[no_mangle]
+pub extern "C" fn anoncreds_object_get_bytes(
+    handle: ObjectHandle,
+    result_p: *mut ByteBuffer,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(result_p);
+        let obj = handle.load()?;
+        let bytes = binary::encode_value(&obj.to_json_value()?);
+        unsafe { *result_p = ByteBuffer::from_vec(bytes) };
+        Ok(())
+    })
+}
+
 #[no_mangle]
 pub extern "C" fn anoncreds_object_get_type_name(
     handle: ObjectHandle,
@@ -185,11 +490,85 @@ pub extern "C" fn anoncreds_object_get_type_name(
     })
 }
 
+/// Register a further handle for an object. The object is kept alive until every
+/// handle to it has been freed.
+#[no_mangle]
+pub extern "C" fn anoncreds_object_copy(
+    handle: ObjectHandle,
+    result_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(result_p);
+        let copy = ObjectHandle::insert(handle.load()?)?;
+        unsafe { *result_p = copy };
+        Ok(())
+    })
+}
+
 #[no_mangle]
 pub extern "C" fn anoncreds_object_free(handle: ObjectHandle) {
     handle.remove().ok();
 }
 
+/// Free a list of handles at once. Handles which are not registered are skipped,
+/// as with `anoncreds_object_free`.
+#[no_mangle]
+pub extern "C" fn anoncreds_object_free_many(handles: FfiList<ObjectHandle>) {
+    ObjectHandle::remove_many(handles.as_slice()).ok();
+}
+
+/// Report the number of live objects, the number of times the object store has
+/// been locked, and how many of those had to wait for another thread.
+#[no_mangle]
+pub extern "C" fn anoncreds_object_store_stats(
+    live_objects_p: *mut i64,
+    lock_acquisitions_p: *mut i64,
+    lock_contentions_p: *mut i64,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(live_objects_p);
+        check_useful_c_ptr!(lock_acquisitions_p);
+        check_useful_c_ptr!(lock_contentions_p);
+        let stats = FFI_OBJECTS.stats();
+        unsafe {
+            *live_objects_p = stats.live_objects as i64;
+            *lock_acquisitions_p = stats.lock_acquisitions as i64;
+            *lock_contentions_p = stats.lock_contentions as i64;
+        }
+        Ok(())
+    })
+}
+
+/// Report the live objects as JSON: their number and approximate size in total and
+/// per type name, the most objects live at once since the peak was last reset,
+/// and the `largest` biggest objects. Sizes are estimated when reporting, mostly
+/// from the length of the JSON encoding of each object. Secrets are not encoded
+/// to be measured.
+#[no_mangle]
+pub extern "C" fn anoncreds_object_store_report(
+    largest: i64,
+    result_p: *mut *const c_char,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(result_p);
+        let largest =
+            usize::try_from(largest).map_err(|_| err_msg!("Invalid number of objects"))?;
+        let report = FFI_OBJECTS.report(largest)?;
+        let json = serde_json::to_string(&report).map_err(err_map!("Error serializing report"))?;
+        unsafe { *result_p = rust_string_to_c(json) };
+        Ok(())
+    })
+}
+
+/// Start tracking the peak number of live objects again from the current number.
+#[no_mangle]
+pub extern "C" fn anoncreds_object_store_reset_peak() -> ErrorCode {
+    catch_error(|| {
+        FFI_OBJECTS.reset_peak();
+        Ok(())
+    })
+}
+
 pub(crate) trait AnonCredsObjectId: AnyAnonCredsObject {
     type Id: Eq + Hash;
 
@@ -201,11 +580,7 @@ pub(crate) struct AnonCredsObjectList(Vec<AnonCredsObject>);
 
 impl AnonCredsObjectList {
     pub fn load(handles: &[ObjectHandle]) -> Result<Self> {
-        let loaded = handles
-            .iter()
-            .map(ObjectHandle::load)
-            .collect::<Result<_>>()?;
-        Ok(Self(loaded))
+        Ok(Self(FFI_OBJECTS.get_many(handles)?))
     }
 
     #[allow(unused)]
@@ -248,3 +623,119 @@ impl DerefMut for AnonCredsObjectList {
         &mut self.0
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    use std::thread;
+
+    #[derive(Debug, Serialize)]
+    struct TestObject(usize);
+
+    impl_anoncreds_object!(TestObject, "TestObject");
+
+    #[test]
+    fn object_store_is_shared_between_threads() {
+        let threads: Vec<_> = (0..16)
+            .map(|_| {
+                thread::spawn(|| {
+                    for value in 0..200 {
+                        let handles = (0..5)
+                            .map(|offset| ObjectHandle::create(TestObject(value + offset)))
+                            .collect::<Result<Vec<_>>>()
+                            .unwrap();
+                        let list = AnonCredsObjectList::load(&handles).unwrap();
+                        let refs = list.refs::<TestObject>().unwrap();
+                        for (offset, obj) in refs.iter().enumerate() {
+                            assert_eq!(obj.0, value + offset);
+                        }
+                        assert_eq!(
+                            handles[2]
+                                .load()
+                                .unwrap()
+                                .cast_ref::<TestObject>()
+                                .unwrap()
+                                .0,
+                            value + 2
+                        );
+                        let copy = ObjectHandle::insert(handles[0].load().unwrap()).unwrap();
+                        handles[1].remove().unwrap();
+                        assert!(handles[1].load().is_err());
+                        assert_eq!(ObjectHandle::remove_many(&handles).unwrap().len(), 4);
+                        for handle in handles {
+                            assert!(handle.load().is_err());
+                        }
+                        assert_eq!(
+                            copy.load().unwrap().cast_ref::<TestObject>().unwrap().0,
+                            value
+                        );
+                        copy.remove().unwrap();
+                    }
+                })
+            })
+            .collect();
+        for thread in threads {
+            thread.join().unwrap();
+        }
+
+        assert!(AnonCredsObjectList::load(&[ObjectHandle::next()]).is_err());
+        let stats = FFI_OBJECTS.stats();
+        assert!(stats.lock_acquisitions >= 16 * 200 * 11);
+        assert!(stats.lock_contentions <= stats.lock_acquisitions);
+    }
+
+    #[derive(Debug, Serialize)]
+    struct ReportObject(Vec<u8>);
+
+    impl_anoncreds_object!(ReportObject, "ReportObject");
+
+    #[derive(Debug)]
+    struct UnserializableObject(usize);
+
+    impl_anoncreds_object!(
+        UnserializableObject,
+        "UnserializableObject",
+        |obj: &UnserializableObject| obj.0
+    );
+
+    impl ToJson for UnserializableObject {
+        fn to_json(&self) -> Result<Vec<u8>> {
+            Err(err_msg!("UnserializableObject cannot be serialized"))
+        }
+    }
+
+    #[test]
+    fn object_store_report() {
+        let small = ObjectHandle::create(ReportObject(vec![1; 10])).unwrap();
+        let large = ObjectHandle::create(ReportObject(vec![1; 1000])).unwrap();
+        let copy = ObjectHandle::insert(large.load().unwrap()).unwrap();
+        let small_bytes = small.load().unwrap().to_json().unwrap().len();
+        let large_bytes = large.load().unwrap().to_json().unwrap().len();
+
+        let report = FFI_OBJECTS.report(usize::MAX).unwrap();
+        let usage = &report.types["ReportObject"];
+        assert_eq!(usage.count, 3);
+        assert_eq!(usage.bytes, small_bytes + large_bytes);
+        assert!(report.live_bytes >= usage.bytes);
+        assert!(report.peak_objects >= 3);
+        let largest = report
+            .largest
+            .iter()
+            .filter(|obj| obj.type_name == "ReportObject")
+            .collect::<Vec<_>>();
+        assert_eq!(largest.len(), 2);
+        assert!(largest[0].handle == large.0 || largest[0].handle == copy.0);
+        assert_eq!(largest[0].bytes, large_bytes);
+        assert_eq!(largest[1].handle, small.0);
+
+        let estimated = ObjectHandle::create(UnserializableObject(500)).unwrap();
+        let report = FFI_OBJECTS.report(usize::MAX).unwrap();
+        assert_eq!(report.types["UnserializableObject"].bytes, 500);
+
+        ObjectHandle::remove_many(&[small, large, copy, estimated]).unwrap();
+        let report = FFI_OBJECTS.report(1).unwrap();
+        assert!(!report.types.contains_key("ReportObject"));
+        assert!(report.largest.len() <= 1);
+    }
+}
@@ -11,6 +11,11 @@ impl_anoncreds_object_from_json!(
     anoncreds_presentation_request_from_json
 );
 
+impl_anoncreds_object_from_bytes!(
+    PresentationRequest,
+    anoncreds_presentation_request_from_bytes
+);
+
 #[no_mangle]
 pub extern "C" fn anoncreds_generate_nonce(nonce_p: *mut *const c_char) -> ErrorCode {
     catch_error(|| {
@@ -1,9 +1,10 @@
 use std::collections::HashMap;
+use std::os::raw::c_char;
 
-use ffi_support::FfiStr;
+use ffi_support::{rust_string_to_c, FfiStr};
 
 use super::error::{catch_error, ErrorCode};
-use super::object::{AnonCredsObject, AnonCredsObjectList, ObjectHandle};
+use super::object::{AnonCredsObject, AnonCredsObjectList, ObjectHandle, ToJson};
 use super::util::{FfiList, FfiStrList};
 use crate::data_types::cred_def::{CredentialDefinition, CredentialDefinitionId};
 use crate::data_types::presentation::Presentation;
@@ -14,12 +15,20 @@ use crate::data_types::rev_reg_def::{
 use crate::data_types::schema::{Schema, SchemaId};
 use crate::error::Result;
 use crate::services::{
-    prover::create_presentation, types::PresentCredentials, verifier::verify_presentation,
+    prover::create_presentation,
+    types::{PresentCredentials, PresentationRequest},
+    verifier::{
+        verify_presentation, verify_presentation_with_context,
+        verify_presentation_with_revocation_index, verify_presentations, RevocationIndex,
+        VerifierContext,
+    },
 };
 
 impl_anoncreds_object!(Presentation, "Presentation");
 impl_anoncreds_object_from_json!(Presentation, anoncreds_presentation_from_json);
 
+impl_anoncreds_object_from_bytes!(Presentation, anoncreds_presentation_from_bytes);
+
 #[derive(Debug)]
 #[repr(C)]
 pub struct FfiCredentialEntry {
@@ -209,6 +218,270 @@ pub extern "C" fn anoncreds_verify_presentation(
     result_p: *mut i8,
 ) -> ErrorCode {
     catch_error(|| {
+        let objects = VerifierObjects::load(
+            &schemas,
+            &schema_ids,
+            &cred_defs,
+            &cred_def_ids,
+            &rev_reg_defs,
+            &rev_reg_def_ids,
+        )?;
+        let (schemas, cred_defs, rev_reg_defs) = objects.refs_maps()?;
+        let rev_reg_defs = match rev_reg_defs.is_empty() {
+            false => Some(&rev_reg_defs),
+            true => None,
+        };
+
+        let rev_status_list: AnonCredsObjectList =
+            AnonCredsObjectList::load(rev_status_list.as_slice())?;
+        let rev_status_list: Result<Vec<&RevocationStatusList>> = rev_status_list.refs();
+        let rev_status_list = rev_status_list.ok();
+
+        let verify = verify_presentation(
+            presentation.load()?.cast_ref()?,
+            pres_req.load()?.cast_ref()?,
+            &schemas,
+            &cred_defs,
+            rev_reg_defs,
+            rev_status_list,
+        )?;
+        unsafe { *result_p = verify as i8 };
+        Ok(())
+    })
+}
+
+/// Verify many presentations against one shared set of schemas, credential
+/// definitions and revocation data.
+///
+/// `presentations` and `pres_reqs` are paired by position. The result is a JSON
+/// array with one entry per pair: `{"code": 0, "valid": <bool>}` when verification
+/// completed, or `{"code": <error code>, "message": <error>}` when it failed.
+#[no_mangle]
+pub extern "C" fn anoncreds_verify_presentations(
+    presentations: FfiList<ObjectHandle>,
+    pres_reqs: FfiList<ObjectHandle>,
+    schemas: FfiList<ObjectHandle>,
+    schema_ids: FfiStrList,
+    cred_defs: FfiList<ObjectHandle>,
+    cred_def_ids: FfiStrList,
+    rev_reg_defs: FfiList<ObjectHandle>,
+    rev_reg_def_ids: FfiStrList,
+    rev_status_list: FfiList<ObjectHandle>,
+    results_json_p: *mut *const c_char,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(results_json_p);
+
+        if presentations.len() != pres_reqs.len() {
+            return Err(err_msg!(
+                "Inconsistent lengths for presentations and presentation requests"
+            ));
+        }
+
+        let objects = VerifierObjects::load(
+            &schemas,
+            &schema_ids,
+            &cred_defs,
+            &cred_def_ids,
+            &rev_reg_defs,
+            &rev_reg_def_ids,
+        )?;
+        let (schemas, cred_defs, rev_reg_defs) = objects.refs_maps()?;
+        let rev_reg_defs = match rev_reg_defs.is_empty() {
+            false => Some(&rev_reg_defs),
+            true => None,
+        };
+
+        let rev_status_list: AnonCredsObjectList =
+            AnonCredsObjectList::load(rev_status_list.as_slice())?;
+        let rev_status_list: Result<Vec<&RevocationStatusList>> = rev_status_list.refs();
+        let rev_index = rev_status_list
+            .ok()
+            .map(|lists| RevocationIndex::new(&lists))
+            .transpose()?;
+
+        let presentations = AnonCredsObjectList::load(presentations.as_slice())?;
+        let presentations = presentations.refs::<Presentation>()?;
+        let pres_reqs = AnonCredsObjectList::load(pres_reqs.as_slice())?;
+        let pres_reqs = pres_reqs.refs::<PresentationRequest>()?;
+        let pairs = presentations.into_iter().zip(pres_reqs).collect::<Vec<_>>();
+
+        let results = verify_presentations(
+            &pairs,
+            &schemas,
+            &cred_defs,
+            rev_reg_defs,
+            rev_index.as_ref(),
+        )
+        .into_iter()
+        .map(|result| match result {
+            Ok(valid) => {
+                serde_json::json!({"code": ErrorCode::Success as usize, "valid": valid})
+            }
+            Err(err) => serde_json::json!({
+                "code": ErrorCode::from(err.kind()) as usize,
+                "message": err.to_string(),
+            }),
+        })
+        .collect::<Vec<_>>();
+
+        let results = serde_json::Value::Array(results).to_string();
+        unsafe { *results_json_p = rust_string_to_c(results) };
+        Ok(())
+    })
+}
+
+impl_anoncreds_object!(
+    VerifierContext,
+    "VerifierContext",
+    VerifierContext::size_estimate
+);
+
+impl ToJson for VerifierContext {
+    fn to_json(&self) -> Result<Vec<u8>> {
+        Err(err_msg!("VerifierContext cannot be serialized"))
+    }
+}
+
+/// Prepare a reusable verifier context from schemas, credential definitions and
+/// revocation registry definitions.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_verifier_context(
+    schemas: FfiList<ObjectHandle>,
+    schema_ids: FfiStrList,
+    cred_defs: FfiList<ObjectHandle>,
+    cred_def_ids: FfiStrList,
+    rev_reg_defs: FfiList<ObjectHandle>,
+    rev_reg_def_ids: FfiStrList,
+    context_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(context_p);
+
+        let objects = VerifierObjects::load(
+            &schemas,
+            &schema_ids,
+            &cred_defs,
+            &cred_def_ids,
+            &rev_reg_defs,
+            &rev_reg_def_ids,
+        )?;
+        let (schemas, cred_defs, rev_reg_defs) = objects.refs_maps()?;
+        let schemas = schemas
+            .into_iter()
+            .map(|(id, schema)| (id.clone(), schema.clone()))
+            .collect();
+        let cred_defs = cred_defs
+            .into_iter()
+            .map(|(id, cred_def)| {
+                let cred_def = cred_def
+                    .try_clone()
+                    .map_err(err_map!(Unexpected, "Error copying credential definition"))?;
+                Ok((id.clone(), cred_def))
+            })
+            .collect::<Result<_>>()?;
+        let rev_reg_defs = rev_reg_defs
+            .into_iter()
+            .map(|(id, rev_reg_def)| (id.clone(), rev_reg_def.clone()))
+            .collect();
+
+        let context = VerifierContext::new(schemas, cred_defs, rev_reg_defs)?;
+        let context = ObjectHandle::create(context)?;
+        unsafe { *context_p = context };
+        Ok(())
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_verify_presentation_with_context(
+    presentation: ObjectHandle,
+    pres_req: ObjectHandle,
+    context: ObjectHandle,
+    rev_index: ObjectHandle,
+    result_p: *mut i8,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(result_p);
+
+        let rev_index = rev_index.opt_load()?;
+
+        let verify = verify_presentation_with_context(
+            presentation.load()?.cast_ref()?,
+            pres_req.load()?.cast_ref()?,
+            context.load()?.cast_ref()?,
+            rev_index
+                .as_ref()
+                .map(AnonCredsObject::cast_ref)
+                .transpose()?,
+        )?;
+        unsafe { *result_p = verify as i8 };
+        Ok(())
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_verify_presentation_with_revocation_index(
+    presentation: ObjectHandle,
+    pres_req: ObjectHandle,
+    schemas: FfiList<ObjectHandle>,
+    schema_ids: FfiStrList,
+    cred_defs: FfiList<ObjectHandle>,
+    cred_def_ids: FfiStrList,
+    rev_reg_defs: FfiList<ObjectHandle>,
+    rev_reg_def_ids: FfiStrList,
+    rev_index: ObjectHandle,
+    result_p: *mut i8,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(result_p);
+
+        let objects = VerifierObjects::load(
+            &schemas,
+            &schema_ids,
+            &cred_defs,
+            &cred_def_ids,
+            &rev_reg_defs,
+            &rev_reg_def_ids,
+        )?;
+        let (schemas, cred_defs, rev_reg_defs) = objects.refs_maps()?;
+        let rev_reg_defs = match rev_reg_defs.is_empty() {
+            false => Some(&rev_reg_defs),
+            true => None,
+        };
+
+        let rev_index = rev_index.opt_load()?;
+
+        let verify = verify_presentation_with_revocation_index(
+            presentation.load()?.cast_ref()?,
+            pres_req.load()?.cast_ref()?,
+            &schemas,
+            &cred_defs,
+            rev_reg_defs,
+            rev_index
+                .as_ref()
+                .map(AnonCredsObject::cast_ref)
+                .transpose()?,
+        )?;
+        unsafe { *result_p = verify as i8 };
+        Ok(())
+    })
+}
+
+struct VerifierIdentifiers {
+    schema_ids: Vec<SchemaId>,
+    cred_def_ids: Vec<CredentialDefinitionId>,
+    rev_reg_def_ids: Vec<RevocationRegistryDefinitionId>,
+}
+
+impl VerifierIdentifiers {
+    fn parse(
+        schemas: &FfiList<ObjectHandle>,
+        schema_ids: &FfiStrList,
+        cred_defs: &FfiList<ObjectHandle>,
+        cred_def_ids: &FfiStrList,
+        rev_reg_defs: &FfiList<ObjectHandle>,
+        rev_reg_def_ids: &FfiStrList,
+    ) -> Result<Self> {
         if schemas.len() != schema_ids.len() {
             return Err(err_msg!("Inconsistent lengths for schemas and schemas ids"));
         }
@@ -243,38 +516,66 @@ pub extern "C" fn anoncreds_verify_presentation(
             rev_reg_def_identifiers.push(rev_reg_def_id);
         }
 
-        let schemas = AnonCredsObjectList::load(schemas.as_slice())?;
-        let schemas = schemas.refs_map::<SchemaId, Schema>(&schema_identifiers)?;
-
-        let cred_defs = AnonCredsObjectList::load(cred_defs.as_slice())?;
-        let cred_defs = cred_defs
-            .refs_map::<CredentialDefinitionId, CredentialDefinition>(&cred_def_identifiers)?;
-
-        let rev_reg_defs = AnonCredsObjectList::load(rev_reg_defs.as_slice())?;
-        let rev_reg_defs = rev_reg_defs
-            .refs_map::<RevocationRegistryDefinitionId, RevocationRegistryDefinition>(
-                &rev_reg_def_identifiers,
-            )?;
-
-        let rev_reg_defs = match rev_reg_defs.is_empty() {
-            false => Some(&rev_reg_defs),
-            true => None,
-        };
+        Ok(Self {
+            schema_ids: schema_identifiers,
+            cred_def_ids: cred_def_identifiers,
+            rev_reg_def_ids: rev_reg_def_identifiers,
+        })
+    }
+}
 
-        let rev_status_list: AnonCredsObjectList =
-            AnonCredsObjectList::load(rev_status_list.as_slice())?;
-        let rev_status_list: Result<Vec<&RevocationStatusList>> = rev_status_list.refs();
-        let rev_status_list = rev_status_list.ok();
+/// The schemas, credential definitions and revocation registry definitions passed
+/// to a verifier entry point, loaded along with their parsed identifiers.
+struct VerifierObjects {
+    identifiers: VerifierIdentifiers,
+    schemas: AnonCredsObjectList,
+    cred_defs: AnonCredsObjectList,
+    rev_reg_defs: AnonCredsObjectList,
+}
 
-        let verify = verify_presentation(
-            presentation.load()?.cast_ref()?,
-            pres_req.load()?.cast_ref()?,
-            &schemas,
-            &cred_defs,
+type VerifierRefsMaps<'a> = (
+    HashMap<&'a SchemaId, &'a Schema>,
+    HashMap<&'a CredentialDefinitionId, &'a CredentialDefinition>,
+    HashMap<&'a RevocationRegistryDefinitionId, &'a RevocationRegistryDefinition>,
+);
+
+impl VerifierObjects {
+    fn load(
+        schemas: &FfiList<ObjectHandle>,
+        schema_ids: &FfiStrList,
+        cred_defs: &FfiList<ObjectHandle>,
+        cred_def_ids: &FfiStrList,
+        rev_reg_defs: &FfiList<ObjectHandle>,
+        rev_reg_def_ids: &FfiStrList,
+    ) -> Result<Self> {
+        let identifiers = VerifierIdentifiers::parse(
+            schemas,
+            schema_ids,
+            cred_defs,
+            cred_def_ids,
             rev_reg_defs,
-            rev_status_list,
+            rev_reg_def_ids,
         )?;
-        unsafe { *result_p = verify as i8 };
-        Ok(())
-    })
+        Ok(Self {
+            identifiers,
+            schemas: AnonCredsObjectList::load(schemas.as_slice())?,
+            cred_defs: AnonCredsObjectList::load(cred_defs.as_slice())?,
+            rev_reg_defs: AnonCredsObjectList::load(rev_reg_defs.as_slice())?,
+        })
+    }
+
+    fn refs_maps(&self) -> Result<VerifierRefsMaps<'_>> {
+        Ok((
+            self.schemas
+                .refs_map::<SchemaId, Schema>(&self.identifiers.schema_ids)?,
+            self.cred_defs
+                .refs_map::<CredentialDefinitionId, CredentialDefinition>(
+                    &self.identifiers.cred_def_ids,
+                )?,
+            self.rev_reg_defs
+                .refs_map::<RevocationRegistryDefinitionId, RevocationRegistryDefinition>(
+                    &self.identifiers.rev_reg_def_ids,
+                )?,
+        ))
+    }
 }
@@ -1,23 +1,36 @@
 use std::collections::BTreeSet;
 use std::os::raw::c_char;
 use std::str::FromStr;
+use std::sync::{Mutex, MutexGuard};
 
-use ffi_support::{rust_string_to_c, FfiStr};
+use ffi_support::{rust_string_to_c, ByteBuffer, FfiStr};
+use rayon::prelude::*;
 
 use super::error::{catch_error, ErrorCode};
-use super::object::{AnonCredsObject, ObjectHandle};
+use super::object::{AnonCredsObject, AnonCredsObjectList, ObjectHandle, ToJson};
+use super::tails::TailsChunkCallback;
 use super::util::FfiList;
 use crate::data_types::{
-    rev_reg::{RevocationRegistry, RevocationRegistryDelta, RevocationStatusList},
+    binary,
+    pres_request::NonRevocedInterval,
+    rev_reg::{
+        RevocationListEncoding, RevocationRegistry, RevocationRegistryDelta, RevocationStatusList,
+    },
     rev_reg_def::{
-        RegistryType, RevocationRegistryDefinition, RevocationRegistryDefinitionPrivate,
+        RegistryType, RevocationRegistryDefinition, RevocationRegistryDefinitionId,
+        RevocationRegistryDefinitionPrivate,
     },
 };
+use crate::error::Result;
 use crate::issuer;
-use crate::services::issuer::create_revocation_registry_def;
-use crate::services::prover::create_or_update_revocation_state;
-use crate::services::tails::TailsFileWriter;
+use crate::services::issuer::{create_revocation_registry_def, RevocationIndexAllocator};
+use crate::services::prover::{
+    catch_up_revocation_state, create_or_update_revocation_state, create_revocation_states,
+    update_revocation_states,
+};
+use crate::services::tails::{TailsFileWriter, TailsMemoryWriter, TailsWriter};
 use crate::services::types::CredentialRevocationState;
+use crate::services::verifier::RevocationIndex;
 
 #[no_mangle]
 pub extern "C" fn anoncreds_create_revocation_status_list(
@@ -69,20 +82,51 @@ pub extern "C" fn anoncreds_update_revocation_status_list(
         } else {
             Some(timestamp as u64)
         };
-        let revoked: Option<BTreeSet<u32>> = if revoked.is_empty() {
-            Some(revoked.as_slice().iter().map(|r| *r as u32).collect())
-        } else {
+        let revoked = _index_set(&revoked)?;
+        let issued = _index_set(&issued)?;
+        let new_rev_status_list = issuer::update_revocation_status_list(
+            timestamp,
+            issued,
+            revoked,
+            rev_reg_def.load()?.cast_ref()?,
+            rev_current_list.load()?.cast_ref()?,
+        )?;
+
+        let new_rev_status_list = ObjectHandle::create(new_rev_status_list)?;
+        ObjectHandle::remove(&rev_current_list)?;
+
+        unsafe { *new_rev_status_list_p = new_rev_status_list };
+
+        Ok(())
+    })
+}
+
+/// Update a revocation status list as `anoncreds_update_revocation_status_list` does,
+/// with the issued and revoked indices given as packed bits.
+///
+/// Index `i` is selected when bit `i % 8` of byte `i / 8` is set, counting from the
+/// least significant bit, as in `anoncreds_revocation_status_list_get_bits`. An empty
+/// buffer selects no indices.
+#[no_mangle]
+pub extern "C" fn anoncreds_update_revocation_status_list_bits(
+    timestamp: i64,
+    issued: ByteBuffer,
+    revoked: ByteBuffer,
+    rev_reg_def: ObjectHandle,
+    rev_current_list: ObjectHandle,
+    new_rev_status_list_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(new_rev_status_list_p);
+        let timestamp = if timestamp <= 0 {
             None
-        };
-        let issued: Option<BTreeSet<u32>> = if issued.is_empty() {
-            Some(issued.as_slice().iter().map(|r| *r as u32).collect())
         } else {
-            None
+            Some(timestamp as u64)
         };
         let new_rev_status_list = issuer::update_revocation_status_list(
             timestamp,
-            issued,
-            revoked,
+            _packed_index_set(issued.as_slice())?,
+            _packed_index_set(revoked.as_slice())?,
             rev_reg_def.load()?.cast_ref()?,
             rev_current_list.load()?.cast_ref()?,
         )?;
@@ -96,6 +140,36 @@ pub extern "C" fn anoncreds_update_revocation_status_list(
     })
 }
 
+fn _index_set(indices: &FfiList<i32>) -> Result<Option<BTreeSet<u32>>> {
+    if indices.is_empty() {
+        return Ok(None);
+    }
+    indices
+        .as_slice()
+        .iter()
+        .map(|idx| u32::try_from(*idx).map_err(|_| err_msg!("Invalid credential revocation index")))
+        .collect::<Result<BTreeSet<_>>>()
+        .map(Some)
+}
+
+fn _packed_index_set(bits: &[u8]) -> Result<Option<BTreeSet<u32>>> {
+    if bits.is_empty() {
+        return Ok(None);
+    }
+    if bits.len() > (u32::MAX as usize + 1) / 8 {
+        return Err(err_msg!("Packed revocation indices are too long"));
+    }
+    let mut indices = BTreeSet::new();
+    for (byte_idx, byte) in bits.iter().enumerate() {
+        let mut byte = *byte;
+        while byte != 0 {
+            indices.insert(byte_idx as u32 * 8 + byte.trailing_zeros());
+            byte &= byte - 1;
+        }
+    }
+    Ok(Some(indices))
+}
+
 #[no_mangle]
 pub extern "C" fn anoncreds_update_revocation_status_list_timestamp_only(
     timestamp: i64,
@@ -131,51 +205,163 @@ pub extern "C" fn anoncreds_create_revocation_registry_def(
     tails_dir_path: FfiStr,
     reg_def_p: *mut ObjectHandle,
     reg_def_private_p: *mut ObjectHandle,
+) -> ErrorCode {
+    anoncreds_create_revocation_registry_def_with_threads(
+        cred_def,
+        cred_def_id,
+        issuer_id,
+        tag,
+        rev_reg_type,
+        max_cred_num,
+        tails_dir_path,
+        1,
+        reg_def_p,
+        reg_def_private_p,
+    )
+}
+
+/// Create a revocation registry definition as `anoncreds_create_revocation_registry_def`
+/// does, generating the tails file on `threads` threads, or on every available core
+/// when `threads` is zero.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_revocation_registry_def_with_threads(
+    cred_def: ObjectHandle,
+    cred_def_id: FfiStr,
+    issuer_id: FfiStr,
+    tag: FfiStr,
+    rev_reg_type: FfiStr,
+    max_cred_num: i64,
+    tails_dir_path: FfiStr,
+    threads: i64,
+    reg_def_p: *mut ObjectHandle,
+    reg_def_private_p: *mut ObjectHandle,
 ) -> ErrorCode {
     catch_error(|| {
-        check_useful_c_ptr!(reg_def_p);
-        check_useful_c_ptr!(reg_def_private_p);
-        let tag = tag.as_opt_str().ok_or_else(|| err_msg!("Missing tag"))?;
-        let cred_def_id = cred_def_id
-            .as_opt_str()
-            .ok_or_else(|| err_msg!("Missing cred def id"))?;
-        let issuer_id = issuer_id
-            .as_opt_str()
-            .ok_or_else(|| err_msg!("Missing issuer id"))?;
-        let rev_reg_type = {
-            let rtype = rev_reg_type
-                .as_opt_str()
-                .ok_or_else(|| err_msg!("Missing registry type"))?;
-            RegistryType::from_str(rtype).map_err(err_map!(Input))?
-        };
-        let mut tails_writer = TailsFileWriter::new(tails_dir_path.into_opt_string());
-        let (reg_def, reg_def_private) = create_revocation_registry_def(
-            cred_def.load()?.cast_ref()?,
+        let threads = usize::try_from(threads).map_err(|_| err_msg!("Invalid thread count"))?;
+        let mut tails_writer =
+            TailsFileWriter::new(tails_dir_path.into_opt_string()).with_threads(threads);
+        _create_revocation_registry_def(
+            cred_def,
             cred_def_id,
             issuer_id,
             tag,
             rev_reg_type,
-            max_cred_num
-                .try_into()
-                .map_err(|_| err_msg!("Invalid maximum credential count"))?,
+            max_cred_num,
             &mut tails_writer,
+            reg_def_p,
+            reg_def_private_p,
+        )
+    })
+}
+
+/// Create a revocation registry definition, returning the tails in `tails_p` instead
+/// of writing a tails file. When `sink` is given the tails are passed to it in
+/// chunks as they are generated, and `tails_p` is left empty.
+///
+/// The tails location of the definition is `tails_location`, or the tails hash when
+/// it is not given.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_revocation_registry_def_in_memory(
+    cred_def: ObjectHandle,
+    cred_def_id: FfiStr,
+    issuer_id: FfiStr,
+    tag: FfiStr,
+    rev_reg_type: FfiStr,
+    max_cred_num: i64,
+    tails_location: FfiStr,
+    threads: i64,
+    sink: Option<TailsChunkCallback>,
+    sink_context: i64,
+    reg_def_p: *mut ObjectHandle,
+    reg_def_private_p: *mut ObjectHandle,
+    tails_p: *mut ByteBuffer,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(tails_p);
+        let threads = usize::try_from(threads).map_err(|_| err_msg!("Invalid thread count"))?;
+        let mut tails_writer =
+            TailsMemoryWriter::new(tails_location.into_opt_string()).with_threads(threads);
+        if let Some(sink) = sink {
+            tails_writer = tails_writer.with_sink(Box::new(move |chunk: &[u8]| {
+                if sink(sink_context, chunk.as_ptr(), chunk.len() as i64) != 0 {
+                    return Err(err_msg!(IOError, "Error passing tails to the sink"));
+                }
+                Ok(())
+            }));
+        }
+        _create_revocation_registry_def(
+            cred_def,
+            cred_def_id,
+            issuer_id,
+            tag,
+            rev_reg_type,
+            max_cred_num,
+            &mut tails_writer,
+            reg_def_p,
+            reg_def_private_p,
         )?;
-        let reg_def = ObjectHandle::create(reg_def)?;
-        let reg_def_private = ObjectHandle::create(reg_def_private)?;
-        unsafe {
-            *reg_def_p = reg_def;
-            *reg_def_private_p = reg_def_private;
-        };
+        unsafe { *tails_p = ByteBuffer::from_vec(tails_writer.into_tails()) };
         Ok(())
     })
 }
 
+fn _create_revocation_registry_def(
+    cred_def: ObjectHandle,
+    cred_def_id: FfiStr,
+    issuer_id: FfiStr,
+    tag: FfiStr,
+    rev_reg_type: FfiStr,
+    max_cred_num: i64,
+    tails_writer: &mut impl TailsWriter,
+    reg_def_p: *mut ObjectHandle,
+    reg_def_private_p: *mut ObjectHandle,
+) -> Result<()> {
+    check_useful_c_ptr!(reg_def_p);
+    check_useful_c_ptr!(reg_def_private_p);
+    let tag = tag.as_opt_str().ok_or_else(|| err_msg!("Missing tag"))?;
+    let cred_def_id = cred_def_id
+        .as_opt_str()
+        .ok_or_else(|| err_msg!("Missing cred def id"))?;
+    let issuer_id = issuer_id
+        .as_opt_str()
+        .ok_or_else(|| err_msg!("Missing issuer id"))?;
+    let rev_reg_type = {
+        let rtype = rev_reg_type
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing registry type"))?;
+        RegistryType::from_str(rtype).map_err(err_map!(Input))?
+    };
+    let (reg_def, reg_def_private) = create_revocation_registry_def(
+        cred_def.load()?.cast_ref()?,
+        cred_def_id,
+        issuer_id,
+        tag,
+        rev_reg_type,
+        max_cred_num
+            .try_into()
+            .map_err(|_| err_msg!("Invalid maximum credential count"))?,
+        tails_writer,
+    )?;
+    let reg_def = ObjectHandle::create(reg_def)?;
+    let reg_def_private = ObjectHandle::create(reg_def_private)?;
+    unsafe {
+        *reg_def_p = reg_def;
+        *reg_def_private_p = reg_def_private;
+    };
+    Ok(())
+}
+
 impl_anoncreds_object!(RevocationRegistryDefinition, "RevocationRegistryDefinition");
 impl_anoncreds_object_from_json!(
     RevocationRegistryDefinition,
     anoncreds_revocation_registry_definition_from_json
 );
 
+impl_anoncreds_object_from_bytes!(
+    RevocationRegistryDefinition,
+    anoncreds_revocation_registry_definition_from_bytes
+);
+
 #[no_mangle]
 pub extern "C" fn anoncreds_revocation_registry_definition_get_attribute(
     handle: ObjectHandle,
@@ -197,27 +383,104 @@ pub extern "C" fn anoncreds_revocation_registry_definition_get_attribute(
     })
 }
 
+// The private key is not encoded to be measured: its encoding is about 100 bytes
 impl_anoncreds_object!(
     RevocationRegistryDefinitionPrivate,
-    "RevocationRegistryDefinitionPrivate"
+    "RevocationRegistryDefinitionPrivate",
+    |_| 100
 );
 impl_anoncreds_object_from_json!(
     RevocationRegistryDefinitionPrivate,
     anoncreds_revocation_registry_definition_private_from_json
 );
 
+impl_anoncreds_object_from_bytes!(
+    RevocationRegistryDefinitionPrivate,
+    anoncreds_revocation_registry_definition_private_from_bytes
+);
+
 impl_anoncreds_object!(RevocationRegistry, "RevocationRegistry");
 impl_anoncreds_object_from_json!(RevocationRegistry, anoncreds_revocation_registry_from_json);
 
+impl_anoncreds_object_from_bytes!(RevocationRegistry, anoncreds_revocation_registry_from_bytes);
+
 impl_anoncreds_object!(RevocationRegistryDelta, "RevocationRegistryDelta");
 impl_anoncreds_object_from_json!(
     RevocationRegistryDelta,
     anoncreds_revocation_registry_delta_from_json
 );
 
+impl_anoncreds_object_from_bytes!(
+    RevocationRegistryDelta,
+    anoncreds_revocation_registry_delta_from_bytes
+);
+
 impl_anoncreds_object!(RevocationStatusList, "RevocationStatusList");
 impl_anoncreds_object_from_json!(RevocationStatusList, anoncreds_revocation_list_from_json);
 
+impl_anoncreds_object_from_bytes!(RevocationStatusList, anoncreds_revocation_list_from_bytes);
+
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_status_list_get_bits(
+    rev_status_list: ObjectHandle,
+    bits_p: *mut *const u8,
+    bits_len_p: *mut usize,
+    list_len_p: *mut usize,
+    pin_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(bits_p);
+        check_useful_c_ptr!(bits_len_p);
+        check_useful_c_ptr!(list_len_p);
+        check_useful_c_ptr!(pin_p);
+        if cfg!(target_endian = "big") {
+            return Err(err_msg!(
+                Unexpected,
+                "Direct access to the revocation list requires a little-endian platform"
+            ));
+        }
+        let rev_status_list = rev_status_list.load()?;
+        let state = rev_status_list.cast_ref::<RevocationStatusList>()?.state();
+        let bits = state.as_raw_slice().as_ptr() as *const u8;
+        let list_len = state.len();
+        // the pin handle keeps the storage alive, whatever happens to the original handle
+        let pin = ObjectHandle::insert(rev_status_list.clone())?;
+        unsafe {
+            *bits_p = bits;
+            *bits_len_p = (list_len + 7) / 8;
+            *list_len_p = list_len;
+            *pin_p = pin;
+        }
+        Ok(())
+    })
+}
+
+/// Serialize a revocation status list to JSON with the given revocation list encoding:
+/// `array` (the default when no encoding is given), `bits` or `rle`. The `bits`
+/// encoding packs the list as `anoncreds_revocation_status_list_get_bits` does.
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_status_list_to_json(
+    rev_status_list: ObjectHandle,
+    encoding: FfiStr,
+    json_p: *mut ByteBuffer,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(json_p);
+        let encoding = match encoding.as_opt_str() {
+            Some(encoding) => {
+                RevocationListEncoding::from_str(encoding).map_err(err_map!(Input))?
+            }
+            None => RevocationListEncoding::default(),
+        };
+        let json = rev_status_list
+            .load()?
+            .cast_ref::<RevocationStatusList>()?
+            .to_json_with_encoding(encoding)?;
+        unsafe { *json_p = ByteBuffer::from_vec(json) };
+        Ok(())
+    })
+}
+
 #[no_mangle]
 pub extern "C" fn anoncreds_create_or_update_revocation_state(
     rev_reg_def: ObjectHandle,
@@ -257,8 +520,336 @@ pub extern "C" fn anoncreds_create_or_update_revocation_state(
     })
 }
 
+/// Create the revocation states for each of `rev_reg_idxs`, written to `rev_states_p`
+/// which must have room for one handle per index.
+#[no_mangle]
+pub extern "C" fn anoncreds_create_revocation_states(
+    rev_reg_def: ObjectHandle,
+    rev_status_list: ObjectHandle,
+    rev_reg_idxs: FfiList<i64>,
+    tails_path: FfiStr,
+    rev_states_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(rev_states_p);
+        let tails_path = tails_path
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails file path"))?;
+        let rev_reg_idxs = rev_reg_idxs.try_collect(|rev_reg_idx| {
+            u32::try_from(*rev_reg_idx).map_err(|_| err_msg!("Invalid credential revocation index"))
+        })?;
+        let rev_states = create_revocation_states(
+            tails_path,
+            rev_reg_def.load()?.cast_ref()?,
+            rev_status_list.load()?.cast_ref()?,
+            &rev_reg_idxs,
+        )?;
+        let rev_states = rev_states
+            .into_iter()
+            .map(ObjectHandle::create)
+            .collect::<Result<Vec<_>>>()?;
+        unsafe {
+            std::slice::from_raw_parts_mut(rev_states_p, rev_states.len())
+                .copy_from_slice(&rev_states)
+        };
+        Ok(())
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_catch_up_revocation_state(
+    rev_reg_def: ObjectHandle,
+    rev_reg_index: i64,
+    tails_path: FfiStr,
+    rev_state: ObjectHandle,
+    old_rev_status_list: ObjectHandle,
+    rev_status_lists: FfiList<ObjectHandle>,
+    rev_state_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(rev_state_p);
+        let tails_path = tails_path
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails file path"))?;
+        let rev_status_lists = AnonCredsObjectList::load(rev_status_lists.as_slice())?;
+        let rev_state = catch_up_revocation_state(
+            tails_path,
+            rev_reg_def.load()?.cast_ref()?,
+            rev_reg_index
+                .try_into()
+                .map_err(|_| err_msg!("Invalid credential revocation index"))?,
+            rev_state.load()?.cast_ref()?,
+            old_rev_status_list.load()?.cast_ref()?,
+            &rev_status_lists.refs::<RevocationStatusList>()?,
+        )?;
+        let rev_state = ObjectHandle::create(rev_state)?;
+        unsafe { *rev_state_p = rev_state };
+        Ok(())
+    })
+}
+
+/// Update serialized revocation states from `old_rev_status_list` to `rev_status_list`.
+///
+/// Each state may be in JSON or the binary encoding, and is written to the same position
+/// of `rev_states_p` in the encoding it was given in. The buffers must be freed by the
+/// caller.
+#[no_mangle]
+pub extern "C" fn anoncreds_update_revocation_states(
+    rev_reg_def: ObjectHandle,
+    old_rev_status_list: ObjectHandle,
+    rev_status_list: ObjectHandle,
+    rev_states: FfiList<ByteBuffer>,
+    rev_reg_idxs: FfiList<i64>,
+    tails_path: FfiStr,
+    rev_states_p: *mut ByteBuffer,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(rev_states_p);
+        let tails_path = tails_path
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails file path"))?;
+        let rev_reg_idxs = rev_reg_idxs.try_collect(|rev_reg_idx| {
+            u32::try_from(*rev_reg_idx).map_err(|_| err_msg!("Invalid credential revocation index"))
+        })?;
+        let encoded = rev_states
+            .as_slice()
+            .iter()
+            .map(ByteBuffer::as_slice)
+            .collect::<Vec<_>>();
+        let mut states = encoded
+            .par_iter()
+            .map(|bytes| {
+                if bytes.starts_with(&binary::BINARY_MAGIC) {
+                    binary::from_bytes::<CredentialRevocationState>(bytes)
+                } else {
+                    serde_json::from_slice(bytes).map_err(err_map!(Input))
+                }
+            })
+            .collect::<Result<Vec<_>>>()?;
+        update_revocation_states(
+            tails_path,
+            rev_reg_def.load()?.cast_ref()?,
+            old_rev_status_list.load()?.cast_ref()?,
+            rev_status_list.load()?.cast_ref()?,
+            &mut states,
+            &rev_reg_idxs,
+        )?;
+        let updated = states
+            .par_iter()
+            .zip(&encoded)
+            .map(|(state, bytes)| {
+                if bytes.starts_with(&binary::BINARY_MAGIC) {
+                    binary::to_bytes(state)
+                } else {
+                    serde_json::to_vec(state).map_err(err_map!("Error serializing object"))
+                }
+            })
+            .collect::<Result<Vec<_>>>()?;
+        let out = unsafe { std::slice::from_raw_parts_mut(rev_states_p, updated.len()) };
+        for (out, bytes) in out.iter_mut().zip(updated) {
+            unsafe { std::ptr::write(out, ByteBuffer::from_vec(bytes)) };
+        }
+        Ok(())
+    })
+}
+
 impl_anoncreds_object!(CredentialRevocationState, "CredentialRevocationState");
 impl_anoncreds_object_from_json!(
     CredentialRevocationState,
     anoncreds_revocation_state_from_json
 );
+
+impl_anoncreds_object_from_bytes!(
+    CredentialRevocationState,
+    anoncreds_revocation_state_from_bytes
+);
+
+impl_anoncreds_object!(
+    RevocationIndex,
+    "RevocationIndex",
+    RevocationIndex::size_estimate
+);
+
+impl ToJson for RevocationIndex {
+    fn to_json(&self) -> Result<Vec<u8>> {
+        Err(err_msg!("RevocationIndex cannot be serialized"))
+    }
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_create_revocation_index(
+    rev_status_lists: FfiList<ObjectHandle>,
+    rev_index_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(rev_index_p);
+        let rev_status_lists = AnonCredsObjectList::load(rev_status_lists.as_slice())?;
+        let rev_index = RevocationIndex::new(&rev_status_lists.refs::<RevocationStatusList>()?)?;
+        let rev_index = ObjectHandle::create(rev_index)?;
+        unsafe { *rev_index_p = rev_index };
+        Ok(())
+    })
+}
+
+/// Find the timestamp of the latest revocation status list for a registry within a
+/// non-revocation interval. A negative `from` or `to` leaves that end of the interval
+/// open, and `-1` is returned in `timestamp_p` when no list matches.
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_index_find_timestamp(
+    rev_index: ObjectHandle,
+    rev_reg_def_id: FfiStr,
+    from: i64,
+    to: i64,
+    timestamp_p: *mut i64,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(timestamp_p);
+        let rev_reg_def_id = rev_reg_def_id
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing rev_reg_def_id"))?;
+        let rev_reg_def_id = RevocationRegistryDefinitionId::new(rev_reg_def_id)?;
+        let interval = NonRevocedInterval {
+            from: u64::try_from(from).ok(),
+            to: u64::try_from(to).ok(),
+        };
+        let timestamp = rev_index
+            .load()?
+            .cast_ref::<RevocationIndex>()?
+            .find_timestamp(&rev_reg_def_id, &interval)
+            .map(|timestamp| i64::try_from(timestamp).map_err(|_| err_msg!("Invalid timestamp")))
+            .transpose()?
+            .unwrap_or(-1);
+        unsafe { *timestamp_p = timestamp };
+        Ok(())
+    })
+}
+
+/// A `RevocationIndexAllocator` shared through an object handle
+#[derive(Debug)]
+pub struct RevocationIndexAllocatorObject(Mutex<RevocationIndexAllocator>);
+
+impl_anoncreds_object!(RevocationIndexAllocatorObject, "RevocationIndexAllocator");
+
+impl ToJson for RevocationIndexAllocatorObject {
+    fn to_json(&self) -> Result<Vec<u8>> {
+        self.lock()?.to_json()
+    }
+}
+
+impl RevocationIndexAllocatorObject {
+    fn lock(&self) -> Result<MutexGuard<'_, RevocationIndexAllocator>> {
+        self.0
+            .lock()
+            .map_err(|_| err_msg!("Error locking revocation index allocator"))
+    }
+}
+
+fn _allocator_index(idx: i64) -> Result<u32> {
+    u32::try_from(idx).map_err(|_| err_msg!("Invalid revocation index: {}", idx))
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_create_revocation_index_allocator(
+    rev_status_list: ObjectHandle,
+    issuance_by_default: i8,
+    first_unused: i64,
+    allocator_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(allocator_p);
+        let allocator = RevocationIndexAllocator::new(
+            rev_status_list.load()?.cast_ref()?,
+            issuance_by_default != 0,
+            _allocator_index(first_unused)?,
+        );
+        let allocator =
+            ObjectHandle::create(RevocationIndexAllocatorObject(Mutex::new(allocator)))?;
+        unsafe { *allocator_p = allocator };
+        Ok(())
+    })
+}
+
+/// Restore an allocator from the JSON snapshot returned by `anoncreds_object_get_json`
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_index_allocator_from_json(
+    json: ByteBuffer,
+    allocator_p: *mut ObjectHandle,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(allocator_p);
+        let allocator = serde_json::from_slice::<RevocationIndexAllocator>(json.as_slice())?;
+        let allocator =
+            ObjectHandle::create(RevocationIndexAllocatorObject(Mutex::new(allocator)))?;
+        unsafe { *allocator_p = allocator };
+        Ok(())
+    })
+}
+
+/// Allocate `count` free indices into `indices_p`, or none of them if there are not
+/// enough.
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_index_allocator_next(
+    allocator: ObjectHandle,
+    count: i64,
+    indices_p: *mut i64,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(indices_p);
+        let count = usize::try_from(count).map_err(|_| err_msg!("Invalid index count"))?;
+        let indices = allocator
+            .load()?
+            .cast_ref::<RevocationIndexAllocatorObject>()?
+            .lock()?
+            .next_many(count)?;
+        let out = unsafe { std::slice::from_raw_parts_mut(indices_p, count) };
+        for (out, idx) in out.iter_mut().zip(indices) {
+            *out = idx.into();
+        }
+        Ok(())
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_index_allocator_reserve(
+    allocator: ObjectHandle,
+    idx: i64,
+) -> ErrorCode {
+    catch_error(|| {
+        allocator
+            .load()?
+            .cast_ref::<RevocationIndexAllocatorObject>()?
+            .lock()?
+            .reserve(_allocator_index(idx)?)
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_index_allocator_release(
+    allocator: ObjectHandle,
+    idx: i64,
+) -> ErrorCode {
+    catch_error(|| {
+        allocator
+            .load()?
+            .cast_ref::<RevocationIndexAllocatorObject>()?
+            .lock()?
+            .release(_allocator_index(idx)?)
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_revocation_index_allocator_free_count(
+    allocator: ObjectHandle,
+    count_p: *mut i64,
+) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(count_p);
+        let count = allocator
+            .load()?
+            .cast_ref::<RevocationIndexAllocatorObject>()?
+            .lock()?
+            .free_count();
+        unsafe { *count_p = count as i64 };
+        Ok(())
+    })
+}
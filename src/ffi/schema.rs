@@ -39,3 +39,5 @@ pub extern "C" fn anoncreds_create_schema(
 
 impl_anoncreds_object!(Schema, "Schema");
 impl_anoncreds_object_from_json!(Schema, anoncreds_schema_from_json);
+
+impl_anoncreds_object_from_bytes!(Schema, anoncreds_schema_from_bytes);
@@ -0,0 +1,156 @@
+use ffi_support::{ByteBuffer, FfiStr};
+
+use super::error::{catch_error, ErrorCode};
+use crate::error::Result;
+use crate::services::tails::{
+    clear_tails_cache, evict_tails, preload_tails, register_tails_bytes, register_tails_source,
+    set_tails_cache_capacity, TailsRangeSource,
+};
+
+/// Fill `buf` with `size` bytes of the tails starting at `offset`, returning zero on
+/// success. `context` is the value given when registering the reader.
+pub type TailsReadCallback =
+    extern "C" fn(context: i64, offset: i64, size: i64, buf: *mut u8) -> i8;
+
+/// Called once the library no longer uses a tails reader, after which its read
+/// callback is not called again. `context` is the value given when registering it.
+pub type TailsReleaseCallback = extern "C" fn(context: i64);
+
+/// Receive the next `size` bytes of the tails, returning zero on success. `context`
+/// is the value given when creating the registry definition.
+pub type TailsChunkCallback = extern "C" fn(context: i64, data: *const u8, size: i64) -> i8;
+
+#[derive(Debug)]
+struct CallbackTailsSource {
+    size: usize,
+    read: TailsReadCallback,
+    release: Option<TailsReleaseCallback>,
+    context: i64,
+}
+
+impl Drop for CallbackTailsSource {
+    fn drop(&mut self) {
+        if let Some(release) = self.release {
+            release(self.context);
+        }
+    }
+}
+
+impl TailsRangeSource for CallbackTailsSource {
+    fn len(&self) -> usize {
+        self.size
+    }
+
+    fn read_at(&self, offset: usize, buf: &mut [u8]) -> Result<()> {
+        let result = (self.read)(
+            self.context,
+            offset as i64,
+            buf.len() as i64,
+            buf.as_mut_ptr(),
+        );
+        if result != 0 {
+            return Err(err_msg!(
+                IOError,
+                "Error reading {} bytes of tails at offset {}",
+                buf.len(),
+                offset
+            ));
+        }
+        Ok(())
+    }
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_tails_cache_preload(
+    tails_path: FfiStr,
+    tails_hash: FfiStr,
+    pin: i8,
+) -> ErrorCode {
+    catch_error(|| {
+        let tails_path = tails_path
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails file path"))?;
+        let tails_hash = tails_hash
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails hash"))?;
+        preload_tails(tails_path, tails_hash, pin != 0)
+    })
+}
+
+/// Register tails held in memory for `tails_hash`, which are used instead of the
+/// tails file by every operation reading those tails.
+#[no_mangle]
+pub extern "C" fn anoncreds_tails_cache_register_bytes(
+    tails_hash: FfiStr,
+    data: ByteBuffer,
+    pin: i8,
+) -> ErrorCode {
+    catch_error(|| {
+        let tails_hash = tails_hash
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails hash"))?;
+        register_tails_bytes(tails_hash, data.as_slice().to_vec(), pin != 0)
+    })
+}
+
+/// Register a reader of `tails_size` bytes of tails for `tails_hash`, used instead
+/// of the tails file. The reader is called for blocks of `block_tails` tails, from
+/// any thread, until it is evicted from the tails cache and no open tails reader
+/// uses it. `release` is then called, if given, including when the registration
+/// fails after checking the arguments.
+#[no_mangle]
+pub extern "C" fn anoncreds_tails_cache_register_reader(
+    tails_hash: FfiStr,
+    tails_size: i64,
+    block_tails: i64,
+    read: Option<TailsReadCallback>,
+    release: Option<TailsReleaseCallback>,
+    context: i64,
+) -> ErrorCode {
+    catch_error(|| {
+        let tails_hash = tails_hash
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails hash"))?;
+        let size = usize::try_from(tails_size).map_err(|_| err_msg!("Invalid tails size"))?;
+        let block_tails =
+            usize::try_from(block_tails).map_err(|_| err_msg!("Invalid tails block size"))?;
+        let read = read.ok_or_else(|| err_msg!("Missing tails read callback"))?;
+        register_tails_source(
+            tails_hash,
+            Box::new(CallbackTailsSource {
+                size,
+                read,
+                release,
+                context,
+            }),
+            block_tails,
+        )
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_tails_cache_evict(tails_hash: FfiStr, evicted_p: *mut i8) -> ErrorCode {
+    catch_error(|| {
+        check_useful_c_ptr!(evicted_p);
+        let tails_hash = tails_hash
+            .as_opt_str()
+            .ok_or_else(|| err_msg!("Missing tails hash"))?;
+        let evicted = evict_tails(tails_hash)?;
+        unsafe { *evicted_p = evicted as i8 };
+        Ok(())
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_tails_cache_set_capacity(capacity: i64) -> ErrorCode {
+    catch_error(|| {
+        let capacity =
+            usize::try_from(capacity).map_err(|_| err_msg!("Invalid tails cache capacity"))?;
+        set_tails_cache_capacity(capacity)
+    })
+}
+
+#[no_mangle]
+pub extern "C" fn anoncreds_tails_cache_clear() -> ErrorCode {
+    catch_error(clear_tails_cache)
+}
@@ -186,3 +186,10 @@ mod tests {
         assert_eq!(None, res);
     }
 }
+
+/// The length of the JSON encoding of a value, used as an estimate of its size.
+pub fn encoded_len<T: serde::Serialize>(value: &T) -> usize {
+    serde_json::to_vec(value)
+        .map(|json| json.len())
+        .unwrap_or(0)
+}
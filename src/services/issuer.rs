@@ -7,7 +7,9 @@ use super::types::*;
 
 use crate::data_types::cred_def::CredentialDefinitionId;
 use crate::data_types::issuer_id::IssuerId;
-use crate::data_types::rev_reg::RevocationRegistryId;
+use crate::data_types::rev_reg::{
+    serde_revocation_list, RevocationListEncoding, RevocationRegistryId,
+};
 use crate::data_types::rev_reg_def::RevocationRegistryDefinitionId;
 use crate::data_types::schema::SchemaId;
 use crate::data_types::{
@@ -18,14 +20,23 @@ use crate::data_types::{
 };
 use crate::error::{Error, ErrorKind, Result, ValidationError};
 use crate::services::helpers::*;
-use crate::ursa::cl::{
-    issuer::Issuer as CryptoIssuer, RevocationRegistryDelta as CryptoRevocationRegistryDelta,
-    Witness,
+use crate::ursa::{
+    cl::{
+        issuer::Issuer as CryptoIssuer, CredentialPublicKey,
+        RevocationRegistryDelta as CryptoRevocationRegistryDelta, Witness,
+    },
+    pair::PointG2,
 };
 use crate::utils::validation::Validatable;
-use bitvec::bitvec;
+use bitvec::{bitvec, vec::BitVec};
+use rayon::prelude::*;
+use serde::{Deserialize, Serialize, Serializer};
+
+use super::tails::{TailsMmapReader, TailsReader, TailsWriter};
+use super::witness::{sum_tails, WitnessCheckpoints};
 
-use super::tails::{TailsFileReader, TailsWriter};
+// The number of indices summed by each task of a parallel accumulator update
+const ACCUM_UPDATE_CHUNK_SIZE: usize = 1024;
 
 const ACCUM_NO_ISSUED: &str = "{\"accum\":\"1 0000000000000000000000000000000000000000000000000000000000000000 1 0000000000000000000000000000000000000000000000000000000000000000 2 095E45DDF417D05FB10933FFC63D474548B7FFFF7888802F07FFFFFF7D07A8A8 1 0000000000000000000000000000000000000000000000000000000000000000 1 0000000000000000000000000000000000000000000000000000000000000000 1 0000000000000000000000000000000000000000000000000000000000000000\"}";
 
@@ -195,7 +206,10 @@ pub fn create_revocation_status_list(
     validated_rev_reg_def_id.validate()?;
 
     let list = if issuance_by_default {
-        let tails_reader = TailsFileReader::new_tails_reader(&rev_reg_def.value.tails_location);
+        let tails_reader = TailsMmapReader::new_tails_reader(
+            &rev_reg_def.value.tails_location,
+            &rev_reg_def.value.tails_hash,
+        )?;
         let issued = BTreeSet::from_iter(1..=max_cred_num);
 
         CryptoIssuer::update_revocation_registry(
@@ -236,6 +250,26 @@ pub fn update_revocation_status_list(
     revoked: Option<BTreeSet<u32>>,
     rev_reg_def: &RevocationRegistryDefinition,
     current_list: &RevocationStatusList,
+) -> Result<RevocationStatusList> {
+    _update_revocation_status_list(
+        timestamp,
+        issued,
+        revoked,
+        rev_reg_def,
+        &rev_reg_def.value.tails_location,
+        current_list,
+    )
+}
+
+/// Update a revocation status list as `update_revocation_status_list` does, reading
+/// the tails from `tails_path` instead of the tails location of the definition.
+fn _update_revocation_status_list(
+    timestamp: Option<u64>,
+    issued: Option<BTreeSet<u32>>,
+    revoked: Option<BTreeSet<u32>>,
+    rev_reg_def: &RevocationRegistryDefinition,
+    tails_path: &str,
+    current_list: &RevocationStatusList,
 ) -> Result<RevocationStatusList> {
     let mut new_list = current_list.clone();
     let issued = issued.map(|i_list| {
@@ -261,21 +295,60 @@ pub fn update_revocation_status_list(
             "Require Accumulator Value to update Rev Status List",
         )
     })?;
-    let tails_reader = TailsFileReader::new_tails_reader(&rev_reg_def.value.tails_location);
-    let max_cred_num = rev_reg_def.value.max_cred_num;
-
-    CryptoIssuer::update_revocation_registry(
+    _update_accumulator(
         &mut rev_reg,
-        max_cred_num,
-        issued.clone().unwrap_or_default(),
-        revoked.clone().unwrap_or_default(),
-        &tails_reader,
+        rev_reg_def,
+        tails_path,
+        issued.as_ref(),
+        revoked.as_ref(),
     )?;
     new_list.update(Some(rev_reg), issued, revoked, timestamp)?;
 
     Ok(new_list)
 }
 
+/// Add the tails of the `issued` indices to the accumulator and subtract those of the
+/// `revoked` indices, as `CryptoIssuer::update_revocation_registry` does.
+///
+/// The indices are summed in chunks in parallel, so a large update is not bound by
+/// reading the tails one at a time.
+fn _update_accumulator(
+    rev_reg: &mut ursa::cl::RevocationRegistry,
+    rev_reg_def: &RevocationRegistryDefinition,
+    tails_path: &str,
+    issued: Option<&BTreeSet<u32>>,
+    revoked: Option<&BTreeSet<u32>>,
+) -> Result<()> {
+    let issued: Vec<u32> = issued.into_iter().flatten().copied().collect();
+    let revoked: Vec<u32> = revoked.into_iter().flatten().copied().collect();
+    if issued.is_empty() && revoked.is_empty() {
+        return Ok(());
+    }
+
+    let sum_chunks = |idxs: &[u32]| -> Result<PointG2> {
+        idxs.par_chunks(ACCUM_UPDATE_CHUNK_SIZE)
+            .map(|chunk| {
+                let tails_reader =
+                    TailsMmapReader::new_tails_reader(tails_path, &rev_reg_def.value.tails_hash)?;
+                let max_cred_num = rev_reg_def.value.max_cred_num;
+                sum_tails(
+                    &tails_reader,
+                    chunk.iter().map(|idx| max_cred_num + 1 - idx),
+                )
+            })
+            .collect::<Result<Vec<_>>>()?
+            .into_iter()
+            .try_fold(PointG2::new_inf()?, |sum, part| Ok(sum.add(&part)?))
+    };
+    let (issued_sum, revoked_sum) = rayon::join(|| sum_chunks(&issued), || sum_chunks(&revoked));
+
+    let mut value = serde_json::to_value(&*rev_reg)?;
+    let accum: PointG2 = serde_json::from_value(value["accum"].take())?;
+    let accum = accum.add(&issued_sum?)?.sub(&revoked_sum?)?;
+    *rev_reg = serde_json::from_value(serde_json::json!({ "accum": accum }))?;
+    Ok(())
+}
+
 pub fn create_credential_offer(
     schema_id: impl TryInto<SchemaId, Error = ValidationError>,
     cred_def_id: impl TryInto<CredentialDefinitionId, Error = ValidationError>,
@@ -321,65 +394,551 @@ pub fn create_credential(
         Unexpected,
         "Error fetching public key from credential definition"
     ))?;
+    let credential = match (revocation_config, rev_status_list) {
+        (Some(revocation_config), Some(rev_status_list)) => {
+            let rev_reg: Option<ursa::cl::RevocationRegistry> = rev_status_list.into();
+            let mut rev_reg = rev_reg.ok_or_else(|| {
+                err_msg!(
+                    Unexpected,
+                    "RevocationStatusList should have accumulator value"
+                )
+            })?;
+            let issuance_by_default =
+                _issuance_by_default(rev_status_list, revocation_config.registry_idx)?;
+
+            _create_credential(
+                &cred_public_key,
+                cred_def_private,
+                cred_offer,
+                cred_request,
+                cred_values,
+                rev_reg_id,
+                Some(RevocationIssuance {
+                    reg_def: revocation_config.reg_def,
+                    reg_def_private: revocation_config.reg_def_private,
+                    registry_idx: revocation_config.registry_idx,
+                    tails_reader: &revocation_config.tails_reader,
+                    rev_reg: &mut rev_reg,
+                    issuance_by_default,
+                    checkpoints: None,
+                }),
+            )?
+        }
+        _ => _create_credential(
+            &cred_public_key,
+            cred_def_private,
+            cred_offer,
+            cred_request,
+            cred_values,
+            rev_reg_id,
+            None,
+        )?,
+    };
+
+    trace!(
+        "create_credential <<< credential {:?}",
+        secret!(&credential),
+    );
+
+    Ok(credential)
+}
+
+/// Issuer state for a revocation registry, kept in memory across many issuances.
+///
+/// The session is bound to the registry definition and tails it is created with,
+/// and holds the current accumulator and status list, and the prefix sums used to
+/// compute issuance by default witnesses, so that issuing a credential only touches
+/// the tails for its own index.
+#[derive(Debug)]
+pub struct IssuerRegistrySession {
+    rev_reg_def: RevocationRegistryDefinition,
+    tails_reader: TailsReader,
+    rev_status_list: RevocationStatusList,
+    rev_reg: ursa::cl::RevocationRegistry,
+    checkpoints: Option<WitnessCheckpoints>,
+}
+
+impl IssuerRegistrySession {
+    pub fn new(
+        rev_reg_def: &RevocationRegistryDefinition,
+        rev_status_list: &RevocationStatusList,
+        tails_reader: TailsReader,
+    ) -> Result<Self> {
+        let rev_reg: Option<ursa::cl::RevocationRegistry> = rev_status_list.into();
+        let rev_reg = rev_reg.ok_or_else(|| {
+            err_msg!(
+                Unexpected,
+                "RevocationStatusList should have accumulator value"
+            )
+        })?;
+        let max_cred_num = rev_reg_def.value.max_cred_num;
+        if max_cred_num == 0
+            || rev_status_list.get(max_cred_num as usize - 1).is_none()
+            || rev_status_list.get(max_cred_num as usize).is_some()
+        {
+            return Err(err_msg!(
+                "Revocation status list does not match the registry definition"
+            ));
+        }
+        Ok(Self {
+            rev_reg_def: rev_reg_def.clone(),
+            tails_reader,
+            rev_status_list: rev_status_list.clone(),
+            rev_reg,
+            checkpoints: None,
+        })
+    }
+
+    /// The registry definition the session issues credentials for.
+    pub fn rev_reg_def(&self) -> &RevocationRegistryDefinition {
+        &self.rev_reg_def
+    }
+
+    /// The approximate size of the session in bytes, from the length of the JSON
+    /// encoding of its registry state and the size of its checkpoints, without the
+    /// tails.
+    pub fn size_estimate(&self) -> usize {
+        encoded_len(&self.rev_reg_def)
+            + encoded_len(&self.rev_status_list)
+            + encoded_len(&self.rev_reg)
+            + self
+                .checkpoints
+                .as_ref()
+                .map(WitnessCheckpoints::size_estimate)
+                .unwrap_or(0)
+    }
+
+    /// The revocation status list, including the credentials issued on demand
+    /// during the session.
+    pub fn rev_status_list(&self) -> &RevocationStatusList {
+        &self.rev_status_list
+    }
+}
+
+/// Create a credential as `create_credential` does, at `registry_idx` in the registry
+/// of `session`, using the registry state it keeps instead of a revocation status
+/// list. `rev_reg_def_private` must be the private key of that registry.
+#[allow(clippy::too_many_arguments)]
+pub fn create_credential_with_session(
+    cred_def: &CredentialDefinition,
+    cred_def_private: &CredentialDefinitionPrivate,
+    cred_offer: &CredentialOffer,
+    cred_request: &CredentialRequest,
+    cred_values: CredentialValues,
+    rev_reg_id: Option<RevocationRegistryId>,
+    rev_reg_def_private: &RevocationRegistryDefinitionPrivate,
+    registry_idx: u32,
+    session: &mut IssuerRegistrySession,
+) -> Result<Credential> {
+    trace!("create_credential_with_session >>> cred_def: {:?}, cred_def_private: {:?}, cred_offer.nonce: {:?}, cred_request: {:?},\
+            cred_values: {:?}, rev_reg_def: {:?}, registry_idx: {:?}",
+            cred_def, secret!(&cred_def_private), &cred_offer.nonce, &cred_request, secret!(&cred_values), session.rev_reg_def, registry_idx,
+            );
+
+    let issuance_by_default = _issuance_by_default(&session.rev_status_list, registry_idx)?;
+    if issuance_by_default && session.checkpoints.is_none() {
+        session.checkpoints = Some(WitnessCheckpoints::new(
+            session.rev_reg_def.value.max_cred_num,
+            &session.tails_reader,
+        )?);
+    }
+
+    let cred_public_key = cred_def.get_public_key().map_err(err_map!(
+        Unexpected,
+        "Error fetching public key from credential definition"
+    ))?;
+    // Sign against a copy of the accumulator, so that a failed issuance leaves the
+    // session unchanged
+    let mut rev_reg = session.rev_reg.clone();
+    let credential = _create_credential(
+        &cred_public_key,
+        cred_def_private,
+        cred_offer,
+        cred_request,
+        cred_values,
+        rev_reg_id,
+        Some(RevocationIssuance {
+            reg_def: &session.rev_reg_def,
+            reg_def_private: rev_reg_def_private,
+            registry_idx,
+            tails_reader: &session.tails_reader,
+            rev_reg: &mut rev_reg,
+            issuance_by_default,
+            checkpoints: session.checkpoints.as_ref(),
+        }),
+    )?;
+
+    if !issuance_by_default {
+        // Issuing on demand adds the index to the accumulator
+        let mut rev_status_list = session.rev_status_list.clone();
+        rev_status_list.update(
+            Some(rev_reg.clone()),
+            Some(BTreeSet::from([registry_idx])),
+            None,
+            None,
+        )?;
+        session.rev_status_list = rev_status_list;
+        session.rev_reg = rev_reg;
+    }
+
+    trace!(
+        "create_credential_with_session <<< credential {:?}",
+        secret!(&credential),
+    );
+
+    Ok(credential)
+}
+
+/// Allocates revocation indices in a registry, keeping the indices in use in a
+/// bitmap laid out like the revocation list of the status list.
+///
+/// An index stays in use once its credential is issued, including after it is
+/// revoked; only an index whose issuance did not go ahead should be released.
+#[derive(Clone, Debug, Deserialize, Serialize)]
+pub struct RevocationIndexAllocator {
+    #[serde(
+        serialize_with = "serialize_used_indices",
+        deserialize_with = "serde_revocation_list::deserialize"
+    )]
+    used: BitVec,
+    // No index below `next` is free, except those in `released`. Neither is kept in
+    // a snapshot: a restored allocator scans the bitmap from the start.
+    #[serde(skip)]
+    next: usize,
+    #[serde(skip)]
+    released: Vec<u32>,
+}
+
+fn serialize_used_indices<S>(used: &BitVec, s: S) -> std::result::Result<S::Ok, S::Error>
+where
+    S: Serializer,
+{
+    serde_revocation_list::serialize_with_encoding(used, RevocationListEncoding::RunLength, s)
+}
+
+impl RevocationIndexAllocator {
+    /// Create an allocator for the indices of a revocation status list.
+    ///
+    /// The status list only tells which indices left their initial state: those
+    /// revoked when issuance is by default, and those issued otherwise. These are in
+    /// use, as is every index below `first_unused`, which covers the indices issued
+    /// by default or revoked after being issued on demand.
+    pub fn new(
+        rev_status_list: &RevocationStatusList,
+        issuance_by_default: bool,
+        first_unused: u32,
+    ) -> Self {
+        let mut used = rev_status_list.state_owned();
+        if !issuance_by_default {
+            used = !used;
+        }
+        // index 0 is not a valid registry index
+        let below = (first_unused.max(1) as usize).min(used.len());
+        used[..below].fill(true);
+        Self {
+            used,
+            next: below,
+            released: Vec::new(),
+        }
+    }
+
+    /// The number of free indices
+    pub fn free_count(&self) -> usize {
+        self.used.count_zeros()
+    }
+
+    pub fn is_used(&self, idx: u32) -> bool {
+        self.used
+            .get(idx as usize)
+            .as_deref()
+            .copied()
+            .unwrap_or(true)
+    }
+
+    /// Allocate a free index, reusing released indices first and otherwise taking
+    /// the lowest index not allocated yet.
+    pub fn next(&mut self) -> Result<u32> {
+        while let Some(idx) = self.released.pop() {
+            if !self.used[idx as usize] {
+                self.used.set(idx as usize, true);
+                return Ok(idx);
+            }
+        }
+        let start = self.next.max(1).min(self.used.len());
+        let idx = self.used[start..]
+            .first_zero()
+            .map(|offset| start + offset)
+            .ok_or_else(|| err_msg!("No free revocation index left in the registry"))?;
+        self.used.set(idx, true);
+        self.next = idx + 1;
+        Ok(idx as u32)
+    }
+
+    /// Allocate `count` free indices, or none of them if there are not enough.
+    pub fn next_many(&mut self, count: usize) -> Result<Vec<u32>> {
+        let mut indices = Vec::with_capacity(count);
+        for _ in 0..count {
+            match self.next() {
+                Ok(idx) => indices.push(idx),
+                Err(err) => {
+                    for idx in indices {
+                        self.release(idx)?;
+                    }
+                    return Err(err);
+                }
+            }
+        }
+        Ok(indices)
+    }
+
+    /// Mark a specific index as in use.
+    pub fn reserve(&mut self, idx: u32) -> Result<()> {
+        self.check_index(idx)?;
+        if self.used[idx as usize] {
+            return Err(err_msg!("Revocation index {} is already in use", idx));
+        }
+        self.used.set(idx as usize, true);
+        Ok(())
+    }
+
+    /// Return an allocated index whose credential was not issued.
+    pub fn release(&mut self, idx: u32) -> Result<()> {
+        self.check_index(idx)?;
+        if !self.used[idx as usize] {
+            return Err(err_msg!("Revocation index {} is not in use", idx));
+        }
+        self.used.set(idx as usize, false);
+        if (idx as usize) < self.next {
+            self.released.push(idx);
+        }
+        Ok(())
+    }
+
+    fn check_index(&self, idx: u32) -> Result<()> {
+        if idx == 0 || idx as usize >= self.used.len() {
+            return Err(err_msg!("Revocation index {} is out of range", idx));
+        }
+        Ok(())
+    }
+}
+
+/// Create a batch of credentials for one credential definition, signing them in
+/// parallel.
+///
+/// When the credentials are revocable every issuance needs a distinct registry index,
+/// and the returned status list marks all of them as issued in one update of the
+/// accumulator.
+pub fn create_credentials(
+    cred_def: &CredentialDefinition,
+    cred_def_private: &CredentialDefinitionPrivate,
+    issuances: Vec<CredentialIssuance>,
+    rev_reg_id: Option<RevocationRegistryId>,
+    rev_status_list: Option<&RevocationStatusList>,
+    revocation_config: Option<CredentialsRevocationConfig>,
+) -> Result<(Vec<Credential>, Option<RevocationStatusList>)> {
+    trace!(
+        "create_credentials >>> cred_def: {:?}, cred_def_private: {:?}, issuances: {:?}, revocation_config: {:?}",
+        cred_def,
+        secret!(&cred_def_private),
+        secret!(&issuances),
+        revocation_config,
+    );
+
+    let cred_public_key = cred_def.get_public_key().map_err(err_map!(
+        Unexpected,
+        "Error fetching public key from credential definition"
+    ))?;
+
+    let (credentials, rev_status_list) = match (revocation_config, rev_status_list) {
+        (Some(revocation_config), Some(rev_status_list)) => {
+            let rev_reg: Option<ursa::cl::RevocationRegistry> = rev_status_list.into();
+            let rev_reg = rev_reg.ok_or_else(|| {
+                err_msg!(
+                    Unexpected,
+                    "RevocationStatusList should have accumulator value"
+                )
+            })?;
+            let rev_reg_def = revocation_config.reg_def;
+
+            let mut registry_idxs = BTreeSet::new();
+            let mut issued_by_default = 0;
+            for issuance in &issuances {
+                let registry_idx = issuance
+                    .registry_idx
+                    .ok_or_else(|| err_msg!("Missing revocation index for credential"))?;
+                if !registry_idxs.insert(registry_idx) {
+                    return Err(err_msg!("Duplicate revocation index {}", registry_idx));
+                }
+                if _issuance_by_default(rev_status_list, registry_idx)? {
+                    issued_by_default += 1;
+                }
+            }
+
+            // Building the checkpoints costs about as much as two witnesses
+            let checkpoints = if issued_by_default > 1 {
+                Some(WitnessCheckpoints::new(
+                    rev_reg_def.value.max_cred_num,
+                    &TailsMmapReader::new_tails_reader(
+                        revocation_config.tails_path,
+                        &rev_reg_def.value.tails_hash,
+                    )?,
+                )?)
+            } else {
+                None
+            };
+
+            let credentials = issuances
+                .into_par_iter()
+                .map(|issuance| {
+                    let registry_idx = issuance.registry_idx.unwrap_or_default();
+                    let tails_reader = TailsMmapReader::new_tails_reader(
+                        revocation_config.tails_path,
+                        &rev_reg_def.value.tails_hash,
+                    )?;
+                    _create_credential(
+                        &cred_public_key,
+                        cred_def_private,
+                        issuance.cred_offer,
+                        issuance.cred_request,
+                        issuance.cred_values,
+                        rev_reg_id.clone(),
+                        Some(RevocationIssuance {
+                            reg_def: rev_reg_def,
+                            reg_def_private: revocation_config.reg_def_private,
+                            registry_idx,
+                            tails_reader: &tails_reader,
+                            rev_reg: &mut rev_reg.clone(),
+                            issuance_by_default: _issuance_by_default(
+                                rev_status_list,
+                                registry_idx,
+                            )?,
+                            checkpoints: checkpoints.as_ref(),
+                        }),
+                    )
+                })
+                .collect::<Result<Vec<_>>>()?;
+
+            // Credentials issued on demand are added to the accumulator all at once
+            let rev_status_list = _update_revocation_status_list(
+                None,
+                Some(registry_idxs),
+                None,
+                rev_reg_def,
+                revocation_config.tails_path,
+                rev_status_list,
+            )?;
+            (credentials, Some(rev_status_list))
+        }
+        _ => {
+            let credentials = issuances
+                .into_par_iter()
+                .map(|issuance| {
+                    _create_credential(
+                        &cred_public_key,
+                        cred_def_private,
+                        issuance.cred_offer,
+                        issuance.cred_request,
+                        issuance.cred_values,
+                        rev_reg_id.clone(),
+                        None,
+                    )
+                })
+                .collect::<Result<Vec<_>>>()?;
+            (credentials, None)
+        }
+    };
+
+    trace!(
+        "create_credentials <<< credentials {:?}, rev_status_list: {:?}",
+        secret!(&credentials),
+        rev_status_list,
+    );
+
+    Ok((credentials, rev_status_list))
+}
+
+struct RevocationIssuance<'a> {
+    reg_def: &'a RevocationRegistryDefinition,
+    reg_def_private: &'a RevocationRegistryDefinitionPrivate,
+    registry_idx: u32,
+    tails_reader: &'a TailsReader,
+    rev_reg: &'a mut ursa::cl::RevocationRegistry,
+    issuance_by_default: bool,
+    checkpoints: Option<&'a WitnessCheckpoints>,
+}
+
+fn _issuance_by_default(rev_status_list: &RevocationStatusList, registry_idx: u32) -> Result<bool> {
+    let status = rev_status_list.get(registry_idx as usize).ok_or_else(|| {
+        err_msg!(
+            "Revocation status list does not have the index {}",
+            registry_idx
+        )
+    })?;
+
+    // This will be a temporary solution for the `issuance_on_demand` vs
+    // `issuance_by_default` state. Right now, we pass in the revcation status list and
+    // we check in this list whether the provided idx (revocation_config.registry_idx)
+    // is inside the revocation status list. If it is not in there we hit an edge case,
+    // which should not be possible within the happy flow.
+    //
+    // If the index is inside the revocation status list we check whether it is set to
+    // `true` or `false` within the bitvec.
+    // When it is set to `true`, or 1, we invert the value. This means that we use
+    // `issuance_on_demand`.
+    // When it is set to `false`, or 0, we invert the value. This means that we use
+    // `issuance_by_default`.
+    Ok(!status)
+}
+
+fn _create_credential(
+    cred_public_key: &CredentialPublicKey,
+    cred_def_private: &CredentialDefinitionPrivate,
+    cred_offer: &CredentialOffer,
+    cred_request: &CredentialRequest,
+    cred_values: CredentialValues,
+    rev_reg_id: Option<RevocationRegistryId>,
+    revocation: Option<RevocationIssuance>,
+) -> Result<Credential> {
     let credential_values = build_credential_values(&cred_values.0, None)?;
     let rand_str = String::from_utf8(thread_rng().sample_iter(&Alphanumeric).take(22).collect())
         .map_err(|_| err_msg!("Unable to instantiate random string for prover did"))?;
     let prover_did = cred_request.prover_did.as_ref().unwrap_or(&rand_str);
 
-    let (credential_signature, signature_correctness_proof, rev_reg, witness) =
-        match (revocation_config, rev_status_list) {
-            (Some(revocation_config), Some(rev_status_list)) => {
-                let rev_reg_def = &revocation_config.reg_def.value;
-                let rev_reg: Option<ursa::cl::RevocationRegistry> = rev_status_list.into();
-                let mut rev_reg = rev_reg.ok_or_else(|| {
-                    err_msg!(
-                        Unexpected,
-                        "RevocationStatusList should have accumulator value"
-                    )
-                })?;
-
-                let status = rev_status_list
-                    .get(revocation_config.registry_idx as usize)
-                    .ok_or_else(|| {
-                        err_msg!(
-                            "Revocation status list does not have the index {}",
-                            revocation_config.registry_idx
-                        )
-                    })?;
-
-                // This will be a temporary solution for the `issuance_on_demand` vs
-                // `issuance_by_default` state. Right now, we pass in the revcation status list and
-                // we check in this list whether the provided idx (revocation_config.registry_idx)
-                // is inside the revocation status list. If it is not in there we hit an edge case,
-                // which should not be possible within the happy flow.
-                //
-                // If the index is inside the revocation status list we check whether it is set to
-                // `true` or `false` within the bitvec.
-                // When it is set to `true`, or 1, we invert the value. This means that we use
-                // `issuance_on_demand`.
-                // When it is set to `false`, or 0, we invert the value. This means that we use
-                // `issuance_by_default`.
-                let issuance_by_default = !status;
-
-                let (credential_signature, signature_correctness_proof, delta) =
-                    CryptoIssuer::sign_credential_with_revoc(
-                        prover_did,
-                        &cred_request.blinded_ms,
-                        &cred_request.blinded_ms_correctness_proof,
-                        cred_offer.nonce.as_native(),
-                        cred_request.nonce.as_native(),
-                        &credential_values,
-                        &cred_public_key,
-                        &cred_def_private.value,
-                        revocation_config.registry_idx,
-                        rev_reg_def.max_cred_num,
-                        issuance_by_default,
-                        &mut rev_reg,
-                        &revocation_config.reg_def_private.value,
-                        &revocation_config.tails_reader,
-                    )?;
+    let (credential_signature, signature_correctness_proof, rev_reg, witness) = match revocation {
+        Some(RevocationIssuance {
+            reg_def,
+            reg_def_private,
+            registry_idx,
+            tails_reader,
+            rev_reg,
+            issuance_by_default,
+            checkpoints,
+        }) => {
+            let rev_reg_def = &reg_def.value;
 
-                let witness = {
+            let (credential_signature, signature_correctness_proof, delta) =
+                CryptoIssuer::sign_credential_with_revoc(
+                    prover_did,
+                    &cred_request.blinded_ms,
+                    &cred_request.blinded_ms_correctness_proof,
+                    cred_offer.nonce.as_native(),
+                    cred_request.nonce.as_native(),
+                    &credential_values,
+                    cred_public_key,
+                    &cred_def_private.value,
+                    registry_idx,
+                    rev_reg_def.max_cred_num,
+                    issuance_by_default,
+                    rev_reg,
+                    &reg_def_private.value,
+                    tails_reader,
+                )?;
+
+            let witness = match checkpoints {
+                Some(checkpoints) if issuance_by_default => {
+                    checkpoints.witness(registry_idx, tails_reader)?
+                }
+                _ => {
                     // `delta` is None if `issuance_type == issuance_by_default`
                     // So in this case the delta goes from none to the new one,
                     // which is all issued (by default) and non is revoked
@@ -388,39 +947,40 @@ pub fn create_credential(
                     // ursa::cl::Witness type
                     let rev_reg_delta = delta.unwrap_or_else(|| {
                         let empty = HashSet::new();
-                        CryptoRevocationRegistryDelta::from_parts(None, &rev_reg, &empty, &empty)
+                        CryptoRevocationRegistryDelta::from_parts(None, rev_reg, &empty, &empty)
                     });
                     Witness::new(
-                        revocation_config.registry_idx,
+                        registry_idx,
                         rev_reg_def.max_cred_num,
                         issuance_by_default,
                         &rev_reg_delta,
-                        &revocation_config.tails_reader,
+                        tails_reader,
                     )?
-                };
-                (
-                    credential_signature,
-                    signature_correctness_proof,
-                    Some(rev_reg),
-                    Some(witness),
-                )
-            }
-            _ => {
-                let (signature, correctness_proof) = CryptoIssuer::sign_credential(
-                    prover_did,
-                    &cred_request.blinded_ms,
-                    &cred_request.blinded_ms_correctness_proof,
-                    cred_offer.nonce.as_native(),
-                    cred_request.nonce.as_native(),
-                    &credential_values,
-                    &cred_public_key,
-                    &cred_def_private.value,
-                )?;
-                (signature, correctness_proof, None, None)
-            }
-        };
+                }
+            };
+            (
+                credential_signature,
+                signature_correctness_proof,
+                Some(rev_reg.clone()),
+                Some(witness),
+            )
+        }
+        None => {
+            let (signature, correctness_proof) = CryptoIssuer::sign_credential(
+                prover_did,
+                &cred_request.blinded_ms,
+                &cred_request.blinded_ms_correctness_proof,
+                cred_offer.nonce.as_native(),
+                cred_request.nonce.as_native(),
+                &credential_values,
+                cred_public_key,
+                &cred_def_private.value,
+            )?;
+            (signature, correctness_proof, None, None)
+        }
+    };
 
-    let credential = Credential {
+    Ok(Credential {
         schema_id: cred_offer.schema_id.to_owned(),
         cred_def_id: cred_offer.cred_def_id.to_owned(),
         rev_reg_id,
@@ -429,14 +989,7 @@ pub fn create_credential(
         signature_correctness_proof,
         rev_reg,
         witness,
-    };
-
-    trace!(
-        "create_credential <<< credential {:?}",
-        secret!(&credential),
-    );
-
-    Ok(credential)
+    })
 }
 
 #[cfg(test)]
@@ -510,4 +1063,32 @@ mod tests {
             "99398763056634537812744552006896172984671876672520535998211840060697129507206"
         );
     }
+
+    #[test]
+    fn revocation_index_allocator() {
+        let mut list = bitvec![0; 10];
+        list.set(5, true);
+        let list = RevocationStatusList::new(Some("mock:uri"), list, None, None).unwrap();
+        let mut allocator = RevocationIndexAllocator::new(&list, true, 3);
+        assert_eq!(allocator.free_count(), 6);
+        assert_eq!(allocator.next().unwrap(), 3);
+        assert_eq!(allocator.next_many(2).unwrap(), vec![4, 6]);
+        allocator.reserve(8).unwrap();
+        assert!(allocator.reserve(8).is_err());
+        assert_eq!(allocator.next().unwrap(), 7);
+        allocator.release(4).unwrap();
+        assert!(allocator.release(4).is_err());
+        assert!(allocator.release(10).is_err());
+        assert_eq!(allocator.next().unwrap(), 4);
+        assert_eq!(allocator.next().unwrap(), 9);
+        assert!(allocator.next().is_err());
+
+        allocator.release(6).unwrap();
+        allocator.release(3).unwrap();
+        let snapshot = serde_json::to_string(&allocator).unwrap();
+        let mut restored: RevocationIndexAllocator = serde_json::from_str(&snapshot).unwrap();
+        assert_eq!(restored.next_many(2).unwrap(), vec![3, 6]);
+        assert!(restored.next_many(1).is_err());
+        assert_eq!(restored.free_count(), 0);
+    }
 }
@@ -5,6 +5,7 @@ pub mod prover;
 pub mod tails;
 pub mod types;
 pub mod verifier;
+pub mod witness;
 
 pub mod utils {
     pub use super::helpers::encode_credential_attribute;
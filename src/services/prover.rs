@@ -1,8 +1,8 @@
-use bitvec::bitvec;
+use bitvec::field::BitField;
+use rayon::prelude::*;
 use std::{
     collections::{HashMap, HashSet},
     convert::TryFrom,
-    ops::BitXor,
 };
 
 use super::types::*;
@@ -17,7 +17,7 @@ use crate::data_types::{
     rev_reg::RevocationStatusList,
     schema::{Schema, SchemaId},
 };
-use crate::error::{Error, Result};
+use crate::error::Result;
 use crate::services::helpers::*;
 use crate::ursa::cl::{
     issuer::Issuer as CryptoIssuer, prover::Prover as CryptoProver,
@@ -27,7 +27,8 @@ use crate::ursa::cl::{
 };
 use crate::utils::validation::Validatable;
 
-use super::tails::TailsFileReader;
+use super::tails::TailsMmapReader;
+use super::witness::WitnessCheckpoints;
 
 pub fn create_master_secret() -> Result<MasterSecret> {
     MasterSecret::new().map_err(err_map!(Unexpected))
@@ -302,83 +303,294 @@ pub fn create_or_update_revocation_state(
         err_msg!("Timestamp is required to create or update the revocation state")
     })?;
 
+    let tails_reader =
+        TailsMmapReader::new_tails_reader(tails_path, &revoc_reg_def.value.tails_hash)?;
+    let witness =
+        if let (Some(source_rev_state), Some(source_rev_list)) = (rev_state, old_rev_status_list) {
+            let rev_reg_delta =
+                _create_rev_reg_delta(Some(source_rev_list), rev_status_list, &rev_reg)?;
+
+            let mut witness = source_rev_state.witness.clone();
+            witness.update(
+                rev_reg_idx,
+                revoc_reg_def.value.max_cred_num,
+                &rev_reg_delta,
+                &tails_reader,
+            )?;
+            witness
+        } else {
+            let rev_reg_delta = _create_rev_reg_delta(None, rev_status_list, &rev_reg)?;
+            Witness::new(
+                rev_reg_idx,
+                revoc_reg_def.value.max_cred_num,
+                // issuance by default
+                true,
+                &rev_reg_delta,
+                &tails_reader,
+            )?
+        };
+
+    Ok(CredentialRevocationState {
+        witness,
+        rev_reg,
+        timestamp,
+    })
+}
+
+/// Create the revocation states of many credentials of a registry at once, for the
+/// same status list, in the order of `rev_reg_idxs`.
+///
+/// The tails are read in a single pass to build prefix sums, from which the witnesses
+/// are computed in parallel, instead of reading every tail for each witness.
+pub fn create_revocation_states(
+    tails_path: &str,
+    revoc_reg_def: &RevocationRegistryDefinition,
+    rev_status_list: &RevocationStatusList,
+    rev_reg_idxs: &[u32],
+) -> Result<Vec<CredentialRevocationState>> {
+    trace!(
+        "create_revocation_states >>> revoc_reg_def: {:?}, rev_status_list: {:?}, \
+    rev_reg_idxs: {:?}",
+        revoc_reg_def,
+        rev_status_list,
+        rev_reg_idxs,
+    );
+
+    // Building the checkpoints costs about as much as two witnesses
+    if rev_reg_idxs.len() < 2 {
+        return rev_reg_idxs
+            .iter()
+            .map(|rev_reg_idx| {
+                create_or_update_revocation_state(
+                    tails_path,
+                    revoc_reg_def,
+                    rev_status_list,
+                    *rev_reg_idx,
+                    None,
+                    None,
+                )
+            })
+            .collect();
+    }
+
+    let rev_reg: Option<ursa::cl::RevocationRegistry> = rev_status_list.into();
+    let rev_reg = rev_reg.ok_or_else(|| {
+        err_msg!("revocation registry is required to create or update the revocation state")
+    })?;
+
+    let timestamp = rev_status_list.timestamp().ok_or_else(|| {
+        err_msg!("Timestamp is required to create or update the revocation state")
+    })?;
+
+    // Issuance by default
     let mut issued = HashSet::<u32>::new();
     let mut revoked = HashSet::<u32>::new();
-    let tails_reader = TailsFileReader::new_tails_reader(tails_path);
-    let witness = if let (Some(source_rev_state), Some(source_rev_list)) =
-        (rev_state, old_rev_status_list)
-    {
-        _create_index_deltas(
-            rev_status_list
-                .state_owned()
-                .bitxor(source_rev_list.state()),
-            rev_status_list.state(),
-            &mut issued,
-            &mut revoked,
-        );
+    _create_index_deltas(None, rev_status_list.state(), &mut issued, &mut revoked)?;
+    let revoked = revoked.into_iter().collect::<Vec<_>>();
 
-        let source_rev_reg: Option<ursa::cl::RevocationRegistry> = source_rev_list.into();
+    let tails_hash = &revoc_reg_def.value.tails_hash;
+    let checkpoints = WitnessCheckpoints::new(
+        revoc_reg_def.value.max_cred_num,
+        &TailsMmapReader::new_tails_reader(tails_path, tails_hash)?,
+    )?;
 
-        let rev_reg_delta = RevocationRegistryDelta::from_parts(
-            source_rev_reg.as_ref(),
-            &rev_reg,
-            &issued,
-            &revoked,
-        );
+    rev_reg_idxs
+        .par_iter()
+        .map(|rev_reg_idx| {
+            let tails_reader = TailsMmapReader::new_tails_reader(tails_path, tails_hash)?;
+            Ok(CredentialRevocationState {
+                witness: checkpoints.witness_with_revoked(*rev_reg_idx, &revoked, &tails_reader)?,
+                rev_reg: rev_reg.clone(),
+                timestamp,
+            })
+        })
+        .collect()
+}
 
-        let mut witness = source_rev_state.witness.clone();
-        witness.update(
-            rev_reg_idx,
-            revoc_reg_def.value.max_cred_num,
-            &rev_reg_delta,
-            &tails_reader,
-        )?;
-        witness
-    } else {
-        let list_size = usize::try_from(revoc_reg_def.value.max_cred_num)
-            .map_err(|e| Error::from_msg(crate::ErrorKind::InvalidState, e.to_string()))?;
-        // Issuance by default
-        let bit: usize = 0;
-        let list = bitvec![bit; list_size];
-        _create_index_deltas(
-            rev_status_list.state_owned().bitxor(list),
-            rev_status_list.state(),
-            &mut issued,
-            &mut revoked,
-        );
-        let rev_reg_delta = RevocationRegistryDelta::from_parts(None, &rev_reg, &issued, &revoked);
-        Witness::new(
-            rev_reg_idx,
-            revoc_reg_def.value.max_cred_num,
-            // issuance by default
-            true,
-            &rev_reg_delta,
-            &tails_reader,
-        )?
-    };
+/// Bring a revocation state up to date with the latest of a number of newer status
+/// lists, given the status list it was created or last updated with.
+///
+/// The witness only depends on the latest registry, so the intermediate lists are
+/// skipped: the net issued and revoked indices are found in a single pass over the
+/// old and latest lists and applied with one witness update.
+pub fn catch_up_revocation_state(
+    tails_path: &str,
+    revoc_reg_def: &RevocationRegistryDefinition,
+    rev_reg_idx: u32,
+    rev_state: &CredentialRevocationState,
+    old_rev_status_list: &RevocationStatusList,
+    rev_status_lists: &[&RevocationStatusList],
+) -> Result<CredentialRevocationState> {
+    trace!(
+        "catch_up_revocation_state >>> revoc_reg_def: {:?}, rev_reg_idx: {}, \
+    rev_state: {:?}, old_rev_status_list: {:?}, rev_status_lists: {:?}",
+        revoc_reg_def,
+        rev_reg_idx,
+        rev_state,
+        old_rev_status_list,
+        rev_status_lists,
+    );
 
-    Ok(CredentialRevocationState {
-        witness,
+    let mut latest: Option<(u64, &RevocationStatusList)> = None;
+    for rev_status_list in rev_status_lists.iter().copied() {
+        if let (Some(id), Some(old_id)) = (rev_status_list.id(), old_rev_status_list.id()) {
+            if id != old_id {
+                return Err(err_msg!(
+                    "Revocation status list for registry {} does not match registry {}",
+                    id,
+                    old_id
+                ));
+            }
+        }
+        let timestamp = rev_status_list.timestamp().ok_or_else(|| {
+            err_msg!("Timestamp is required to create or update the revocation state")
+        })?;
+        if old_rev_status_list
+            .timestamp()
+            .map_or(false, |old_timestamp| timestamp < old_timestamp)
+        {
+            return Err(err_msg!(
+                "Revocation status list at {} precedes the revocation state",
+                timestamp
+            ));
+        }
+        if latest.map_or(true, |(latest_timestamp, _)| timestamp >= latest_timestamp) {
+            latest = Some((timestamp, rev_status_list));
+        }
+    }
+    let (_, latest) =
+        latest.ok_or_else(|| err_msg!("At least one revocation status list is required"))?;
+
+    create_or_update_revocation_state(
+        tails_path,
+        revoc_reg_def,
+        latest,
+        rev_reg_idx,
+        Some(rev_state),
+        Some(old_rev_status_list),
+    )
+}
+
+/// Update many revocation states of a registry from `old_rev_status_list` to
+/// `rev_status_list`, each for the index at the same position of `rev_reg_idxs`.
+///
+/// The registry delta between the two lists is computed once and applied to the
+/// witnesses in parallel.
+pub fn update_revocation_states(
+    tails_path: &str,
+    revoc_reg_def: &RevocationRegistryDefinition,
+    old_rev_status_list: &RevocationStatusList,
+    rev_status_list: &RevocationStatusList,
+    rev_states: &mut [CredentialRevocationState],
+    rev_reg_idxs: &[u32],
+) -> Result<()> {
+    trace!(
+        "update_revocation_states >>> revoc_reg_def: {:?}, old_rev_status_list: {:?}, \
+    rev_status_list: {:?}, rev_reg_idxs: {:?}",
+        revoc_reg_def,
+        old_rev_status_list,
+        rev_status_list,
+        rev_reg_idxs,
+    );
+
+    if rev_states.len() != rev_reg_idxs.len() {
+        return Err(err_msg!(
+            "Mismatch between number of revocation states and indices"
+        ));
+    }
+
+    let rev_reg: Option<ursa::cl::RevocationRegistry> = rev_status_list.into();
+    let rev_reg = rev_reg.ok_or_else(|| {
+        err_msg!("revocation registry is required to create or update the revocation state")
+    })?;
+
+    let timestamp = rev_status_list.timestamp().ok_or_else(|| {
+        err_msg!("Timestamp is required to create or update the revocation state")
+    })?;
+
+    let rev_reg_delta =
+        _create_rev_reg_delta(Some(old_rev_status_list), rev_status_list, &rev_reg)?;
+    let tails_hash = &revoc_reg_def.value.tails_hash;
+
+    rev_states
+        .par_iter_mut()
+        .zip(rev_reg_idxs)
+        .try_for_each(|(rev_state, rev_reg_idx)| {
+            let tails_reader = TailsMmapReader::new_tails_reader(tails_path, tails_hash)?;
+            rev_state.witness.update(
+                *rev_reg_idx,
+                revoc_reg_def.value.max_cred_num,
+                &rev_reg_delta,
+                &tails_reader,
+            )?;
+            rev_state.rev_reg = rev_reg.clone();
+            rev_state.timestamp = timestamp;
+            Ok(())
+        })
+}
+
+/// The registry delta from the `source` list, or from an issuance by default registry
+/// without one, to `rev_status_list`
+fn _create_rev_reg_delta(
+    source: Option<&RevocationStatusList>,
+    rev_status_list: &RevocationStatusList,
+    rev_reg: &CryptoRevocationRegistry,
+) -> Result<RevocationRegistryDelta> {
+    let mut issued = HashSet::<u32>::new();
+    let mut revoked = HashSet::<u32>::new();
+    _create_index_deltas(
+        source.map(RevocationStatusList::state),
+        rev_status_list.state(),
+        &mut issued,
+        &mut revoked,
+    )?;
+    let source_rev_reg: Option<CryptoRevocationRegistry> = source.and_then(Into::into);
+    Ok(RevocationRegistryDelta::from_parts(
+        source_rev_reg.as_ref(),
         rev_reg,
-        timestamp,
-    })
+        &issued,
+        &revoked,
+    ))
 }
 
+/// Collect the indices whose status differs between two revocation lists, comparing
+/// a word at a time: those set in `list` have been revoked, the others issued. Without
+/// a `source` list, every index starts out issued.
 fn _create_index_deltas(
-    delta: bitvec::vec::BitVec,
+    source: Option<&bitvec::vec::BitVec>,
     list: &bitvec::vec::BitVec,
     issued: &mut HashSet<u32>,
     revoked: &mut HashSet<u32>,
-) {
-    for i in delta.iter_ones() {
-        if list[i] {
-            // true means cred has been revoked
-            revoked.insert(i as u32);
-        } else {
-            // false means cred has not been
-            issued.insert(i as u32);
+) -> Result<()> {
+    if source.map_or(false, |source| source.len() != list.len()) {
+        return Err(err_msg!(
+            InvalidState,
+            "Revocation status lists differ in length"
+        ));
+    }
+    let mut source_chunks = source.map(|source| source.chunks(64));
+    for (chunk_idx, chunk) in list.chunks(64).enumerate() {
+        let word = chunk.load_le::<u64>();
+        let source_word = source_chunks
+            .as_mut()
+            .and_then(Iterator::next)
+            .map_or(0, |source_chunk| source_chunk.load_le::<u64>());
+        let mut delta = word ^ source_word;
+        while delta != 0 {
+            let bit = delta.trailing_zeros();
+            let idx = u32::try_from(chunk_idx * 64 + bit as usize)
+                .map_err(|_| err_msg!(InvalidState, "Revocation list is too long"))?;
+            if word >> bit & 1 == 1 {
+                // true means cred has been revoked
+                revoked.insert(idx);
+            } else {
+                // false means cred has not been
+                issued.insert(idx);
+            }
+            delta &= delta - 1;
         }
     }
+    Ok(())
 }
 
 fn prepare_credential_for_proving(
@@ -1,9 +1,14 @@
 use std::cell::RefCell;
+use std::collections::HashMap;
 use std::fs::File;
-use std::io::{Read, Seek, SeekFrom, Write};
+use std::io::{BufWriter, Read, Seek, SeekFrom, Write};
 use std::path::PathBuf;
+use std::sync::{mpsc, Arc, Mutex};
 
 use crate::utils::base58;
+use memmap2::Mmap;
+use once_cell::sync::Lazy;
+use rayon::prelude::*;
 use sha2::{Digest, Sha256};
 use tempfile;
 
@@ -16,6 +21,15 @@ use crate::ursa::{
 const TAILS_BLOB_TAG_SZ: u8 = 2;
 const TAIL_SIZE: usize = Tail::BYTES_REPR_SIZE;
 
+/// The default number of unpinned tails files kept open by the tails cache
+pub const DEFAULT_TAILS_CACHE_CAPACITY: usize = 16;
+
+// The number of tails generated by each task of a parallel tails file write
+const TAILS_CHUNK_SIZE: u32 = 1024;
+
+static TAILS_CACHE: Lazy<Mutex<TailsCache>> =
+    Lazy::new(|| Mutex::new(TailsCache::new(DEFAULT_TAILS_CACHE_CAPACITY)));
+
 #[derive(Debug)]
 pub struct TailsReader {
     inner: Box<RefCell<dyn TailsReaderImpl>>,
@@ -32,6 +46,19 @@ impl TailsReader {
 pub trait TailsReaderImpl: std::fmt::Debug + Send {
     fn hash(&mut self) -> Result<Vec<u8>>;
     fn read(&mut self, size: usize, offset: usize) -> Result<Vec<u8>>;
+
+    /// Pass `size` bytes starting at `offset` to `accessor`. Readers which keep the
+    /// tails in memory override this to avoid copying the bytes.
+    fn access(
+        &mut self,
+        size: usize,
+        offset: usize,
+        accessor: &mut dyn FnMut(&[u8]),
+    ) -> Result<()> {
+        let buf = self.read(size, offset)?;
+        accessor(buf.as_slice());
+        Ok(())
+    }
 }
 
 impl RevocationTailsAccessor for TailsReader {
@@ -42,12 +69,13 @@ impl RevocationTailsAccessor for TailsReader {
     ) -> std::result::Result<(), UrsaCryptoError> {
         trace!("access_tail >>> tail_id: {:?}", tail_id);
 
-        let tail_bytes = self
-            .inner
+        let mut tail = None;
+        self.inner
             .borrow_mut()
-            .read(
+            .access(
                 TAIL_SIZE,
                 TAIL_SIZE * tail_id as usize + TAILS_BLOB_TAG_SZ as usize,
+                &mut |tail_bytes| tail = Some(Tail::from_bytes(tail_bytes)),
             )
             .map_err(|_| {
                 UrsaCryptoError::from_msg(
@@ -56,7 +84,12 @@ impl RevocationTailsAccessor for TailsReader {
                 )
             })?; // FIXME: IO error should be returned
 
-        let tail = Tail::from_bytes(tail_bytes.as_slice())?;
+        let tail = tail.ok_or_else(|| {
+            UrsaCryptoError::from_msg(
+                UrsaCryptoErrorKind::InvalidState,
+                "Can't read tail bytes from file",
+            )
+        })??;
         accessor(&tail);
 
         trace!("access_tail <<< res: ()");
@@ -129,6 +162,357 @@ impl TailsReaderImpl for TailsFileReader {
     }
 }
 
+/// A source of tails read by byte range, such as a blob store
+pub trait TailsRangeSource: std::fmt::Debug + Send + Sync {
+    /// The size of the tails in bytes
+    fn len(&self) -> usize;
+
+    /// Fill `buf` with the bytes starting at `offset`
+    fn read_at(&self, offset: usize, buf: &mut [u8]) -> Result<()>;
+}
+
+/// Tails kept by the tails cache: a memory-mapped tails file, tails held in memory,
+/// or a range source
+#[derive(Debug)]
+struct CachedTails {
+    name: String,
+    hash: Vec<u8>,
+    data: TailsData,
+}
+
+#[derive(Debug)]
+enum TailsData {
+    Mapped(Mmap),
+    Memory(Vec<u8>),
+    Source {
+        source: Box<dyn TailsRangeSource>,
+        block_size: usize,
+    },
+}
+
+impl CachedTails {
+    /// Map a tails file, verifying it against its tails hash
+    fn open(tails_path: &str, tails_hash: &str) -> Result<Self> {
+        let file = File::open(tails_path)?;
+        // Tails files are written once and never modified in place
+        let mmap = unsafe { Mmap::map(&file)? };
+        let hash = Self::check_hash(&mmap[..], tails_hash, tails_path)?;
+        Ok(Self {
+            name: tails_path.to_owned(),
+            hash,
+            data: TailsData::Mapped(mmap),
+        })
+    }
+
+    /// Keep tails in memory, verifying them against their tails hash
+    fn memory(tails_hash: &str, data: Vec<u8>) -> Result<Self> {
+        let hash = Self::check_hash(&data, tails_hash, tails_hash)?;
+        Ok(Self {
+            name: tails_hash.to_owned(),
+            hash,
+            data: TailsData::Memory(data),
+        })
+    }
+
+    /// Read tails from a range source in blocks of `block_tails` tails. The tails are
+    /// not verified, as that would read all of them.
+    fn source(
+        tails_hash: &str,
+        source: Box<dyn TailsRangeSource>,
+        block_tails: usize,
+    ) -> Result<Self> {
+        Ok(Self {
+            name: tails_hash.to_owned(),
+            hash: base58::decode(tails_hash)?,
+            data: TailsData::Source {
+                source,
+                block_size: block_tails.max(1) * TAIL_SIZE,
+            },
+        })
+    }
+
+    fn check_hash(data: &[u8], tails_hash: &str, name: &str) -> Result<Vec<u8>> {
+        let hash = Sha256::digest(data).to_vec();
+        if base58::encode(&hash) != tails_hash {
+            return Err(err_msg!(
+                Input,
+                "Tails file does not match the tails hash: {}",
+                name
+            ));
+        }
+        Ok(hash)
+    }
+
+    fn out_of_range(&self) -> crate::Error {
+        err_msg!(IOError, "Tail out of range in file: {}", self.name)
+    }
+
+    /// The bytes of tails held in memory
+    fn bytes(&self, size: usize, offset: usize) -> Result<&[u8]> {
+        let data = match &self.data {
+            TailsData::Mapped(mmap) => &mmap[..],
+            TailsData::Memory(data) => data.as_slice(),
+            TailsData::Source { .. } => {
+                return Err(err_msg!(Unexpected, "Tails are read by range"));
+            }
+        };
+        offset
+            .checked_add(size)
+            .and_then(|end| data.get(offset..end))
+            .ok_or_else(|| self.out_of_range())
+    }
+}
+
+// The number of blocks read from a range source kept by each reader
+const TAILS_READER_BLOCKS: usize = 4;
+
+/// A tails reader backed by the tails cache, which shares memory-mapped tails files
+/// and tails registered in memory or as range sources
+#[derive(Debug)]
+pub struct TailsMmapReader {
+    tails: Arc<CachedTails>,
+    // the blocks read from a range source, least recently read first
+    blocks: Vec<(usize, Vec<u8>)>,
+}
+
+impl TailsMmapReader {
+    /// Open a tails reader through the process-wide tails cache.
+    ///
+    /// The tails file is mapped and checked against `tails_hash` the first time it
+    /// is opened, and later readers for the same hash share the mapping. Tails
+    /// registered with the cache for `tails_hash` are used instead of the file.
+    pub fn new_tails_reader(tails_path: &str, tails_hash: &str) -> Result<TailsReader> {
+        let tails = cached_tails(tails_path, tails_hash, false)?;
+        Ok(TailsReader::new(Self {
+            tails,
+            blocks: Vec::new(),
+        }))
+    }
+
+    /// The bytes read from a range source, reading the block around them when they
+    /// were not read already. The blocks are aligned on tails, so that the adjacent
+    /// tails read when computing witnesses and accumulators share a request.
+    fn source_bytes(
+        &mut self,
+        source: &dyn TailsRangeSource,
+        block_size: usize,
+        size: usize,
+        offset: usize,
+    ) -> Result<&[u8]> {
+        let end = offset
+            .checked_add(size)
+            .filter(|end| *end <= source.len())
+            .ok_or_else(|| self.tails.out_of_range())?;
+        let pos = self
+            .blocks
+            .iter()
+            .position(|(start, block)| *start <= offset && end <= start + block.len());
+        let pos = match pos {
+            Some(pos) => pos,
+            None => {
+                let tag_size = TAILS_BLOB_TAG_SZ as usize;
+                let start = match offset.checked_sub(tag_size) {
+                    Some(tails_offset) => tag_size + tails_offset / block_size * block_size,
+                    None => offset,
+                };
+                let block_end = (start + block_size).max(end).min(source.len());
+                let mut block = vec![0u8; block_end - start];
+                source.read_at(start, &mut block)?;
+                if self.blocks.len() == TAILS_READER_BLOCKS {
+                    self.blocks.remove(0);
+                }
+                self.blocks.push((start, block));
+                self.blocks.len() - 1
+            }
+        };
+        let (start, block) = &self.blocks[pos];
+        Ok(&block[offset - start..end - start])
+    }
+}
+
+impl TailsReaderImpl for TailsMmapReader {
+    fn hash(&mut self) -> Result<Vec<u8>> {
+        Ok(self.tails.hash.clone())
+    }
+
+    fn read(&mut self, size: usize, offset: usize) -> Result<Vec<u8>> {
+        let mut buf = Vec::with_capacity(size);
+        self.access(size, offset, &mut |bytes| buf.extend_from_slice(bytes))?;
+        Ok(buf)
+    }
+
+    fn access(
+        &mut self,
+        size: usize,
+        offset: usize,
+        accessor: &mut dyn FnMut(&[u8]),
+    ) -> Result<()> {
+        let tails = self.tails.clone();
+        match &tails.data {
+            TailsData::Source { source, block_size } => {
+                accessor(self.source_bytes(source.as_ref(), *block_size, size, offset)?)
+            }
+            _ => accessor(tails.bytes(size, offset)?),
+        }
+        Ok(())
+    }
+}
+
+#[derive(Debug)]
+struct TailsCacheEntry {
+    tails: Arc<CachedTails>,
+    last_used: u64,
+    pinned: bool,
+}
+
+/// Open tails files keyed by tails hash, evicting the least recently used unpinned
+/// entries once there are more than `capacity` of them
+#[derive(Debug)]
+struct TailsCache {
+    capacity: usize,
+    entries: HashMap<String, TailsCacheEntry>,
+    clock: u64,
+}
+
+impl TailsCache {
+    fn new(capacity: usize) -> Self {
+        Self {
+            capacity,
+            entries: HashMap::new(),
+            clock: 0,
+        }
+    }
+
+    fn get(&mut self, tails_hash: &str, pin: bool) -> Option<Arc<CachedTails>> {
+        self.clock += 1;
+        let entry = self.entries.get_mut(tails_hash)?;
+        entry.last_used = self.clock;
+        entry.pinned |= pin;
+        Some(entry.tails.clone())
+    }
+
+    fn insert(&mut self, tails_hash: &str, tails: Arc<CachedTails>, pin: bool) -> Arc<CachedTails> {
+        if let Some(tails) = self.get(tails_hash, pin) {
+            // Another caller opened the same tails file in the meantime
+            return tails;
+        }
+        self.entries.insert(
+            tails_hash.to_owned(),
+            TailsCacheEntry {
+                tails: tails.clone(),
+                last_used: self.clock,
+                pinned: pin,
+            },
+        );
+        self.evict();
+        tails
+    }
+
+    /// Add tails registered by the caller, replacing any tails with the same hash
+    fn replace(&mut self, tails_hash: &str, tails: Arc<CachedTails>, pin: bool) {
+        self.clock += 1;
+        self.entries.insert(
+            tails_hash.to_owned(),
+            TailsCacheEntry {
+                tails,
+                last_used: self.clock,
+                pinned: pin,
+            },
+        );
+        self.evict();
+    }
+
+    fn remove(&mut self, tails_hash: &str) -> bool {
+        self.entries.remove(tails_hash).is_some()
+    }
+
+    fn set_capacity(&mut self, capacity: usize) {
+        self.capacity = capacity;
+        self.evict();
+    }
+
+    fn unpinned(&self) -> usize {
+        self.entries.values().filter(|entry| !entry.pinned).count()
+    }
+
+    fn evict(&mut self) {
+        while self.unpinned() > self.capacity {
+            let oldest = self
+                .entries
+                .iter()
+                .filter(|(_, entry)| !entry.pinned)
+                .min_by_key(|(_, entry)| entry.last_used)
+                .map(|(hash, _)| hash.clone());
+            match oldest {
+                Some(hash) => self.entries.remove(&hash),
+                None => break,
+            };
+        }
+    }
+}
+
+fn lock_tails_cache() -> Result<std::sync::MutexGuard<'static, TailsCache>> {
+    TAILS_CACHE
+        .lock()
+        .map_err(|_| err_msg!("Error locking tails cache"))
+}
+
+fn cached_tails(tails_path: &str, tails_hash: &str, pin: bool) -> Result<Arc<CachedTails>> {
+    if let Some(tails) = lock_tails_cache()?.get(tails_hash, pin) {
+        return Ok(tails);
+    }
+    // Map and hash the file without holding the lock
+    let tails = Arc::new(CachedTails::open(tails_path, tails_hash)?);
+    Ok(lock_tails_cache()?.insert(tails_hash, tails, pin))
+}
+
+/// Open a tails file and keep it in the tails cache, optionally pinning it so that
+/// it is never evicted.
+pub fn preload_tails(tails_path: &str, tails_hash: &str, pin: bool) -> Result<()> {
+    cached_tails(tails_path, tails_hash, pin).map(|_| ())
+}
+
+/// Register tails held in memory with the tails cache, after checking them against
+/// `tails_hash`. Readers opened for `tails_hash` then use them instead of a file.
+pub fn register_tails_bytes(tails_hash: &str, data: Vec<u8>, pin: bool) -> Result<()> {
+    let tails = Arc::new(CachedTails::memory(tails_hash, data)?);
+    lock_tails_cache()?.replace(tails_hash, tails, pin);
+    Ok(())
+}
+
+/// Register a range source of tails with the tails cache, used by the readers
+/// opened for `tails_hash` instead of a file. Each reader requests `block_tails`
+/// tails at a time around the tails it reads.
+///
+/// Range sources are pinned, and are not checked against the tails hash.
+pub fn register_tails_source(
+    tails_hash: &str,
+    source: Box<dyn TailsRangeSource>,
+    block_tails: usize,
+) -> Result<()> {
+    let tails = Arc::new(CachedTails::source(tails_hash, source, block_tails)?);
+    lock_tails_cache()?.replace(tails_hash, tails, true);
+    Ok(())
+}
+
+/// Remove a tails file from the tails cache, whether or not it is pinned. Readers
+/// already using the file keep it open until they are dropped.
+pub fn evict_tails(tails_hash: &str) -> Result<bool> {
+    Ok(lock_tails_cache()?.remove(tails_hash))
+}
+
+/// Set the number of unpinned tails files kept open by the tails cache.
+pub fn set_tails_cache_capacity(capacity: usize) -> Result<()> {
+    lock_tails_cache()?.set_capacity(capacity);
+    Ok(())
+}
+
+/// Remove all tails files from the tails cache, including pinned ones.
+pub fn clear_tails_cache() -> Result<()> {
+    lock_tails_cache()?.entries.clear();
+    Ok(())
+}
+
 pub trait TailsWriter: std::fmt::Debug {
     fn write(&mut self, generator: &mut RevocationTailsGenerator) -> Result<(String, String)>;
 }
@@ -136,6 +520,7 @@ pub trait TailsWriter: std::fmt::Debug {
 #[derive(Debug)]
 pub struct TailsFileWriter {
     root_path: PathBuf,
+    threads: Option<usize>,
 }
 
 impl TailsFileWriter {
@@ -144,25 +529,26 @@ impl TailsFileWriter {
             root_path: root_path
                 .map(PathBuf::from)
                 .unwrap_or_else(std::env::temp_dir),
+            threads: None,
         }
     }
+
+    /// Generate the tails on `threads` threads, or on every available core when
+    /// `threads` is zero. The file written and its hash are the same as those of a
+    /// sequential write.
+    pub fn with_threads(mut self, threads: usize) -> Self {
+        self.threads = Some(threads);
+        self
+    }
 }
 
 impl TailsWriter for TailsFileWriter {
     fn write(&mut self, generator: &mut RevocationTailsGenerator) -> Result<(String, String)> {
         let mut tempf = tempfile::NamedTempFile::new_in(self.root_path.clone())?;
-        let file = tempf.as_file_mut();
-        let mut hasher = Sha256::default();
-        let version = &[0u8, 2u8];
-        file.write_all(version)?;
-        hasher.update(version);
-        while let Some(tail) = generator.try_next()? {
-            let tail_bytes = tail.to_bytes()?;
-            file.write_all(tail_bytes.as_slice())?;
-            hasher.update(tail_bytes);
-        }
+        let mut file = BufWriter::new(tempf.as_file_mut());
+        let hash = write_tails(generator, self.threads, &mut file)?;
         let tails_size = file.stream_position()?;
-        let hash = base58::encode(hasher.finalize());
+        drop(file);
         let path = tempf.path().with_file_name(hash.clone());
         let _outf = match tempf.persist_noclobber(&path) {
             Ok(f) => f,
@@ -178,3 +564,432 @@ impl TailsWriter for TailsFileWriter {
         Ok((path, hash))
     }
 }
+
+/// A callback receiving the tails in order, a chunk at a time
+pub type TailsSink = Box<dyn FnMut(&[u8]) -> Result<()> + Send>;
+
+// The size of the chunks of tails passed to a tails sink
+const TAILS_SINK_CHUNK_SIZE: usize = 64 * 1024;
+
+/// Keeps the tails in memory, or passes them to a sink, instead of writing a file.
+///
+/// The tails location of the registry definition is the location given, such as
+/// the URL the tails will be uploaded to, or the tails hash by default.
+pub struct TailsMemoryWriter {
+    tails_location: Option<String>,
+    threads: Option<usize>,
+    sink: Option<TailsSink>,
+    tails: Vec<u8>,
+}
+
+impl TailsMemoryWriter {
+    pub fn new(tails_location: Option<String>) -> Self {
+        Self {
+            tails_location,
+            threads: None,
+            sink: None,
+            tails: Vec::new(),
+        }
+    }
+
+    /// Generate the tails on `threads` threads, as `TailsFileWriter::with_threads`
+    /// does.
+    pub fn with_threads(mut self, threads: usize) -> Self {
+        self.threads = Some(threads);
+        self
+    }
+
+    /// Pass the tails to `sink` in chunks as they are generated, instead of keeping
+    /// them in memory.
+    pub fn with_sink(mut self, sink: TailsSink) -> Self {
+        self.sink = Some(sink);
+        self
+    }
+
+    /// The tails written last, empty when they were passed to a sink
+    pub fn tails(&self) -> &[u8] {
+        &self.tails
+    }
+
+    pub fn into_tails(self) -> Vec<u8> {
+        self.tails
+    }
+}
+
+impl std::fmt::Debug for TailsMemoryWriter {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        f.debug_struct("TailsMemoryWriter")
+            .field("tails_location", &self.tails_location)
+            .field("threads", &self.threads)
+            .field("sink", &self.sink.is_some())
+            .field("tails_size", &self.tails.len())
+            .finish()
+    }
+}
+
+impl TailsWriter for TailsMemoryWriter {
+    fn write(&mut self, generator: &mut RevocationTailsGenerator) -> Result<(String, String)> {
+        self.tails.clear();
+        let hash = match self.sink.as_mut() {
+            Some(sink) => {
+                let mut out =
+                    BufWriter::with_capacity(TAILS_SINK_CHUNK_SIZE, SinkWriter(sink.as_mut()));
+                write_tails(generator, self.threads, &mut out)?
+            }
+            None => write_tails(generator, self.threads, &mut self.tails)?,
+        };
+        debug!(
+            "TailsMemoryWriter: wrote tails [size {}]: {}",
+            self.tails.len(),
+            hash
+        );
+        let location = self.tails_location.clone().unwrap_or_else(|| hash.clone());
+        Ok((location, hash))
+    }
+}
+
+/// Adapts a tails sink to `Write`
+struct SinkWriter<'a>(&'a mut (dyn FnMut(&[u8]) -> Result<()> + Send));
+
+impl Write for SinkWriter<'_> {
+    fn write(&mut self, buf: &[u8]) -> std::io::Result<usize> {
+        (self.0)(buf).map_err(|err| std::io::Error::new(std::io::ErrorKind::Other, err))?;
+        Ok(buf.len())
+    }
+
+    fn flush(&mut self) -> std::io::Result<()> {
+        Ok(())
+    }
+}
+
+/// Write the tails blob for the remaining tails of `generator` to `out`, returning
+/// its hash.
+fn write_tails<W: Write + Send>(
+    generator: &mut RevocationTailsGenerator,
+    threads: Option<usize>,
+    out: &mut W,
+) -> Result<String> {
+    let mut hasher = Sha256::default();
+    let version = &[0u8, 2u8];
+    out.write_all(version)?;
+    hasher.update(version);
+    match threads {
+        Some(threads) if threads != 1 => {
+            write_tails_parallel(generator, threads, out, &mut hasher)?
+        }
+        _ => {
+            while let Some(tail) = generator.try_next()? {
+                let tail_bytes = tail.to_bytes()?;
+                out.write_all(tail_bytes.as_slice())?;
+                hasher.update(tail_bytes);
+            }
+        }
+    }
+    out.flush()?;
+    Ok(base58::encode(hasher.finalize()))
+}
+
+/// Generate the remaining tails of `generator` in chunks on a pool of `threads`
+/// threads, while a separate thread writes and hashes the finished chunks in order.
+fn write_tails_parallel<W: Write + Send>(
+    generator: &mut RevocationTailsGenerator,
+    threads: usize,
+    out: &mut W,
+    hasher: &mut Sha256,
+) -> Result<()> {
+    // The tails depend only on their index, so each chunk is generated by a copy of
+    // the generator limited to the chunk's range
+    let mut state = serde_json::to_value(&*generator)?;
+    let index_field = |name: &str| {
+        state[name]
+            .as_u64()
+            .and_then(|idx| u32::try_from(idx).ok())
+            .ok_or_else(|| err_msg!(Unexpected, "Invalid tails generator state"))
+    };
+    let (start, size) = (index_field("current_index")?, index_field("size")?);
+    let chunks = (start..size)
+        .step_by(TAILS_CHUNK_SIZE as usize)
+        .map(|chunk_start| (chunk_start, size.min(chunk_start + TAILS_CHUNK_SIZE)))
+        .collect::<Vec<_>>();
+
+    let pool = rayon::ThreadPoolBuilder::new()
+        .num_threads(threads)
+        .build()
+        .map_err(err_map!(Unexpected, "Error creating tails thread pool"))?;
+    // Each batch of chunks is generated while the previous batch is written
+    let batch_size = pool.current_num_threads() * 4;
+    let (sender, receiver) = mpsc::sync_channel::<Vec<u8>>(batch_size);
+    let state_ref = &state;
+    std::thread::scope(|scope| {
+        let writer = scope.spawn(move || -> Result<()> {
+            for chunk in receiver {
+                out.write_all(&chunk)?;
+                hasher.update(&chunk);
+            }
+            Ok(())
+        });
+        let generated = pool.install(move || -> Result<()> {
+            for batch in chunks.chunks(batch_size) {
+                let tails = batch
+                    .par_iter()
+                    .map(|(chunk_start, chunk_end)| {
+                        let mut chunk_state = state_ref.clone();
+                        chunk_state["current_index"] = (*chunk_start).into();
+                        chunk_state["size"] = (*chunk_end).into();
+                        let mut chunk_generator: RevocationTailsGenerator =
+                            serde_json::from_value(chunk_state)?;
+                        let mut bytes =
+                            Vec::with_capacity((chunk_end - chunk_start) as usize * TAIL_SIZE);
+                        while let Some(tail) = chunk_generator.try_next()? {
+                            bytes.extend_from_slice(&tail.to_bytes()?);
+                        }
+                        Ok(bytes)
+                    })
+                    .collect::<Result<Vec<_>>>()?;
+                for chunk in tails {
+                    if sender.send(chunk).is_err() {
+                        // the writer failed, and reports the error
+                        return Ok(());
+                    }
+                }
+            }
+            Ok(())
+        });
+        let written = writer
+            .join()
+            .map_err(|_| err_msg!(Unexpected, "Tails writer thread panicked"))?;
+        generated.and(written)
+    })?;
+
+    // Leave the generator exhausted, as a sequential write does
+    state["current_index"] = size.into();
+    *generator = serde_json::from_value(state)?;
+    Ok(())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn tails_file(content: &[u8]) -> (tempfile::NamedTempFile, String) {
+        let mut file = tempfile::NamedTempFile::new().unwrap();
+        file.write_all(content).unwrap();
+        let hash = base58::encode(Sha256::digest(content));
+        (file, hash)
+    }
+
+    fn mapped(content: &[u8]) -> (tempfile::NamedTempFile, String, Arc<CachedTails>) {
+        let (file, hash) = tails_file(content);
+        let tails = CachedTails::open(file.path().to_str().unwrap(), &hash).unwrap();
+        (file, hash, Arc::new(tails))
+    }
+
+    #[test]
+    fn mmap_reader_reads_bytes() {
+        let (file, hash) = tails_file(&[0, 2, 1, 2, 3, 4]);
+        let reader =
+            TailsMmapReader::new_tails_reader(file.path().to_str().unwrap(), &hash).unwrap();
+        let mut inner = reader.inner.borrow_mut();
+        assert_eq!(inner.read(2, 3).unwrap(), vec![2, 3]);
+        assert!(inner.read(2, 5).is_err());
+        let mut seen = vec![];
+        inner
+            .access(4, 2, &mut |bytes| seen.extend_from_slice(bytes))
+            .unwrap();
+        assert_eq!(seen, vec![1, 2, 3, 4]);
+        assert_eq!(base58::encode(inner.hash().unwrap()), hash);
+    }
+
+    #[test]
+    fn mmap_reader_checks_hash() {
+        let (file, _) = tails_file(&[0, 2, 1, 2, 3, 4]);
+        let (_, other_hash) = tails_file(&[0, 2]);
+        assert!(CachedTails::open(file.path().to_str().unwrap(), &other_hash).is_err());
+    }
+
+    #[test]
+    fn registered_memory_tails_replace_file() {
+        let content = [0, 2, 5, 6, 7];
+        let hash = base58::encode(Sha256::digest(content));
+        assert!(register_tails_bytes(&hash, vec![0, 2], false).is_err());
+        register_tails_bytes(&hash, content.to_vec(), false).unwrap();
+        let reader = TailsMmapReader::new_tails_reader("missing tails file", &hash).unwrap();
+        let mut inner = reader.inner.borrow_mut();
+        assert_eq!(inner.read(2, 2).unwrap(), vec![5, 6]);
+        assert!(inner.read(2, 4).is_err());
+        assert!(evict_tails(&hash).unwrap());
+    }
+
+    #[derive(Debug)]
+    struct RecordingSource {
+        data: Vec<u8>,
+        reads: Arc<Mutex<Vec<(usize, usize)>>>,
+    }
+
+    impl TailsRangeSource for RecordingSource {
+        fn len(&self) -> usize {
+            self.data.len()
+        }
+
+        fn read_at(&self, offset: usize, buf: &mut [u8]) -> Result<()> {
+            self.reads.lock().unwrap().push((offset, buf.len()));
+            buf.copy_from_slice(&self.data[offset..offset + buf.len()]);
+            Ok(())
+        }
+    }
+
+    #[test]
+    fn range_source_reads_blocks_of_tails() {
+        let tag_size = TAILS_BLOB_TAG_SZ as usize;
+        let data = (0..tag_size + 10 * TAIL_SIZE)
+            .map(|idx| idx as u8)
+            .collect::<Vec<_>>();
+        let hash = base58::encode(Sha256::digest(&data));
+        let reads = Arc::new(Mutex::new(Vec::new()));
+        register_tails_source(
+            &hash,
+            Box::new(RecordingSource {
+                data: data.clone(),
+                reads: reads.clone(),
+            }),
+            4,
+        )
+        .unwrap();
+
+        let reader = TailsMmapReader::new_tails_reader("missing tails file", &hash).unwrap();
+        let mut inner = reader.inner.borrow_mut();
+        let tail = |idx: usize| tag_size + idx * TAIL_SIZE;
+        for idx in [3, 2, 1, 0, 5, 9, 3] {
+            assert_eq!(
+                inner.read(TAIL_SIZE, tail(idx)).unwrap(),
+                data[tail(idx)..tail(idx + 1)]
+            );
+        }
+        assert!(inner.read(TAIL_SIZE, tail(10)).is_err());
+        assert_eq!(
+            *reads.lock().unwrap(),
+            vec![
+                (tail(0), 4 * TAIL_SIZE),
+                (tail(4), 4 * TAIL_SIZE),
+                (tail(8), 2 * TAIL_SIZE)
+            ]
+        );
+        assert!(evict_tails(&hash).unwrap());
+    }
+
+    #[test]
+    fn tails_cache_evicts_least_recently_used() {
+        let (_f1, h1, t1) = mapped(&[0, 2, 1]);
+        let (_f2, h2, t2) = mapped(&[0, 2, 2]);
+        let (_f3, h3, t3) = mapped(&[0, 2, 3]);
+
+        let mut cache = TailsCache::new(2);
+        cache.insert(&h1, t1, false);
+        cache.insert(&h2, t2, false);
+        assert!(cache.get(&h1, false).is_some());
+        cache.insert(&h3, t3, false);
+
+        assert!(cache.get(&h1, false).is_some());
+        assert!(cache.get(&h2, false).is_none());
+        assert!(cache.get(&h3, false).is_some());
+    }
+
+    #[test]
+    fn tails_cache_keeps_pinned() {
+        let (_f1, h1, t1) = mapped(&[0, 2, 1]);
+        let (_f2, h2, t2) = mapped(&[0, 2, 2]);
+        let (_f3, h3, t3) = mapped(&[0, 2, 3]);
+
+        let mut cache = TailsCache::new(1);
+        cache.insert(&h1, t1, true);
+        cache.insert(&h2, t2, false);
+        cache.insert(&h3, t3, false);
+        assert!(cache.get(&h1, false).is_some());
+        assert!(cache.get(&h2, false).is_none());
+        assert!(cache.get(&h3, false).is_some());
+
+        cache.set_capacity(0);
+        assert!(cache.get(&h1, false).is_some());
+        assert!(cache.get(&h3, false).is_none());
+        assert!(cache.remove(&h1));
+    }
+
+    #[test]
+    fn parallel_tails_file_matches_sequential() {
+        use crate::ursa::pair::{GroupOrderElement, PointG2};
+
+        // enough tails for several chunks, the last one partial
+        let max_cred_num = TAILS_CHUNK_SIZE + 100;
+        let generator = serde_json::json!({
+            "size": 2 * max_cred_num + 1,
+            "current_index": 0,
+            "g_dash": PointG2::new().unwrap(),
+            "gamma": GroupOrderElement::new().unwrap(),
+        });
+        let write = |mut writer: TailsFileWriter| {
+            let mut generator: RevocationTailsGenerator =
+                serde_json::from_value(generator.clone()).unwrap();
+            let (path, hash) = writer.write(&mut generator).unwrap();
+            assert_eq!(generator.count(), 0);
+            (std::fs::read(path).unwrap(), hash)
+        };
+
+        let sequential_dir = tempfile::tempdir().unwrap();
+        let parallel_dir = tempfile::tempdir().unwrap();
+        let (sequential, sequential_hash) = write(TailsFileWriter::new(Some(
+            sequential_dir.path().to_string_lossy().into_owned(),
+        )));
+        let (parallel, parallel_hash) = write(
+            TailsFileWriter::new(Some(parallel_dir.path().to_string_lossy().into_owned()))
+                .with_threads(3),
+        );
+        assert_eq!(
+            sequential.len(),
+            2 + (2 * max_cred_num as usize + 1) * TAIL_SIZE
+        );
+        assert!(sequential == parallel);
+        assert_eq!(sequential_hash, parallel_hash);
+    }
+
+    #[test]
+    fn memory_tails_match_file() {
+        use crate::ursa::pair::{GroupOrderElement, PointG2};
+
+        let generator = serde_json::json!({
+            "size": 201,
+            "current_index": 0,
+            "g_dash": PointG2::new().unwrap(),
+            "gamma": GroupOrderElement::new().unwrap(),
+        });
+        let generator =
+            || -> RevocationTailsGenerator { serde_json::from_value(generator.clone()).unwrap() };
+
+        let dir = tempfile::tempdir().unwrap();
+        let (path, hash) = TailsFileWriter::new(Some(dir.path().to_string_lossy().into_owned()))
+            .write(&mut generator())
+            .unwrap();
+        let file_tails = std::fs::read(path).unwrap();
+
+        let mut writer = TailsMemoryWriter::new(None);
+        assert_eq!(
+            writer.write(&mut generator()).unwrap(),
+            (hash.clone(), hash.clone())
+        );
+        assert!(writer.tails() == file_tails.as_slice());
+
+        let streamed = Arc::new(Mutex::new(Vec::new()));
+        let sink_tails = streamed.clone();
+        let mut writer = TailsMemoryWriter::new(Some("https://tails/upload".to_owned()))
+            .with_threads(2)
+            .with_sink(Box::new(move |chunk| {
+                sink_tails.lock().unwrap().extend_from_slice(chunk);
+                Ok(())
+            }));
+        assert_eq!(
+            writer.write(&mut generator()).unwrap(),
+            ("https://tails/upload".to_owned(), hash)
+        );
+        assert!(writer.tails().is_empty());
+        assert!(*streamed.lock().unwrap() == file_tails);
+    }
+}
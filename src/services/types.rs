@@ -235,3 +235,31 @@ impl<'a> std::fmt::Debug for CredentialRevocationConfig<'a> {
         )
     }
 }
+
+/// A credential to create with `issuer::create_credentials`
+#[derive(Debug)]
+pub struct CredentialIssuance<'a> {
+    pub cred_offer: &'a CredentialOffer,
+    pub cred_request: &'a CredentialRequest,
+    pub cred_values: CredentialValues,
+    pub registry_idx: Option<u32>,
+}
+
+/// The revocation registry shared by a batch of credentials
+pub struct CredentialsRevocationConfig<'a> {
+    pub reg_def: &'a RevocationRegistryDefinition,
+    pub reg_def_private: &'a RevocationRegistryDefinitionPrivate,
+    pub tails_path: &'a str,
+}
+
+impl<'a> std::fmt::Debug for CredentialsRevocationConfig<'a> {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        write!(
+            f,
+            "CredentialsRevocationConfig {{ reg_def: {:?}, private: {:?}, tails_path: {} }}",
+            self.reg_def,
+            secret!(self.reg_def_private),
+            self.tails_path,
+        )
+    }
+}
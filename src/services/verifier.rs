@@ -1,6 +1,7 @@
-use std::collections::{HashMap, HashSet};
+use std::collections::{btree_map::Entry, BTreeMap, HashMap, HashSet};
 
 use once_cell::sync::Lazy;
+use rayon::prelude::*;
 use regex::Regex;
 
 use super::helpers::*;
@@ -18,8 +19,8 @@ use crate::data_types::{
 };
 use crate::error::Result;
 use crate::ursa::cl::{
-    verifier::Verifier as CryptoVerifier, CredentialPublicKey,
-    RevocationRegistry as CryptoRevocationRegistry,
+    verifier::Verifier as CryptoVerifier, CredentialPublicKey, CredentialSchema,
+    NonCredentialSchema, RevocationRegistry as CryptoRevocationRegistry,
 };
 use crate::utils::query::Query;
 use crate::utils::validation::LEGACY_IDENTIFIER;
@@ -37,6 +38,179 @@ pub struct Filter {
 static INTERNAL_TAG_MATCHER: Lazy<Regex> =
     Lazy::new(|| Regex::new("^attr::([^:]+)::(value|marker)$").unwrap());
 
+/// Prepared verification inputs which can be reused across many presentations.
+///
+/// The context owns the schemas, credential definitions and revocation registry
+/// definitions used for verification, and caches the credential public keys and
+/// credential schemas derived from them so that they are only built once.
+#[derive(Debug)]
+pub struct VerifierContext {
+    schemas: HashMap<SchemaId, Schema>,
+    cred_defs: HashMap<CredentialDefinitionId, CredentialDefinition>,
+    rev_reg_defs: HashMap<RevocationRegistryDefinitionId, RevocationRegistryDefinition>,
+    credential_schemas: HashMap<SchemaId, CredentialSchema>,
+    credential_pub_keys: HashMap<CredentialDefinitionId, CredentialPublicKey>,
+    non_credential_schema: NonCredentialSchema,
+}
+
+impl VerifierContext {
+    /// The approximate size of the context in bytes, from the length of the JSON
+    /// encoding of the objects it holds.
+    pub fn size_estimate(&self) -> usize {
+        let schemas: usize = self.schemas.values().map(encoded_len).sum();
+        let cred_defs: usize = self.cred_defs.values().map(encoded_len).sum();
+        let rev_reg_defs: usize = self.rev_reg_defs.values().map(encoded_len).sum();
+        // the credential public keys repeat the credential definitions
+        schemas + 2 * cred_defs + rev_reg_defs
+    }
+
+    pub fn new(
+        schemas: HashMap<SchemaId, Schema>,
+        cred_defs: HashMap<CredentialDefinitionId, CredentialDefinition>,
+        rev_reg_defs: HashMap<RevocationRegistryDefinitionId, RevocationRegistryDefinition>,
+    ) -> Result<Self> {
+        trace!(
+            "VerifierContext::new >>> schemas: {:?}, cred_defs: {:?}, rev_reg_defs: {:?}",
+            schemas,
+            cred_defs,
+            rev_reg_defs
+        );
+
+        let mut credential_schemas = HashMap::with_capacity(schemas.len());
+        for (schema_id, schema) in schemas.iter() {
+            credential_schemas.insert(
+                schema_id.clone(),
+                build_credential_schema(&schema.attr_names.0)?,
+            );
+        }
+
+        let mut credential_pub_keys = HashMap::with_capacity(cred_defs.len());
+        for (cred_def_id, cred_def) in cred_defs.iter() {
+            credential_pub_keys.insert(
+                cred_def_id.clone(),
+                CredentialPublicKey::build_from_parts(
+                    &cred_def.value.primary,
+                    cred_def.value.revocation.as_ref(),
+                )?,
+            );
+        }
+
+        Ok(Self {
+            schemas,
+            cred_defs,
+            rev_reg_defs,
+            credential_schemas,
+            credential_pub_keys,
+            non_credential_schema: build_non_credential_schema()?,
+        })
+    }
+
+    fn schemas(&self) -> HashMap<&SchemaId, &Schema> {
+        self.schemas.iter().collect()
+    }
+
+    fn cred_defs(&self) -> HashMap<&CredentialDefinitionId, &CredentialDefinition> {
+        self.cred_defs.iter().collect()
+    }
+
+    fn rev_reg_defs(
+        &self,
+    ) -> Option<HashMap<&RevocationRegistryDefinitionId, &RevocationRegistryDefinition>> {
+        if self.rev_reg_defs.is_empty() {
+            None
+        } else {
+            Some(self.rev_reg_defs.iter().collect())
+        }
+    }
+}
+
+/// Revocation registry accumulators, indexed by revocation registry definition ID
+/// and timestamp.
+///
+/// The index is built once from a set of revocation status lists and can be shared
+/// between verifications, instead of re-reading the lists for every sub-proof.
+#[derive(Debug, Default)]
+pub struct RevocationIndex {
+    registries: HashMap<RevocationRegistryDefinitionId, BTreeMap<u64, CryptoRevocationRegistry>>,
+}
+
+impl RevocationIndex {
+    pub fn new(rev_status_lists: &[&RevocationStatusList]) -> Result<Self> {
+        let mut index = Self::default();
+        for list in rev_status_lists {
+            index.insert(list)?;
+        }
+        Ok(index)
+    }
+
+    /// The approximate size of the index in bytes, from the number of accumulators
+    /// it holds and the length of their JSON encoding.
+    pub fn size_estimate(&self) -> usize {
+        self.registries
+            .values()
+            .flat_map(BTreeMap::values)
+            .map(|rev_reg| std::mem::size_of::<u64>() + encoded_len(rev_reg))
+            .sum()
+    }
+
+    pub fn insert(&mut self, rev_status_list: &RevocationStatusList) -> Result<()> {
+        let id = rev_status_list
+            .id()
+            .ok_or_else(|| err_msg!(Unexpected, "RevStatusList missing Id"))?;
+
+        let timestamp = rev_status_list
+            .timestamp()
+            .ok_or_else(|| err_msg!(Unexpected, "RevStatusList missing timestamp"))?;
+
+        let rev_reg: CryptoRevocationRegistry =
+            Into::<Option<CryptoRevocationRegistry>>::into(rev_status_list)
+                .ok_or_else(|| err_msg!(Unexpected, "RevStatusList missing Accum"))?;
+
+        match self.registries.entry(id).or_default().entry(timestamp) {
+            Entry::Occupied(_) => Err(err_msg!(
+                Unexpected,
+                "Duplicated timestamp for Revocation Status List"
+            )),
+            Entry::Vacant(entry) => {
+                entry.insert(rev_reg);
+                Ok(())
+            }
+        }
+    }
+
+    pub fn get(
+        &self,
+        rev_reg_def_id: &RevocationRegistryDefinitionId,
+        timestamp: u64,
+    ) -> Option<&CryptoRevocationRegistry> {
+        self.registries
+            .get(rev_reg_def_id)
+            .and_then(|regs| regs.get(&timestamp))
+    }
+
+    /// Find the timestamp of the most recent registry entry within a non-revocation
+    /// interval, that is the latest entry at or before `to` which is not before `from`.
+    pub fn find_timestamp(
+        &self,
+        rev_reg_def_id: &RevocationRegistryDefinitionId,
+        interval: &NonRevocedInterval,
+    ) -> Option<u64> {
+        let (timestamp, _) = self
+            .registries
+            .get(rev_reg_def_id)?
+            .range(..=interval.to.unwrap_or(u64::MAX))
+            .next_back()?;
+        match interval.from {
+            Some(from) if *timestamp < from => None,
+            _ => Some(*timestamp),
+        }
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.registries.is_empty()
+    }
+}
+
 pub fn verify_presentation(
     presentation: &Presentation,
     pres_req: &PresentationRequest,
@@ -48,6 +222,78 @@ pub fn verify_presentation(
     trace!("verify >>> presentation: {:?}, pres_req: {:?}, schemas: {:?}, cred_defs: {:?}, rev_reg_defs: {:?} rev_status_lists: {:?}",
     presentation, pres_req, schemas, cred_defs, rev_reg_defs, rev_status_lists);
 
+    let rev_index = rev_status_lists
+        .map(|lists| RevocationIndex::new(&lists))
+        .transpose()?;
+
+    _verify_presentation(
+        presentation,
+        pres_req,
+        schemas,
+        cred_defs,
+        rev_reg_defs,
+        rev_index.as_ref(),
+        None,
+    )
+}
+
+/// Verify a presentation using revocation registries from a prepared `RevocationIndex`.
+pub fn verify_presentation_with_revocation_index(
+    presentation: &Presentation,
+    pres_req: &PresentationRequest,
+    schemas: &HashMap<&SchemaId, &Schema>,
+    cred_defs: &HashMap<&CredentialDefinitionId, &CredentialDefinition>,
+    rev_reg_defs: Option<&HashMap<&RevocationRegistryDefinitionId, &RevocationRegistryDefinition>>,
+    rev_index: Option<&RevocationIndex>,
+) -> Result<bool> {
+    trace!("verify_presentation_with_revocation_index >>> presentation: {:?}, pres_req: {:?}, schemas: {:?}, cred_defs: {:?}, rev_reg_defs: {:?} rev_index: {:?}",
+    presentation, pres_req, schemas, cred_defs, rev_reg_defs, rev_index);
+
+    _verify_presentation(
+        presentation,
+        pres_req,
+        schemas,
+        cred_defs,
+        rev_reg_defs,
+        rev_index,
+        None,
+    )
+}
+
+/// Verify a presentation using the keys and schemas prepared in a `VerifierContext`.
+pub fn verify_presentation_with_context(
+    presentation: &Presentation,
+    pres_req: &PresentationRequest,
+    context: &VerifierContext,
+    rev_index: Option<&RevocationIndex>,
+) -> Result<bool> {
+    trace!(
+        "verify_presentation_with_context >>> presentation: {:?}, pres_req: {:?}, rev_index: {:?}",
+        presentation,
+        pres_req,
+        rev_index
+    );
+
+    _verify_presentation(
+        presentation,
+        pres_req,
+        &context.schemas(),
+        &context.cred_defs(),
+        context.rev_reg_defs().as_ref(),
+        rev_index,
+        Some(context),
+    )
+}
+
+fn _verify_presentation(
+    presentation: &Presentation,
+    pres_req: &PresentationRequest,
+    schemas: &HashMap<&SchemaId, &Schema>,
+    cred_defs: &HashMap<&CredentialDefinitionId, &CredentialDefinition>,
+    rev_reg_defs: Option<&HashMap<&RevocationRegistryDefinitionId, &RevocationRegistryDefinition>>,
+    rev_index: Option<&RevocationIndex>,
+    context: Option<&VerifierContext>,
+) -> Result<bool> {
     let pres_req = pres_req.value();
     let received_revealed_attrs: HashMap<String, Identifier> =
         received_revealed_attrs(presentation)?;
@@ -88,7 +334,14 @@ pub fn verify_presentation(
     )?;
 
     let mut proof_verifier = CryptoVerifier::new_proof_verifier()?;
-    let non_credential_schema = build_non_credential_schema()?;
+    let built_non_credential_schema;
+    let non_credential_schema = match context {
+        Some(context) => &context.non_credential_schema,
+        None => {
+            built_non_credential_schema = build_non_credential_schema()?;
+            &built_non_credential_schema
+        }
+    };
 
     for sub_proof_index in 0..presentation.identifiers.len() {
         let identifier = presentation.identifiers[sub_proof_index].clone();
@@ -105,41 +358,6 @@ pub fn verify_presentation(
             )
         })?;
 
-        let rev_reg_map = if let Some(ref lists) = rev_status_lists {
-            let mut map: HashMap<
-                RevocationRegistryDefinitionId,
-                HashMap<u64, CryptoRevocationRegistry>,
-            > = HashMap::new();
-
-            for list in lists.iter() {
-                let id = list
-                    .id()
-                    .ok_or_else(|| err_msg!(Unexpected, "RevStatusList missing Id"))?;
-
-                let timestamp = list
-                    .timestamp()
-                    .ok_or_else(|| err_msg!(Unexpected, "RevStatusList missing timestamp"))?;
-
-                let rev_reg: ursa::cl::RevocationRegistry =
-                    Into::<Option<ursa::cl::RevocationRegistry>>::into(*list)
-                        .ok_or_else(|| err_msg!(Unexpected, "RevStatusList missing Accum"))?;
-
-                if map.get(&id).and_then(|t| t.get(&timestamp)).is_some() {
-                    return Err(err_msg!(
-                        Unexpected,
-                        "Duplicated timestamp for Revocation Status List"
-                    ));
-                } else if map.get(&id).is_none() {
-                    map.insert(id, HashMap::from([(timestamp, rev_reg)]));
-                } else {
-                    map.get_mut(&id).unwrap().insert(timestamp, rev_reg);
-                }
-            }
-            Some(map)
-        } else {
-            None
-        };
-
         let (rev_reg_def, rev_reg) = if let Some(timestamp) = identifier.timestamp {
             let rev_reg_id = identifier.rev_reg_id.clone().ok_or_else(|| {
                 err_msg!("Timestamp provided but Revocation Registry Id not found")
@@ -149,7 +367,7 @@ pub fn verify_presentation(
                     "Timestamp provided but no Revocation Registry Definitions found"
                 ));
             }
-            if rev_reg_map.is_none() {
+            if rev_index.is_none() {
                 return Err(err_msg!(
                     "Timestamp provided but no Revocation Registries found"
                 ));
@@ -171,11 +389,9 @@ pub fn verify_presentation(
             );
 
             let rev_reg = Some(
-                rev_reg_map
-                    .as_ref()
+                rev_index
                     .unwrap()
-                    .get(&rev_reg_def_id)
-                    .and_then(|regs| regs.get(&timestamp))
+                    .get(&rev_reg_def_id, timestamp)
                     .ok_or_else(|| {
                         err_msg!(
                             "Revocation Registry not provided for ID and timestamp: {:?}, {:?}",
@@ -201,22 +417,46 @@ pub fn verify_presentation(
             pres_req,
         )?;
 
-        let credential_schema = build_credential_schema(&schema.attr_names.0)?;
         let sub_pres_request =
             build_sub_proof_request(&attrs_for_credential, &predicates_for_credential)?;
 
-        let credential_pub_key = CredentialPublicKey::build_from_parts(
-            &cred_def.value.primary,
-            cred_def.value.revocation.as_ref(),
-        )?;
+        let built_credential_schema;
+        let built_credential_pub_key;
+        let (credential_schema, credential_pub_key) = match context {
+            Some(context) => (
+                context
+                    .credential_schemas
+                    .get(&identifier.schema_id)
+                    .ok_or_else(|| {
+                        err_msg!("Schema not provided for ID: {:?}", identifier.schema_id)
+                    })?,
+                context
+                    .credential_pub_keys
+                    .get(&cred_def_id)
+                    .ok_or_else(|| {
+                        err_msg!(
+                            "Credential Definition not provided for ID: {:?}",
+                            identifier.cred_def_id
+                        )
+                    })?,
+            ),
+            None => {
+                built_credential_schema = build_credential_schema(&schema.attr_names.0)?;
+                built_credential_pub_key = CredentialPublicKey::build_from_parts(
+                    &cred_def.value.primary,
+                    cred_def.value.revocation.as_ref(),
+                )?;
+                (&built_credential_schema, &built_credential_pub_key)
+            }
+        };
 
         let rev_key_pub = rev_reg_def.map(|d| &d.value.public_keys.accum_key);
 
         proof_verifier.add_sub_proof_request(
             &sub_pres_request,
-            &credential_schema,
-            &non_credential_schema,
-            &credential_pub_key,
+            credential_schema,
+            non_credential_schema,
+            credential_pub_key,
             rev_key_pub,
             rev_reg,
         )?;
@@ -229,6 +469,43 @@ pub fn verify_presentation(
     Ok(valid)
 }
 
+/// Verify a batch of presentations against one shared set of schemas, credential
+/// definitions and revocation data.
+///
+/// The presentations are verified in parallel and a result is returned for each
+/// `(presentation, request)` pair, in the order they were provided. A failure to
+/// verify one presentation does not affect the others.
+pub fn verify_presentations(
+    presentations: &[(&Presentation, &PresentationRequest)],
+    schemas: &HashMap<&SchemaId, &Schema>,
+    cred_defs: &HashMap<&CredentialDefinitionId, &CredentialDefinition>,
+    rev_reg_defs: Option<&HashMap<&RevocationRegistryDefinitionId, &RevocationRegistryDefinition>>,
+    rev_index: Option<&RevocationIndex>,
+) -> Vec<Result<bool>> {
+    trace!(
+        "verify_presentations >>> presentations: {:?}",
+        presentations.len()
+    );
+
+    let results = presentations
+        .par_iter()
+        .map(|(presentation, pres_req)| {
+            verify_presentation_with_revocation_index(
+                presentation,
+                pres_req,
+                schemas,
+                cred_defs,
+                rev_reg_defs,
+                rev_index,
+            )
+        })
+        .collect::<Vec<_>>();
+
+    trace!("verify_presentations <<< results: {:?}", results);
+
+    results
+}
+
 pub fn generate_nonce() -> Result<Nonce> {
     new_nonce()
 }
@@ -0,0 +1,132 @@
+use crate::error::Result;
+use crate::ursa::{
+    cl::{RevocationTailsAccessor, Witness},
+    pair::PointG2,
+};
+
+use super::tails::TailsReader;
+
+/// The number of tails between two stored prefix sums
+pub const WITNESS_CHECKPOINT_INTERVAL: u32 = 32;
+
+/// Prefix sums of the tails of a revocation registry, stored every
+/// `WITNESS_CHECKPOINT_INTERVAL` tails.
+///
+/// With every index issued, the witness for index `i` is the sum of the tails
+/// `i + 1 ..= i + max_cred_num`, leaving out tail `max_cred_num + 1`. The checkpoints
+/// turn that sum into the difference of two prefix sums, so a witness costs a bounded
+/// number of tail reads however large the registry is.
+#[derive(Debug)]
+pub struct WitnessCheckpoints {
+    max_cred_num: u32,
+    sums: Vec<PointG2>,
+    skipped_tail: PointG2,
+}
+
+impl WitnessCheckpoints {
+    /// Build the checkpoints with a single pass over the tails.
+    pub fn new(max_cred_num: u32, tails_reader: &TailsReader) -> Result<Self> {
+        let tails_count = tails_count(max_cred_num)?;
+        let mut sums = Vec::with_capacity((tails_count / WITNESS_CHECKPOINT_INTERVAL) as usize + 1);
+        let mut sum = PointG2::new_inf()?;
+        for tail_id in 0..=tails_count {
+            if tail_id % WITNESS_CHECKPOINT_INTERVAL == 0 {
+                sums.push(sum.clone());
+            }
+            if tail_id < tails_count {
+                sum = add_tail(tails_reader, tail_id, &sum)?;
+            }
+        }
+        let skipped_tail = add_tail(tails_reader, max_cred_num + 1, &PointG2::new_inf()?)?;
+        Ok(Self {
+            max_cred_num,
+            sums,
+            skipped_tail,
+        })
+    }
+
+    /// The size of the checkpoints in bytes.
+    pub fn size_estimate(&self) -> usize {
+        (self.sums.len() + 1) * std::mem::size_of::<PointG2>()
+    }
+
+    pub fn max_cred_num(&self) -> u32 {
+        self.max_cred_num
+    }
+
+    /// The sum of the tails `0 .. end`
+    fn prefix_sum(&self, end: u32, tails_reader: &TailsReader) -> Result<PointG2> {
+        let checkpoint = end / WITNESS_CHECKPOINT_INTERVAL;
+        let mut sum = self
+            .sums
+            .get(checkpoint as usize)
+            .ok_or_else(|| err_msg!(InvalidUserRevocId, "Tail index out of range"))?
+            .clone();
+        for tail_id in checkpoint * WITNESS_CHECKPOINT_INTERVAL..end {
+            sum = add_tail(tails_reader, tail_id, &sum)?;
+        }
+        Ok(sum)
+    }
+
+    /// Compute the witness for `rev_idx` with every index of the registry issued, as
+    /// `Witness::new` does for an issuance by default registry.
+    pub fn witness(&self, rev_idx: u32, tails_reader: &TailsReader) -> Result<Witness> {
+        self.witness_with_revoked(rev_idx, &[], tails_reader)
+    }
+
+    /// Compute the witness for `rev_idx` with every index of the registry issued but
+    /// those in `revoked`, as `Witness::new` does for an issuance by default registry
+    /// with those indices revoked. Each revoked index costs one more tail read.
+    pub fn witness_with_revoked(
+        &self,
+        rev_idx: u32,
+        revoked: &[u32],
+        tails_reader: &TailsReader,
+    ) -> Result<Witness> {
+        if rev_idx == 0 || rev_idx > self.max_cred_num {
+            return Err(err_msg!(
+                InvalidUserRevocId,
+                "Revocation index {} is out of range",
+                rev_idx
+            ));
+        }
+        let mut omega = self
+            .prefix_sum(rev_idx + self.max_cred_num + 1, tails_reader)?
+            .sub(&self.prefix_sum(rev_idx + 1, tails_reader)?)?
+            .sub(&self.skipped_tail)?;
+        for &revoked_idx in revoked {
+            if revoked_idx != rev_idx && (1..=self.max_cred_num).contains(&revoked_idx) {
+                let tail_id = self.max_cred_num + 1 - revoked_idx + rev_idx;
+                omega = omega.sub(&add_tail(tails_reader, tail_id, &PointG2::new_inf()?)?)?;
+            }
+        }
+        Ok(serde_json::from_value(
+            serde_json::json!({ "omega": omega }),
+        )?)
+    }
+}
+
+fn tails_count(max_cred_num: u32) -> Result<u32> {
+    max_cred_num
+        .checked_mul(2)
+        .and_then(|count| count.checked_add(1))
+        .ok_or_else(|| err_msg!("Invalid maximum credential count"))
+}
+
+/// The sum of the tails `tail_ids`
+pub(crate) fn sum_tails(
+    tails_reader: &TailsReader,
+    tail_ids: impl IntoIterator<Item = u32>,
+) -> Result<PointG2> {
+    tail_ids
+        .into_iter()
+        .try_fold(PointG2::new_inf()?, |sum, tail_id| {
+            add_tail(tails_reader, tail_id, &sum)
+        })
+}
+
+fn add_tail(tails_reader: &TailsReader, tail_id: u32, sum: &PointG2) -> Result<PointG2> {
+    let mut result = None;
+    tails_reader.access_tail(tail_id, &mut |tail| result = Some(sum.add(tail)))?;
+    Ok(result.ok_or_else(|| err_msg!(IOError, "Can't read tail {}", tail_id))??)
+}
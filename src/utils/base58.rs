@@ -3,3 +3,9 @@ use bs58;
 pub fn encode<T: AsRef<[u8]>>(val: T) -> String {
     bs58::encode(val).into_string()
 }
+
+pub fn decode<T: AsRef<[u8]>>(val: T) -> crate::Result<Vec<u8>> {
+    bs58::decode(val)
+        .into_vec()
+        .map_err(err_map!("Invalid base58 string"))
+}
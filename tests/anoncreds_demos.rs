@@ -6,6 +6,7 @@ use std::{
 use anoncreds::{
     data_types::{
         cred_def::{CredentialDefinition, CredentialDefinitionId},
+        credential::CredentialValues,
         presentation::Presentation,
         rev_reg::RevocationRegistryId,
         rev_reg_def::RevocationRegistryDefinitionId,
@@ -14,8 +15,9 @@ use anoncreds::{
     issuer, prover,
     tails::{TailsFileReader, TailsFileWriter},
     types::{
-        CredentialDefinitionConfig, CredentialRevocationConfig, CredentialRevocationState,
-        MakeCredentialValues, PresentCredentials, PresentationRequest, RegistryType, SignatureType,
+        CredentialDefinitionConfig, CredentialIssuance, CredentialRevocationConfig,
+        CredentialRevocationState, CredentialsRevocationConfig, MakeCredentialValues,
+        PresentCredentials, PresentationRequest, RegistryType, SignatureType,
     },
     verifier,
 };
@@ -223,6 +225,39 @@ fn anoncreds_works_for_single_issuer_single_prover() {
     )
     .expect("Error verifying presentation");
     assert!(valid);
+
+    // Verify the same presentation as part of a batch
+    let results = verifier::verify_presentations(
+        &[
+            (&presentation, &pres_request),
+            (&presentation, &pres_request),
+        ],
+        &schemas,
+        &cred_defs,
+        None,
+        None,
+    );
+    assert_eq!(results.len(), 2);
+    for result in results {
+        assert!(result.expect("Error verifying presentation batch"));
+    }
+
+    // Verifier verifies presentation using a prepared context
+    let context = verifier::VerifierContext::new(
+        HashMap::from([(schema_id.clone(), gvt_schema.clone())]),
+        HashMap::from([(
+            cred_def_id.clone(),
+            cred_def_pub
+                .try_clone()
+                .expect("Error copying credential definition"),
+        )]),
+        HashMap::new(),
+    )
+    .expect("Error creating verifier context");
+    let valid =
+        verifier::verify_presentation_with_context(&presentation, &pres_request, &context, None)
+            .expect("Error verifying presentation with context");
+    assert!(valid);
 }
 
 #[test]
@@ -324,12 +359,13 @@ fn anoncreds_with_revocation_works_for_single_issuer_single_prover() {
     let location = rev_reg_def_pub.clone().value.tails_location;
     let tr = TailsFileReader::new_tails_reader(location.as_str());
 
+    let cred_values: CredentialValues = cred_values.into();
     let issue_cred = issuer::create_credential(
         &cred_def_pub,
         &cred_def_priv,
         &cred_offer,
         &cred_request,
-        cred_values.into(),
+        cred_values.clone(),
         Some(rev_reg_id.clone()),
         Some(&revocation_status_list),
         Some(CredentialRevocationConfig {
@@ -341,6 +377,59 @@ fn anoncreds_with_revocation_works_for_single_issuer_single_prover() {
     )
     .expect("Error creating credential");
 
+    // Issuing through a registry session gives the same witness
+    let mut session = issuer::IssuerRegistrySession::new(
+        &rev_reg_def_pub,
+        &revocation_status_list,
+        TailsFileReader::new_tails_reader(location.as_str()),
+    )
+    .expect("Error creating issuer registry session");
+    let session_cred = issuer::create_credential_with_session(
+        &cred_def_pub,
+        &cred_def_priv,
+        &cred_offer,
+        &cred_request,
+        cred_values.clone(),
+        Some(rev_reg_id.clone()),
+        &rev_reg_def_priv,
+        REV_IDX,
+        &mut session,
+    )
+    .expect("Error creating credential");
+    assert_eq!(
+        serde_json::to_value(&session_cred.witness).unwrap(),
+        serde_json::to_value(&issue_cred.witness).unwrap()
+    );
+
+    // Issuing a batch of credentials gives the same witnesses
+    let (batch_creds, batch_status_list) = issuer::create_credentials(
+        &cred_def_pub,
+        &cred_def_priv,
+        [REV_IDX, 1]
+            .into_iter()
+            .map(|registry_idx| CredentialIssuance {
+                cred_offer: &cred_offer,
+                cred_request: &cred_request,
+                cred_values: cred_values.clone(),
+                registry_idx: Some(registry_idx),
+            })
+            .collect(),
+        Some(rev_reg_id.clone()),
+        Some(&revocation_status_list),
+        Some(CredentialsRevocationConfig {
+            reg_def: &rev_reg_def_pub,
+            reg_def_private: &rev_reg_def_priv,
+            tails_path: location.as_str(),
+        }),
+    )
+    .expect("Error creating credentials");
+    assert_eq!(batch_creds.len(), 2);
+    assert!(batch_status_list.is_some());
+    assert_eq!(
+        serde_json::to_value(&batch_creds[0].witness).unwrap(),
+        serde_json::to_value(&issue_cred.witness).unwrap()
+    );
+
     let time_after_creating_cred = time_create_rev_status_list + 1;
     let issued_rev_status_list = issuer::update_revocation_status_list(
         Some(time_after_creating_cred),
@@ -476,10 +565,162 @@ fn anoncreds_with_revocation_works_for_single_issuer_single_prover() {
         &schemas,
         &cred_defs,
         Some(&rev_reg_def_map),
-        Some(rev_status_list),
+        Some(rev_status_list.clone()),
+    )
+    .expect("Error verifying presentation");
+    assert!(!valid);
+
+    // Verifier reuses one revocation index for the same status lists
+    let rev_index =
+        verifier::RevocationIndex::new(&rev_status_list).expect("Error indexing status lists");
+    let valid = verifier::verify_presentation_with_revocation_index(
+        &presentation,
+        &pres_request,
+        &schemas,
+        &cred_defs,
+        Some(&rev_reg_def_map),
+        Some(&rev_index),
     )
     .expect("Error verifying presentation");
     assert!(!valid);
+
+    // A revocation state several status lists behind catches up in one witness update
+    let tails_location = &rev_reg_def_pub.value.tails_location;
+    let initial_rev_state = prover::create_or_update_revocation_state(
+        tails_location,
+        &rev_reg_def_pub,
+        &revocation_status_list,
+        REV_IDX,
+        None,
+        None,
+    )
+    .unwrap();
+    let issued_rev_state = prover::create_or_update_revocation_state(
+        tails_location,
+        &rev_reg_def_pub,
+        &issued_rev_status_list,
+        REV_IDX,
+        Some(&initial_rev_state),
+        Some(&revocation_status_list),
+    )
+    .unwrap();
+    let stepwise_rev_state = prover::create_or_update_revocation_state(
+        tails_location,
+        &rev_reg_def_pub,
+        &revoked_status_list,
+        REV_IDX,
+        Some(&issued_rev_state),
+        Some(&issued_rev_status_list),
+    )
+    .unwrap();
+    let caught_up_rev_state = prover::catch_up_revocation_state(
+        tails_location,
+        &rev_reg_def_pub,
+        REV_IDX,
+        &initial_rev_state,
+        &revocation_status_list,
+        &[&revoked_status_list, &issued_rev_status_list],
+    )
+    .expect("Error catching up revocation state");
+    assert_eq!(
+        serde_json::to_value(&caught_up_rev_state).unwrap(),
+        serde_json::to_value(&stepwise_rev_state).unwrap()
+    );
+
+    // Revocation states created together match those created one at a time
+    let rev_reg_idxs = [REV_IDX, 1, 2, MAX_CRED_NUM];
+    let rev_states = prover::create_revocation_states(
+        tails_location,
+        &rev_reg_def_pub,
+        &revoked_status_list,
+        &rev_reg_idxs,
+    )
+    .expect("Error creating revocation states");
+    assert_eq!(rev_states.len(), rev_reg_idxs.len());
+    for (rev_state, rev_reg_idx) in rev_states.iter().zip(rev_reg_idxs) {
+        let single_rev_state = prover::create_or_update_revocation_state(
+            tails_location,
+            &rev_reg_def_pub,
+            &revoked_status_list,
+            rev_reg_idx,
+            None,
+            None,
+        )
+        .unwrap();
+        assert_eq!(
+            serde_json::to_value(rev_state).unwrap(),
+            serde_json::to_value(&single_rev_state).unwrap()
+        );
+    }
+
+    // Revocation states updated together match those updated one at a time
+    let initial_rev_states = prover::create_revocation_states(
+        tails_location,
+        &rev_reg_def_pub,
+        &revocation_status_list,
+        &rev_reg_idxs,
+    )
+    .expect("Error creating revocation states");
+    let mut updated_rev_states = initial_rev_states.clone();
+    prover::update_revocation_states(
+        tails_location,
+        &rev_reg_def_pub,
+        &revocation_status_list,
+        &revoked_status_list,
+        &mut updated_rev_states,
+        &rev_reg_idxs,
+    )
+    .expect("Error updating revocation states");
+    for ((initial_rev_state, updated_rev_state), rev_reg_idx) in initial_rev_states
+        .iter()
+        .zip(&updated_rev_states)
+        .zip(rev_reg_idxs)
+    {
+        let single_rev_state = prover::create_or_update_revocation_state(
+            tails_location,
+            &rev_reg_def_pub,
+            &revoked_status_list,
+            rev_reg_idx,
+            Some(initial_rev_state),
+            Some(&revocation_status_list),
+        )
+        .unwrap();
+        assert_eq!(
+            serde_json::to_value(updated_rev_state).unwrap(),
+            serde_json::to_value(&single_rev_state).unwrap()
+        );
+    }
+
+    // Issuing and revoking many indices in one update matches one index at a time
+    let time_bulk_update = time_revoke_cred + 1;
+    let bulk_status_list = issuer::update_revocation_status_list(
+        Some(time_bulk_update),
+        Some(BTreeSet::from([REV_IDX])),
+        Some(BTreeSet::from([1, 2, 3])),
+        &rev_reg_def_pub,
+        &revoked_status_list,
+    )
+    .expect("Error updating revocation status list");
+    let mut stepwise_status_list = revoked_status_list.clone();
+    for (issued, revoked) in [
+        (None, Some(1)),
+        (None, Some(2)),
+        (None, Some(3)),
+        (Some(REV_IDX), None),
+    ] {
+        stepwise_status_list = issuer::update_revocation_status_list(
+            Some(time_bulk_update),
+            issued.map(|idx| BTreeSet::from([idx])),
+            revoked.map(|idx| BTreeSet::from([idx])),
+            &rev_reg_def_pub,
+            &stepwise_status_list,
+        )
+        .unwrap();
+    }
+    assert_eq!(
+        serde_json::to_value(&bulk_status_list).unwrap(),
+        serde_json::to_value(&stepwise_status_list).unwrap()
+    );
 }
 
 fn _create_presentation(
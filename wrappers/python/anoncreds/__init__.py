@@ -1,13 +1,33 @@
 """Anoncreds Python wrapper library"""
 
-from .bindings import encode_credential_attributes, generate_nonce, library_version
+from .bindings import (
+    arena,
+    Arena,
+    encode_credential_attributes,
+    generate_nonce,
+    library_version,
+    object_creation_sites,
+    object_store_report,
+    object_store_reset_peak,
+    object_store_stats,
+    set_object_tracing,
+    tails_cache_clear,
+    tails_cache_evict,
+    tails_cache_preload,
+    tails_cache_register_bytes,
+    tails_cache_register_reader,
+    tails_cache_set_capacity,
+)
 from .error import AnoncredsError, AnoncredsErrorCode
+from .object_cache import ObjectCache, get_object_cache, set_object_cache
+from .registry_pool import PooledRegistry, RevocationRegistryPool
 from .types import (
     Credential,
     CredentialDefinition,
     CredentialDefinitionPrivate,
     CredentialRevocationConfig,
     CredentialRevocationState,
+    IssuerRegistrySession,
     KeyCorrectnessProof,
     CredentialOffer,
     CredentialRequest,
@@ -17,16 +37,36 @@ from .types import (
     Presentation,
     PresentCredentials,
     Schema,
+    TailsMemoryWriter,
+    RevocationIndex,
+    RevocationIndexAllocator,
     RevocationRegistry,
     RevocationRegistryDefinition,
     RevocationRegistryDefinitionPrivate,
     RevocationRegistryDelta,
+    RevocationStatusList,
+    VerifierContext,
 )
 
 __all__ = (
+    "arena",
     "encode_credential_attributes",
     "generate_nonce",
+    "get_object_cache",
     "library_version",
+    "object_creation_sites",
+    "object_store_report",
+    "object_store_reset_peak",
+    "object_store_stats",
+    "set_object_cache",
+    "set_object_tracing",
+    "tails_cache_clear",
+    "tails_cache_evict",
+    "tails_cache_preload",
+    "tails_cache_register_bytes",
+    "tails_cache_register_reader",
+    "tails_cache_set_capacity",
+    "Arena",
     "AnoncredsError",
     "AnoncredsErrorCode",
     "Credential",
@@ -34,17 +74,26 @@ __all__ = (
     "CredentialDefinitionPrivate",
     "CredentialRevocationConfig",
     "CredentialRevocationState",
+    "IssuerRegistrySession",
     "KeyCorrectnessProof",
     "CredentialOffer",
     "CredentialRequest",
     "CredentialRequestMetadata",
     "MasterSecret",
+    "ObjectCache",
     "PresentationRequest",
     "Presentation",
     "PresentCredentials",
+    "PooledRegistry",
+    "RevocationIndex",
+    "RevocationIndexAllocator",
+    "RevocationRegistryPool",
     "RevocationRegistry",
     "RevocationRegistryDefinition",
     "RevocationRegistryDefinitionPrivate",
     "RevocationRegistryDelta",
+    "RevocationStatusList",
     "Schema",
+    "TailsMemoryWriter",
+    "VerifierContext",
 )
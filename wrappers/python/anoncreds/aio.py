@@ -0,0 +1,242 @@
+"""Awaitable versions of the expensive library operations.
+
+Library calls release the GIL while they run, so running them on a pool of native
+threads keeps the event loop responsive and lets one process use every core.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from . import bindings
+from .error import AnoncredsError
+from .types import (
+    Credential,
+    CredentialDefinition,
+    CredentialDefinitionPrivate,
+    CredentialRequest,
+    CredentialRequestMetadata,
+    CredentialRevocationState,
+    IssuerRegistrySession,
+    KeyCorrectnessProof,
+    Presentation,
+    RevocationRegistryDefinition,
+    RevocationRegistryDefinitionPrivate,
+    RevocationStatusList,
+    VerifierContext,
+)
+
+
+class NativePool:
+    """A bounded pool of threads running library calls for asyncio callers.
+
+    Up to `max_workers` calls run in parallel. At most `max_in_flight` calls per
+    event loop are queued or running at once: further callers wait for a free slot
+    rather than growing the executor queue without bound.
+
+    A cancelled call which has already started still runs to completion, as the
+    native call cannot be interrupted. Its slot is held until then and the objects
+    it returns are freed as soon as it finishes.
+    """
+
+    def __init__(self, max_workers: int = None, max_in_flight: int = None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_in_flight is None:
+            max_in_flight = max_workers * 2
+        if max_workers < 1 or max_in_flight < 1:
+            raise ValueError("Pool size and in-flight limit must be positive")
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="anoncreds"
+        )
+        self._slots = weakref.WeakKeyDictionary()
+        self._slots_lock = threading.Lock()
+
+    def _loop_slots(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        with self._slots_lock:
+            slots = self._slots.get(loop)
+            if slots is None:
+                slots = asyncio.Semaphore(self.max_in_flight)
+                self._slots[loop] = slots
+            return slots
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots(loop)
+        await slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        # the slot is released when the call finishes, not when the caller stops waiting
+        future.add_done_callback(lambda _: _call_soon(loop, slots.release))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                future.add_done_callback(_free_result)
+            raise
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting calls, optionally waiting for the running ones."""
+        self._executor.shutdown(wait=wait)
+
+
+POOL: NativePool = None
+POOL_LOCK = threading.Lock()
+
+
+def configure(max_workers: int = None, max_in_flight: int = None) -> NativePool:
+    """Replace the default pool used by the functions of this module.
+
+    Calls already submitted to the previous pool are left to finish.
+    """
+    global POOL
+    pool = NativePool(max_workers, max_in_flight)
+    with POOL_LOCK:
+        previous, POOL = POOL, pool
+    if previous:
+        previous.shutdown(wait=False)
+    return pool
+
+
+def get_pool() -> NativePool:
+    """Return the default pool, creating it if necessary."""
+    global POOL
+    if POOL is None:
+        with POOL_LOCK:
+            if POOL is None:
+                POOL = NativePool()
+    return POOL
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """Run `fn(*args, **kwargs)` on the default pool and await its result."""
+    return await get_pool().run(fn, *args, **kwargs)
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        # the loop is closed, and its semaphore with it
+        pass
+
+
+def _free_result(future: Future):
+    if not future.cancelled() and future.exception() is None:
+        _free(future.result())
+
+
+def _free(value):
+    if isinstance(value, bindings.AnoncredsObject):
+        _free(value.handle)
+    elif isinstance(value, bindings.ObjectHandle):
+        bindings.object_free(value)
+        value.value = 0
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _free(item)
+
+
+async def create_credential_definition(
+    *args, **kwargs
+) -> Tuple[CredentialDefinition, CredentialDefinitionPrivate, KeyCorrectnessProof]:
+    """Awaitable `CredentialDefinition.create`."""
+    return await run(CredentialDefinition.create, *args, **kwargs)
+
+
+async def create_credential_request(
+    *args, **kwargs
+) -> Tuple[CredentialRequest, CredentialRequestMetadata]:
+    """Awaitable `CredentialRequest.create`."""
+    return await run(CredentialRequest.create, *args, **kwargs)
+
+
+async def create_credential(*args, **kwargs) -> Credential:
+    """Awaitable `Credential.create`."""
+    return await run(Credential.create, *args, **kwargs)
+
+
+async def create_credentials(
+    *args, **kwargs
+) -> Tuple[List[Credential], Optional[RevocationStatusList]]:
+    """Awaitable `Credential.create_many`."""
+    return await run(Credential.create_many, *args, **kwargs)
+
+
+async def create_credential_with_session(
+    session: IssuerRegistrySession, *args, **kwargs
+) -> Credential:
+    """Awaitable `IssuerRegistrySession.create_credential`."""
+    return await run(session.create_credential, *args, **kwargs)
+
+
+async def process_credential(credential: Credential, *args, **kwargs) -> Credential:
+    """Awaitable `Credential.process`."""
+    return await run(credential.process, *args, **kwargs)
+
+
+async def create_presentation(*args, **kwargs) -> Presentation:
+    """Awaitable `Presentation.create`."""
+    return await run(Presentation.create, *args, **kwargs)
+
+
+async def verify_presentation(presentation: Presentation, *args, **kwargs) -> bool:
+    """Awaitable `Presentation.verify`."""
+    return await run(presentation.verify, *args, **kwargs)
+
+
+async def verify_presentations(
+    *args, **kwargs
+) -> List[Union[bool, AnoncredsError]]:
+    """Awaitable `Presentation.verify_many`."""
+    return await run(Presentation.verify_many, *args, **kwargs)
+
+
+async def verify_with_context(context: VerifierContext, *args, **kwargs) -> bool:
+    """Awaitable `VerifierContext.verify`."""
+    return await run(context.verify, *args, **kwargs)
+
+
+async def create_revocation_registry_definition(
+    *args, **kwargs
+) -> Tuple[RevocationRegistryDefinition, RevocationRegistryDefinitionPrivate]:
+    """Awaitable `RevocationRegistryDefinition.create`."""
+    return await run(RevocationRegistryDefinition.create, *args, **kwargs)
+
+
+async def create_revocation_state(*args, **kwargs) -> CredentialRevocationState:
+    """Awaitable `CredentialRevocationState.create`."""
+    return await run(CredentialRevocationState.create, *args, **kwargs)
+
+
+async def create_revocation_states(*args, **kwargs) -> List[CredentialRevocationState]:
+    """Awaitable `CredentialRevocationState.create_many`."""
+    return await run(CredentialRevocationState.create_many, *args, **kwargs)
+
+
+async def catch_up_revocation_state(
+    rev_state: CredentialRevocationState, *args, **kwargs
+):
+    """Awaitable `CredentialRevocationState.catch_up`."""
+    return await run(rev_state.catch_up, *args, **kwargs)
+
+
+async def update_revocation_states(*args, **kwargs) -> List[bytes]:
+    """Awaitable `CredentialRevocationState.update_many`."""
+    return await run(CredentialRevocationState.update_many, *args, **kwargs)
+
+
+async def update_revocation_status_list(
+    rev_status_list: RevocationStatusList, *args, **kwargs
+):
+    """Awaitable `RevocationStatusList.update`."""
+    return await run(rev_status_list.update, *args, **kwargs)
@@ -1,32 +1,39 @@
 """Low-level interaction with the anoncreds library."""
 
+import itertools
 import json
 import logging
 import os
 import sys
+import threading
 from ctypes import (
     Array,
     CDLL,
+    CFUNCTYPE,
     POINTER,
     Structure,
     byref,
     c_char_p,
     c_int8,
+    c_int32,
     c_int64,
     c_size_t,
     c_ubyte,
     c_void_p,
+    memmove,
     pointer,
+    string_at,
 )
 from ctypes.util import find_library
 from io import BytesIO
-from typing import Optional, Mapping, Sequence, Tuple, Union
+from typing import Callable, Dict, List, Optional, Mapping, Sequence, Tuple, Union
 
 from .error import AnoncredsError, AnoncredsErrorCode
 
 
 CALLBACKS = {}
 LIB: CDLL = None
+LIB_LOCK = threading.Lock()
 LOGGER = logging.getLogger(__name__)
 
 
@@ -49,7 +56,72 @@ class ObjectHandle(c_int64):
         return f"{self.__class__.__name__}({type_name}, {self.value})"
 
     def __del__(self):
-        object_free(self)
+        if self.value:
+            object_free(self)
+
+
+# The arenas active on each thread, innermost last
+_ARENAS = threading.local()
+
+# While tracing, the number of frames to record and where each live handle was set
+_TRACE_DEPTH = 0
+_CREATION_SITES: Dict[int, str] = {}
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Arena:
+    """Frees the objects created on this thread within a `with` block together.
+
+    The objects are freed with a single library call when the block exits, rather
+    than each when it is garbage collected, and any remaining references to them
+    become invalid. Pass an object to `keep`, or `copy` it, to use it afterwards.
+    Objects created on other threads, as by the `aio` interface, are not tracked.
+    """
+
+    def __init__(self):
+        self._handles = {}
+
+    def __enter__(self) -> "Arena":
+        stack = getattr(_ARENAS, "stack", None)
+        if stack is None:
+            stack = _ARENAS.stack = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, *_exc):
+        _ARENAS.stack.remove(self)
+        self.free()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def track(self, handle: ObjectHandle):
+        self._handles[id(handle)] = handle
+
+    def keep(self, obj: "AnoncredsObject") -> "AnoncredsObject":
+        """Leave an object to be freed when it is garbage collected instead."""
+        self._handles.pop(id(obj.handle), None)
+        return obj
+
+    def free(self):
+        """Free the objects tracked so far."""
+        handles = [handle for handle in self._handles.values() if handle.value]
+        self._handles.clear()
+        if handles:
+            object_free_many(handles)
+            for handle in handles:
+                handle.value = 0
+
+
+def arena() -> Arena:
+    """Track the objects created within a `with` block, and free them on exit."""
+    return Arena()
+
+
+def _keep_from_arenas(obj: "AnoncredsObject"):
+    # exclude an object which outlives the current call from the active arenas
+    for active in getattr(_ARENAS, "stack", ()):
+        active.keep(obj)
 
 
 class AnoncredsObject:
@@ -57,6 +129,19 @@ class AnoncredsObject:
 
     def __init__(self, handle: ObjectHandle) -> "AnoncredsObject":
         self.handle = handle
+        stack = getattr(_ARENAS, "stack", None)
+        if stack:
+            stack[-1].track(handle)
+
+    @property
+    def handle(self) -> ObjectHandle:
+        return self._handle
+
+    @handle.setter
+    def handle(self, handle: ObjectHandle):
+        self._handle = handle
+        if _TRACE_DEPTH:
+            _record_creation_site(handle)
 
     def __bytes__(self) -> bytes:
         return bytes(self.to_json_buffer())
@@ -66,7 +151,29 @@ class AnoncredsObject:
         return f"{self.__class__.__name__}({self.handle.value})"
 
     def copy(self):
-        return self.__class__(self.handle)
+        """Return a new handle to the same object, freed independently of this one.
+
+        The copy is not tracked by the active arena.
+        """
+        inst = self.__class__.__new__(self.__class__)
+        inst.__dict__.update(self.__dict__)
+        inst.handle = object_copy(self.handle)
+        return inst
+
+    @classmethod
+    def from_bytes(cls, value: Union[bytes, bytearray, memoryview]):
+        """Load an object from the compact binary encoding."""
+        from_bytes = getattr(cls, "FROM_BYTES", None)
+        if not from_bytes:
+            raise AnoncredsError(
+                AnoncredsErrorCode.WRAPPER,
+                f"{cls.__name__} does not support the binary encoding",
+            )
+        return cls(_object_from_bytes(from_bytes, value))
+
+    def to_bytes(self) -> bytes:
+        """Serialize the object in the compact binary encoding."""
+        return bytes(object_get_bytes(self.handle))
 
     def to_dict(self) -> dict:
         return json.load(BytesIO(self.to_json_buffer()))
@@ -101,7 +208,7 @@ class ByteBuffer(Structure):
 
     def __del__(self):
         """Call the byte buffer destructor when this instance is released."""
-        get_library().anoncreds_buffer_free(self)
+        _get_function("anoncreds_buffer_free")(self)
 
 
 class StrBuffer(c_char_p):
@@ -133,7 +240,7 @@ class StrBuffer(c_char_p):
 
     def __del__(self):
         """Call the string destructor when this instance is released."""
-        get_library().anoncreds_string_free(self)
+        _get_function("anoncreds_string_free")(self)
 
 
 class FfiObjectHandleList(Structure):
@@ -168,6 +275,22 @@ class FfiIntList(Structure):
         return inst
 
 
+class FfiInt32List(Structure):
+    _fields_ = [
+        ("count", c_size_t),
+        ("data", POINTER(c_int32)),
+    ]
+
+    @classmethod
+    def create(cls, values: Optional[Sequence[int]]) -> "FfiInt32List":
+        inst = FfiInt32List()
+        if values is not None:
+            values = [c_int32(v) for v in values]
+            inst.count = len(values)
+            inst.data = (c_int32 * inst.count)(*values)
+        return inst
+
+
 class FfiStrList(Structure):
     _fields_ = [
         ("count", c_size_t),
@@ -255,78 +378,512 @@ class CredentialProveList(Structure):
     ]
 
 
-class RevocationConfig(Structure):
+# Reads `size` bytes of tails at `offset` into a buffer, returning zero on success
+TailsReadCallback = CFUNCTYPE(c_int8, c_int64, c_int64, c_int64, POINTER(c_ubyte))
+
+# Signals that the library no longer uses a tails reader
+TailsReleaseCallback = CFUNCTYPE(None, c_int64)
+
+# Receives the next chunk of generated tails, returning zero on success
+TailsChunkCallback = CFUNCTYPE(c_int8, c_int64, POINTER(c_ubyte), c_int64)
+
+
+class CredRevInfo(Structure):
     _fields_ = [
-        ("rev_reg_def", ObjectHandle),
-        ("rev_reg_def_private", ObjectHandle),
-        ("rev_reg", ObjectHandle),
-        ("rev_reg_index", c_int64),
-        ("rev_reg_used", FfiIntList),
+        ("reg_def", ObjectHandle),
+        ("reg_def_private", ObjectHandle),
+        ("reg_idx", c_int64),
         ("tails_path", c_char_p),
     ]
 
     @classmethod
     def create(
         cls,
-        rev_reg_def: ObjectHandle,
-        rev_reg_def_private: ObjectHandle,
-        rev_reg: ObjectHandle,
-        rev_reg_index: int,
-        rev_reg_used: Sequence[int],
+        reg_def: ObjectHandle,
+        reg_def_private: ObjectHandle,
+        reg_idx: int,
         tails_path: str,
-    ) -> "RevocationConfig":
-        return RevocationConfig(
-            rev_reg_def=rev_reg_def,
-            rev_reg_def_private=rev_reg_def_private,
-            rev_reg=rev_reg,
-            rev_reg_index=rev_reg_index,
-            rev_reg_used=FfiIntList.create(rev_reg_used),
+    ) -> "CredRevInfo":
+        return CredRevInfo(
+            reg_def=reg_def,
+            reg_def_private=reg_def_private,
+            reg_idx=reg_idx,
             tails_path=encode_str(tails_path),
         )
 
 
-class RevocationEntry(Structure):
+class FfiByteBuffer(Structure):
+    """A byte buffer allocated by python."""
+
     _fields_ = [
-        ("def_entry_idx", c_int64),
-        ("entry", ObjectHandle),
-        ("timestamp", c_int64),
+        ("len", c_int64),
+        ("value", POINTER(c_ubyte)),
     ]
 
-    @classmethod
-    def create(
-        cls,
-        def_entry_idx: int,
-        entry: ObjectHandle,
-        timestamp: int,
-    ) -> "RevocationEntry":
-        return RevocationEntry(
-            def_entry_idx=def_entry_idx,
-            entry=entry,
-            timestamp=timestamp,
-        )
-
 
-class RevocationEntryList(Structure):
+class FfiByteBufferList(Structure):
     _fields_ = [
-        ("count", c_int64),
-        ("data", POINTER(RevocationEntry)),
+        ("count", c_size_t),
+        ("data", POINTER(FfiByteBuffer)),
     ]
 
+    @classmethod
+    def create(cls, values: Optional[Sequence[bytes]]) -> "FfiByteBufferList":
+        inst = FfiByteBufferList()
+        if values is not None:
+            buffers = [encode_bytes(v) for v in values]
+            inst.count = len(buffers)
+            inst.data = (FfiByteBuffer * inst.count)(*buffers)
+            setattr(inst, "_buffers", buffers)  # keep the byte arrays alive
+        return inst
+
+
+# Result and argument types of the library functions, declared on loading
+LIB_SIGNATURES = {
+    "anoncreds_buffer_free": (None, (ByteBuffer,)),
+    "anoncreds_catch_up_revocation_state": (
+        c_size_t,
+        (
+            ObjectHandle,
+            c_int64,
+            c_char_p,
+            ObjectHandle,
+            ObjectHandle,
+            FfiObjectHandleList,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_credential": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            FfiStrList,
+            FfiStrList,
+            FfiStrList,
+            c_char_p,
+            ObjectHandle,
+            POINTER(CredRevInfo),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_credential_definition": (
+        c_size_t,
+        (
+            c_char_p,
+            ObjectHandle,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_int8,
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_credential_offer": (
+        c_size_t,
+        (c_char_p, c_char_p, ObjectHandle, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_credential_request": (
+        c_size_t,
+        (
+            c_char_p,
+            ObjectHandle,
+            ObjectHandle,
+            c_char_p,
+            ObjectHandle,
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_credential_with_session": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            FfiStrList,
+            FfiStrList,
+            FfiStrList,
+            c_char_p,
+            ObjectHandle,
+            c_int64,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_credentials": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            FfiObjectHandleList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiStrList,
+            FfiStrList,
+            c_char_p,
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            c_char_p,
+            FfiIntList,
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_issuer_registry_session": (
+        c_size_t,
+        (ObjectHandle, ObjectHandle, ObjectHandle, c_char_p, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_master_secret": (c_size_t, (POINTER(ObjectHandle),)),
+    "anoncreds_create_or_update_revocation_state": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            c_int64,
+            c_char_p,
+            ObjectHandle,
+            ObjectHandle,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_presentation": (
+        c_size_t,
+        (
+            ObjectHandle,
+            CredentialEntryList,
+            CredentialProveList,
+            FfiStrList,
+            FfiStrList,
+            ObjectHandle,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_revocation_index": (
+        c_size_t,
+        (FfiObjectHandleList, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_revocation_index_allocator": (
+        c_size_t,
+        (ObjectHandle, c_int8, c_int64, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_revocation_registry_def": (
+        c_size_t,
+        (
+            ObjectHandle,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_int64,
+            c_char_p,
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_revocation_registry_def_in_memory": (
+        c_size_t,
+        (
+            ObjectHandle,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_int64,
+            c_char_p,
+            c_int64,
+            TailsChunkCallback,
+            c_int64,
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+            POINTER(ByteBuffer),
+        ),
+    ),
+    "anoncreds_create_revocation_registry_def_with_threads": (
+        c_size_t,
+        (
+            ObjectHandle,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_char_p,
+            c_int64,
+            c_char_p,
+            c_int64,
+            POINTER(ObjectHandle),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_create_revocation_states": (
+        c_size_t,
+        (ObjectHandle, ObjectHandle, FfiIntList, c_char_p, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_revocation_status_list": (
+        c_size_t,
+        (c_char_p, ObjectHandle, c_int64, c_int8, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_schema": (
+        c_size_t,
+        (c_char_p, c_char_p, c_char_p, FfiStrList, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_create_verifier_context": (
+        c_size_t,
+        (
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_credential_get_attribute": (
+        c_size_t,
+        (ObjectHandle, c_char_p, POINTER(StrBuffer)),
+    ),
+    "anoncreds_encode_credential_attributes": (
+        c_size_t,
+        (FfiStrList, POINTER(StrBuffer)),
+    ),
+    "anoncreds_generate_nonce": (c_size_t, (POINTER(StrBuffer),)),
+    "anoncreds_get_current_error": (c_size_t, (POINTER(StrBuffer),)),
+    "anoncreds_issuer_registry_session_get_status_list": (
+        c_size_t,
+        (ObjectHandle, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_object_copy": (c_size_t, (ObjectHandle, POINTER(ObjectHandle))),
+    "anoncreds_object_free": (None, (ObjectHandle,)),
+    "anoncreds_object_free_many": (None, (FfiObjectHandleList,)),
+    "anoncreds_object_get_bytes": (c_size_t, (ObjectHandle, POINTER(ByteBuffer))),
+    "anoncreds_object_get_json": (c_size_t, (ObjectHandle, POINTER(ByteBuffer))),
+    "anoncreds_object_get_type_name": (
+        c_size_t,
+        (ObjectHandle, POINTER(StrBuffer)),
+    ),
+    "anoncreds_object_store_report": (c_size_t, (c_int64, POINTER(StrBuffer))),
+    "anoncreds_object_store_reset_peak": (c_size_t, ()),
+    "anoncreds_object_store_stats": (
+        c_size_t,
+        (POINTER(c_int64), POINTER(c_int64), POINTER(c_int64)),
+    ),
+    "anoncreds_process_credential": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_revocation_index_allocator_free_count": (
+        c_size_t,
+        (ObjectHandle, POINTER(c_int64)),
+    ),
+    "anoncreds_revocation_index_allocator_next": (
+        c_size_t,
+        (ObjectHandle, c_int64, POINTER(c_int64)),
+    ),
+    "anoncreds_revocation_index_allocator_release": (
+        c_size_t,
+        (ObjectHandle, c_int64),
+    ),
+    "anoncreds_revocation_index_allocator_reserve": (
+        c_size_t,
+        (ObjectHandle, c_int64),
+    ),
+    "anoncreds_revocation_index_find_timestamp": (
+        c_size_t,
+        (ObjectHandle, c_char_p, c_int64, c_int64, POINTER(c_int64)),
+    ),
+    "anoncreds_revocation_registry_definition_get_attribute": (
+        c_size_t,
+        (ObjectHandle, c_char_p, POINTER(StrBuffer)),
+    ),
+    "anoncreds_revocation_status_list_get_bits": (
+        c_size_t,
+        (
+            ObjectHandle,
+            POINTER(c_void_p),
+            POINTER(c_size_t),
+            POINTER(c_size_t),
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_revocation_status_list_to_json": (
+        c_size_t,
+        (ObjectHandle, c_char_p, POINTER(ByteBuffer)),
+    ),
+    "anoncreds_set_default_logger": (c_size_t, ()),
+    "anoncreds_string_free": (None, (c_void_p,)),
+    "anoncreds_tails_cache_clear": (c_size_t, ()),
+    "anoncreds_tails_cache_evict": (c_size_t, (c_char_p, POINTER(c_int8))),
+    "anoncreds_tails_cache_preload": (c_size_t, (c_char_p, c_char_p, c_int8)),
+    "anoncreds_tails_cache_register_bytes": (
+        c_size_t,
+        (c_char_p, FfiByteBuffer, c_int8),
+    ),
+    "anoncreds_tails_cache_register_reader": (
+        c_size_t,
+        (
+            c_char_p,
+            c_int64,
+            c_int64,
+            TailsReadCallback,
+            TailsReleaseCallback,
+            c_int64,
+        ),
+    ),
+    "anoncreds_tails_cache_set_capacity": (c_size_t, (c_int64,)),
+    "anoncreds_update_revocation_status_list": (
+        c_size_t,
+        (
+            c_int64,
+            FfiInt32List,
+            FfiInt32List,
+            ObjectHandle,
+            ObjectHandle,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_update_revocation_status_list_bits": (
+        c_size_t,
+        (
+            c_int64,
+            FfiByteBuffer,
+            FfiByteBuffer,
+            ObjectHandle,
+            ObjectHandle,
+            POINTER(ObjectHandle),
+        ),
+    ),
+    "anoncreds_update_revocation_status_list_timestamp_only": (
+        c_size_t,
+        (c_int64, ObjectHandle, POINTER(ObjectHandle)),
+    ),
+    "anoncreds_update_revocation_states": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            ObjectHandle,
+            FfiByteBufferList,
+            FfiIntList,
+            c_char_p,
+            POINTER(ByteBuffer),
+        ),
+    ),
+    "anoncreds_verify_presentation": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            POINTER(c_int8),
+        ),
+    ),
+    "anoncreds_verify_presentation_with_context": (
+        c_size_t,
+        (ObjectHandle, ObjectHandle, ObjectHandle, ObjectHandle, POINTER(c_int8)),
+    ),
+    "anoncreds_verify_presentation_with_revocation_index": (
+        c_size_t,
+        (
+            ObjectHandle,
+            ObjectHandle,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            ObjectHandle,
+            POINTER(c_int8),
+        ),
+    ),
+    "anoncreds_verify_presentations": (
+        c_size_t,
+        (
+            FfiObjectHandleList,
+            FfiObjectHandleList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            FfiStrList,
+            FfiObjectHandleList,
+            POINTER(StrBuffer),
+        ),
+    ),
+    "anoncreds_version": (c_void_p, ()),
+}
+LIB_SIGNATURES.update(
+    (method, (c_size_t, (FfiByteBuffer, POINTER(ObjectHandle))))
+    for method in (
+        "anoncreds_credential_definition_from_json",
+        "anoncreds_credential_definition_private_from_json",
+        "anoncreds_credential_from_json",
+        "anoncreds_credential_offer_from_json",
+        "anoncreds_credential_request_from_json",
+        "anoncreds_credential_request_metadata_from_json",
+        "anoncreds_key_correctness_proof_from_json",
+        "anoncreds_master_secret_from_json",
+        "anoncreds_presentation_from_json",
+        "anoncreds_presentation_request_from_json",
+        "anoncreds_revocation_index_allocator_from_json",
+        "anoncreds_revocation_list_from_json",
+        "anoncreds_revocation_registry_definition_from_json",
+        "anoncreds_revocation_registry_definition_private_from_json",
+        "anoncreds_revocation_registry_delta_from_json",
+        "anoncreds_revocation_registry_from_json",
+        "anoncreds_revocation_state_from_json",
+        "anoncreds_schema_from_json",
+    )
+)
+# the allocator is only restored from its JSON snapshot
+LIB_SIGNATURES.update(
+    (method[: -len("_from_json")] + "_from_bytes", signature)
+    for method, signature in list(LIB_SIGNATURES.items())
+    if method.endswith("_from_json")
+    and method != "anoncreds_revocation_index_allocator_from_json"
+)
+LIB_FUNCTIONS = {}
+
 
 def get_library() -> CDLL:
     """Return the CDLL instance, loading it if necessary."""
     global LIB
     if LIB is None:
-        LIB = _load_library("anoncreds")
-        do_call("anoncreds_set_default_logger")
+        with LIB_LOCK:
+            if LIB is None:
+                lib = _load_library("anoncreds")
+                _bind_functions(lib)
+                LIB = lib
+                do_call("anoncreds_set_default_logger")
     return LIB
 
 
 def library_version() -> str:
     """Get the version of the installed aries-askar library."""
-    lib = get_library()
-    lib.anoncreds_version.restype = c_void_p
-    return str(StrBuffer(lib.anoncreds_version()))
+    return str(StrBuffer(_get_function("anoncreds_version")()))
 
 
 def _load_library(lib_name: str) -> CDLL:
@@ -363,23 +920,41 @@ def _load_library(lib_name: str) -> CDLL:
         ) from e
 
 
+def _bind_functions(lib: CDLL):
+    """Declare the signatures of the library functions and cache them."""
+    for fn_name, (restype, argtypes) in LIB_SIGNATURES.items():
+        lib_fn = getattr(lib, fn_name, None)
+        if lib_fn is None:
+            LOGGER.debug("Library function not found: %s", fn_name)
+            continue
+        lib_fn.restype = restype
+        lib_fn.argtypes = argtypes
+        LIB_FUNCTIONS[fn_name] = lib_fn
+
+
+def _get_function(fn_name: str):
+    lib_fn = LIB_FUNCTIONS.get(fn_name)
+    if lib_fn is None:
+        lib_fn = getattr(get_library(), fn_name)
+    return lib_fn
+
+
 def do_call(fn_name, *args):
     """Perform a synchronous library function call."""
-    lib_fn = getattr(get_library(), fn_name)
-    result = lib_fn(*args)
+    result = _get_function(fn_name)(*args)
     if result:
         raise get_current_error(True)
 
 
 def get_current_error(expect: bool = False) -> Optional[AnoncredsError]:
     """
-    Get the error result from the previous failed API method.
+    Get the error result from the previous failed API method on this thread.
 
     Args:
         expect: Return a default error message if none is found
     """
     err_json = StrBuffer()
-    if not get_library().anoncreds_get_current_error(byref(err_json)):
+    if not _get_function("anoncreds_get_current_error")(byref(err_json)):
         try:
             msg = json.loads(err_json.value)
         except json.JSONDecodeError:
@@ -411,15 +986,6 @@ def encode_str(arg: Optional[Union[str, bytes]]) -> c_char_p:
     return c_char_p(arg)
 
 
-class FfiByteBuffer(Structure):
-    """A byte buffer allocated by python."""
-
-    _fields_ = [
-        ("len", c_int64),
-        ("value", POINTER(c_ubyte)),
-    ]
-
-
 def encode_bytes(arg: Optional[Union[str, bytes]]) -> FfiByteBuffer:
     buf = FfiByteBuffer()
     if isinstance(arg, memoryview):
@@ -439,8 +1005,23 @@ def encode_bytes(arg: Optional[Union[str, bytes]]) -> FfiByteBuffer:
     return buf
 
 
+def object_copy(handle: ObjectHandle) -> ObjectHandle:
+    result = ObjectHandle()
+    do_call("anoncreds_object_copy", handle, byref(result))
+    return result
+
+
 def object_free(handle: ObjectHandle):
-    get_library().anoncreds_object_free(handle)
+    if _CREATION_SITES:
+        _CREATION_SITES.pop(handle.value, None)
+    _get_function("anoncreds_object_free")(handle)
+
+
+def object_free_many(handles: Sequence[ObjectHandle]):
+    if _CREATION_SITES:
+        for handle in handles:
+            _CREATION_SITES.pop(handle.value, None)
+    _get_function("anoncreds_object_free_many")(FfiObjectHandleList.create(handles))
 
 
 def object_get_json(handle: ObjectHandle) -> ByteBuffer:
@@ -449,12 +1030,86 @@ def object_get_json(handle: ObjectHandle) -> ByteBuffer:
     return result
 
 
+def object_get_bytes(handle: ObjectHandle) -> ByteBuffer:
+    result = ByteBuffer()
+    do_call("anoncreds_object_get_bytes", handle, byref(result))
+    return result
+
+
 def object_get_type_name(handle: ObjectHandle) -> StrBuffer:
     result = StrBuffer()
     do_call("anoncreds_object_get_type_name", handle, byref(result))
     return result
 
 
+def object_store_stats() -> dict:
+    """Report the live native objects and the contention on the object store."""
+    live_objects, lock_acquisitions, lock_contentions = c_int64(), c_int64(), c_int64()
+    do_call(
+        "anoncreds_object_store_stats",
+        byref(live_objects),
+        byref(lock_acquisitions),
+        byref(lock_contentions),
+    )
+    return {
+        "live_objects": live_objects.value,
+        "lock_acquisitions": lock_acquisitions.value,
+        "lock_contentions": lock_contentions.value,
+    }
+
+
+def object_store_report(largest: int = 10) -> dict:
+    """Report the live native objects and their approximate size, by type name.
+
+    Includes the peak number of live objects since `object_store_reset_peak`, and
+    the `largest` biggest objects, with where each was created while tracing.
+    """
+    result = StrBuffer()
+    do_call("anoncreds_object_store_report", c_int64(largest), byref(result))
+    report = json.loads(str(result))
+    if _CREATION_SITES:
+        for obj in report["largest"]:
+            obj["created_at"] = _CREATION_SITES.get(obj["handle"])
+    return report
+
+
+def object_store_reset_peak():
+    do_call("anoncreds_object_store_reset_peak")
+
+
+def set_object_tracing(enabled: bool, depth: int = 1):
+    """Record where each object is created, for finding leaked handles.
+
+    Each site is made up of the innermost `depth` calling frames outside of this
+    package. Disabling tracing forgets the sites recorded so far.
+    """
+    global _TRACE_DEPTH
+    if enabled and depth < 1:
+        raise ValueError("depth must be at least 1")
+    _TRACE_DEPTH = depth if enabled else 0
+    if not enabled:
+        _CREATION_SITES.clear()
+
+
+def object_creation_sites() -> Dict[str, int]:
+    """The number of live objects created at each recorded site, most first."""
+    counts = {}
+    for site in list(_CREATION_SITES.values()):
+        counts[site] = counts.get(site, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+
+def _record_creation_site(handle: ObjectHandle):
+    sites = []
+    frame = sys._getframe(2)
+    while frame is not None and len(sites) < _TRACE_DEPTH:
+        code = frame.f_code
+        if not code.co_filename.startswith(_PACKAGE_DIR):
+            sites.append(f"{code.co_filename}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+    _CREATION_SITES[handle.value] = " <- ".join(sites)
+
+
 def _object_from_json(method: str, value: Union[dict, str, bytes]) -> ObjectHandle:
     if isinstance(value, dict):
         value = json.dumps(value)
@@ -463,6 +1118,14 @@ def _object_from_json(method: str, value: Union[dict, str, bytes]) -> ObjectHand
     return result
 
 
+def _object_from_bytes(
+    method: str, value: Union[bytes, bytearray, memoryview]
+) -> ObjectHandle:
+    result = ObjectHandle()
+    do_call(method, encode_bytes(value), byref(result))
+    return result
+
+
 def _object_get_attribute(
     method: str, handle: ObjectHandle, name: str
 ) -> Optional[StrBuffer]:
@@ -530,21 +1193,13 @@ def create_credential(
     attr_raw_values: Mapping[str, str],
     attr_enc_values: Optional[Mapping[str, str]],
     rev_reg_id: Optional[str],
-    revocation_config: Optional[RevocationConfig],
-) -> Tuple[ObjectHandle, ObjectHandle, ObjectHandle]:
+    rev_status_list: Optional[ObjectHandle],
+    revocation: Optional[CredRevInfo],
+) -> ObjectHandle:
     cred = ObjectHandle()
-    rev_reg = ObjectHandle()
-    rev_delta = ObjectHandle()
-    attr_keys = list(attr_raw_values.keys())
-    names_list = FfiStrList.create(attr_keys)
-    raw_values_list = FfiStrList.create(str(attr_raw_values[k]) for k in attr_keys)
-    if attr_enc_values:
-        enc_values_list = []
-        for name in attr_raw_values:
-            enc_values_list.append(attr_enc_values.get(name))
-    else:
-        enc_values_list = None
-    enc_values_list = FfiStrList().create(enc_values_list)
+    names_list, raw_values_list, enc_values_list = _credential_values_lists(
+        attr_raw_values, attr_enc_values
+    )
     do_call(
         "anoncreds_create_credential",
         cred_def,
@@ -555,14 +1210,129 @@ def create_credential(
         raw_values_list,
         enc_values_list,
         encode_str(rev_reg_id),
-        pointer(revocation_config)
-        if revocation_config
-        else POINTER(RevocationConfig)(),
+        rev_status_list or ObjectHandle(),
+        pointer(revocation) if revocation else POINTER(CredRevInfo)(),
+        byref(cred),
+    )
+    return cred
+
+
+def create_credentials(
+    cred_def: ObjectHandle,
+    cred_def_private: ObjectHandle,
+    cred_offers: Sequence[ObjectHandle],
+    cred_requests: Sequence[ObjectHandle],
+    attr_names: Sequence[str],
+    attr_raw_values: Sequence[str],
+    attr_enc_values: Optional[Sequence[Optional[str]]],
+    rev_reg_id: Optional[str],
+    rev_status_list: Optional[ObjectHandle],
+    rev_reg_def: Optional[ObjectHandle],
+    rev_reg_def_private: Optional[ObjectHandle],
+    tails_path: Optional[str],
+    rev_reg_idxs: Optional[Sequence[int]],
+) -> Tuple[List[ObjectHandle], Optional[ObjectHandle]]:
+    creds = (ObjectHandle * len(cred_offers))()
+    new_rev_status_list = ObjectHandle()
+    do_call(
+        "anoncreds_create_credentials",
+        cred_def,
+        cred_def_private,
+        FfiObjectHandleList.create(cred_offers),
+        FfiObjectHandleList.create(cred_requests),
+        FfiStrList.create(attr_names),
+        FfiStrList.create(attr_raw_values),
+        FfiStrList.create(attr_enc_values),
+        encode_str(rev_reg_id),
+        rev_status_list or ObjectHandle(),
+        rev_reg_def or ObjectHandle(),
+        rev_reg_def_private or ObjectHandle(),
+        encode_str(tails_path),
+        FfiIntList.create(rev_reg_idxs),
+        creds,
+        byref(new_rev_status_list),
+    )
+    return (
+        list(creds),
+        new_rev_status_list if new_rev_status_list.value else None,
+    )
+
+
+def create_issuer_registry_session(
+    rev_reg_def: ObjectHandle,
+    rev_reg_def_private: ObjectHandle,
+    rev_status_list: ObjectHandle,
+    tails_path: str,
+) -> ObjectHandle:
+    session = ObjectHandle()
+    do_call(
+        "anoncreds_create_issuer_registry_session",
+        rev_reg_def,
+        rev_reg_def_private,
+        rev_status_list,
+        encode_str(tails_path),
+        byref(session),
+    )
+    return session
+
+
+def issuer_registry_session_get_status_list(session: ObjectHandle) -> ObjectHandle:
+    rev_status_list = ObjectHandle()
+    do_call(
+        "anoncreds_issuer_registry_session_get_status_list",
+        session,
+        byref(rev_status_list),
+    )
+    return rev_status_list
+
+
+def create_credential_with_session(
+    cred_def: ObjectHandle,
+    cred_def_private: ObjectHandle,
+    cred_offer: ObjectHandle,
+    cred_request: ObjectHandle,
+    attr_raw_values: Mapping[str, str],
+    attr_enc_values: Optional[Mapping[str, str]],
+    rev_reg_id: Optional[str],
+    session: ObjectHandle,
+    rev_reg_index: int,
+) -> ObjectHandle:
+    cred = ObjectHandle()
+    names_list, raw_values_list, enc_values_list = _credential_values_lists(
+        attr_raw_values, attr_enc_values
+    )
+    do_call(
+        "anoncreds_create_credential_with_session",
+        cred_def,
+        cred_def_private,
+        cred_offer,
+        cred_request,
+        names_list,
+        raw_values_list,
+        enc_values_list,
+        encode_str(rev_reg_id),
+        session,
+        c_int64(rev_reg_index),
         byref(cred),
-        byref(rev_reg),
-        byref(rev_delta),
     )
-    return cred, rev_reg, rev_delta
+    return cred
+
+
+def _credential_values_lists(
+    attr_raw_values: Mapping[str, str],
+    attr_enc_values: Optional[Mapping[str, str]],
+) -> Tuple[FfiStrList, FfiStrList, FfiStrList]:
+    attr_keys = list(attr_raw_values.keys())
+    names_list = FfiStrList.create(attr_keys)
+    raw_values_list = FfiStrList.create(str(attr_raw_values[k]) for k in attr_keys)
+    if attr_enc_values:
+        enc_values_list = []
+        for name in attr_raw_values:
+            enc_values_list.append(attr_enc_values.get(name))
+    else:
+        enc_values_list = None
+    enc_values_list = FfiStrList().create(enc_values_list)
+    return names_list, raw_values_list, enc_values_list
 
 
 def encode_credential_attributes(
@@ -595,26 +1365,6 @@ def process_credential(
     return result
 
 
-def revoke_credential(
-    rev_reg_def: ObjectHandle,
-    rev_reg: ObjectHandle,
-    cred_rev_idx: int,
-    tails_path: str,
-) -> Tuple[ObjectHandle, ObjectHandle]:
-    upd_rev_reg = ObjectHandle()
-    rev_delta = ObjectHandle()
-    do_call(
-        "anoncreds_revoke_credential",
-        rev_reg_def,
-        rev_reg,
-        c_int64(cred_rev_idx),
-        encode_str(tails_path),
-        byref(upd_rev_reg),
-        byref(rev_delta),
-    )
-    return upd_rev_reg, rev_delta
-
-
 def create_credential_offer(
     schema_id: str, cred_def_id: str, key_proof: ObjectHandle
 ) -> ObjectHandle:
@@ -698,111 +1448,585 @@ def verify_presentation(
     presentation: ObjectHandle,
     pres_req: ObjectHandle,
     schemas: Sequence[ObjectHandle],
+    schema_ids: Sequence[str],
     cred_defs: Sequence[ObjectHandle],
+    cred_def_ids: Sequence[str],
     rev_reg_defs: Sequence[ObjectHandle],
-    rev_regs: Sequence[RevocationEntry],
+    rev_reg_def_ids: Sequence[str],
+    rev_status_lists: Sequence[ObjectHandle],
 ) -> bool:
     verify = c_int8()
-    entry_list = RevocationEntryList()
-    if rev_regs:
-        entry_list.count = len(rev_regs)
-        entry_list.data = (RevocationEntry * entry_list.count)(*rev_regs)
     do_call(
         "anoncreds_verify_presentation",
         presentation,
         pres_req,
         FfiObjectHandleList.create(schemas),
+        FfiStrList.create(schema_ids),
         FfiObjectHandleList.create(cred_defs),
+        FfiStrList.create(cred_def_ids),
         FfiObjectHandleList.create(rev_reg_defs),
-        entry_list,
+        FfiStrList.create(rev_reg_def_ids),
+        FfiObjectHandleList.create(rev_status_lists),
         byref(verify),
     )
     return bool(verify)
 
 
-def create_revocation_registry(
+def create_verifier_context(
+    schemas: Sequence[ObjectHandle],
+    schema_ids: Sequence[str],
+    cred_defs: Sequence[ObjectHandle],
+    cred_def_ids: Sequence[str],
+    rev_reg_defs: Sequence[ObjectHandle],
+    rev_reg_def_ids: Sequence[str],
+) -> ObjectHandle:
+    context = ObjectHandle()
+    do_call(
+        "anoncreds_create_verifier_context",
+        FfiObjectHandleList.create(schemas),
+        FfiStrList.create(schema_ids),
+        FfiObjectHandleList.create(cred_defs),
+        FfiStrList.create(cred_def_ids),
+        FfiObjectHandleList.create(rev_reg_defs),
+        FfiStrList.create(rev_reg_def_ids),
+        byref(context),
+    )
+    return context
+
+
+def verify_presentation_with_context(
+    presentation: ObjectHandle,
+    pres_req: ObjectHandle,
+    context: ObjectHandle,
+    rev_index: Optional[ObjectHandle],
+) -> bool:
+    verify = c_int8()
+    do_call(
+        "anoncreds_verify_presentation_with_context",
+        presentation,
+        pres_req,
+        context,
+        rev_index or ObjectHandle(),
+        byref(verify),
+    )
+    return bool(verify)
+
+
+def create_revocation_index(rev_status_lists: Sequence[ObjectHandle]) -> ObjectHandle:
+    rev_index = ObjectHandle()
+    do_call(
+        "anoncreds_create_revocation_index",
+        FfiObjectHandleList.create(rev_status_lists),
+        byref(rev_index),
+    )
+    return rev_index
+
+
+def revocation_index_find_timestamp(
+    rev_index: ObjectHandle,
+    rev_reg_def_id: str,
+    from_: Optional[int],
+    to: Optional[int],
+) -> Optional[int]:
+    timestamp = c_int64()
+    do_call(
+        "anoncreds_revocation_index_find_timestamp",
+        rev_index,
+        encode_str(rev_reg_def_id),
+        c_int64(-1 if from_ is None else from_),
+        c_int64(-1 if to is None else to),
+        byref(timestamp),
+    )
+    return None if timestamp.value < 0 else timestamp.value
+
+
+def create_revocation_index_allocator(
+    rev_status_list: ObjectHandle, issuance_by_default: bool, first_unused: int
+) -> ObjectHandle:
+    allocator = ObjectHandle()
+    do_call(
+        "anoncreds_create_revocation_index_allocator",
+        rev_status_list,
+        c_int8(issuance_by_default),
+        c_int64(first_unused),
+        byref(allocator),
+    )
+    return allocator
+
+
+def revocation_index_allocator_next(allocator: ObjectHandle, count: int) -> List[int]:
+    indices = (c_int64 * count)()
+    do_call("anoncreds_revocation_index_allocator_next", allocator, count, indices)
+    return list(indices)
+
+
+def revocation_index_allocator_reserve(allocator: ObjectHandle, index: int):
+    do_call("anoncreds_revocation_index_allocator_reserve", allocator, index)
+
+
+def revocation_index_allocator_release(allocator: ObjectHandle, index: int):
+    do_call("anoncreds_revocation_index_allocator_release", allocator, index)
+
+
+def revocation_index_allocator_free_count(allocator: ObjectHandle) -> int:
+    count = c_int64()
+    do_call("anoncreds_revocation_index_allocator_free_count", allocator, byref(count))
+    return count.value
+
+
+def verify_presentation_with_revocation_index(
+    presentation: ObjectHandle,
+    pres_req: ObjectHandle,
+    schemas: Sequence[ObjectHandle],
+    schema_ids: Sequence[str],
+    cred_defs: Sequence[ObjectHandle],
+    cred_def_ids: Sequence[str],
+    rev_reg_defs: Sequence[ObjectHandle],
+    rev_reg_def_ids: Sequence[str],
+    rev_index: Optional[ObjectHandle],
+) -> bool:
+    verify = c_int8()
+    do_call(
+        "anoncreds_verify_presentation_with_revocation_index",
+        presentation,
+        pres_req,
+        FfiObjectHandleList.create(schemas),
+        FfiStrList.create(schema_ids),
+        FfiObjectHandleList.create(cred_defs),
+        FfiStrList.create(cred_def_ids),
+        FfiObjectHandleList.create(rev_reg_defs),
+        FfiStrList.create(rev_reg_def_ids),
+        rev_index or ObjectHandle(),
+        byref(verify),
+    )
+    return bool(verify)
+
+
+def verify_presentations(
+    presentations: Sequence[ObjectHandle],
+    pres_reqs: Sequence[ObjectHandle],
+    schemas: Sequence[ObjectHandle],
+    schema_ids: Sequence[str],
+    cred_defs: Sequence[ObjectHandle],
+    cred_def_ids: Sequence[str],
+    rev_reg_defs: Sequence[ObjectHandle],
+    rev_reg_def_ids: Sequence[str],
+    rev_status_lists: Sequence[ObjectHandle],
+) -> List[Union[bool, AnoncredsError]]:
+    results = StrBuffer()
+    do_call(
+        "anoncreds_verify_presentations",
+        FfiObjectHandleList.create(presentations),
+        FfiObjectHandleList.create(pres_reqs),
+        FfiObjectHandleList.create(schemas),
+        FfiStrList.create(schema_ids),
+        FfiObjectHandleList.create(cred_defs),
+        FfiStrList.create(cred_def_ids),
+        FfiObjectHandleList.create(rev_reg_defs),
+        FfiStrList.create(rev_reg_def_ids),
+        FfiObjectHandleList.create(rev_status_lists),
+        byref(results),
+    )
+    return [
+        bool(item["valid"])
+        if item["code"] == AnoncredsErrorCode.SUCCESS
+        else AnoncredsError(AnoncredsErrorCode(item["code"]), item["message"])
+        for item in json.loads(str(results))
+    ]
+
+
+def create_revocation_registry_definition(
     cred_def: ObjectHandle,
     cred_def_id: str,
+    issuer_id: str,
     tag: str,
     rev_reg_type: str,
-    issuance_type: Optional[str],
     max_cred_num: int,
     tails_dir_path: Optional[str],
-) -> Tuple[ObjectHandle, ObjectHandle, ObjectHandle, ObjectHandle]:
+    threads: int = 1,
+) -> Tuple[ObjectHandle, ObjectHandle]:
+    """Create a revocation registry definition and write its tails file.
+
+    The tails are generated on `threads` threads, or on every core when zero.
+    """
     reg_def = ObjectHandle()
     reg_def_private = ObjectHandle()
-    reg_entry = ObjectHandle()
-    reg_init_delta = ObjectHandle()
     do_call(
-        "anoncreds_create_revocation_registry",
+        "anoncreds_create_revocation_registry_def_with_threads",
         cred_def,
         encode_str(cred_def_id),
+        encode_str(issuer_id),
         encode_str(tag),
         encode_str(rev_reg_type),
-        encode_str(issuance_type),
         c_int64(max_cred_num),
         encode_str(tails_dir_path),
+        c_int64(threads),
         byref(reg_def),
         byref(reg_def_private),
-        byref(reg_entry),
-        byref(reg_init_delta),
     )
-    return reg_def, reg_def_private, reg_entry, reg_init_delta
+    return reg_def, reg_def_private
+
+
+def create_revocation_registry_definition_in_memory(
+    cred_def: ObjectHandle,
+    cred_def_id: str,
+    issuer_id: str,
+    tag: str,
+    rev_reg_type: str,
+    max_cred_num: int,
+    tails_location: Optional[str],
+    threads: int = 1,
+    sink: Callable[[bytes], None] = None,
+) -> Tuple[ObjectHandle, ObjectHandle, Optional[ByteBuffer]]:
+    """Create a revocation registry definition, keeping its tails in memory.
+
+    When `sink` is given, it receives the tails in chunks as they are generated
+    and no buffer is returned.
+    """
+    errors = []
+
+    def write_chunk(_context, data, size):
+        try:
+            sink(string_at(data, size))
+            return 0
+        except Exception as err:
+            errors.append(err)
+            return 1
+
+    reg_def = ObjectHandle()
+    reg_def_private = ObjectHandle()
+    tails = ByteBuffer()
+    try:
+        do_call(
+            "anoncreds_create_revocation_registry_def_in_memory",
+            cred_def,
+            encode_str(cred_def_id),
+            encode_str(issuer_id),
+            encode_str(tag),
+            encode_str(rev_reg_type),
+            c_int64(max_cred_num),
+            encode_str(tails_location),
+            c_int64(threads),
+            TailsChunkCallback(write_chunk) if sink else TailsChunkCallback(),
+            c_int64(0),
+            byref(reg_def),
+            byref(reg_def_private),
+            byref(tails),
+        )
+    except AnoncredsError as err:
+        if errors:
+            raise errors[0] from err
+        raise
+    return reg_def, reg_def_private, None if sink else tails
 
 
-def update_revocation_registry(
+def create_revocation_status_list(
+    rev_reg_def_id: str,
     rev_reg_def: ObjectHandle,
-    rev_reg: ObjectHandle,
-    issued: Sequence[int],
-    revoked: Sequence[int],
-    tails_path: str,
-) -> Tuple[ObjectHandle, ObjectHandle]:
-    upd_rev_reg = ObjectHandle()
-    rev_delta = ObjectHandle()
+    timestamp: Optional[int],
+    issuance_by_default: bool,
+) -> ObjectHandle:
+    result = ObjectHandle()
     do_call(
-        "anoncreds_update_revocation_registry",
+        "anoncreds_create_revocation_status_list",
+        encode_str(rev_reg_def_id),
         rev_reg_def,
-        rev_reg,
-        FfiIntList.create(issued),
-        FfiIntList.create(revoked),
-        encode_str(tails_path),
-        byref(upd_rev_reg),
-        byref(rev_delta),
+        c_int64(timestamp or -1),
+        c_int8(issuance_by_default),
+        byref(result),
     )
-    return upd_rev_reg, rev_delta
+    return result
 
 
-def merge_revocation_registry_deltas(
-    rev_reg_delta_1: ObjectHandle,
-    rev_reg_delta_2: ObjectHandle,
+def update_revocation_status_list(
+    timestamp: Optional[int],
+    issued: Optional[Sequence[int]],
+    revoked: Optional[Sequence[int]],
+    rev_reg_def: ObjectHandle,
+    rev_current_list: ObjectHandle,
 ) -> ObjectHandle:
-    rev_delta = ObjectHandle()
+    """Update a revocation status list, releasing the handle of the current list."""
+    result = ObjectHandle()
     do_call(
-        "anoncreds_merge_revocation_registry_deltas",
-        rev_reg_delta_1,
-        rev_reg_delta_2,
-        byref(rev_delta),
+        "anoncreds_update_revocation_status_list",
+        c_int64(timestamp or -1),
+        FfiInt32List.create(issued),
+        FfiInt32List.create(revoked),
+        rev_reg_def,
+        rev_current_list,
+        byref(result),
     )
-    return rev_delta
+    return result
+
+
+def update_revocation_status_list_bits(
+    timestamp: Optional[int],
+    issued: Optional[Union[bytes, bytearray, memoryview]],
+    revoked: Optional[Union[bytes, bytearray, memoryview]],
+    rev_reg_def: ObjectHandle,
+    rev_current_list: ObjectHandle,
+) -> ObjectHandle:
+    """Update a revocation status list with indices given as packed bits.
+
+    Index `i` is selected when bit `i % 8` of byte `i // 8` is set, counting from the
+    least significant bit. The handle of the current list is released.
+    """
+    result = ObjectHandle()
+    do_call(
+        "anoncreds_update_revocation_status_list_bits",
+        c_int64(timestamp or -1),
+        encode_bytes(issued),
+        encode_bytes(revoked),
+        rev_reg_def,
+        rev_current_list,
+        byref(result),
+    )
+    return result
+
+
+def update_revocation_status_list_timestamp_only(
+    timestamp: int, rev_current_list: ObjectHandle
+) -> ObjectHandle:
+    """Set the timestamp of a status list, releasing the handle of the current list."""
+    result = ObjectHandle()
+    do_call(
+        "anoncreds_update_revocation_status_list_timestamp_only",
+        c_int64(timestamp),
+        rev_current_list,
+        byref(result),
+    )
+    return result
 
 
 def create_or_update_revocation_state(
     rev_reg_def: ObjectHandle,
-    rev_reg_list: ObjectHandle,
+    rev_status_list: ObjectHandle,
     rev_reg_index: int,
     tails_path: str,
-    rev_state: ObjectHandle,
-    old_rev_reg_list: ObjectHandle,
+    rev_state: Optional[ObjectHandle],
+    old_rev_status_list: Optional[ObjectHandle],
 ) -> ObjectHandle:
-    rev_state = ObjectHandle()
+    result = ObjectHandle()
     do_call(
         "anoncreds_create_or_update_revocation_state",
         rev_reg_def,
-        rev_reg_list,
+        rev_status_list,
+        c_int64(rev_reg_index),
+        encode_str(tails_path),
+        rev_state or ObjectHandle(),
+        old_rev_status_list or ObjectHandle(),
+        byref(result),
+    )
+    return result
+
+
+def create_revocation_states(
+    rev_reg_def: ObjectHandle,
+    rev_status_list: ObjectHandle,
+    rev_reg_idxs: Sequence[int],
+    tails_path: str,
+) -> List[ObjectHandle]:
+    rev_states = (ObjectHandle * len(rev_reg_idxs))()
+    do_call(
+        "anoncreds_create_revocation_states",
+        rev_reg_def,
+        rev_status_list,
+        FfiIntList.create(rev_reg_idxs),
+        encode_str(tails_path),
+        rev_states,
+    )
+    return list(rev_states)
+
+
+def catch_up_revocation_state(
+    rev_reg_def: ObjectHandle,
+    rev_reg_index: int,
+    tails_path: str,
+    rev_state: ObjectHandle,
+    old_rev_status_list: ObjectHandle,
+    rev_status_lists: Sequence[ObjectHandle],
+) -> ObjectHandle:
+    result = ObjectHandle()
+    do_call(
+        "anoncreds_catch_up_revocation_state",
+        rev_reg_def,
         c_int64(rev_reg_index),
         encode_str(tails_path),
         rev_state,
-        old_rev_reg_list,
-        byref(rev_state),
+        old_rev_status_list,
+        FfiObjectHandleList.create(rev_status_lists),
+        byref(result),
     )
-    return rev_state
+    return result
+
+
+def update_revocation_states(
+    rev_reg_def: ObjectHandle,
+    old_rev_status_list: ObjectHandle,
+    rev_status_list: ObjectHandle,
+    rev_states: Sequence[bytes],
+    rev_reg_idxs: Sequence[int],
+    tails_path: str,
+) -> List[bytes]:
+    """Update serialized revocation states to a newer revocation status list.
+
+    Each state may be JSON or the binary encoding, and is returned in the same one.
+    """
+    results = (ByteBuffer * len(rev_states))()
+    do_call(
+        "anoncreds_update_revocation_states",
+        rev_reg_def,
+        old_rev_status_list,
+        rev_status_list,
+        FfiByteBufferList.create(rev_states),
+        FfiIntList.create(rev_reg_idxs),
+        encode_str(tails_path),
+        results,
+    )
+    # each element is read once, as the buffer is freed with the returned instance
+    return [bytes(buf) for buf in results]
+
+
+def revocation_status_list_get_bits(
+    rev_status_list: ObjectHandle,
+) -> Tuple[memoryview, int]:
+    """Access the revocation list of a status list without copying it.
+
+    Returns a view of the packed bits and the number of entries in the list. Index `i`
+    is revoked when bit `i % 8` of byte `i // 8` is set, counting from the least
+    significant bit. The view keeps the list alive for as long as it is referenced.
+    """
+    bits = c_void_p()
+    bits_len = c_size_t()
+    list_len = c_size_t()
+    pin = ObjectHandle()
+    do_call(
+        "anoncreds_revocation_status_list_get_bits",
+        rev_status_list,
+        byref(bits),
+        byref(bits_len),
+        byref(list_len),
+        byref(pin),
+    )
+    if not bits_len.value:
+        return memoryview(b""), 0
+    buffer = (c_ubyte * bits_len.value).from_address(bits.value)
+    setattr(buffer, "_ref_", pin)  # ensure the list is not dropped
+    view = memoryview(buffer).cast("B")
+    if hasattr(view, "toreadonly"):
+        view = view.toreadonly()
+    return view, list_len.value
+
+
+def revocation_status_list_to_json(
+    rev_status_list: ObjectHandle, encoding: str = None
+) -> ByteBuffer:
+    """Serialize a revocation status list with the given revocation list encoding.
+
+    The encoding is one of `array` (the default), `bits` or `rle`.
+    """
+    result = ByteBuffer()
+    do_call(
+        "anoncreds_revocation_status_list_to_json",
+        rev_status_list,
+        encode_str(encoding),
+        byref(result),
+    )
+    return result
+
+
+def tails_cache_preload(tails_path: str, tails_hash: str, pin: bool = False):
+    """Open a tails file ahead of use, optionally pinning it in the tails cache."""
+    do_call(
+        "anoncreds_tails_cache_preload",
+        encode_str(tails_path),
+        encode_str(tails_hash),
+        c_int8(pin),
+    )
+
+
+# The tails readers registered with the tails cache, by context, kept until the
+# library releases them
+_TAILS_READERS = {}
+_TAILS_READER_IDS = itertools.count(1)
+
+
+@TailsReadCallback
+def _read_tails(context, offset, size, buf):
+    try:
+        data = _TAILS_READERS[context](offset, size)
+        if len(data) != size:
+            LOGGER.error("Tails reader returned %d of %d bytes", len(data), size)
+            return 1
+        memmove(buf, data if isinstance(data, bytes) else bytes(data), size)
+        return 0
+    except Exception:
+        LOGGER.exception("Error reading tails")
+        return 1
+
+
+@TailsReleaseCallback
+def _release_tails_reader(context):
+    _TAILS_READERS.pop(context, None)
+
+
+def tails_cache_register_bytes(
+    tails_hash: str, data: Union[bytes, bytearray, memoryview], pin: bool = True
+):
+    """Serve the tails for `tails_hash` from memory instead of the tails file.
+
+    The tails are copied by the library and checked against the tails hash.
+    """
+    do_call(
+        "anoncreds_tails_cache_register_bytes",
+        encode_str(tails_hash),
+        encode_bytes(data),
+        c_int8(pin),
+    )
+
+
+def tails_cache_register_reader(
+    tails_hash: str,
+    tails_size: int,
+    read: Callable[[int, int], Union[bytes, bytearray, memoryview]],
+    block_tails: int = 256,
+):
+    """Serve the tails for `tails_hash` from `read(offset, size)` instead of a file.
+
+    Adjacent tails are requested together, `block_tails` tails at a time, and `read`
+    must return exactly `size` bytes. It may be called from library threads until
+    the tails are evicted and no longer used, and its result is not checked against
+    the tails hash.
+    """
+    context = next(_TAILS_READER_IDS)
+    _TAILS_READERS[context] = read
+    try:
+        do_call(
+            "anoncreds_tails_cache_register_reader",
+            encode_str(tails_hash),
+            c_int64(tails_size),
+            c_int64(block_tails),
+            _read_tails,
+            _release_tails_reader,
+            c_int64(context),
+        )
+    except AnoncredsError:
+        _TAILS_READERS.pop(context, None)
+        raise
+
+
+def tails_cache_evict(tails_hash: str) -> bool:
+    """Remove a tails file from the tails cache, even when pinned."""
+    evicted = c_int8()
+    do_call("anoncreds_tails_cache_evict", encode_str(tails_hash), byref(evicted))
+    return bool(evicted)
+
+
+def tails_cache_set_capacity(capacity: int):
+    """Set the number of unpinned tails files kept open by the tails cache."""
+    do_call("anoncreds_tails_cache_set_capacity", c_int64(capacity))
+
+
+def tails_cache_clear():
+    """Remove all tails files from the tails cache."""
+    do_call("anoncreds_tails_cache_clear")
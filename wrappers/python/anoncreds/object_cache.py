@@ -0,0 +1,129 @@
+"""A bounded cache of parsed ledger objects, keyed by identifier and content."""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Type, TypeVar, Union
+
+from . import bindings
+
+T = TypeVar("T", bound=bindings.AnoncredsObject)
+
+# The cache used by the high-level APIs, if one has been installed
+_OBJECT_CACHE: Optional["ObjectCache"] = None
+
+
+class ObjectCache:
+    """Keep the native objects for schemas, credential definitions and revocation
+    registry definitions loaded, so that each one is parsed once per process.
+
+    Entries are keyed by type, identifier and a hash of the serialized object, so
+    a changed object is never served under an old identifier. The least recently
+    used entries are evicted once the total size of the cached objects, measured by
+    their serialized length, would exceed `max_bytes`, or once more than
+    `max_entries` are held. Objects larger than the whole budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = None):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[bindings.AnoncredsObject, int]]" = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def resolve(
+        self, cls: Type[T], obj_id: str, value: Union[T, dict, str, bytes, memoryview]
+    ) -> T:
+        """Return the loaded object for `value`, parsing it only if not cached."""
+        if isinstance(value, bindings.AnoncredsObject):
+            return value
+        if isinstance(value, dict):
+            value = json.dumps(value).encode("utf-8")
+        elif isinstance(value, str):
+            value = value.encode("utf-8")
+        key = (cls, obj_id, hashlib.blake2b(value, digest_size=16).digest())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+        # parse outside of the lock, another thread may load the same object
+        obj = cls.load(value)
+        # cached objects outlive any arena they were loaded in
+        bindings._keep_from_arenas(obj)
+        size = value.nbytes if isinstance(value, memoryview) else len(value)
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (obj, size)
+                    self._size += size
+                    self._evict()
+        return obj
+
+    def _evict(self):
+        # called with the lock held
+        while self._size > self.max_bytes or (
+            self.max_entries is not None and len(self._entries) > self.max_entries
+        ):
+            _key, (_obj, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self._evictions += 1
+
+    def clear(self):
+        """Drop every cached object, keeping the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def stats(self) -> dict:
+        """The hits, misses and evictions so far, and the current entries and size."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "size": self._size,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+
+
+def get_object_cache() -> Optional[ObjectCache]:
+    """The object cache used by the high-level APIs, if any."""
+    return _OBJECT_CACHE
+
+
+def set_object_cache(cache: Optional[ObjectCache]) -> Optional[ObjectCache]:
+    """Install the object cache used by the high-level APIs, returning the previous
+    one. Pass None to stop caching."""
+    global _OBJECT_CACHE
+    previous, _OBJECT_CACHE = _OBJECT_CACHE, cache
+    return previous
+
+
+def resolve(
+    cls: Type[T], obj_id: str, value: Union[T, dict, str, bytes, memoryview]
+) -> T:
+    """Load `value` as `cls`, through the installed object cache if there is one."""
+    if isinstance(value, bindings.AnoncredsObject):
+        return value
+    cache = _OBJECT_CACHE
+    if cache is not None:
+        return cache.resolve(cls, obj_id, value)
+    return cls.load(value)
@@ -0,0 +1,251 @@
+"""Revocation registries generated ahead of use, with indices allocated across them."""
+
+import threading
+from collections import deque
+from itertools import count
+from typing import Callable, Deque, List, Optional, Tuple, Union
+
+from . import bindings
+from .types import (
+    CredentialDefinition,
+    CredentialRevocationConfig,
+    RevocationRegistryDefinition,
+    RevocationRegistryDefinitionPrivate,
+    RevocationStatusList,
+)
+
+
+class PooledRegistry:
+    """A revocation registry created by a `RevocationRegistryPool`.
+
+    Indices are allocated from 1, as in the accumulator, up to the last index held
+    by the status list.
+    """
+
+    def __init__(
+        self,
+        tag: str,
+        rev_reg_def_id: str,
+        rev_reg_def: RevocationRegistryDefinition,
+        rev_reg_def_private: RevocationRegistryDefinitionPrivate,
+        rev_status_list: RevocationStatusList,
+    ):
+        self.tag = tag
+        self.rev_reg_def_id = rev_reg_def_id
+        self.rev_reg_def = rev_reg_def
+        self.rev_reg_def_private = rev_reg_def_private
+        self.rev_status_list = rev_status_list
+        self.capacity = rev_status_list.size - 1
+        self.allocated = 0
+
+    @property
+    def tails_path(self) -> str:
+        return self.rev_reg_def.tails_location
+
+    def revocation_config(self, rev_reg_index: int) -> CredentialRevocationConfig:
+        """The revocation config for issuing a credential at `rev_reg_index`."""
+        return CredentialRevocationConfig(
+            rev_reg_def=self.rev_reg_def,
+            rev_reg_def_private=self.rev_reg_def_private,
+            rev_reg_index=rev_reg_index,
+            tails_path=self.tails_path,
+        )
+
+
+class RevocationRegistryPool:
+    """Keep revocation registries ready ahead of issuance.
+
+    A background thread generates registries, with their tails files and status
+    lists, until `ready` of them are waiting. Indices are allocated from the active
+    registry; once `fill_level` of its indices are allocated, the next allocation
+    switches to a ready registry under the same lock, so issuance only waits for
+    tails generation when the pool has fallen behind.
+
+    Registries are tagged `tag_prefix` followed by a counter starting at `first_tag`,
+    and identified by `rev_reg_def_id(tag)`, which defaults to the legacy identifier
+    for the credential definition. `on_created` is called on the background thread
+    with each new registry before it is made ready, for instance to publish it.
+    `timestamp`, if given, is called for the timestamp of each new status list, such
+    as `lambda: int(time.time())`, as registries may be created long after the pool.
+    """
+
+    def __init__(
+        self,
+        cred_def_id: str,
+        cred_def: Union[str, CredentialDefinition],
+        issuer_id: str,
+        max_cred_num: int,
+        *,
+        registry_type: str = "CL_ACCUM",
+        tag_prefix: str = "",
+        first_tag: int = 0,
+        rev_reg_def_id: Callable[[str], str] = None,
+        ready: int = 1,
+        fill_level: float = 1.0,
+        tails_dir_path: str = None,
+        threads: int = 0,
+        timestamp: Callable[[], int] = None,
+        issuance_by_default: bool = True,
+        on_created: Callable[[PooledRegistry], None] = None,
+    ):
+        if ready < 1:
+            raise ValueError("ready must be at least 1")
+        if not 0.0 < fill_level <= 1.0:
+            raise ValueError("fill_level must be greater than 0 and at most 1")
+        if max_cred_num < 2:
+            raise ValueError("max_cred_num must be at least 2")
+        if not isinstance(cred_def, bindings.AnoncredsObject):
+            cred_def = CredentialDefinition.load(cred_def)
+        self.cred_def_id = cred_def_id
+        self.cred_def = cred_def
+        self.issuer_id = issuer_id
+        self.max_cred_num = max_cred_num
+        self.registry_type = registry_type
+        self.ready = ready
+        self.fill_level = fill_level
+        self.tails_dir_path = tails_dir_path
+        self.threads = threads
+        self.timestamp = timestamp
+        self.issuance_by_default = issuance_by_default
+        self.on_created = on_created
+        self._tag_prefix = tag_prefix
+        self._tags = count(first_tag)
+        self._rev_reg_def_id = rev_reg_def_id or (
+            lambda tag: f"{issuer_id}:4:{cred_def_id}:{registry_type}:{tag}"
+        )
+        self._cond = threading.Condition()
+        self._ready: Deque[PooledRegistry] = deque()
+        self._active: Optional[PooledRegistry] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "RevocationRegistryPool":
+        """Start generating registries on the background thread."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Revocation registry pool is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="anoncreds-registry-pool", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def close(self, wait: bool = True):
+        """Stop generating registries, finishing the one in progress if `wait`."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "RevocationRegistryPool":
+        return self.start()
+
+    def __exit__(self, *_exc):
+        self.close()
+
+    @property
+    def active(self) -> Optional[PooledRegistry]:
+        """The registry indices are currently allocated from."""
+        return self._active
+
+    @property
+    def ready_count(self) -> int:
+        """The number of generated registries waiting to become active."""
+        with self._cond:
+            return len(self._ready)
+
+    def allocate(self) -> Tuple[PooledRegistry, int]:
+        """Allocate the next revocation index, returning it with its registry."""
+        with self._cond:
+            registry = self._current()
+            registry.allocated += 1
+            return registry, registry.allocated
+
+    def allocate_many(self, number: int) -> List[Tuple[PooledRegistry, int]]:
+        """Allocate `number` revocation indices at once, rotating as required.
+
+        Either all of the indices are allocated, or none of them.
+        """
+        allocated = []
+        with self._cond:
+            try:
+                while len(allocated) < number:
+                    registry = self._current()
+                    take = min(number - len(allocated), self._limit(registry))
+                    start = registry.allocated + 1
+                    registry.allocated += take
+                    allocated.extend(
+                        (registry, index) for index in range(start, start + take)
+                    )
+            except BaseException:
+                # the registries taken from are full, so no other caller has
+                # allocated from them since
+                for registry, _index in allocated:
+                    registry.allocated -= 1
+                raise
+        return allocated
+
+    def _limit(self, registry: PooledRegistry) -> int:
+        # the indices left before the registry reaches the fill level
+        return max(1, int(registry.capacity * self.fill_level)) - registry.allocated
+
+    def _current(self) -> PooledRegistry:
+        # called with the lock held
+        if self._active is None or self._limit(self._active) <= 0:
+            if self._thread is None:
+                raise RuntimeError("Revocation registry pool is not started")
+            while not self._ready:
+                if self._error is not None:
+                    raise self._error
+                if self._closed:
+                    raise RuntimeError("Revocation registry pool is closed")
+                self._cond.wait()
+            self._active = self._ready.popleft()
+            self._cond.notify_all()
+        return self._active
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and len(self._ready) >= self.ready:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                registry = self._create()
+                if self.on_created:
+                    self.on_created(registry)
+            except BaseException as err:
+                with self._cond:
+                    self._error = err
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._ready.append(registry)
+                self._cond.notify_all()
+
+    def _create(self) -> PooledRegistry:
+        tag = f"{self._tag_prefix}{next(self._tags)}"
+        rev_reg_def_id = self._rev_reg_def_id(tag)
+        rev_reg_def, rev_reg_def_private = RevocationRegistryDefinition.create(
+            self.cred_def_id,
+            self.cred_def,
+            self.issuer_id,
+            tag,
+            self.registry_type,
+            self.max_cred_num,
+            tails_dir_path=self.tails_dir_path,
+            threads=self.threads,
+        )
+        rev_status_list = RevocationStatusList.create(
+            rev_reg_def_id,
+            rev_reg_def,
+            self.timestamp() if self.timestamp else None,
+            self.issuance_by_default,
+        )
+        return PooledRegistry(
+            tag, rev_reg_def_id, rev_reg_def, rev_reg_def_private, rev_status_list
+        )
@@ -1,9 +1,22 @@
-from typing import Mapping, Optional, Sequence, Tuple, Union
-
-from . import bindings
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from . import bindings, object_cache
+from .error import AnoncredsError, AnoncredsErrorCode
 
 
 class CredentialDefinition(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_credential_definition_from_bytes"
     GET_ATTR = "anoncreds_credential_definition_get_attribute"
 
     @classmethod
@@ -60,6 +73,8 @@ class CredentialDefinition(bindings.AnoncredsObject):
 
 
 class CredentialDefinitionPrivate(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_credential_definition_private_from_bytes"
+
     @classmethod
     def load(
         cls, value: Union[dict, str, bytes, memoryview]
@@ -72,6 +87,8 @@ class CredentialDefinitionPrivate(bindings.AnoncredsObject):
 
 
 class KeyCorrectnessProof(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_key_correctness_proof_from_bytes"
+
     @classmethod
     def load(cls, value: Union[dict, str, bytes, memoryview]) -> "KeyCorrectnessProof":
         return KeyCorrectnessProof(
@@ -82,6 +99,8 @@ class KeyCorrectnessProof(bindings.AnoncredsObject):
 
 
 class CredentialOffer(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_credential_offer_from_bytes"
+
     @classmethod
     def create(
         cls,
@@ -103,6 +122,8 @@ class CredentialOffer(bindings.AnoncredsObject):
 
 
 class CredentialRequest(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_credential_request_from_bytes"
+
     @classmethod
     def create(
         cls,
@@ -135,6 +156,8 @@ class CredentialRequest(bindings.AnoncredsObject):
 
 
 class CredentialRequestMetadata(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_credential_request_metadata_from_bytes"
+
     @classmethod
     def load(
         cls, value: Union[dict, str, bytes, memoryview]
@@ -147,6 +170,8 @@ class CredentialRequestMetadata(bindings.AnoncredsObject):
 
 
 class MasterSecret(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_master_secret_from_bytes"
+
     @classmethod
     def create(cls) -> "MasterSecret":
         return MasterSecret(bindings.create_master_secret())
@@ -159,6 +184,8 @@ class MasterSecret(bindings.AnoncredsObject):
 
 
 class Schema(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_schema_from_bytes"
+
     @classmethod
     def create(
         cls,
@@ -175,6 +202,7 @@ class Schema(bindings.AnoncredsObject):
 
 
 class Credential(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_credential_from_bytes"
     GET_ATTR = "anoncreds_credential_get_attribute"
 
     @classmethod
@@ -188,11 +216,8 @@ class Credential(bindings.AnoncredsObject):
         attr_enc_values: Mapping[str, str] = None,
         rev_reg_id: Optional[str] = None,
         revocation_config: "CredentialRevocationConfig" = None,
-    ) -> Tuple[
-        "Credential",
-        Optional["RevocationRegistry"],
-        Optional["RevocationRegistryDelta"],
-    ]:
+        rev_status_list: Union[str, bindings.AnoncredsObject] = None,
+    ) -> "Credential":
         if not isinstance(cred_def, bindings.AnoncredsObject):
             cred_def = CredentialDefinition.load(cred_def)
         if not isinstance(cred_def_private, bindings.AnoncredsObject):
@@ -201,20 +226,139 @@ class Credential(bindings.AnoncredsObject):
             cred_offer = CredentialOffer.load(cred_offer)
         if not isinstance(cred_request, bindings.AnoncredsObject):
             cred_request = CredentialRequest.load(cred_request)
-        cred, rev_reg, rev_delta = bindings.create_credential(
-            cred_def.handle,
-            cred_def_private.handle,
-            cred_offer.handle,
-            cred_request.handle,
-            attr_raw_values,
-            attr_enc_values,
-            rev_reg_id,
-            revocation_config._native if revocation_config else None,
-        )
+        if rev_status_list is not None:
+            (rev_status_list,) = _rev_status_list_handles([rev_status_list])
+
+        def issue(rev_info: Optional[bindings.CredRevInfo]) -> bindings.ObjectHandle:
+            return bindings.create_credential(
+                cred_def.handle,
+                cred_def_private.handle,
+                cred_offer.handle,
+                cred_request.handle,
+                attr_raw_values,
+                attr_enc_values,
+                rev_reg_id,
+                rev_status_list,
+                rev_info,
+            )
+
+        if revocation_config:
+            return Credential(revocation_config._issue(issue))
+        return Credential(issue(None))
+
+    @classmethod
+    def create_many(
+        cls,
+        cred_def: Union[str, CredentialDefinition],
+        cred_def_private: Union[str, CredentialDefinitionPrivate],
+        issuances: Sequence[
+            Union[
+                Tuple[
+                    Union[str, CredentialOffer],
+                    Union[str, CredentialRequest],
+                    Mapping[str, str],
+                    Optional[int],
+                ],
+                Tuple[
+                    Union[str, CredentialOffer],
+                    Union[str, CredentialRequest],
+                    Mapping[str, str],
+                    Optional[int],
+                    Optional[Mapping[str, str]],
+                ],
+            ]
+        ],
+        rev_reg_id: Optional[str] = None,
+        rev_status_list: Union[str, "RevocationStatusList"] = None,
+        revocation_config: "CredentialRevocationConfig" = None,
+    ) -> Tuple[List["Credential"], Optional["RevocationStatusList"]]:
+        """Create many credentials for one credential definition in one call.
+
+        Each issuance is a tuple of the credential offer, the credential request,
+        the raw attribute values and the registry index of the credential, and
+        optionally the encoded attribute values as for `create`. Every issuance
+        must have the same attribute names. Indices given as `None` take the
+        index of the revocation config, for a single issuance, or are allocated
+        from its index allocator. Returns the credentials
+        and, for revocable credentials, the status list with all of them issued.
+        """
+        if not isinstance(cred_def, bindings.AnoncredsObject):
+            cred_def = CredentialDefinition.load(cred_def)
+        if not isinstance(cred_def_private, bindings.AnoncredsObject):
+            cred_def_private = CredentialDefinitionPrivate.load(cred_def_private)
+        attr_names = list(issuances[0][2].keys()) if issuances else []
+        cred_offers = []
+        cred_requests = []
+        attr_raw_values = []
+        attr_enc_values = []
+        rev_reg_idxs = []
+        for pos, issuance in enumerate(issuances):
+            cred_offer, cred_request, values, rev_reg_idx = issuance[:4]
+            enc_values = issuance[4] if len(issuance) > 4 else None
+            if set(values) != set(attr_names):
+                raise AnoncredsError(
+                    AnoncredsErrorCode.INPUT,
+                    f"Issuance {pos} does not have the attribute names of the first",
+                )
+            if not isinstance(cred_offer, bindings.AnoncredsObject):
+                cred_offer = CredentialOffer.load(cred_offer)
+            if not isinstance(cred_request, bindings.AnoncredsObject):
+                cred_request = CredentialRequest.load(cred_request)
+            cred_offers.append(cred_offer.handle)
+            cred_requests.append(cred_request.handle)
+            attr_raw_values.extend(str(values[name]) for name in attr_names)
+            attr_enc_values.extend((enc_values or {}).get(name) for name in attr_names)
+            rev_reg_idxs.append(rev_reg_idx)
+        if not any(attr_enc_values):
+            attr_enc_values = None
+        if rev_status_list is not None:
+            (rev_status_list,) = _rev_status_list_handles([rev_status_list])
+        allocated = []
+        missing = [pos for pos, idx in enumerate(rev_reg_idxs) if idx is None]
+        if revocation_config and missing:
+            if revocation_config.rev_reg_index is not None:
+                if len(missing) > 1:
+                    raise AnoncredsError(
+                        AnoncredsErrorCode.INPUT,
+                        "Only one issuance can use the configured revocation index",
+                    )
+                rev_reg_idxs[missing[0]] = revocation_config.rev_reg_index
+            elif revocation_config.index_allocator:
+                allocated = revocation_config.index_allocator.next_many(len(missing))
+                for pos, idx in zip(missing, allocated):
+                    rev_reg_idxs[pos] = idx
+            else:
+                raise AnoncredsError(
+                    AnoncredsErrorCode.INPUT,
+                    f"Issuance {missing[0]} has no revocation index and the "
+                    "revocation config has no index allocator",
+                )
+
+        try:
+            creds, rev_status_list = bindings.create_credentials(
+                cred_def.handle,
+                cred_def_private.handle,
+                cred_offers,
+                cred_requests,
+                attr_names,
+                attr_raw_values,
+                attr_enc_values,
+                rev_reg_id,
+                rev_status_list,
+                revocation_config.rev_reg_def.handle if revocation_config else None,
+                revocation_config.rev_reg_def_private.handle
+                if revocation_config
+                else None,
+                revocation_config.tails_path if revocation_config else None,
+                rev_reg_idxs if revocation_config else None,
+            )
+        except BaseException:
+            for idx in allocated:
+                revocation_config.index_allocator.release(idx)
+            raise
         return (
-            Credential(cred),
-            RevocationRegistry(rev_reg) if rev_reg else None,
-            RevocationRegistryDelta(rev_delta) if rev_delta else None,
+            [Credential(cred) for cred in creds],
+            RevocationStatusList(rev_status_list) if rev_status_list else None,
         )
 
     def process(
@@ -289,6 +433,8 @@ class Credential(bindings.AnoncredsObject):
 
 
 class PresentationRequest(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_presentation_request_from_bytes"
+
     @classmethod
     def load(cls, value: Union[dict, str, bytes, memoryview]) -> "PresentationRequest":
         return PresentationRequest(
@@ -352,6 +498,8 @@ class PresentCredentials:
 
 
 class Presentation(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_presentation_from_bytes"
+
     @classmethod
     def create(
         cls,
@@ -366,22 +514,8 @@ class Presentation(bindings.AnoncredsObject):
             pres_req = PresentationRequest.load(pres_req)
         if not isinstance(master_secret, bindings.AnoncredsObject):
             master_secret = MasterSecret.load(master_secret)
-        schema_ids = list(schemas.keys())
-        cred_def_ids = list(cred_defs.keys())
-        schemas = [
-            (
-                Schema.load(s) if not isinstance(s, bindings.AnoncredsObject) else s
-            ).handle
-            for s in schemas.values()
-        ]
-        cred_defs = [
-            (
-                CredentialDefinition.load(c)
-                if not isinstance(c, bindings.AnoncredsObject)
-                else c
-            ).handle
-            for c in cred_defs.values()
-        ]
+        schema_ids, schemas = _object_handles(Schema, schemas)
+        cred_def_ids, cred_defs = _object_handles(CredentialDefinition, cred_defs)
         creds = []
         creds_prove = []
         for (cred, cred_ts) in present_creds.entries.items():
@@ -423,57 +557,434 @@ class Presentation(bindings.AnoncredsObject):
     def verify(
         self,
         pres_req: Union[str, PresentationRequest],
-        schemas: Sequence[Union[str, Schema]],
-        cred_defs: Sequence[Union[str, CredentialDefinition]],
-        rev_reg_defs: Sequence[Union[str, "RevocationRegistryDefinition"]] = None,
-        rev_reg_entries: Mapping[
-            str, Mapping[int, Union[str, "RevocationRegistry"]]
-        ] = None,
+        schemas: Mapping[str, Union[str, Schema]],
+        cred_defs: Mapping[str, Union[str, CredentialDefinition]],
+        rev_reg_defs: Mapping[str, Union[str, "RevocationRegistryDefinition"]] = None,
+        rev_status_lists: Sequence[Union[str, bindings.AnoncredsObject]] = None,
     ) -> bool:
         if not isinstance(pres_req, bindings.AnoncredsObject):
             pres_req = PresentationRequest.load(pres_req)
-        schemas = [
-            (
-                Schema.load(s) if not isinstance(s, bindings.AnoncredsObject) else s
-            ).handle
-            for s in schemas
-        ]
-        cred_defs = [
-            (
-                CredentialDefinition.load(c)
-                if not isinstance(c, bindings.AnoncredsObject)
-                else c
-            ).handle
-            for c in cred_defs
-        ]
-        reg_defs = []
-        reg_entries = []
-        for reg_def in rev_reg_defs:
-            if not isinstance(reg_def, bindings.AnoncredsObject):
-                reg_def = RevocationRegistryDefinition.load(reg_def)
-            reg_def_id = reg_def.id
-            if rev_reg_entries and reg_def_id in rev_reg_entries:
-                for timestamp, entry in rev_reg_entries[reg_def_id].items():
-                    if not isinstance(entry, bindings.AnoncredsObject):
-                        entry = RevocationRegistry.load(entry)
-                    reg_entries.append(
-                        bindings.RevocationEntry.create(
-                            len(reg_defs), entry.handle, timestamp
-                        )
-                    )
-            reg_defs.append(reg_def.handle)
+        schema_ids, schemas = _object_handles(Schema, schemas)
+        cred_def_ids, cred_defs = _object_handles(CredentialDefinition, cred_defs)
+        rev_reg_def_ids, rev_reg_defs = _object_handles(
+            RevocationRegistryDefinition, rev_reg_defs
+        )
 
         return bindings.verify_presentation(
             self.handle,
             pres_req.handle,
             schemas,
+            schema_ids,
+            cred_defs,
+            cred_def_ids,
+            rev_reg_defs,
+            rev_reg_def_ids,
+            _rev_status_list_handles(rev_status_lists),
+        )
+
+    def verify_with_index(
+        self,
+        pres_req: Union[str, PresentationRequest],
+        schemas: Mapping[str, Union[str, Schema]],
+        cred_defs: Mapping[str, Union[str, CredentialDefinition]],
+        rev_reg_defs: Mapping[str, Union[str, "RevocationRegistryDefinition"]] = None,
+        rev_index: "RevocationIndex" = None,
+    ) -> bool:
+        if not isinstance(pres_req, bindings.AnoncredsObject):
+            pres_req = PresentationRequest.load(pres_req)
+        schema_ids, schemas = _object_handles(Schema, schemas)
+        cred_def_ids, cred_defs = _object_handles(CredentialDefinition, cred_defs)
+        rev_reg_def_ids, rev_reg_defs = _object_handles(
+            RevocationRegistryDefinition, rev_reg_defs
+        )
+
+        return bindings.verify_presentation_with_revocation_index(
+            self.handle,
+            pres_req.handle,
+            schemas,
+            schema_ids,
             cred_defs,
-            reg_defs,
-            reg_entries or None,
+            cred_def_ids,
+            rev_reg_defs,
+            rev_reg_def_ids,
+            rev_index and rev_index.handle,
         )
 
+    @classmethod
+    def verify_many(
+        cls,
+        presentations: Sequence[
+            Tuple[Union[str, "Presentation"], Union[str, PresentationRequest]]
+        ],
+        schemas: Mapping[str, Union[str, Schema]],
+        cred_defs: Mapping[str, Union[str, CredentialDefinition]],
+        rev_reg_defs: Mapping[str, Union[str, "RevocationRegistryDefinition"]] = None,
+        rev_status_lists: Sequence[Union[str, bindings.AnoncredsObject]] = None,
+    ) -> List[Union[bool, AnoncredsError]]:
+        """Verify many presentations in one call using the shared objects.
+
+        Returns one entry per `(presentation, pres_req)` pair: the verification
+        result, or the `AnoncredsError` raised while verifying that pair.
+        """
+        pres_handles = []
+        pres_req_handles = []
+        for presentation, pres_req in presentations:
+            if not isinstance(presentation, bindings.AnoncredsObject):
+                presentation = Presentation.load(presentation)
+            if not isinstance(pres_req, bindings.AnoncredsObject):
+                pres_req = PresentationRequest.load(pres_req)
+            pres_handles.append(presentation.handle)
+            pres_req_handles.append(pres_req.handle)
+        schema_ids, schemas = _object_handles(Schema, schemas)
+        cred_def_ids, cred_defs = _object_handles(CredentialDefinition, cred_defs)
+        rev_reg_def_ids, rev_reg_defs = _object_handles(
+            RevocationRegistryDefinition, rev_reg_defs
+        )
+        rev_status_lists = _rev_status_list_handles(rev_status_lists)
+
+        return bindings.verify_presentations(
+            pres_handles,
+            pres_req_handles,
+            schemas,
+            schema_ids,
+            cred_defs,
+            cred_def_ids,
+            rev_reg_defs,
+            rev_reg_def_ids,
+            rev_status_lists,
+        )
+
+
+class VerifierContext(bindings.AnoncredsObject):
+    """Prepared verification keys, reusable across many presentations."""
+
+    @classmethod
+    def create(
+        cls,
+        schemas: Mapping[str, Union[str, Schema]],
+        cred_defs: Mapping[str, Union[str, CredentialDefinition]],
+        rev_reg_defs: Mapping[str, Union[str, "RevocationRegistryDefinition"]] = None,
+    ) -> "VerifierContext":
+        schema_ids, schemas = _object_handles(Schema, schemas)
+        cred_def_ids, cred_defs = _object_handles(CredentialDefinition, cred_defs)
+        rev_reg_def_ids, rev_reg_defs = _object_handles(
+            RevocationRegistryDefinition, rev_reg_defs
+        )
+        return VerifierContext(
+            bindings.create_verifier_context(
+                schemas,
+                schema_ids,
+                cred_defs,
+                cred_def_ids,
+                rev_reg_defs,
+                rev_reg_def_ids,
+            )
+        )
+
+    def verify(
+        self,
+        presentation: Union[str, Presentation],
+        pres_req: Union[str, PresentationRequest],
+        rev_index: "RevocationIndex" = None,
+    ) -> bool:
+        if not isinstance(presentation, bindings.AnoncredsObject):
+            presentation = Presentation.load(presentation)
+        if not isinstance(pres_req, bindings.AnoncredsObject):
+            pres_req = PresentationRequest.load(pres_req)
+        return bindings.verify_presentation_with_context(
+            presentation.handle,
+            pres_req.handle,
+            self.handle,
+            rev_index and rev_index.handle,
+        )
+
+
+class RevocationIndex(bindings.AnoncredsObject):
+    """Revocation status lists indexed by registry and timestamp."""
+
+    @classmethod
+    def create(
+        cls, rev_status_lists: Sequence[Union[str, bindings.AnoncredsObject]]
+    ) -> "RevocationIndex":
+        return RevocationIndex(
+            bindings.create_revocation_index(
+                _rev_status_list_handles(rev_status_lists)
+            )
+        )
+
+    def find_timestamp(
+        self, rev_reg_def_id: str, from_: int = None, to: int = None
+    ) -> Optional[int]:
+        """Find the latest indexed timestamp for a registry within an interval."""
+        return bindings.revocation_index_find_timestamp(
+            self.handle, rev_reg_def_id, from_, to
+        )
+
+
+class RevocationIndexAllocator(bindings.AnoncredsObject):
+    """Allocates the revocation indices of a registry from a bitmap of those in use.
+
+    An index stays in use once its credential is issued, including after it is
+    revoked. The state can be saved with `to_json` and restored with `load`.
+    """
+
+    @classmethod
+    def create(
+        cls,
+        rev_status_list: Union[str, bindings.AnoncredsObject],
+        issuance_by_default: bool = True,
+        first_unused: int = 1,
+    ) -> "RevocationIndexAllocator":
+        """Create an allocator for the indices of a status list.
+
+        The status list only shows the indices revoked when issuance is by default,
+        and those issued otherwise. Indices below `first_unused` are also in use.
+        """
+        (rev_status_list,) = _rev_status_list_handles([rev_status_list])
+        return RevocationIndexAllocator(
+            bindings.create_revocation_index_allocator(
+                rev_status_list, issuance_by_default, first_unused
+            )
+        )
+
+    @classmethod
+    def load(
+        cls, value: Union[dict, str, bytes, memoryview]
+    ) -> "RevocationIndexAllocator":
+        return RevocationIndexAllocator(
+            bindings._object_from_json(
+                "anoncreds_revocation_index_allocator_from_json", value
+            )
+        )
+
+    def next(self) -> int:
+        """Allocate a free index."""
+        return bindings.revocation_index_allocator_next(self.handle, 1)[0]
+
+    def next_many(self, count: int) -> List[int]:
+        """Allocate `count` free indices, or none of them if there are not enough."""
+        return bindings.revocation_index_allocator_next(self.handle, count)
+
+    def reserve(self, index: int):
+        """Mark a specific index as in use."""
+        bindings.revocation_index_allocator_reserve(self.handle, index)
+
+    def release(self, index: int):
+        """Return an allocated index whose credential was not issued."""
+        bindings.revocation_index_allocator_release(self.handle, index)
+
+    @property
+    def free_count(self) -> int:
+        return bindings.revocation_index_allocator_free_count(self.handle)
+
+
+# Revocation indices as integers, or as packed bits laid out as in
+# `RevocationStatusList.bits`
+RevocationIndices = Union[Iterable[int], range, bytes, bytearray, memoryview]
+
+
+class RevocationStatusList(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_revocation_list_from_bytes"
+
+    @classmethod
+    def create(
+        cls,
+        rev_reg_def_id: str,
+        rev_reg_def: Union[str, "RevocationRegistryDefinition"],
+        timestamp: Optional[int] = None,
+        issuance_by_default: bool = True,
+    ) -> "RevocationStatusList":
+        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
+            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
+        return RevocationStatusList(
+            bindings.create_revocation_status_list(
+                rev_reg_def_id, rev_reg_def.handle, timestamp, issuance_by_default
+            )
+        )
+
+    @classmethod
+    def load(cls, value: Union[dict, str, bytes, memoryview]) -> "RevocationStatusList":
+        return RevocationStatusList(
+            bindings._object_from_json("anoncreds_revocation_list_from_json", value)
+        )
+
+    def update(
+        self,
+        rev_reg_def: Union[str, "RevocationRegistryDefinition"],
+        issued: Optional[RevocationIndices] = None,
+        revoked: Optional[RevocationIndices] = None,
+        timestamp: Optional[int] = None,
+    ):
+        """Mark indices as issued or revoked, updating the accumulator in one call.
+
+        The indices may be given as an iterable of integers, a `range`, or packed bits
+        in a bytes-like object, laid out as in `bits`. The previous list is released
+        by the library, so other references to its handle become invalid.
+        """
+        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
+            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
+        size = self.size
+        self.handle = bindings.update_revocation_status_list_bits(
+            timestamp,
+            _pack_indices(issued, size),
+            _pack_indices(revoked, size),
+            rev_reg_def.handle,
+            self.handle,
+        )
+
+    def revoke(
+        self,
+        rev_reg_def: Union[str, "RevocationRegistryDefinition"],
+        indices: RevocationIndices,
+        timestamp: Optional[int] = None,
+    ):
+        """Revoke the credentials at `indices`, as `update` does."""
+        self.update(rev_reg_def, revoked=indices, timestamp=timestamp)
+
+    def update_timestamp(self, timestamp: int):
+        """Set the timestamp of the list, without changing the revocation list."""
+        self.handle = bindings.update_revocation_status_list_timestamp_only(
+            timestamp, self.handle
+        )
+
+    def to_json(self, encoding: str = None) -> str:
+        """Serialize the status list, optionally with a compact revocation list.
+
+        The encoding is one of `array` (the default), `bits` or `rle`. The `bits`
+        encoding holds the base64 encoded bytes of `bits`, in the same bit order.
+        """
+        return bytes(
+            bindings.revocation_status_list_to_json(self.handle, encoding)
+        ).decode("utf-8")
+
+    @property
+    def bits(self) -> memoryview:
+        """A read-only view of the packed revocation list, without copying it.
+
+        Index `i` is revoked when bit `i % 8` of byte `i // 8` is set, counting from the
+        least significant bit, as in the `bits` JSON encoding. The bits following the
+        last index are undefined.
+        """
+        return bindings.revocation_status_list_get_bits(self.handle)[0]
+
+    @property
+    def size(self) -> int:
+        """The number of indices in the revocation list."""
+        return bindings.revocation_status_list_get_bits(self.handle)[1]
+
+    def is_revoked(self, index: int) -> bool:
+        return self.are_revoked((index,))[0]
+
+    def are_revoked(self, indices: Iterable[int]) -> List[bool]:
+        """Look up the revocation status of many indices."""
+        bits, size = bindings.revocation_status_list_get_bits(self.handle)
+        result = []
+        for index in indices:
+            if not 0 <= index < size:
+                raise IndexError(f"Revocation index {index} is out of range")
+            result.append(bool(bits[index >> 3] >> (index & 7) & 1))
+        return result
+
+    def count_revoked(self) -> int:
+        """Count the revoked indices."""
+        bits, size = bindings.revocation_status_list_get_bits(self.handle)
+        value = int.from_bytes(bits, "little") & ((1 << size) - 1)
+        if hasattr(value, "bit_count"):
+            return value.bit_count()
+        return bin(value).count("1")
+
+    def iter_revoked(self) -> Iterator[int]:
+        """Iterate over the revoked indices in ascending order."""
+        bits, size = bindings.revocation_status_list_get_bits(self.handle)
+        # unrevoked spans are skipped eight bytes at a time
+        words = bits[: len(bits) & ~7].cast("Q") if len(bits) >= 8 else ()
+        for word_idx, word in enumerate(words):
+            if word:
+                yield from _set_bits(word, word_idx << 6, size)
+        for byte_idx in range(len(words) << 3, len(bits)):
+            if bits[byte_idx]:
+                yield from _set_bits(bits[byte_idx], byte_idx << 3, size)
+
+
+def _pack_indices(
+    indices: Optional[RevocationIndices], size: int
+) -> Optional[Union[bytes, bytearray, memoryview]]:
+    """Pack revocation indices into bits, as returned by `RevocationStatusList.bits`
+    and held by the `bits` JSON encoding."""
+    if indices is None or isinstance(indices, (bytes, bytearray, memoryview)):
+        return indices
+    if isinstance(indices, range) and indices.step == 1:
+        if not indices:
+            return None
+        if indices.start < 0 or indices.stop > size:
+            raise IndexError(f"Revocation indices {indices} are out of range")
+        value = (1 << indices.stop) - (1 << indices.start)
+        return value.to_bytes((size + 7) >> 3, "little")
+    packed = bytearray((size + 7) >> 3)
+    for index in indices:
+        if not 0 <= index < size:
+            raise IndexError(f"Revocation index {index} is out of range")
+        packed[index >> 3] |= 1 << (index & 7)
+    return packed
+
+
+def _set_bits(value: int, start: int, size: int) -> Iterator[int]:
+    while value:
+        low = value & -value
+        index = start + low.bit_length() - 1
+        if index >= size:
+            return
+        yield index
+        value ^= low
+
+
+def _object_handles(
+    cls: Type[bindings.AnoncredsObject],
+    objects: Optional[Mapping[str, Union[str, bindings.AnoncredsObject]]],
+) -> Tuple[List[str], List[bindings.ObjectHandle]]:
+    """The identifiers and handles of ledger objects, loaded through the object
+    cache when one is installed."""
+    objects = objects or {}
+    return list(objects.keys()), [
+        object_cache.resolve(cls, obj_id, obj).handle
+        for obj_id, obj in objects.items()
+    ]
+
+
+def _rev_status_list_handles(
+    rev_status_lists: Optional[Sequence[Union[str, bindings.AnoncredsObject]]]
+) -> List[bindings.ObjectHandle]:
+    return [
+        (
+            RevocationStatusList.load(r)
+            if not isinstance(r, bindings.AnoncredsObject)
+            else r
+        ).handle
+        for r in (rev_status_lists or ())
+    ]
+
+
+class TailsMemoryWriter:
+    """Keeps the tails of a new registry in memory instead of writing a tails file.
+
+    Pass it to `RevocationRegistryDefinition.create` as `tails_writer`. The tails are
+    then available as `tails`, or passed to `sink` in chunks as they are generated so
+    that they need not be held in memory. The tails location of the definition is
+    `tails_location`, such as the URL the tails will be uploaded to, or the tails
+    hash by default.
+    """
+
+    def __init__(
+        self, tails_location: str = None, sink: Callable[[bytes], None] = None
+    ):
+        self.tails_location = tails_location
+        self.sink = sink
+        self.tails: Optional[memoryview] = None
+        self.tails_hash: Optional[str] = None
+
 
 class RevocationRegistryDefinition(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_revocation_registry_definition_from_bytes"
     GET_ATTR = "anoncreds_revocation_registry_definition_get_attribute"
 
     @classmethod
@@ -481,39 +992,57 @@ class RevocationRegistryDefinition(bindings.AnoncredsObject):
         cls,
         cred_def_id: str,
         cred_def: Union[str, CredentialDefinition],
+        issuer_id: str,
         tag: str,
         registry_type: str,
         max_cred_num: int,
         *,
-        issuance_type: str = None,
         tails_dir_path: str = None,
-    ) -> Tuple[
-        "RevocationRegistryDefinition",
-        "RevocationRegistryDefinitionPrivate",
-        "RevocationRegistry",
-        "RevocationRegistryDelta",
-    ]:
+        threads: int = 1,
+        tails_writer: TailsMemoryWriter = None,
+    ) -> Tuple["RevocationRegistryDefinition", "RevocationRegistryDefinitionPrivate"]:
+        """Create a revocation registry definition and write its tails file.
+
+        The tails are generated on `threads` threads, or on every available core when
+        `threads` is zero. The tails file is the same whatever the thread count. With
+        a `tails_writer`, the tails are kept in memory instead of written to a file.
+        """
         if not isinstance(cred_def, bindings.AnoncredsObject):
             cred_def = CredentialDefinition.load(cred_def)
-        (
-            reg_def,
-            reg_def_private,
-            reg_entry,
-            reg_init_delta,
-        ) = bindings.create_revocation_registry(
+        if tails_writer:
+            (
+                reg_def,
+                reg_def_private,
+                tails,
+            ) = bindings.create_revocation_registry_definition_in_memory(
+                cred_def.handle,
+                cred_def_id,
+                issuer_id,
+                tag,
+                registry_type,
+                max_cred_num,
+                tails_writer.tails_location,
+                threads,
+                tails_writer.sink,
+            )
+            reg_def = RevocationRegistryDefinition(reg_def)
+            tails_writer.tails = memoryview(tails.raw) if tails else None
+            tails_writer.tails_hash = reg_def.tails_hash
+            return reg_def, RevocationRegistryDefinitionPrivate(reg_def_private)
+
+        reg_def, reg_def_private = bindings.create_revocation_registry_definition(
             cred_def.handle,
             cred_def_id,
+            issuer_id,
             tag,
             registry_type,
-            issuance_type,
             max_cred_num,
             tails_dir_path,
+            threads,
         )
         return (
             RevocationRegistryDefinition(reg_def),
             RevocationRegistryDefinitionPrivate(reg_def_private),
-            RevocationRegistry(reg_entry),
-            RevocationRegistryDelta(reg_init_delta),
         )
 
     @classmethod
@@ -570,6 +1099,8 @@ class RevocationRegistryDefinition(bindings.AnoncredsObject):
 
 
 class RevocationRegistryDefinitionPrivate(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_revocation_registry_definition_private_from_bytes"
+
     @classmethod
     def load(
         cls, value: Union[dict, str, bytes, memoryview]
@@ -582,41 +1113,18 @@ class RevocationRegistryDefinitionPrivate(bindings.AnoncredsObject):
 
 
 class RevocationRegistry(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_revocation_registry_from_bytes"
+
     @classmethod
     def load(cls, value: Union[dict, str, bytes, memoryview]) -> "RevocationRegistry":
         return RevocationRegistry(
             bindings._object_from_json("anoncreds_revocation_registry_from_json", value)
         )
 
-    def revoke_credential(
-        self,
-        rev_reg_def: Union[str, RevocationRegistryDefinition],
-        cred_rev_idx: int,
-        tails_path: str,
-    ) -> "RevocationRegistryDelta":
-        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
-            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
-        self.handle, rev_delta = bindings.revoke_credential(
-            rev_reg_def.handle, self.handle, cred_rev_idx, tails_path
-        )
-        return RevocationRegistryDelta(rev_delta)
-
-    def update(
-        self,
-        rev_reg_def: Union[str, RevocationRegistryDefinition],
-        issued: Sequence[int],
-        revoked: Sequence[int],
-        tails_path: str,
-    ) -> "RevocationRegistryDelta":
-        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
-            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
-        self.handle, rev_delta = bindings.update_revocation_registry(
-            rev_reg_def.handle, self.handle, issued, revoked, tails_path
-        )
-        return RevocationRegistryDelta(rev_delta)
-
 
 class RevocationRegistryDelta(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_revocation_registry_delta_from_bytes"
+
     @classmethod
     def load(
         cls, value: Union[dict, str, bytes, memoryview]
@@ -627,25 +1135,21 @@ class RevocationRegistryDelta(bindings.AnoncredsObject):
             )
         )
 
-    def update_with(
-        self, next_delta: Union[str, "RevocationRegistryDelta"]
-    ) -> "RevocationRegistryDelta":
-        if not isinstance(next_delta, bindings.AnoncredsObject):
-            next_delta = RevocationRegistryDelta.load(next_delta)
-        self.handle = bindings.merge_revocation_registry_deltas(
-            self.handle, next_delta.handle
-        )
-
 
 class CredentialRevocationConfig:
+    """The registry to issue revocable credentials in.
+
+    Without a `rev_reg_index`, each issuance allocates an index from
+    `index_allocator`, which is released again if the issuance fails.
+    """
+
     def __init__(
         self,
         rev_reg_def: Union[str, "RevocationRegistryDefinition"] = None,
         rev_reg_def_private: Union[str, "RevocationRegistryDefinitionPrivate"] = None,
-        rev_reg: Union[str, "RevocationRegistry"] = None,
         rev_reg_index: int = None,
-        rev_reg_used: Sequence[int] = None,
         tails_path: str = None,
+        index_allocator: RevocationIndexAllocator = None,
     ):
         if not isinstance(rev_reg_def, bindings.AnoncredsObject):
             rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
@@ -655,58 +1159,170 @@ class CredentialRevocationConfig:
                 rev_reg_def_private
             )
         self.rev_reg_def_private = rev_reg_def_private
-        if not isinstance(rev_reg, bindings.AnoncredsObject):
-            rev_reg = RevocationRegistry.load(rev_reg)
-        self.rev_reg = rev_reg
         self.rev_reg_index = rev_reg_index
-        self.rev_reg_used = rev_reg_used
         self.tails_path = tails_path
+        self.index_allocator = index_allocator
 
     @property
-    def _native(self) -> bindings.RevocationConfig:
-        return bindings.RevocationConfig.create(
+    def _cred_rev_info(self) -> bindings.CredRevInfo:
+        return self._cred_rev_info_for(self.rev_reg_index)
+
+    def _cred_rev_info_for(self, rev_reg_index: int) -> bindings.CredRevInfo:
+        return bindings.CredRevInfo.create(
             self.rev_reg_def.handle,
             self.rev_reg_def_private.handle,
-            self.rev_reg.handle,
-            self.rev_reg_index,
-            self.rev_reg_used,
+            rev_reg_index,
             self.tails_path,
         )
 
+    def _issue(
+        self, issue: Callable[[bindings.CredRevInfo], bindings.ObjectHandle]
+    ) -> bindings.ObjectHandle:
+        # issue with the configured index, or with a newly allocated one
+        if self.rev_reg_index is not None:
+            return issue(self._cred_rev_info)
+        if self.index_allocator is None:
+            raise AnoncredsError(
+                AnoncredsErrorCode.INPUT,
+                "The revocation config has neither a revocation index nor an index "
+                "allocator",
+            )
+        rev_reg_index = self.index_allocator.next()
+        try:
+            return issue(self._cred_rev_info_for(rev_reg_index))
+        except BaseException:
+            self.index_allocator.release(rev_reg_index)
+            raise
+
+
+class IssuerRegistrySession(bindings.AnoncredsObject):
+    """Issuer state for a revocation registry, reused across many issuances.
+
+    The session is bound to the registry definition, private key and tails file of
+    `revocation_config`, and issues at its index or from its index allocator. Only
+    the tails for the index of each new credential are read, instead of walking
+    the registry for every issuance.
+    """
+
+    @classmethod
+    def create(
+        cls,
+        revocation_config: CredentialRevocationConfig,
+        rev_status_list: Union[str, RevocationStatusList],
+    ) -> "IssuerRegistrySession":
+        (rev_status_list,) = _rev_status_list_handles([rev_status_list])
+        session = IssuerRegistrySession(
+            bindings.create_issuer_registry_session(
+                revocation_config.rev_reg_def.handle,
+                revocation_config.rev_reg_def_private.handle,
+                rev_status_list,
+                revocation_config.tails_path,
+            )
+        )
+        session.revocation_config = revocation_config
+        return session
+
+    @property
+    def rev_status_list(self) -> RevocationStatusList:
+        """The status list, including credentials issued on demand so far."""
+        return RevocationStatusList(
+            bindings.issuer_registry_session_get_status_list(self.handle)
+        )
+
+    def create_credential(
+        self,
+        cred_def: Union[str, CredentialDefinition],
+        cred_def_private: Union[str, CredentialDefinitionPrivate],
+        cred_offer: Union[str, CredentialOffer],
+        cred_request: Union[str, CredentialRequest],
+        attr_raw_values: Mapping[str, str],
+        attr_enc_values: Mapping[str, str] = None,
+        rev_reg_id: Optional[str] = None,
+    ) -> Credential:
+        if not isinstance(cred_def, bindings.AnoncredsObject):
+            cred_def = CredentialDefinition.load(cred_def)
+        if not isinstance(cred_def_private, bindings.AnoncredsObject):
+            cred_def_private = CredentialDefinitionPrivate.load(cred_def_private)
+        if not isinstance(cred_offer, bindings.AnoncredsObject):
+            cred_offer = CredentialOffer.load(cred_offer)
+        if not isinstance(cred_request, bindings.AnoncredsObject):
+            cred_request = CredentialRequest.load(cred_request)
+        return Credential(
+            self.revocation_config._issue(
+                lambda rev_info: bindings.create_credential_with_session(
+                    cred_def.handle,
+                    cred_def_private.handle,
+                    cred_offer.handle,
+                    cred_request.handle,
+                    attr_raw_values,
+                    attr_enc_values,
+                    rev_reg_id,
+                    self.handle,
+                    rev_info.reg_idx,
+                )
+            )
+        )
+
 
 class CredentialRevocationState(bindings.AnoncredsObject):
+    FROM_BYTES = "anoncreds_revocation_state_from_bytes"
+
     @classmethod
     def create(
         cls,
         rev_reg_def: Union[str, RevocationRegistryDefinition],
-        # Delta -> List
-        rev_reg_list: Union[str, RevocationRegistryDelta],
+        rev_status_list: Union[str, RevocationStatusList],
         rev_reg_idx: int,
         tails_path: str,
-        # TODO: state type
-        rev_state: Union[str, str],
-        # Delta -> List
-        old_rev_reg_list: Union[str, RevocationRegistryDelta],
+        rev_state: Union[str, "CredentialRevocationState"] = None,
+        old_rev_status_list: Union[str, RevocationStatusList] = None,
     ) -> "CredentialRevocationState":
         if not isinstance(rev_reg_def, bindings.AnoncredsObject):
             rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
-        if not isinstance(rev_reg_list, bindings.AnoncredsObject):
-            rev_reg_list = RevocationRegistryDelta.load(rev_reg_list)
-        if not isinstance(rev_state, bindings.AnoncredsObject):
+        if not isinstance(rev_status_list, bindings.AnoncredsObject):
+            rev_status_list = RevocationStatusList.load(rev_status_list)
+        if rev_state is not None and not isinstance(
+            rev_state, bindings.AnoncredsObject
+        ):
             rev_state = CredentialRevocationState.load(rev_state)
-        if not isinstance(old_rev_reg_list, bindings.AnoncredsObject):
-            old_rev_reg_list = RevocationRegistryDelta.load(old_rev_reg_list)
+        if old_rev_status_list is not None and not isinstance(
+            old_rev_status_list, bindings.AnoncredsObject
+        ):
+            old_rev_status_list = RevocationStatusList.load(old_rev_status_list)
         return CredentialRevocationState(
             bindings.create_or_update_revocation_state(
                 rev_reg_def.handle,
-                rev_reg_list.handle,
+                rev_status_list.handle,
                 rev_reg_idx,
                 tails_path,
-                rev_state.handle,
-                old_rev_reg_list.handle,
+                rev_state.handle if rev_state is not None else None,
+                old_rev_status_list.handle if old_rev_status_list is not None else None,
             )
         )
 
+    @classmethod
+    def create_many(
+        cls,
+        rev_reg_def: Union[str, RevocationRegistryDefinition],
+        rev_status_list: Union[str, RevocationStatusList],
+        rev_reg_idxs: Sequence[int],
+        tails_path: str,
+    ) -> List["CredentialRevocationState"]:
+        """Create the revocation states of many credentials for one status list.
+
+        The tails are read once and the witnesses computed in parallel.
+        """
+        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
+            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
+        if not isinstance(rev_status_list, bindings.AnoncredsObject):
+            rev_status_list = RevocationStatusList.load(rev_status_list)
+        return [
+            CredentialRevocationState(handle)
+            for handle in bindings.create_revocation_states(
+                rev_reg_def.handle, rev_status_list.handle, rev_reg_idxs, tails_path
+            )
+        ]
+
     @classmethod
     def load(
         cls, value: Union[dict, str, bytes, memoryview]
@@ -718,20 +1334,79 @@ class CredentialRevocationState(bindings.AnoncredsObject):
     def update(
         self,
         rev_reg_def: Union[str, RevocationRegistryDefinition],
-        rev_reg_delta: Union[str, RevocationRegistryDelta],
+        rev_status_list: Union[str, RevocationStatusList],
         rev_reg_index: int,
-        timestamp: int,
         tails_path: str,
+        old_rev_status_list: Union[str, RevocationStatusList],
     ):
         if not isinstance(rev_reg_def, bindings.AnoncredsObject):
             rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
-        if not isinstance(rev_reg_delta, bindings.AnoncredsObject):
-            rev_reg_delta = RevocationRegistryDelta.load(rev_reg_delta)
+        if not isinstance(rev_status_list, bindings.AnoncredsObject):
+            rev_status_list = RevocationStatusList.load(rev_status_list)
+        if not isinstance(old_rev_status_list, bindings.AnoncredsObject):
+            old_rev_status_list = RevocationStatusList.load(old_rev_status_list)
         self.handle = bindings.create_or_update_revocation_state(
             rev_reg_def.handle,
-            rev_reg_delta.handle,
+            rev_status_list.handle,
             rev_reg_index,
-            timestamp,
             tails_path,
             self.handle,
+            old_rev_status_list.handle,
+        )
+
+    def catch_up(
+        self,
+        rev_reg_def: Union[str, RevocationRegistryDefinition],
+        rev_reg_index: int,
+        tails_path: str,
+        old_rev_status_list: Union[str, RevocationStatusList],
+        rev_status_lists: Sequence[Union[str, RevocationStatusList]],
+    ):
+        """Update the state to the latest of a number of newer status lists.
+
+        `old_rev_status_list` is the status list the state was created or last updated
+        with. The intermediate lists are skipped, with a single witness update.
+        """
+        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
+            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
+        if not isinstance(old_rev_status_list, bindings.AnoncredsObject):
+            old_rev_status_list = RevocationStatusList.load(old_rev_status_list)
+        self.handle = bindings.catch_up_revocation_state(
+            rev_reg_def.handle,
+            rev_reg_index,
+            tails_path,
+            self.handle,
+            old_rev_status_list.handle,
+            _rev_status_list_handles(rev_status_lists),
+        )
+
+    @classmethod
+    def update_many(
+        cls,
+        rev_reg_def: Union[str, RevocationRegistryDefinition],
+        old_rev_status_list: Union[str, RevocationStatusList],
+        rev_status_list: Union[str, RevocationStatusList],
+        rev_states: Sequence[Union[bytes, memoryview]],
+        rev_reg_idxs: Sequence[int],
+        tails_path: str,
+    ) -> List[bytes]:
+        """Update many serialized revocation states to a newer status list.
+
+        The states are given and returned as JSON or binary encoded buffers, each in
+        the encoding it was given in. The registry delta is computed once and applied
+        to the witnesses in parallel.
+        """
+        if not isinstance(rev_reg_def, bindings.AnoncredsObject):
+            rev_reg_def = RevocationRegistryDefinition.load(rev_reg_def)
+        if not isinstance(old_rev_status_list, bindings.AnoncredsObject):
+            old_rev_status_list = RevocationStatusList.load(old_rev_status_list)
+        if not isinstance(rev_status_list, bindings.AnoncredsObject):
+            rev_status_list = RevocationStatusList.load(rev_status_list)
+        return bindings.update_revocation_states(
+            rev_reg_def.handle,
+            old_rev_status_list.handle,
+            rev_status_list.handle,
+            rev_states,
+            rev_reg_idxs,
+            tails_path,
         )
@@ -0,0 +1,78 @@
+"""Measure the round-trip overhead of library calls.
+
+Compares calls through the declared signatures and cached function pointers used by
+`bindings.do_call` with the previous behaviour: a library attribute lookup on every
+call and dynamic conversion of undeclared arguments.
+
+Run from the wrapper directory with `python demo/ffi_overhead.py`.
+"""
+
+from ctypes import CDLL, byref
+from timeit import timeit
+
+from anoncreds import (
+    bindings,
+    Credential,
+    CredentialDefinition,
+    CredentialOffer,
+    CredentialRequest,
+    MasterSecret,
+    Schema,
+)
+
+ITERATIONS = 100000
+
+issuer_id = "mock:uri"
+schema_id = "mock:uri"
+cred_def_id = "mock:uri"
+
+schema = Schema.create("schema name", "schema version", issuer_id, ["attr"])
+cred_def, cred_def_pvt, key_proof = CredentialDefinition.create(
+    schema_id, schema, issuer_id, "tag", "CL"
+)
+master_secret = MasterSecret.create()
+cred_offer = CredentialOffer.create(schema_id, cred_def_id, key_proof)
+cred_req, _cred_req_metadata = CredentialRequest.create(
+    None, cred_def, master_secret, "my id", cred_offer
+)
+cred = Credential.create(
+    cred_def, cred_def_pvt, cred_offer, cred_req, {"attr": "test"}
+)
+
+# a second instance of the library without declared signatures
+unbound_lib = CDLL(bindings.get_library()._name)
+
+
+def unbound_call(fn_name, *args):
+    result = getattr(unbound_lib, fn_name)(*args)
+    if result:
+        raise bindings.get_current_error(True)
+
+
+def object_get_json(call):
+    result = bindings.ByteBuffer()
+    call("anoncreds_object_get_json", schema.handle, byref(result))
+
+
+def object_get_attribute(call):
+    result = bindings.StrBuffer()
+    call(
+        "anoncreds_credential_get_attribute",
+        cred.handle,
+        bindings.encode_str("schema_id"),
+        byref(result),
+    )
+
+
+def generate_nonce(call):
+    result = bindings.StrBuffer()
+    call("anoncreds_generate_nonce", byref(result))
+
+
+for op in (object_get_json, object_get_attribute, generate_nonce):
+    before = timeit(lambda: op(unbound_call), number=ITERATIONS) / ITERATIONS
+    after = timeit(lambda: op(bindings.do_call), number=ITERATIONS) / ITERATIONS
+    print(
+        f"{op.__name__:<22} before: {before * 1e6:8.2f}us"
+        f"  after: {after * 1e6:8.2f}us  saved: {(before - after) * 1e6:8.2f}us"
+    )
@@ -1,7 +1,22 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from time import time
 
 from anoncreds import (
+    aio,
+    arena,
+    bindings,
     generate_nonce,
+    get_object_cache,
+    object_creation_sites,
+    object_store_report,
+    object_store_stats,
+    set_object_cache,
+    set_object_tracing,
+    tails_cache_evict,
+    tails_cache_register_reader,
+    AnoncredsError,
     Credential,
     CredentialDefinition,
     CredentialOffer,
@@ -12,8 +27,13 @@ from anoncreds import (
     Presentation,
     PresentCredentials,
     MasterSecret,
+    ObjectCache,
+    RevocationIndexAllocator,
     RevocationRegistryDefinition,
+    RevocationRegistryPool,
+    RevocationStatusList,
     Schema,
+    TailsMemoryWriter,
 )
 
 issuer_id   = "mock:uri"
@@ -34,12 +54,11 @@ cred_def, cred_def_pvt, key_proof = CredentialDefinition.create(
     schema_id, schema, issuer_id, "tag", "CL", support_revocation=True
 )
 
-(
-    rev_reg_def,
-    rev_reg_def_private,
-    rev_reg,
-    rev_reg_init_list,
-) = RevocationRegistryDefinition.create(cred_def_id, cred_def, "default", "CL_ACCUM", 100)
+rev_reg_def, rev_reg_def_private = RevocationRegistryDefinition.create(
+    cred_def_id, cred_def, issuer_id, "default", "CL_ACCUM", 100
+)
+
+rev_status_list = RevocationStatusList.create(rev_reg_id, rev_reg_def, int(time()))
 
 master_secret = MasterSecret.create()
 master_secret_id = "my id"
@@ -52,7 +71,7 @@ cred_req, cred_req_metadata = CredentialRequest.create(
 
 issuer_rev_index = 1
 
-cred, _rev_reg_updated, _rev_delta = Credential.create(
+cred = Credential.create(
     cred_def,
     cred_def_pvt,
     cred_offer,
@@ -63,11 +82,10 @@ cred, _rev_reg_updated, _rev_delta = Credential.create(
     CredentialRevocationConfig(
         rev_reg_def,
         rev_reg_def_private,
-        rev_reg,
         issuer_rev_index,
-        (),
         rev_reg_def.tails_location,
     ),
+    rev_status_list,
 )
 
 cred_received = cred.process(cred_req_metadata, master_secret, cred_def, rev_reg_def)
@@ -109,6 +127,36 @@ presentation = Presentation.create(
     pres_req, present_creds, {}, master_secret, {schema_id: schema}, {cred_def_id: cred_def}
 )
 
+# parse the ledger objects passed as JSON once, however many presentations use them
+set_object_cache(ObjectCache(max_bytes=16 * 1024 * 1024))
+for _ in range(2):
+    Presentation.create(
+        pres_req,
+        present_creds,
+        {},
+        master_secret,
+        {schema_id: schema.to_json()},
+        {cred_def_id: cred_def.to_json()},
+    )
+assert get_object_cache().stats["hits"] == 2
+set_object_cache(None)
+
+# free the objects created while handling a request together, keeping a copy of one
+with arena() as scope:
+    loaded = [Presentation.load(presentation.to_json()) for _ in range(3)]
+    assert len(scope) == 3
+    kept = loaded[0].copy()
+assert kept.to_json() == presentation.to_json()
+
+# account for the live native objects, recording where new ones are created
+set_object_tracing(True)
+traced = Presentation.load(presentation.to_json())
+report = object_store_report(largest=3)
+assert report["types"]["Presentation"]["count"] >= 2
+assert report["peak_objects"] >= report["live_objects"]
+assert any("test.py" in site for site in object_creation_sites())
+set_object_tracing(False)
+
 # verified = presentation.verify(
 #     pres_req,
 #     [schema],
@@ -147,5 +195,171 @@ presentation = Presentation.create(
 # )
 # assert not verified
 # 
+
+# revoke a block of credentials with one update of the accumulator
+rev_status_list.revoke(rev_reg_def, range(10, 60), int(time()) + 1)
+assert rev_status_list.count_revoked() == 50
+
+# allocate the registry index on issuance, and restore the allocator from a snapshot
+allocator = RevocationIndexAllocator.create(rev_status_list, first_unused=2)
+cred_allocated = Credential.create(
+    cred_def,
+    cred_def_pvt,
+    cred_offer,
+    cred_req,
+    {"attr": "test"},
+    None,
+    rev_reg_id,
+    CredentialRevocationConfig(
+        rev_reg_def,
+        rev_reg_def_private,
+        tails_path=rev_reg_def.tails_location,
+        index_allocator=allocator,
+    ),
+    rev_status_list,
+)
+assert cred_allocated.rev_reg_index == 2
+allocator = RevocationIndexAllocator.load(allocator.to_json())
+assert allocator.next_many(8) == [3, 4, 5, 6, 7, 8, 9, 60]
+
+# serve the tails through a range reader, as from a blob store, instead of the file
+with open(rev_reg_def.tails_location, "rb") as tails_file:
+    tails = tails_file.read()
+tails_reads = []
+
+
+def read_tails(offset, size):
+    tails_reads.append((offset, size))
+    return tails[offset : offset + size]
+
+
+tails_cache_register_reader(rev_reg_def.tails_hash, len(tails), read_tails)
+cred_from_reader = Credential.create(
+    cred_def,
+    cred_def_pvt,
+    cred_offer,
+    cred_req,
+    {"attr": "test"},
+    None,
+    rev_reg_id,
+    CredentialRevocationConfig(
+        rev_reg_def,
+        rev_reg_def_private,
+        tails_path="",
+        index_allocator=allocator,
+    ),
+    rev_status_list,
+)
+assert tails_reads and cred_from_reader.rev_reg_index == 61
+assert tails_cache_evict(rev_reg_def.tails_hash)
+# the reader is released by the library once no longer used
+assert not bindings._TAILS_READERS
+
+# keep the tails of a new registry in memory, or stream them, instead of a file
+tails_writer = TailsMemoryWriter("https://tails.example/upload")
+memory_reg_def, _ = RevocationRegistryDefinition.create(
+    cred_def_id,
+    cred_def,
+    issuer_id,
+    "memory",
+    "CL_ACCUM",
+    10,
+    tails_writer=tails_writer,
+)
+assert memory_reg_def.tails_location == "https://tails.example/upload"
+assert tails_writer.tails_hash == memory_reg_def.tails_hash
+tails_chunks = []
+RevocationRegistryDefinition.create(
+    cred_def_id,
+    cred_def,
+    issuer_id,
+    "streamed",
+    "CL_ACCUM",
+    10,
+    tails_writer=TailsMemoryWriter(sink=tails_chunks.append),
+)
+assert len(b"".join(tails_chunks)) == len(tails_writer.tails)
+
+# allocate indices from registries generated in the background, rotating to the
+# next registry once half of the indices of the active one are allocated
+with RevocationRegistryPool(
+    cred_def_id, cred_def, issuer_id, 10, ready=2, fill_level=0.5
+) as pool:
+    allocated = pool.allocate_many(8)
+    assert [index for _, index in allocated] == [1, 2, 3, 4, 1, 2, 3, 4]
+    registry, index = allocated[-1]
+    cred_pooled = Credential.create(
+        cred_def,
+        cred_def_pvt,
+        cred_offer,
+        cred_req,
+        {"attr": "test"},
+        None,
+        registry.rev_reg_def_id,
+        registry.revocation_config(index),
+        registry.rev_status_list,
+    )
+    assert cred_pooled.rev_reg_index == index
+
+# await library calls from asyncio, with at most two of them queued or running at
+# once, and cancel one which has already started
+native_pool = aio.NativePool(max_workers=4, max_in_flight=2)
+running = {"now": 0, "most": 0}
+running_lock = threading.Lock()
+blocked_started = threading.Event()
+unblock = threading.Event()
+
+
+def load_presentation(block=False):
+    with running_lock:
+        running["now"] += 1
+        running["most"] = max(running["most"], running["now"])
+    try:
+        if block:
+            blocked_started.set()
+            unblock.wait()
+        return Presentation.load(presentation.to_json())
+    finally:
+        with running_lock:
+            running["now"] -= 1
+
+
+async def load_presentations():
+    blocked = asyncio.ensure_future(native_pool.run(load_presentation, True))
+    await asyncio.get_running_loop().run_in_executor(None, blocked_started.wait)
+    blocked.cancel()
+    loaded = await asyncio.gather(
+        *(native_pool.run(load_presentation) for _ in range(6))
+    )
+    try:
+        await blocked
+    except asyncio.CancelledError:
+        pass
+    return loaded
+
+
+live_before = object_store_stats()["live_objects"]
+loaded = asyncio.run(load_presentations())
+assert len(loaded) == 6 and running["most"] <= 2
+# the cancelled call finishes after its event loop is closed, and its result is freed
+unblock.set()
+native_pool.shutdown(wait=True)
+assert object_store_stats()["live_objects"] == live_before + 6
+
+
+# each thread sees the error of its own failing call, while other threads succeed
+def load_or_fail(pos):
+    if pos % 2:
+        return Presentation.load(presentation.to_json()).to_json() is not None
+    try:
+        Schema.load(" " * pos + "x")
+    except AnoncredsError as err:
+        return f"column {pos + 1}]" in str(err)
+    return False
+
+
+with ThreadPoolExecutor(32) as executor:
+    assert all(executor.map(load_or_fail, range(512)))
+
 print("ok")
 